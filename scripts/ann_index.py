@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Approximate Nearest Neighbour Index
+HNSW graph over unit-normalised vectors for the local vector store
+- Incremental inserts (no rebuild when the embedders add chunks)
+- Per-query ef (search breadth) for trading latency against recall
+- Compaction drops tombstones left by deletes and replaced vectors
+- Compact binary persistence that loads with a few array.frombytes calls
+"""
+
+import heapq
+import math
+import operator
+import random
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+INDEX_MAGIC = b'HNSW'
+INDEX_VERSION = 1
+# magic, version, dim, m, ef_construction, ef_search, node count, entry point, max level
+HEADER_FORMAT = '<4sIIIIIiii'
+
+
+def normalize(vector: Sequence[float]) -> array:
+    """Return an L2-normalised float32 copy of a vector"""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return array('f', vector)
+    return array('f', (x / norm for x in vector))
+
+
+def dot(a: Sequence[float], b: Sequence[float]) -> float:
+    """Dot product of two equal-length vectors"""
+    return sum(map(operator.mul, a, b))
+
+
+class HNSWIndex:
+    """Hierarchical Navigable Small World graph (cosine similarity)"""
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 100,
+                 ef_search: int = 50, seed: int = 42):
+        """Create an empty index for vectors of the given dimension"""
+        self.dim = dim
+        self.m = m
+        self.m0 = m * 2  # layer 0 keeps twice as many links
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(max(m, 2))
+        self._rng = random.Random(seed)
+        self._vectors: List[array] = []
+        self._links: List[List[List[int]]] = []
+        self._deleted: set = set()
+        self._entry = -1
+        self._max_level = -1
+        self.stamp = ''  # save() tag shared with the records file written alongside
+
+    def __len__(self) -> int:
+        """Number of live (non-deleted) nodes"""
+        return len(self._vectors) - len(self._deleted)
+
+    @property
+    def node_count(self) -> int:
+        """Number of nodes including tombstones"""
+        return len(self._vectors)
+
+    @property
+    def entry_point(self) -> int:
+        """Node where searches start (-1 when empty)"""
+        return self._entry
+
+    @property
+    def max_level(self) -> int:
+        """Top layer of the graph"""
+        return self._max_level
+
+    @property
+    def deleted(self) -> Set[int]:
+        """Tombstoned node ids (live set; do not modify)"""
+        return self._deleted
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by vectors and link lists"""
+        vector_bytes = sum(sys.getsizeof(vector) for vector in self._vectors)
+        link_bytes = sum(sys.getsizeof(layers) + sum(sys.getsizeof(layer) for layer in layers)
+                         for layers in self._links)
+        return vector_bytes + link_bytes + sys.getsizeof(self._vectors) + sys.getsizeof(self._links)
+
+    def links(self, node: int) -> Sequence[Sequence[int]]:
+        """Per-layer neighbour lists of a node"""
+        return self._links[node]
+
+    def vector(self, node: int) -> array:
+        """Stored (normalised) vector of a node"""
+        return self._vectors[node]
+
+    def add(self, vector: Sequence[float]) -> int:
+        """Insert a vector and return its node id"""
+        if len(vector) != self.dim:
+            raise ValueError(f"Expected vector of dimension {self.dim}, got {len(vector)}")
+
+        query = normalize(vector)
+        node = len(self._vectors)
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._vectors.append(query)
+        self._links.append([[] for _ in range(level + 1)])
+
+        if self._entry < 0:
+            self._entry = node
+            self._max_level = level
+            return node
+
+        entry = self._entry
+        for layer in range(self._max_level, level, -1):
+            entry = self._search_layer(query, [entry], 1, layer)[0][1]
+
+        entries = [entry]
+        for layer in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(query, entries, self.ef_construction, layer)
+            max_links = self.m0 if layer == 0 else self.m
+            neighbours = self._select_neighbours(found, self.m)
+            self._links[node][layer] = neighbours
+            for neighbour in neighbours:
+                links = self._links[neighbour][layer]
+                links.append(node)
+                if len(links) > max_links:
+                    vec = self._vectors[neighbour]
+                    scored = [(dot(vec, self._vectors[n]), n) for n in links]
+                    self._links[neighbour][layer] = self._select_neighbours(scored, max_links)
+            entries = [n for _, n in found]
+
+        if level > self._max_level:
+            self._entry = node
+            self._max_level = level
+        return node
+
+    def remove(self, node: int) -> None:
+        """Tombstone a node; it stays in the graph for routing but is never returned"""
+        self._deleted.add(node)
+
+    def compacted(self) -> Tuple['HNSWIndex', List[int]]:
+        """New index holding only the live nodes, and the old node id of each new node
+
+        The graph is rebuilt by re-inserting the live vectors in node order;
+        the calibrated ef_search carries over.
+        """
+        index = HNSWIndex(self.dim, m=self.m, ef_construction=self.ef_construction, ef_search=self.ef_search)
+        live = [node for node in range(len(self._vectors)) if node not in self._deleted]
+        for node in live:
+            index.add(self._vectors[node])
+        return index, live
+
+    def search(self, vector: Sequence[float], k: int = 10,
+               ef: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to k (node, cosine similarity) pairs, best first"""
+        if self._entry < 0:
+            return []
+
+        query = normalize(vector)
+        ef = max(ef or self.ef_search, k)
+        entry = self._entry
+        for layer in range(self._max_level, 0, -1):
+            entry = self._search_layer(query, [entry], 1, layer)[0][1]
+
+        # Over-fetch a little so tombstoned nodes do not shrink the result set
+        found = self._search_layer(query, [entry], ef + len(self._deleted) if self._deleted else ef, 0)
+        results = [(node, sim) for sim, node in found if node not in self._deleted]
+        return results[:k]
+
+    def brute_force(self, vector: Sequence[float], k: int = 10) -> List[Tuple[int, float]]:
+        """Exact top-k by scanning every live vector"""
+        query = normalize(vector)
+        scored = (
+            (dot(query, vec), node)
+            for node, vec in enumerate(self._vectors)
+            if node not in self._deleted
+        )
+        return [(node, sim) for sim, node in heapq.nlargest(k, scored)]
+
+    def measure_recall(self, queries: Sequence[Sequence[float]], k: int = 10,
+                       ef: Optional[int] = None) -> float:
+        """Average recall@k of the graph search against an exact scan"""
+        if not queries:
+            return 1.0
+        total = 0.0
+        for query in queries:
+            exact = {node for node, _ in self.brute_force(query, k)}
+            if not exact:
+                total += 1.0
+                continue
+            approx = {node for node, _ in self.search(query, k, ef)}
+            total += len(exact & approx) / len(exact)
+        return total / len(queries)
+
+    def tune_ef(self, target_recall: float, k: int = 10, sample_size: int = 50,
+                max_ef: int = 512) -> Tuple[int, float]:
+        """Find the smallest ef that reaches target recall on sampled stored vectors"""
+        live = [node for node in range(len(self._vectors)) if node not in self._deleted]
+        if not live:
+            return self.ef_search, 1.0
+        sample = self._rng.sample(live, min(sample_size, len(live)))
+        queries = [self._vectors[node] for node in sample]
+
+        ef = max(k, 16)
+        recall = self.measure_recall(queries, k, ef)
+        while recall < target_recall and ef < max_ef:
+            ef = min(ef * 2, max_ef)
+            recall = self.measure_recall(queries, k, ef)
+        self.ef_search = ef
+        return ef, recall
+
+    def _search_layer(self, query: array, entries: List[int], ef: int,
+                      layer: int) -> List[Tuple[float, int]]:
+        """Greedy best-first search of one layer; returns (similarity, node) best first"""
+        vectors = self._vectors
+        links = self._links
+        visited = set(entries)
+        candidates = []
+        results = []
+        for node in entries:
+            sim = dot(query, vectors[node])
+            heapq.heappush(candidates, (-sim, node))
+            heapq.heappush(results, (sim, node))
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+            node_links = links[node]
+            if layer >= len(node_links):
+                continue
+            for neighbour in node_links[layer]:
+                if neighbour in visited:
+                    continue
+                visited.add(neighbour)
+                sim = dot(query, vectors[neighbour])
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbour))
+                    heapq.heappush(results, (sim, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbours(self, scored: List[Tuple[float, int]], limit: int) -> List[int]:
+        """HNSW neighbour heuristic: prefer candidates that are not already covered"""
+        selected: List[int] = []
+        discarded: List[int] = []
+        for sim, node in sorted(scored, reverse=True):
+            if len(selected) >= limit:
+                break
+            vec = self._vectors[node]
+            if all(dot(vec, self._vectors[s]) < sim for s in selected):
+                selected.append(node)
+            else:
+                discarded.append(node)
+        # Fill remaining slots with the closest discarded candidates
+        for node in discarded:
+            if len(selected) >= limit:
+                break
+            selected.append(node)
+        return selected
+
+    def export_graph(self) -> Tuple[array, array, array]:
+        """Flatten links into (levels, per-node offsets into flat links, flat links)
+
+        Each node's block in flat links is [n, ids...] repeated once per level.
+        """
+        levels = array('i', (len(node_links) - 1 for node_links in self._links))
+        offsets = array('Q', [0])
+        flat_links = array('i')
+        for node_links in self._links:
+            for layer_links in node_links:
+                flat_links.append(len(layer_links))
+                flat_links.extend(layer_links)
+            offsets.append(len(flat_links))
+        return levels, offsets, flat_links
+
+    @classmethod
+    def from_graph(cls, dim: int, vectors: Sequence, links: Sequence, deleted: Iterable[int],
+                   entry: int, max_level: int, m: int = 16, ef_construction: int = 100,
+                   ef_search: int = 50) -> 'HNSWIndex':
+        """Assemble an index from already-built vectors and links
+
+        vectors[node] and links[node][layer] may be lazy sequences (e.g. views
+        over a memory-mapped snapshot); such an index can be searched but not
+        extended.
+        """
+        index = cls(dim, m=m, ef_construction=ef_construction, ef_search=ef_search)
+        index._vectors = vectors
+        index._links = links
+        index._deleted = set(deleted)
+        index._entry = entry
+        index._max_level = max_level
+        return index
+
+    def save(self, path: str, stamp: str = '') -> None:
+        """Write the index to a binary file, tagged with stamp (trailing bytes)"""
+        levels, _, flat_links = self.export_graph()
+        vectors = array('f')
+        for vec in self._vectors:
+            vectors.extend(vec)
+        deleted = array('i', sorted(self._deleted))
+
+        with open(path, 'wb') as f:
+            f.write(struct.pack(
+                HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, self.dim, self.m,
+                self.ef_construction, self.ef_search, len(self._vectors),
+                self._entry, self._max_level,
+            ))
+            f.write(struct.pack('<II', len(flat_links), len(deleted)))
+            levels.tofile(f)
+            vectors.tofile(f)
+            flat_links.tofile(f)
+            deleted.tofile(f)
+            f.write(stamp.encode('utf-8'))
+
+    @classmethod
+    def load(cls, path: str) -> 'HNSWIndex':
+        """Read an index written by save()"""
+        with open(path, 'rb') as f:
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+            magic, version, dim, m, ef_c, ef_s, count, entry, max_level = struct.unpack(HEADER_FORMAT, header)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"{path} is not a version {INDEX_VERSION} HNSW index")
+            link_count, deleted_count = struct.unpack('<II', f.read(8))
+
+            levels = array('i')
+            levels.fromfile(f, count)
+            vectors = array('f')
+            vectors.fromfile(f, count * dim)
+            flat_links = array('i')
+            flat_links.fromfile(f, link_count)
+            deleted = array('i')
+            deleted.fromfile(f, deleted_count)
+            stamp = f.read().decode('utf-8')  # empty for files written before stamps
+
+        node_vectors = [vectors[i * dim:(i + 1) * dim] for i in range(count)]
+        node_links = []
+        pos = 0
+        for node in range(count):
+            layers = []
+            for _ in range(levels[node] + 1):
+                n = flat_links[pos]
+                layers.append(flat_links[pos + 1:pos + 1 + n].tolist())
+                pos += n + 1
+            node_links.append(layers)
+        index = cls.from_graph(dim, node_vectors, node_links, deleted, entry, max_level,
+                               m=m, ef_construction=ef_c, ef_search=ef_s)
+        index.stamp = stamp
+        return index
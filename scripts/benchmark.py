@@ -0,0 +1,1083 @@
+#!/usr/bin/env python3
+"""
+Digital Twin Benchmark Suite
+Offline performance measurements that need no Upstash or Groq credentials
+- ann: HNSW query latency and recall against exact scan as the corpus grows
+- chunks: memory of the columnar ChunkStore vs per-chunk dataclasses + dicts
+- tail: p50/p99 of a flaky synthetic provider, unguarded vs deadline + hedging
+- load: concurrent keep-alive JSON-RPC clients against a running mcp_server.py
+- embed: in-process embedding throughput (texts/sec) by worker count
+- imports: fresh-process import time of each cli.py command and of cli.py --help
+- skills: skill-gap queries on bitsets vs per-posting Python sets
+- postings: resident memory and read latency of posting bodies, in memory vs mmap content store
+- shards: scatter-gather recall, then upsert/query throughput over simulated remote shards
+- sched: live-question wait and batch fairness under a shared rate limit, FIFO vs priority scheduler
+- dedup: MinHash/LSH near-duplicate detection vs exact pairwise comparison; recall of injected reposts
+- metadata: query response bytes and parse time with full vs slim metadata plus local hydration
+- prefork: CPU-bound retrieval throughput and memory, one server process vs N pre-forked workers
+- json: profile load time and peak memory by file size, json.load vs the streaming parser
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import json
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from ann_index import HNSWIndex
+from chunk_store import ChunkStore
+from chunk_text import hydrate, slim_upserts
+from content_store import ContentStore
+from dedup import DuplicateIndex, shingles
+from embeddings import EMBEDDING_DIM, HashEmbedder, OnnxEmbedder
+from vector_store import LocalVectorStore, QueryResult
+from profiling import run
+from resilience import Deadline, ResilientCall
+from scheduler import INTERACTIVE, RequestScheduler
+from sharded_store import ShardedIndex
+from skill_index import SKILLS, SkillIndex, skill_mask
+
+
+def _clustered_vectors(rng: random.Random, count: int, dim: int,
+                       clusters: int = 64) -> List[List[float]]:
+    """Synthetic corpus with topic-like clusters (uniform noise makes ANN look too easy)"""
+    centers = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(clusters)]
+    vectors = []
+    for _ in range(count):
+        center = rng.choice(centers)
+        vectors.append([x + rng.gauss(0, 0.6) for x in center])
+    return vectors
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_ann(sizes: List[int], dim: int, queries: int, k: int, ef: int,
+              recall_target: float, seed: int = 7) -> List[Dict[str, float]]:
+    """Measure exact vs HNSW latency and recall at each corpus size"""
+    rng = random.Random(seed)
+    rows = []
+    print(f"\n📊 ANN benchmark (dim={dim}, k={k}, queries={queries})")
+    print(f"{'vectors':>9} {'build s':>8} {'exact ms':>9} {'ann p50':>8} {'ann p95':>8} "
+          f"{'recall':>7} {'tuned ef':>9} {'tuned recall':>13}")
+
+    for size in sizes:
+        corpus = _clustered_vectors(rng, size, dim)
+        probe = _clustered_vectors(rng, queries, dim)
+
+        index = HNSWIndex(dim)
+        start = time.perf_counter()
+        for vector in corpus:
+            index.add(vector)
+        build_s = time.perf_counter() - start
+
+        exact_ms = []
+        for query in probe:
+            start = time.perf_counter()
+            index.brute_force(query, k)
+            exact_ms.append((time.perf_counter() - start) * 1000)
+
+        ann_ms = []
+        for query in probe:
+            start = time.perf_counter()
+            index.search(query, k, ef)
+            ann_ms.append((time.perf_counter() - start) * 1000)
+
+        recall = index.measure_recall(probe, k, ef)
+        tuned_ef, tuned_recall = index.tune_ef(recall_target, k=k)
+
+        row = {
+            'vectors': size,
+            'build_s': build_s,
+            'exact_ms': statistics.mean(exact_ms),
+            'ann_p50_ms': _percentile(ann_ms, 50),
+            'ann_p95_ms': _percentile(ann_ms, 95),
+            'recall': recall,
+            'tuned_ef': tuned_ef,
+            'tuned_recall': tuned_recall,
+        }
+        rows.append(row)
+        print(f"{size:>9} {build_s:>8.1f} {row['exact_ms']:>9.2f} {row['ann_p50_ms']:>8.2f} "
+              f"{row['ann_p95_ms']:>8.2f} {recall:>7.1%} {tuned_ef:>9} {tuned_recall:>13.1%}")
+
+    return rows
+
+
+@dataclass
+class _DataclassChunk:
+    """The per-chunk layout the embedders used before ChunkStore"""
+    id: str
+    title: str
+    content: str
+    type: str
+    category: str
+    tags: List[str]
+
+
+def _synthetic_chunk(i: int) -> Dict:
+    """Posting-section-like chunk with realistic repetition in its short fields"""
+    company = f"Company {i % 500}"
+    return {
+        'id': f"job_{i // 5}_s{i % 5}",
+        'title': f"Data Analyst {i % 37} at {company}",
+        'content': (f"Section {i % 5} of posting {i // 5}. We are looking for an analyst with SQL, "
+                    f"Power BI and stakeholder skills to join {company} in Sydney. ") * 3,
+        'type': 'job_posting',
+        'category': ['requirements', 'about', 'benefits'][i % 3],
+        'tags': ['sql', 'power bi', 'analytics'][: 1 + i % 3],
+        'company': company,
+        'location': ['Sydney', 'Melbourne', 'Remote'][i % 3],
+    }
+
+
+def bench_chunks(count: int) -> Dict[str, float]:
+    """Peak traced memory for holding count chunks plus their upsert tuples"""
+    print(f"\n📊 Chunk storage benchmark ({count} chunks)")
+
+    tracemalloc.start()
+    chunks = []
+    for i in range(count):
+        c = _synthetic_chunk(i)
+        chunks.append(_DataclassChunk(c['id'], c['title'], c['content'], c['type'], c['category'], c['tags']))
+    vectors = [
+        (chunk.id, f"{chunk.title}: {chunk.content}",
+         {'title': chunk.title, 'type': chunk.type, 'category': chunk.category,
+          'content': chunk.content, 'tags': chunk.tags})
+        for chunk in chunks
+    ]
+    legacy = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del chunks, vectors
+
+    tracemalloc.start()
+    store = ChunkStore()
+    for i in range(count):
+        c = _synthetic_chunk(i)
+        store.append(c['id'], c['title'], c['content'], c['type'], c['category'], c['tags'],
+                     company=c['company'], location=c['location'])
+    for _ in store.iter_upsert(10):
+        pass
+    columnar = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rows = {'legacy_mb': legacy / 1e6, 'columnar_mb': columnar / 1e6, 'ratio': legacy / max(columnar, 1)}
+    print(f"  dataclasses + upsert tuples: {rows['legacy_mb']:8.1f} MB peak")
+    print(f"  ChunkStore + batched upsert: {rows['columnar_mb']:8.1f} MB peak "
+          f"({store.nbytes() / 1e6:.1f} MB in columns)")
+    print(f"  reduction: {rows['ratio']:.1f}x")
+    return rows
+
+
+def bench_tail(calls: int, base_ms: float, stall_rate: float, stall_ms: float,
+               deadline_ms: float, seed: int = 11) -> Dict[str, Dict[str, float]]:
+    """Latency percentiles of a provider that occasionally stalls, with and without guarding"""
+    rng = random.Random(seed)
+
+    def provider(_: Deadline = None) -> None:
+        slow = rng.random() < stall_rate
+        time.sleep((stall_ms if slow else rng.uniform(0.5, 1.5) * base_ms) / 1000)
+
+    print(f"\n📊 Tail latency benchmark ({calls} calls, {stall_rate:.0%} stall for {stall_ms:.0f} ms, "
+          f"deadline {deadline_ms:.0f} ms)")
+    rows = {}
+    guarded = ResilientCall('bench', default_hedge_delay=deadline_ms / 2000,
+                            failure_threshold=calls + 1)
+    for label in ('unguarded', 'deadline+hedge'):
+        samples, failures = [], 0
+        for _ in range(calls):
+            start = time.perf_counter()
+            if label == 'unguarded':
+                provider()
+            elif not guarded(provider, Deadline(deadline_ms / 1000)).ok:
+                failures += 1
+            samples.append((time.perf_counter() - start) * 1000)
+        rows[label] = {'p50_ms': _percentile(samples, 50), 'p99_ms': _percentile(samples, 99),
+                       'max_ms': max(samples), 'failed': failures}
+        print(f"  {label:>15}: p50 {rows[label]['p50_ms']:7.1f} ms  p99 {rows[label]['p99_ms']:7.1f} ms  "
+              f"max {rows[label]['max_ms']:7.1f} ms  timed out {failures}")
+    print(f"  hedges sent: {guarded.stats['hedges']}, won: {guarded.stats['hedge_wins']}")
+    return rows
+
+
+class _SimulatedShard:
+    """Stand-in for a remote index: one request at a time, service time grows with its size"""
+
+    def __init__(self, upsert_ms: float, per_vector_ms: float, query_ms: float, per_1k_ms: float,
+                 stall_s: float = 0.0):
+        self.ids: List[str] = []
+        self.upsert_ms, self.per_vector_ms = upsert_ms, per_vector_ms
+        self.query_ms, self.per_1k_ms = query_ms, per_1k_ms
+        self.stall_s = stall_s
+        self._busy = threading.Lock()
+        self._rng = random.Random(len(self.ids))
+
+    def upsert(self, vectors: List[Tuple]) -> str:
+        with self._busy:
+            time.sleep((self.upsert_ms + self.per_vector_ms * len(vectors)) / 1000)
+            self.ids.extend(v[0] for v in vectors)
+        return 'Success'
+
+    def query(self, vector: Any = None, top_k: int = 10, **_: Any) -> List[QueryResult]:
+        with self._busy:
+            time.sleep(self.stall_s or (self.query_ms + self.per_1k_ms * len(self.ids) / 1000) / 1000)
+            picks = self._rng.sample(self.ids, min(top_k, len(self.ids)))
+        return [QueryResult(id=i, score=self._rng.random()) for i in picks]
+
+
+def bench_shards(shard_counts: List[int], count: int, queries: int, clients: int,
+                 upsert_ms: float, per_vector_ms: float, query_ms: float, per_1k_ms: float,
+                 timeout_s: float, dim: int = 32, seed: int = 11) -> List[Dict[str, float]]:
+    """Merge recall on real local shards, then throughput scaling on simulated remote shards"""
+    rng = random.Random(seed)
+    print(f"\n📊 Sharded index benchmark ({count} vectors, {queries} queries, {clients} clients)")
+
+    # 1. Scatter-gather must return what one exact index returns
+    corpus = _clustered_vectors(rng, 2000, dim)
+    probes = _clustered_vectors(rng, 50, dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        single = LocalVectorStore(os.path.join(tmp, 'single'), dim=dim)
+        single.upsert([(f"v{i}", v) for i, v in enumerate(corpus)])
+        sharded = ShardedIndex([LocalVectorStore(os.path.join(tmp, f"s{n}"), dim=dim) for n in range(4)])
+        sharded.upsert([(f"v{i}", v) for i, v in enumerate(corpus)])
+        agree = 0
+        for probe in probes:
+            expect = {hit.id for hit in single.query(vector=probe, top_k=10, exact=True)}
+            got = {hit.id for hit in sharded.query(vector=probe, top_k=10, exact=True)}
+            agree += len(expect & got)
+        sharded.close()
+    print(f"  top-10 agreement, 4 local shards vs one exact index: {agree / (10 * len(probes)):.1%}")
+
+    # 2. Throughput against shards that serve one request at a time; batches
+    # grow with the shard count as in the ingest pipeline, and the timeout is
+    # lifted so queueing shows up as latency rather than partial results
+    print(f"  simulated shard: upsert {upsert_ms:g} ms + {per_vector_ms:g} ms/vector, "
+          f"query {query_ms:g} ms + {per_1k_ms:g} ms per 1k vectors")
+    print(f"  {'shards':>6} {'upserts/s':>10} {'queries/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'upsert x':>9} {'query x':>8}")
+    rows = []
+    batch = [(f"job_{i}", None) for i in range(count)]
+    for shards in shard_counts:
+        index = ShardedIndex([_SimulatedShard(upsert_ms, per_vector_ms, query_ms, per_1k_ms)
+                              for _ in range(shards)], timeout=600)
+        step = 100 * shards
+        start = time.perf_counter()
+        for pos in range(0, count, step):
+            index.upsert(batch[pos:pos + step])
+        upsert_rate = count / (time.perf_counter() - start)
+
+        latencies: List[float] = []
+        per_client = max(1, queries // clients)
+
+        def client() -> None:
+            for _ in range(per_client):
+                begin = time.perf_counter()
+                index.query(vector=[0.0], top_k=10)
+                latencies.append((time.perf_counter() - begin) * 1000)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        query_rate = len(latencies) / (time.perf_counter() - start)
+        index.close()
+        row = {'shards': shards, 'upserts_per_s': upsert_rate, 'queries_per_s': query_rate,
+               'p50_ms': _percentile(latencies, 50), 'p99_ms': _percentile(latencies, 99)}
+        base = rows[0] if rows else row
+        row['upsert_scaling'] = upsert_rate / base['upserts_per_s']
+        row['query_scaling'] = query_rate / base['queries_per_s']
+        rows.append(row)
+        print(f"  {shards:>6} {upsert_rate:>10.0f} {query_rate:>10.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['upsert_scaling']:>8.1f}x {row['query_scaling']:>7.1f}x")
+    print("  every query visits every shard, so the fixed per-shard query cost caps query scaling")
+
+    # 3. One stalled shard: answers still arrive, one timeout later and partial
+    shards = max(shard_counts)
+    members = [_SimulatedShard(upsert_ms, per_vector_ms, query_ms, per_1k_ms) for _ in range(shards)]
+    members[-1].stall_s = timeout_s * 5
+    index = ShardedIndex(members, timeout=timeout_s)
+    index.upsert(batch[:1000])
+    start = time.perf_counter()
+    hits = index.query(vector=[0.0], top_k=10)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {shards} shards, one stalled: {len(hits)} hits in {elapsed:.0f} ms "
+          f"(timeout {timeout_s * 1000:.0f} ms), missing shard(s) {index.last_missing}")
+    index.close()
+    return rows
+
+
+def bench_sched(seconds: float, rate: float, service_ms: float, jobs: Dict[str, int],
+                interval_ms: float, batch_share: float) -> Dict[str, Dict[str, float]]:
+    """Interactive waits and batch throughput when batch jobs saturate one provider
+
+    The provider allows `rate` requests per second. Batch workers send back
+    to back; one live client asks every interval_ms. 'fifo' is a shared
+    limiter with no priorities (everything queues in arrival order),
+    'scheduled' tags the workers as batch jobs.
+    """
+    print(f"\n📊 Scheduler benchmark ({rate:g} requests/s limit, {seconds:g}s, batch jobs "
+          + ', '.join(f"{job}×{workers}" for job, workers in jobs.items())
+          + f", a live question every {interval_ms:g} ms)")
+    print(f"  {'mode':>10} {'live p50 ms':>12} {'live p95 ms':>12} {'live max ms':>12} "
+          f"{'batch req/s':>12}  per-job share")
+    rows = {}
+    for mode in ('fifo', 'scheduled'):
+        scheduler = RequestScheduler({'provider': (rate, 0)}, batch_share=batch_share, window=1.0)
+        stop = time.perf_counter() + seconds
+        live_waits: List[float] = []
+
+        def worker(job: str) -> None:
+            while time.perf_counter() < stop:
+                # In fifo mode the job name only labels the request; every request is one class
+                scheduler.acquire('provider', job=job if mode == 'scheduled' else None)
+                if mode == 'fifo':
+                    scheduler.jobs.setdefault(job, {'granted': 0, 'waited_s': 0.0})['granted'] += 1
+                time.sleep(service_ms / 1000)
+
+        def live() -> None:
+            time.sleep(1.0)  # let the batch jobs fill the window first
+            while time.perf_counter() < stop:
+                begin = time.perf_counter()
+                scheduler.acquire('provider')
+                live_waits.append((time.perf_counter() - begin) * 1000)
+                time.sleep(interval_ms / 1000)
+
+        threads = [threading.Thread(target=worker, args=(job,), daemon=True)
+                   for job, workers in jobs.items() for _ in range(workers)]
+        threads.append(threading.Thread(target=live, daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        granted = {job: stats['granted'] for job, stats in scheduler.jobs.items()}
+        total = sum(granted.values()) or 1
+        row = {'live_p50_ms': _percentile(live_waits, 50), 'live_p95_ms': _percentile(live_waits, 95),
+               'live_max_ms': max(live_waits), 'batch_per_s': total / seconds,
+               'max_live_queued': scheduler.counts[INTERACTIVE]['max_queued']}
+        rows[mode] = row
+        shares = ', '.join(f"{job} {granted.get(job, 0) / total:.0%}" for job in jobs)
+        print(f"  {mode:>10} {row['live_p50_ms']:>12.1f} {row['live_p95_ms']:>12.1f} "
+              f"{row['live_max_ms']:>12.1f} {row['batch_per_s']:>12.1f}  {shares}")
+    print(f"  batch work may use {batch_share:.0%} of the limit; the rest is kept for live questions")
+    return rows
+
+
+def bench_dedup(count: int, repost_rate: float, edit_rate: float, threshold: float,
+                exact_sample: int = 1000) -> Dict[str, float]:
+    """Near-duplicate detection over count synthetic postings with injected reposts
+
+    A repost copies an earlier posting with edit_rate of its words changed;
+    an equal number of loosely related rewrites (40% of words changed) must
+    not be flagged. Exact all-pairs Jaccard is timed on exact_sample postings
+    and extrapolated, since it grows with the square of the corpus.
+    """
+    rng = random.Random(11)
+    vocab = [f"term{i}" for i in range(3000)]
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(vocab))]
+    boilerplate = ' '.join(rng.choices(vocab, weights, k=40))  # the equal-opportunity paragraph
+    texts: List[str] = []
+    reposts: Dict[int, int] = {}  # repost position -> original position
+
+    def rewrite(words: List[str], rate: float) -> List[str]:
+        words = list(words)
+        for pos in rng.sample(range(len(words)), int(len(words) * rate)):
+            words[pos] = rng.choice(vocab)
+        return words
+
+    for i in range(count):
+        if texts and rng.random() < repost_rate:
+            original = rng.randrange(len(texts))
+            reposts[len(texts)] = original
+            texts.append(' '.join(rewrite(texts[original].split(), edit_rate)))
+        elif texts and rng.random() < repost_rate:
+            texts.append(' '.join(rewrite(rng.choice(texts).split(), 0.4)))
+        else:
+            texts.append(' '.join(rng.choices(vocab, weights, k=rng.randint(250, 450))) + ' ' + boilerplate)
+
+    print(f"\n📊 Near-duplicate benchmark ({count} postings, {len(reposts)} reposts at "
+          f"{edit_rate:.0%} edits, threshold {threshold:.2f})")
+    index = DuplicateIndex(threshold)
+    found: Dict[int, int] = {}
+    start = time.perf_counter()
+    for pos, text in enumerate(texts):
+        match = index.add(str(pos), text)
+        if match:
+            found[pos] = int(match[0])
+    lsh_s = time.perf_counter() - start
+
+    sets = [set(shingles(text)) for text in texts[:exact_sample]]
+    start = time.perf_counter()
+    for i in range(len(sets)):
+        for j in range(i):
+            len(sets[i] & sets[j]) / len(sets[i] | sets[j])
+    sample_s = time.perf_counter() - start
+    exact_s = sample_s * (count / len(sets)) ** 2 if sets else 0.0
+
+    # A repost of a repost may be matched to any copy in its group
+    def root(pos: int) -> int:
+        while pos in reposts:
+            pos = reposts[pos]
+        return pos
+
+    hits = sum(1 for pos in reposts if pos in found and root(found[pos]) == root(pos))
+    false_positives = sum(1 for pos, other in found.items() if root(pos) != root(other))
+    row = {'postings': count, 'reposts': len(reposts), 'found': len(found),
+           'recall': hits / len(reposts) if reposts else 1.0, 'false_positives': false_positives,
+           'lsh_s': lsh_s, 'exact_s': exact_s, 'candidates': index.stats['candidates'],
+           'pairs': count * (count - 1) // 2}
+    print(f"  MinHash + LSH ({index.bands} bands × {index.rows} rows): {lsh_s:.2f}s "
+          f"({lsh_s / count * 1000:.2f} ms/posting), {row['candidates']:,} candidate comparisons")
+    print(f"  exact pairwise Jaccard: {exact_s:.2f}s (extrapolated from {len(sets)} postings), "
+          f"{row['pairs']:,} comparisons")
+    print(f"  reposts found: {hits}/{len(reposts)} (recall {row['recall']:.1%}), "
+          f"{false_positives} rewrite(s) wrongly flagged")
+    print(f"  vectors saved: {len(found)} of {count} ({len(found) / count:.1%}) not embedded")
+    return row
+
+
+def _synthetic_chunk_metadata(rng: random.Random, i: int) -> Dict[str, Any]:
+    """Metadata shaped like a profile chunk or a posting section chunk"""
+    words = ' '.join(rng.choice(SKILLS) for _ in range(rng.randint(60, 180)))
+    if i % 3:
+        return {'jobId': f"job_{i // 6}", 'type': 'job_posting', 'title': f"Data Analyst {i % 37}",
+                'company': f"Company {i % 500}", 'location': 'Sydney, New South Wales, Australia (Hybrid)',
+                'salary': 'Not specified', 'filename': f"posting-{i // 6}.md", 'section': i % 6,
+                'content': words}
+    return {'title': f"Experience {i % 40} - Achievements at Company {i % 12}", 'type': 'experience',
+            'category': 'professional', 'content': words, 'tags': ['experience', 'achievement', 'metrics']}
+
+
+def bench_metadata(count: int, queries: int, top_k: int, shards: int) -> Dict[str, Dict[str, float]]:
+    """Bytes and parse time of query responses, full metadata vs slim plus hydration
+
+    Each query gets top_k hits from each of `shards` shards, as the sharded
+    index scatters, and keeps the best top_k. Responses are Upstash-shaped
+    JSON; slim hits are hydrated from a chunk text store afterwards, for the
+    kept hits only.
+    """
+    rng = random.Random(5)
+    full = [(f"chunk_{i}", None, _synthetic_chunk_metadata(rng, i)) for i in range(count)]
+    candidates = top_k * shards
+    print(f"\n📊 Metadata benchmark ({count} chunks, {queries} queries, {candidates} candidates "
+          f"→ {top_k} kept per query)")
+    picks = [rng.sample(range(count), candidates) for _ in range(queries)]
+    rows: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ContentStore.open(os.path.join(tmp, 'chunk_text.dat'), writable=True)
+        slim = slim_upserts(full, store)
+        store.save()
+        store.close()
+        reader = ContentStore.open(os.path.join(tmp, 'chunk_text.dat'))
+        for mode, vectors in (('full', full), ('slim', slim)):
+            responses = [json.dumps({'result': [{'id': vectors[pos][0], 'score': 0.5, 'metadata': vectors[pos][2]}
+                                                for pos in pick]}) for pick in picks]
+            start = time.perf_counter()
+            parsed = [json.loads(body)['result'] for body in responses]
+            parse_s = time.perf_counter() - start
+            start = time.perf_counter()
+            for hits in parsed:
+                for hit in hits[:top_k]:
+                    hydrate(hit['id'], hit['metadata'], reader if mode == 'slim' else None)
+            hydrate_s = time.perf_counter() - start
+            records = ChunkStore()
+            for vector_id, _, metadata in vectors:
+                records.append_metadata(vector_id, metadata)
+            rows[mode] = {'bytes_per_query': sum(map(len, responses)) / queries,
+                          'parse_us': parse_s / queries * 1e6, 'hydrate_us': hydrate_s / queries * 1e6,
+                          'local_records_mb': records.nbytes() / 1e6}
+        reader.close()
+    print(f"  {'metadata':<9} {'KB/query':>9} {'parse µs':>9} {'hydrate µs':>11} {'total µs':>9} "
+          f"{'local records MB':>17}")
+    for mode, row in rows.items():
+        print(f"  {mode:<9} {row['bytes_per_query'] / 1000:>9.1f} {row['parse_us']:>9.0f} "
+              f"{row['hydrate_us']:>11.0f} {row['parse_us'] + row['hydrate_us']:>9.0f} "
+              f"{row['local_records_mb']:>17.2f}")
+    saved = 1 - rows['slim']['bytes_per_query'] / rows['full']['bytes_per_query']
+    print(f"  slim responses are {saved:.0%} smaller; text is read locally for the {top_k} kept hits only")
+    return rows
+
+
+LOAD_QUESTIONS = [
+    "What certifications do you have?",
+    "Tell me about your work experience",
+    "What are your technical skills?",
+    "Describe a challenging project you worked on",
+    "How are you transitioning into data analytics?",
+    "How do you approach data quality issues?",
+]
+
+
+def _drive_load(url: str, clients: int, requests_per_client: int, tenant: str = None,
+                vary: bool = False) -> Dict[str, Any]:
+    """Concurrent keep-alive JSON-RPC clients; vary makes every question distinct (no coalescing)"""
+    target = urlsplit(url)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    def client(worker: int) -> None:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        for i in range(requests_per_client):
+            question = LOAD_QUESTIONS[(worker + i) % len(LOAD_QUESTIONS)]
+            arguments = {'question': f"{question} ({worker}-{i})" if vary else question}
+            if tenant:
+                arguments['tenant'] = tenant
+            body = json.dumps({'jsonrpc': '2.0', 'id': f"{worker}-{i}", 'method': 'tools/call',
+                               'params': {'name': 'query_digital_twin', 'arguments': arguments}})
+            start = time.perf_counter()
+            try:
+                conn.request('POST', target.path or '/api/mcp', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+                status = 0
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {'requests': len(latencies), 'rps': len(latencies) / elapsed,
+            'p50_ms': _percentile(latencies, 50), 'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99), 'statuses': statuses}
+
+
+def bench_load(url: str, clients: int, requests_per_client: int, tenant: str = None) -> Dict[str, float]:
+    """Latency and throughput of the JSON-RPC server under concurrent keep-alive clients"""
+    print(f"\n📊 Load test against {url} ({clients} clients x {requests_per_client} requests)")
+    row = _drive_load(url, clients, requests_per_client, tenant)
+    print(f"  {row['rps']:.1f} req/s  p50 {row['p50_ms']:.1f} ms  p95 {row['p95_ms']:.1f} ms  "
+          f"p99 {row['p99_ms']:.1f} ms  statuses {row['statuses']}")
+    target = urlsplit(url)
+    try:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=5)
+        conn.request('GET', '/health')
+        print(f"  server: {conn.getresponse().read().decode()}")
+    except OSError:
+        pass
+    return row
+
+
+def _process_tree_mb(root: int) -> Tuple[float, float]:
+    """(summed RSS, summed PSS) in MB of a process and its children, from /proc
+
+    RSS counts a shared page once per process that maps it; PSS splits it
+    between them, so PSS is what the tree really costs.
+    """
+    pids = [root]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == root:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith('Rss:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('Pss:'):
+                        pss += int(line.split()[1])
+        except OSError:
+            continue
+    return rss / 1024, pss / 1024
+
+
+def bench_prefork(processes: List[int], count: int, clients: int,
+                  requests_per_client: int) -> List[Dict[str, Any]]:
+    """Throughput of CPU-bound local retrieval: one server process vs N pre-forked workers
+
+    0 processes is the plain mcp_server.py (one process, thread pool). Every
+    question is distinct so none are coalesced; each is a local text query
+    plus context assembly, with no LLM.
+    """
+    from mcp_server import DigitalTwinServer
+    from worker_pool import PreforkServer, prefork_supported
+    if not prefork_supported():
+        print("❌ Pre-forked workers need fork and socket passing (Unix only)")
+        return []
+    print(f"\n📊 Prefork benchmark ({count} chunks, {clients} clients x {requests_per_client} "
+          f"requests, {os.cpu_count()} CPUs)")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp)
+        chunks = [_synthetic_chunk(i) for i in range(count)]
+        for pos in range(0, count, 500):
+            store.upsert([(f"chunk_{i}", chunk['content'], {'title': chunk['title'], 'content': chunk['content']})
+                          for i, chunk in enumerate(chunks[pos:pos + 500], pos)])
+        del chunks
+
+        def answer(tenant: str, question: str) -> Dict[str, Any]:
+            hits = store.query(data=question, top_k=3, include_metadata=True)
+            context = '\n\n'.join(f"{hit.metadata['title']}: {hit.metadata['content']}" for hit in hits)
+            return {'success': True, 'response': f"Based on {len(hits)} chunks ({len(context)} chars)"}
+
+        print(f"  {'processes':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'PSS MB':>8} "
+              f"{'speedup':>8}")
+        for n in processes:
+            sock = socket.create_server(('127.0.0.1', 0), backlog=1024)
+            port = sock.getsockname()[1]
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    sys.stdout = open(os.devnull, 'w')
+                    if n:
+                        PreforkServer(lambda: DigitalTwinServer(answer, 8, 1024), n).serve(sock=sock)
+                    else:
+                        asyncio.run(DigitalTwinServer(answer, 8, 1024).serve('', 0, sock=sock))
+                except BaseException:
+                    status = 1
+                finally:
+                    os._exit(status)
+            sock.close()
+            url = f"http://127.0.0.1:{port}/api/mcp"
+            _drive_load(url, max(n, 1), 5, vary=True)  # warm up every worker
+            row = _drive_load(url, clients, requests_per_client, vary=True)
+            rss, pss = _process_tree_mb(pid)
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+            row.update({'processes': n, 'rss_mb': rss, 'pss_mb': pss})
+            row['speedup'] = row['rps'] / rows[0]['rps'] if rows else 1.0
+            rows.append(row)
+            print(f"  {n:>9} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {rss:>8.1f} "
+                  f"{pss:>8.1f} {row['speedup']:>7.1f}x")
+    print("  PSS splits shared pages between the processes mapping them; RSS counts them in each")
+    return rows
+
+
+def bench_embed(count: int, workers: List[int], provider: str = 'hash',
+                batch_size: int = 64) -> List[Dict[str, float]]:
+    """Embedding throughput for count posting-like texts at each worker count"""
+    texts = [_synthetic_chunk(i)['content'] for i in range(count)]
+    rows = []
+    print(f"\n📊 Embedding benchmark ({provider}, {count} texts, batch {batch_size})")
+    print(f"{'workers':>8} {'seconds':>8} {'texts/sec':>10} {'speedup':>8}")
+    for n in workers:
+        if provider == 'onnx':
+            embedder = OnnxEmbedder(workers=n, batch_size=batch_size)
+        else:
+            embedder = HashEmbedder(EMBEDDING_DIM, workers=n, batch_size=batch_size)
+        embedder.embed_batch(texts[:batch_size])  # warm up pools and model
+        embedder.stats = {'texts': 0, 'batches': 0, 'seconds': 0.0}
+        embedder.embed_batch(texts)
+        embedder.close()
+        rate = embedder.texts_per_sec
+        rows.append({'workers': n, 'seconds': embedder.stats['seconds'], 'texts_per_sec': rate})
+        print(f"{n:>8} {embedder.stats['seconds']:>8.2f} {rate:>10,.0f} {rate / rows[0]['texts_per_sec']:>7.1f}x")
+    return rows
+
+
+def bench_skills(count: int, repeats: int = 5) -> Dict[str, float]:
+    """Gap/overlap/demand over count synthetic postings: bitset index vs sets + Counter"""
+    from collections import Counter
+
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(SKILLS))]  # a few skills are asked for everywhere
+    index = SkillIndex()
+    posting_sets = []
+    started = time.perf_counter()
+    for i in range(count):
+        wanted = set(rng.choices(SKILLS, weights, k=rng.randint(6, 18)))
+        text = f"We need {', '.join(sorted(wanted))}."
+        index.add(f"job_{i}", f"Data Analyst {i % 37}", f"Company {i % 500}", text)
+        posting_sets.append(wanted)
+    build_s = time.perf_counter() - started
+    have = skill_mask(rng.sample(SKILLS, len(SKILLS) // 3))
+    have_names = {skill for skill in SKILLS if have & skill_mask([skill])}
+    companies = [f"Company {i % 500}".casefold() for i in range(count)]
+    needle = 'company 1'  # Company 1, 10-19, 100-199: about a fifth of postings
+
+    def timed(fn) -> float:
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return statistics.median(times) * 1000
+
+    def naive(rows):
+        demand = Counter(skill for wanted in rows for skill in wanted)
+        return ([(s, n) for s, n in demand.most_common() if s not in have_names],
+                [(s, n) for s, n in demand.most_common() if s in have_names])
+
+    row = {
+        'postings': count, 'build_s': build_s,
+        'bitset_all_ms': timed(lambda: (index.gaps(have), index.overlap(have))),
+        'sets_all_ms': timed(lambda: naive(posting_sets)),
+        'bitset_subset_ms': timed(lambda: (lambda subset: (index.gaps(have, subset), index.overlap(have, subset)))(
+            index.select(needle))),
+        'sets_subset_ms': timed(lambda: naive([s for s, c in zip(posting_sets, companies) if needle in c])),
+        'coverage_ms': timed(lambda: index.coverage(have)),
+    }
+    print(f"\n📊 Skill-gap index ({count} postings, {len(SKILLS)} skills; built in {build_s:.2f}s)")
+    print(f"{'query':<28} {'bitsets ms':>11} {'sets ms':>9} {'speedup':>8}")
+    for label, fast, slow in (('gaps + overlap, all', 'bitset_all_ms', 'sets_all_ms'),
+                              ('gaps + overlap, filtered', 'bitset_subset_ms', 'sets_subset_ms')):
+        print(f"{label:<28} {row[fast]:>11.2f} {row[slow]:>9.2f} {row[slow] / row[fast]:>7.1f}x")
+    print(f"{'coverage per posting':<28} {row['coverage_ms']:>11.2f}")
+    return row
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('upstash_vector', 'groq', 'httpx', 'numpy', 'onnxruntime', 'tokenizers')
+
+
+def _synthetic_posting(i: int) -> str:
+    """Posting-sized markdown body (~3 KB)"""
+    company = f"Company {i % 500}"
+    return (f"# Data Analyst {i % 37}\n\n**Company:** {company}\n**Location:** Sydney\n\n"
+            + f"Posting {i}: we need SQL, Power BI and stakeholder skills at {company}. " * 40)
+
+
+def bench_postings(count: int, reads: int = 2000) -> Dict[str, float]:
+    """Resident memory and body read latency: in-memory arena vs mmap content store"""
+    print(f"\n📊 Posting content benchmark ({count} postings)")
+    rng = random.Random(42)
+    ids = [f"job_{i}" for i in range(count)]
+    sample = [rng.randrange(count) for _ in range(reads)]
+
+    tracemalloc.start()
+    store = ChunkStore()
+    for i, posting_id in enumerate(ids):
+        store.append(posting_id, '', _synthetic_posting(i), 'job_posting', None)
+    in_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for row in sample:
+        store[row].content
+    arena_us = (time.perf_counter() - start) / reads * 1e6
+    del store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'postings.dat')
+        writer = ContentStore.open(path, writable=True)
+        start = time.perf_counter()
+        for i, posting_id in enumerate(ids):
+            writer.put(posting_id, _synthetic_posting(i))
+        writer.save()
+        write_s = time.perf_counter() - start
+        writer.close()
+
+        tracemalloc.start()
+        reader = ContentStore.open(path)
+        resident = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for row in sample:
+            reader.get(ids[row])
+        mmap_us = (time.perf_counter() - start) / reads * 1e6
+        file_mb = os.path.getsize(path) / 1e6
+        reader.close()
+
+    rows = {'in_memory_mb': in_memory / 1e6, 'content_store_mb': resident / 1e6, 'file_mb': file_mb,
+            'arena_read_us': arena_us, 'mmap_read_us': mmap_us, 'write_s': write_s}
+    print(f"  bodies in memory (ChunkStore arena): {rows['in_memory_mb']:8.1f} MB resident, "
+          f"{arena_us:6.1f} µs/read")
+    print(f"  content store index (bodies mmap'd): {rows['content_store_mb']:8.1f} MB resident, "
+          f"{mmap_us:6.1f} µs/read")
+    print(f"  data file: {file_mb:.1f} MB, written in {write_s:.2f}s; shared through the page cache")
+    return rows
+
+
+_JSON_MODES = {
+    'json.load': "with open(path, 'rb') as f: json.load(f)",
+    'stream': "with open(path, 'rb') as f: collections.deque(json_stream.iter_values(f, PROFILE_STREAM_PATHS), 0)",
+    'stream (stdlib)': "json_stream.orjson = None\n"
+                       "with open(path, 'rb') as f: collections.deque(json_stream.iter_values(f, PROFILE_STREAM_PATHS), 0)",
+    'validate': "with open(path, 'rb') as f: json_stream.validate(f)",
+    'json.load + chunk': "setup = VectorDatabaseSetup(path)\n"
+                         "with open(path, 'rb') as f: setup.extract_chunks(json.load(f))",
+    'stream -> chunk': "setup = VectorDatabaseSetup(path)\nsetup.load_profile_data()",
+}
+
+# Runs one mode in a fresh interpreter; peak RSS before and after the work
+_JSON_CHILD = """
+import collections, json, resource, sys, time
+import json_stream
+from embed_digitaltwin import PROFILE_STREAM_PATHS, VectorDatabaseSetup
+path = sys.argv[1]
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{'s': seconds, 'peak_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024}}))
+"""
+
+
+def _synthetic_profile(path: str, target_mb: float) -> int:
+    """Write the sample profile with its item lists repeated up to about target_mb; returns its size"""
+    with open(os.path.join(os.path.dirname(SCRIPTS_DIR), 'data', 'digitaltwin_clean.json'), 'rb') as f:
+        profile = json.load(f)
+    lists = [profile['professional_experience'], profile['interview_prep']['behavioral'],
+             profile['interview_prep']['technical']]
+    templates = [list(items) for items in lists]
+    item_bytes = sum(len(json.dumps(item)) for items in templates for item in items)
+    for _ in range(int(target_mb * 1e6 / item_bytes)):
+        for items, template in zip(lists, templates):
+            items.extend(template)
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    return os.path.getsize(path)
+
+
+def bench_json(sizes_mb: List[float]) -> List[Dict[str, Any]]:
+    """Profile load time and peak memory by file size: json.load vs the streaming parser
+
+    Each mode runs in a fresh interpreter so its peak RSS is its own; the
+    chunk modes include building the chunk store, which grows with the
+    profile either way.
+    """
+    import json_stream
+    env = {**os.environ, 'VECTOR_BACKEND': 'local',
+           'PYTHONPATH': os.pathsep.join(filter(None, [SCRIPTS_DIR, os.getenv('PYTHONPATH')]))}
+    print(f"\n📊 JSON load benchmark (orjson {'installed' if json_stream.orjson else 'not installed'})")
+    print(f"  {'file MB':>8} {'mode':<18} {'seconds':>8} {'peak +MB':>9}")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for target in sizes_mb:
+            path = os.path.join(tmp, f"profile_{target:g}.json")
+            file_mb = _synthetic_profile(path, target) / 1e6
+            for mode, code in _JSON_MODES.items():
+                if mode == 'stream (stdlib)' and not json_stream.orjson:
+                    continue  # same as 'stream'
+                proc = subprocess.run([sys.executable, '-c', _JSON_CHILD.format(code=code), path],
+                                      capture_output=True, text=True, env=env)
+                if proc.returncode != 0:
+                    print(f"  {file_mb:>8.1f} {mode:<18} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                    continue
+                row = {'file_mb': file_mb, 'mode': mode, **json.loads(proc.stdout.splitlines()[-1])}
+                rows.append(row)
+                print(f"  {file_mb:>8.1f} {mode:<18} {row['s']:>8.2f} {row['peak_mb']:>9.1f}")
+    print("  peak +MB: growth of peak RSS over the interpreter with its imports loaded")
+    return rows
+
+
+def _import_profile(module: str) -> Dict[str, Any]:
+    """Import one module in a fresh interpreter under -X importtime
+
+    Returns its cumulative import time, its heaviest direct imports and which
+    heavy third-party packages it pulled in.
+    """
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [SCRIPTS_DIR, os.getenv('PYTHONPATH')]))}
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                          capture_output=True, text=True, env=env)
+    total_us = 0
+    children: List[Tuple[int, str]] = []
+    loaded = set()
+    after_site = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        loaded.add(name.split('.')[0])
+        if depth == 0:
+            if name == 'site':
+                after_site = True
+            elif name == module:
+                total_us = int(cumulative)
+        elif depth == 1 and after_site:
+            children.append((int(cumulative), name))
+    children.sort(reverse=True)
+    return {'module': module, 'ok': proc.returncode == 0, 'ms': total_us / 1000,
+            'top': [(name, us / 1000) for us, name in children[:3]],
+            'heavy': [m for m in HEAVY_MODULES if m in loaded]}
+
+
+def _wall_ms(args: List[str], runs: int) -> float:
+    """Median wall time of a fresh process"""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args, capture_output=True)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def bench_imports(runs: int = 5) -> List[Dict[str, Any]]:
+    """Import time per cli.py command, plus cli.py --help startup vs a bare interpreter"""
+    from cli import COMMANDS
+
+    print("\n📊 Import time per command (fresh interpreter each)")
+    print(f"{'command':<14} {'module':<20} {'import ms':>9}  heaviest imports")
+    rows = []
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for command, (module, _, _) in COMMANDS.items():
+        if module not in profiles:
+            profiles[module] = _import_profile(module)
+        profile = profiles[module]
+        rows.append({'command': command, **profile})
+        if not profile['ok']:
+            print(f"{command:<14} {module:<20} {'failed':>9}  (missing dependency?)")
+            continue
+        top = ', '.join(f"{name} {ms:.0f}" for name, ms in profile['top'])
+        heavy = f"  [{', '.join(profile['heavy'])}]" if profile['heavy'] else ''
+        print(f"{command:<14} {module:<20} {profile['ms']:>9.1f}  {top}{heavy}")
+
+    bare = _wall_ms([sys.executable, '-c', 'pass'], runs)
+    help_ms = _wall_ms([sys.executable, os.path.join(SCRIPTS_DIR, 'cli.py'), '--help'], runs)
+    print(f"\n  cli.py --help: {help_ms:.1f} ms wall (bare interpreter {bare:.1f} ms, median of {runs})")
+    rows.append({'command': '--help', 'wall_ms': help_ms, 'bare_ms': bare})
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description="Digital Twin offline benchmarks")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    ann = sub.add_parser('ann', help="HNSW latency/recall vs corpus size")
+    ann.add_argument('--sizes', default='1000,4000,16000', help="Comma-separated corpus sizes")
+    ann.add_argument('--dim', type=int, default=64)
+    ann.add_argument('--queries', type=int, default=50)
+    ann.add_argument('--k', type=int, default=10)
+    ann.add_argument('--ef', type=int, default=50)
+    ann.add_argument('--recall-target', type=float, default=0.95)
+
+    chunks = sub.add_parser('chunks', help="Chunk storage memory, columnar vs per-chunk objects")
+    chunks.add_argument('--count', type=int, default=100000)
+
+    tail = sub.add_parser('tail', help="Tail latency of a flaky provider, unguarded vs guarded")
+    tail.add_argument('--calls', type=int, default=200)
+    tail.add_argument('--base-ms', type=float, default=20)
+    tail.add_argument('--stall-rate', type=float, default=0.05)
+    tail.add_argument('--stall-ms', type=float, default=1000)
+    tail.add_argument('--deadline-ms', type=float, default=300)
+
+    load = sub.add_parser('load', help="Concurrent clients against a running mcp_server.py")
+    load.add_argument('--url', default='http://127.0.0.1:3000/api/mcp')
+    load.add_argument('--clients', type=int, default=16)
+    load.add_argument('--requests', type=int, default=20, help="Requests per client")
+    load.add_argument('--tenant', help="Tenant id when the server runs with --tenants")
+
+    embed = sub.add_parser('embed', help="In-process embedding throughput by worker count")
+    embed.add_argument('--count', type=int, default=20000)
+    embed.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help="Comma-separated worker counts")
+    embed.add_argument('--provider', choices=['hash', 'onnx'], default='hash')
+    embed.add_argument('--batch-size', type=int, default=64)
+
+    imports = sub.add_parser('imports', help="Import time per cli.py command in a fresh interpreter")
+    imports.add_argument('--runs', type=int, default=5, help="Runs of cli.py --help to take the median of")
+
+    skills = sub.add_parser('skills', help="Skill-gap queries on bitsets vs Python sets")
+    skills.add_argument('--count', type=int, default=20000)
+
+    postings = sub.add_parser('postings', help="Posting body memory, in memory vs mmap content store")
+    postings.add_argument('--count', type=int, default=100000)
+
+    shards = sub.add_parser('shards', help="Scatter-gather recall and throughput by shard count")
+    shards.add_argument('--shards', default='1,2,4,8', help="Comma-separated shard counts")
+    shards.add_argument('--count', type=int, default=20000, help="Vectors to upsert")
+    shards.add_argument('--queries', type=int, default=200)
+    shards.add_argument('--clients', type=int, default=16)
+    shards.add_argument('--upsert-ms', type=float, default=10)
+    shards.add_argument('--per-vector-ms', type=float, default=0.2)
+    shards.add_argument('--query-ms', type=float, default=5)
+    shards.add_argument('--per-1k-ms', type=float, default=2)
+    shards.add_argument('--timeout', type=float, default=0.5, help="Per-shard query timeout (seconds)")
+
+    sched = sub.add_parser('sched', help="Live-question waits with batch jobs saturating a rate limit")
+    sched.add_argument('--seconds', type=float, default=5)
+    sched.add_argument('--rate', type=float, default=50, help="Provider requests per second")
+    sched.add_argument('--service-ms', type=float, default=20, help="Provider latency per request")
+    sched.add_argument('--jobs', default='reembed:12,tailor:3', help="Batch jobs as name:workers,...")
+    sched.add_argument('--interval-ms', type=float, default=100, help="Time between live questions")
+    sched.add_argument('--batch-share', type=float, default=0.8)
+
+    dedup = sub.add_parser('dedup', help="MinHash/LSH near-duplicate detection vs exact pairwise")
+    dedup.add_argument('--count', type=int, default=20000)
+    dedup.add_argument('--repost-rate', type=float, default=0.1, help="Share of postings that are reposts")
+    dedup.add_argument('--edit-rate', type=float, default=0.02, help="Share of words a repost changes")
+    dedup.add_argument('--threshold', type=float, default=0.8)
+
+    metadata = sub.add_parser('metadata', help="Query payload with full vs slim metadata plus hydration")
+    metadata.add_argument('--count', type=int, default=20000)
+    metadata.add_argument('--queries', type=int, default=2000)
+    metadata.add_argument('--top-k', type=int, default=3)
+    metadata.add_argument('--shards', type=int, default=4, help="Shards each returning top_k candidates")
+
+    prefork = sub.add_parser('prefork', help="Retrieval throughput, one server process vs pre-forked workers")
+    prefork.add_argument('--processes', default=f"0,1,{os.cpu_count() or 1}",
+                         help="Comma-separated worker process counts (0: single-process server)")
+    prefork.add_argument('--count', type=int, default=5000, help="Chunks in the index")
+    prefork.add_argument('--clients', type=int, default=16)
+    prefork.add_argument('--requests', type=int, default=50, help="Requests per client")
+
+    json_load = sub.add_parser('json', help="Profile load time and peak memory, json.load vs streaming")
+    json_load.add_argument('--sizes', default="10,50", help="Comma-separated profile sizes in MB")
+
+    args = parser.parse_args(argv)
+    if args.bench == 'json':
+        bench_json([float(s) for s in args.sizes.split(',') if s])
+    elif args.bench == 'prefork':
+        counts = sorted({int(p) for p in args.processes.split(',') if p})
+        bench_prefork(counts, args.count, args.clients, args.requests)
+    elif args.bench == 'metadata':
+        bench_metadata(args.count, args.queries, args.top_k, args.shards)
+    elif args.bench == 'dedup':
+        bench_dedup(args.count, args.repost_rate, args.edit_rate, args.threshold)
+    elif args.bench == 'sched':
+        jobs = {name: int(workers) for name, workers in (item.split(':') for item in args.jobs.split(',') if item)}
+        bench_sched(args.seconds, args.rate, args.service_ms, jobs, args.interval_ms, args.batch_share)
+    elif args.bench == 'shards':
+        counts = sorted({int(s) for s in args.shards.split(',') if s})
+        bench_shards(counts, args.count, args.queries, args.clients, args.upsert_ms, args.per_vector_ms,
+                     args.query_ms, args.per_1k_ms, args.timeout)
+    elif args.bench == 'postings':
+        bench_postings(args.count)
+    elif args.bench == 'skills':
+        bench_skills(args.count)
+    elif args.bench == 'imports':
+        bench_imports(args.runs)
+    elif args.bench == 'embed':
+        workers = sorted({int(w) for w in args.workers.split(',') if w})
+        bench_embed(args.count, workers, args.provider, args.batch_size)
+    elif args.bench == 'load':
+        bench_load(args.url, args.clients, args.requests, args.tenant)
+    elif args.bench == 'tail':
+        bench_tail(args.calls, args.base_ms, args.stall_rate, args.stall_ms, args.deadline_ms)
+    elif args.bench == 'chunks':
+        bench_chunks(args.count)
+    elif args.bench == 'ann':
+        sizes = [int(s) for s in args.sizes.split(',') if s]
+        bench_ann(sizes, args.dim, args.queries, args.k, args.ef, args.recall_target)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
@@ -1,14 +1,27 @@
-import json
+import os
+import sys
 
-p = 'data/digitaltwin.json'
-try:
-    with open(p, 'r', encoding='utf-8') as f:
-        s = f.read()
-    print('FILE_LENGTH', len(s))
+from json_stream import JsonStreamError, validate
+
+
+def main() -> int:
+    p = sys.argv[1] if len(sys.argv) > 1 else 'data/digitaltwin.json'
     try:
-        json.loads(s)
-        print('PARSE_OK')
+        print('FILE_LENGTH', os.path.getsize(p))
+        with open(p, 'rb') as f:
+            # Streams the file, so memory does not grow with its size
+            try:
+                validate(f)
+                print('PARSE_OK')
+                return 0
+            except JsonStreamError as e:
+                print('PARSE_ERROR', e)
+                print('ERROR_OFFSET', e.offset)
+                return 1
     except Exception as e:
-        print('PARSE_ERROR', repr(e))
-except Exception as e:
-    print('FILE_ERROR', e)
+        print('FILE_ERROR', e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Columnar Chunk Store
+Compact storage for embeddable chunks shared by the embedders and the local index
+- Titles and content live in UTF-8 arenas indexed by offset arrays
+- type, category, tags and extra metadata fields are interned symbol codes
+- Rows are read through lightweight __slots__ views; metadata dicts and
+  enriched text are only built for the batch or hit that needs them
+"""
+
+import json
+import struct
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+STORE_MAGIC = b'DTCHUNK1'
+
+# Metadata keys stored in dedicated columns; anything else becomes an interned field
+CORE_KEYS = ('title', 'content', 'type', 'category', 'tags')
+
+
+class SymbolTable:
+    """Interns repeated strings as small integer codes; code 0 means absent"""
+
+    def __init__(self, symbols: Optional[List[str]] = None):
+        """Create a table, optionally restoring a saved symbol list"""
+        self._symbols: List[Optional[str]] = symbols if symbols is not None else [None]
+        self._codes: Dict[str, int] = {s: i for i, s in enumerate(self._symbols) if s is not None}
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def code(self, value: Optional[str]) -> int:
+        """Code for value, adding it on first sight"""
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._symbols)
+            self._symbols.append(value)
+            self._codes[value] = code
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        """String for a code"""
+        return self._symbols[code]
+
+    def symbols(self) -> List[Optional[str]]:
+        """All symbols in code order"""
+        return self._symbols
+
+
+class StringArena:
+    """Append-only UTF-8 string storage addressed by row number"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, value: str) -> None:
+        """Add a string as the next row"""
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def get(self, row: int) -> str:
+        """Decode one row"""
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def nbytes(self) -> int:
+        """Bytes held by the arena and its offsets"""
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ChunkRow:
+    """Read-only view of one row in a ChunkStore"""
+
+    __slots__ = ('_store', 'row')
+
+    def __init__(self, store: 'ChunkStore', row: int):
+        self._store = store
+        self.row = row
+
+    @property
+    def id(self) -> str:
+        return self._store.ids.get(self.row)
+
+    @property
+    def title(self) -> str:
+        return self._store.titles.get(self.row)
+
+    @property
+    def content(self) -> str:
+        return self._store.contents.get(self.row)
+
+    @property
+    def type(self) -> Optional[str]:
+        return self._store.symbols.value(self._store.types[self.row])
+
+    @property
+    def category(self) -> Optional[str]:
+        return self._store.symbols.value(self._store.categories[self.row])
+
+    @property
+    def tags(self) -> List[str]:
+        return self._store.tags(self.row)
+
+    def field(self, name: str) -> Any:
+        """Value of an extra metadata field, or None"""
+        return self._store.field(self.row, name)
+
+    def metadata(self, include_content: bool = True) -> Dict[str, Any]:
+        """Metadata dict for this row"""
+        return self._store.metadata(self.row, include_content)
+
+    def __repr__(self) -> str:
+        return f"ChunkRow({self.id!r}, title={self.title!r})"
+
+
+class ChunkStore:
+    """Column-oriented chunk table"""
+
+    def __init__(self):
+        """Create an empty store"""
+        self.symbols = SymbolTable()
+        self.ids = StringArena()
+        self.titles = StringArena()
+        self.contents = StringArena()
+        self.types = array('I')
+        self.categories = array('I')
+        self.tag_offsets = array('I', [0])
+        self.tag_codes = array('I')
+        self.fields: Dict[str, array] = {}
+        self._rows: Optional[Dict[str, int]] = None
+        self.stamp = ''  # save() tag shared with the graph file written alongside
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, row: int) -> ChunkRow:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return ChunkRow(self, row)
+
+    def __iter__(self) -> Iterator[ChunkRow]:
+        for row in range(len(self)):
+            yield ChunkRow(self, row)
+
+    def append(self, id: str, title: str, content: str, type: str, category: str,
+               tags: Iterable[str] = (), **fields: Any) -> int:
+        """Add a chunk and return its row number
+
+        Extra keyword fields (e.g. company, location) are stored as interned
+        JSON scalars, so values repeated across chunks cost one code each.
+        """
+        row = len(self.types)
+        self.ids.append(id)
+        self.titles.append(title or '')
+        self.contents.append(content or '')
+        self.types.append(self.symbols.code(type))
+        self.categories.append(self.symbols.code(category))
+        self.tag_codes.extend(self.symbols.code(tag) for tag in tags or ())
+        self.tag_offsets.append(len(self.tag_codes))
+        for name, value in fields.items():
+            column = self.fields.get(name)
+            if column is None:
+                column = self.fields[name] = array('I', bytes(4 * row))
+            column.append(0 if value is None else self.symbols.code(json.dumps(value)))
+        for column in self.fields.values():
+            if len(column) <= row:
+                column.append(0)
+        if self._rows is not None:
+            self._rows[id] = row
+        return row
+
+    def append_metadata(self, id: str, metadata: Optional[Dict[str, Any]]) -> int:
+        """Add a chunk from an Upstash-style metadata dict"""
+        metadata = metadata or {}
+        extra = {k: v for k, v in metadata.items() if k not in CORE_KEYS}
+        return self.append(
+            id,
+            metadata.get('title', ''),
+            metadata.get('content', ''),
+            metadata.get('type'),
+            metadata.get('category'),
+            metadata.get('tags') or (),
+            **extra
+        )
+
+    def row_of(self, id: str) -> Optional[int]:
+        """Row number of the most recent chunk with this id"""
+        if self._rows is None:
+            self._rows = {self.ids.get(row): row for row in range(len(self))}
+        return self._rows.get(id)
+
+    def tags(self, row: int) -> List[str]:
+        """Tags of a row"""
+        value = self.symbols.value
+        return [value(code) for code in self.tag_codes[self.tag_offsets[row]:self.tag_offsets[row + 1]]]
+
+    def field(self, row: int, name: str) -> Any:
+        """Extra field value of a row, or None"""
+        column = self.fields.get(name)
+        if column is None or not column[row]:
+            return None
+        return json.loads(self.symbols.value(column[row]))
+
+    def metadata(self, row: int, include_content: bool = True) -> Dict[str, Any]:
+        """Build the metadata dict for one row"""
+        value = self.symbols.value
+        metadata: Dict[str, Any] = {'title': self.titles.get(row)}
+        if self.types[row]:
+            metadata['type'] = value(self.types[row])
+        if self.categories[row]:
+            metadata['category'] = value(self.categories[row])
+        if include_content:
+            metadata['content'] = self.contents.get(row)
+        if self.tag_offsets[row + 1] > self.tag_offsets[row]:
+            metadata['tags'] = self.tags(row)
+        for name, column in self.fields.items():
+            if column[row]:
+                metadata[name] = json.loads(value(column[row]))
+        return metadata
+
+    def iter_upsert(self, batch_size: int, text: Optional[Callable[[ChunkRow], str]] = None,
+                    include_content: bool = True, rows: Optional[Sequence[int]] = None
+                    ) -> Iterator[List[Tuple[str, str, Dict[str, Any]]]]:
+        """Yield upsert batches of (id, enriched_text, metadata), built one batch at a time"""
+        text = text or (lambda chunk: f"{chunk.title}: {chunk.content}")
+        rows = range(len(self)) if rows is None else rows
+        batch: List[Tuple[str, str, Dict[str, Any]]] = []
+        for row in rows:
+            chunk = ChunkRow(self, row)
+            batch.append((chunk.id, text(chunk), self.metadata(row, include_content)))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the store's buffers"""
+        arrays = [self.types, self.categories, self.tag_offsets, self.tag_codes, *self.fields.values()]
+        symbol_bytes = sum(len(s) for s in self.symbols.symbols() if s)
+        return (self.ids.nbytes() + self.titles.nbytes() + self.contents.nbytes()
+                + sum(a.itemsize * len(a) for a in arrays) + symbol_bytes)
+
+    def save(self, path: str, stamp: str = '') -> None:
+        """Write the store as a small JSON header (tagged with stamp) followed by raw columns"""
+        columns: List[Tuple[str, Any]] = [
+            ('ids.offsets', self.ids.offsets), ('ids.data', self.ids.data),
+            ('titles.offsets', self.titles.offsets), ('titles.data', self.titles.data),
+            ('contents.offsets', self.contents.offsets), ('contents.data', self.contents.data),
+            ('types', self.types), ('categories', self.categories),
+            ('tag_offsets', self.tag_offsets), ('tag_codes', self.tag_codes),
+        ]
+        columns.extend((f'field.{name}', column) for name, column in self.fields.items())
+        header = json.dumps({
+            'symbols': self.symbols.symbols(),
+            'columns': [[name, len(column)] for name, column in columns],
+            'stamp': stamp,
+        }).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(STORE_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for _, column in columns:
+                f.write(column if isinstance(column, bytearray) else column.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'ChunkStore':
+        """Read a store written by save()"""
+        store = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                raise ValueError(f"{path} is not a chunk store")
+            (header_len,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len))
+            store.symbols = SymbolTable(header['symbols'])
+            store.stamp = header.get('stamp', '')
+            for name, length in header['columns']:
+                if name.endswith('.data'):
+                    getattr(store, name.split('.')[0]).data = bytearray(f.read(length))
+                    continue
+                column = array('Q' if name.endswith('.offsets') else 'I')
+                column.fromfile(f, length)
+                if name.endswith('.offsets'):
+                    getattr(store, name.split('.')[0]).offsets = column
+                elif name.startswith('field.'):
+                    store.fields[name[len('field.'):]] = column
+                else:
+                    setattr(store, name, column)
+        return store
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Slim Vector Metadata
+Keeps chunk text out of vector metadata and reads it back locally
+- With VECTOR_METADATA=slim, writers put each chunk's text fields (content,
+  title, company, location, ...) in a local chunk text store and upsert the
+  vector with only its id and small filterable fields (type, category,
+  jobId, section)
+- A query then moves ids, scores and those fields only; text is read from
+  the store just for the hits that are finally used
+- The store is chunk_text.dat next to the local index (CHUNK_TEXT_FILE to move
+  it), in the mmap-backed posting content store format: readers share its
+  pages and reload it when a writer publishes changes
+- Hits that still carry full metadata (VECTOR_METADATA=full, the default,
+  or vectors written before switching) pass through unchanged
+
+Switching an index to slim metadata needs a re-embed, which fills the store.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from content_store import ContentStore, ContentStoreError
+
+CHUNK_TEXT_FILE = 'chunk_text.dat'
+SLIM_FIELDS = ('type', 'category', 'jobId', 'section')  # stay in the vector for filtering
+
+
+def slim_enabled() -> bool:
+    """True when writers should upsert slim metadata (VECTOR_METADATA=slim)"""
+    return os.getenv('VECTOR_METADATA', 'full').lower() == 'slim'
+
+
+def chunk_text_path(namespace: str = '') -> str:
+    """Data file of the chunk text store for a namespace"""
+    from vector_store import local_index_dir
+    if os.getenv('CHUNK_TEXT_FILE'):
+        root, ext = os.path.splitext(os.environ['CHUNK_TEXT_FILE'])
+        return f"{root}-{namespace}{ext}" if namespace else os.environ['CHUNK_TEXT_FILE']
+    return os.path.join(local_index_dir(), namespace, CHUNK_TEXT_FILE)
+
+
+def open_chunk_text(namespace: str = '') -> Optional[ContentStore]:
+    """Writer for the chunk text store, or None when metadata stays full"""
+    if not slim_enabled():
+        return None
+    path = chunk_text_path(namespace)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return ContentStore.open(path, writable=True)
+
+
+def split_metadata(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(fields kept in the vector, text fields moved to the store)"""
+    slim, text = {}, {}
+    for key, value in metadata.items():
+        (slim if key in SLIM_FIELDS else text)[key] = value
+    return slim, text
+
+
+def slim_upserts(batch: List[Tuple], store: Optional[ContentStore]) -> List[Tuple]:
+    """Store each upsert's text fields and strip them from its metadata
+
+    Unchanged when store is None (full metadata).
+    """
+    if store is None:
+        return batch
+    vectors = []
+    for vector_id, payload, *rest in batch:
+        metadata = rest[0] if rest else None
+        if metadata:
+            metadata, text = split_metadata(metadata)
+            store.put(vector_id, json.dumps(text, ensure_ascii=False, separators=(',', ':')))
+        vectors.append((vector_id, payload, metadata, *rest[1:]))
+    return vectors
+
+
+def save_chunk_text(store: Optional[ContentStore]) -> None:
+    """Publish the chunk text store after a run that wrote to it"""
+    if store is not None and store.save():
+        print(f"📝 Chunk text: {len(store)} chunk(s) → {store.path}")
+
+
+def is_slim(metadata: Optional[Dict[str, Any]]) -> bool:
+    """True for metadata written by slim_upserts (every full chunk has a title)
+
+    The local store hands back an empty title rather than none at all.
+    """
+    return metadata is not None and not metadata.get('title')
+
+
+def hydrate(vector_id: str, metadata: Optional[Dict[str, Any]], store: Optional[ContentStore]) -> Dict[str, Any]:
+    """Full metadata of a hit: slim fields plus the text fields read from the store"""
+    metadata = dict(metadata or {})
+    if store is None or not is_slim(metadata):
+        return metadata
+    try:
+        stored = store.get(vector_id)
+    except ContentStoreError as e:
+        print(f"⚠️  Could not read chunk text for {vector_id}: {e}")
+        return metadata
+    if stored:
+        metadata.update(json.loads(stored))
+    return metadata
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Digital Twin CLI
+One entry point for every script: python scripts/cli.py <command> [args...]
+- A command imports only its own module, so --help and local-only commands
+  start without loading the Upstash/Groq SDKs
+- Configuration (.env.local, then .env) is loaded the same way for every command
+- --profiler MODE works for every command (see profiling.py)
+
+Keep this module's own imports to the standard library essentials.
+"""
+
+import sys
+
+# command -> (module, entry point, summary); entry points parse sys.argv[1:]
+COMMANDS = {
+    'ingest': ('embed_digitaltwin', 'main', "Embed the profile into the vector index"),
+    'ingest-jobs': ('embed_job_postings', 'main', "Embed job postings (--stream, --feed)"),
+    'chat': ('digital_twin_rag', 'main', "Interactive chat with the digital twin"),
+    'query': ('digital_twin_rag', 'ask', "Answer one question and exit"),
+    'verify': ('verify_setup', 'main', "Check prerequisites and configuration"),
+    'bench': ('benchmark', 'main', "Offline benchmarks (ann, chunks, tail, load, embed, imports, skills, postings, shards, sched, dedup, metadata, prefork, json)"),
+    'serve': ('mcp_server', 'main', "Serve the MCP JSON-RPC endpoint"),
+    'watch': ('watch_index', 'main', "Re-index the profile and postings as they change"),
+    'snapshot': ('snapshot', 'main', "Export, import and inspect index snapshots"),
+    'tenants': ('tenants', 'main', "List tenants or ask one tenant's twin"),
+    'tailor': ('tailored_answers', 'main', "Generate tailored answers per job posting"),
+    'tune': ('tune_chunks', 'main', "Sweep chunk size, overlap, top_k and batch size on labeled questions"),
+    'skills': ('skill_index', 'main', "Skill gaps, overlap and coverage across job postings"),
+    'postings': ('content_store', 'main', "Inspect or compact the posting content store"),
+    'check-json': ('check_json', 'main', "Check a profile JSON file parses"),
+    'inspect-groq': ('inspect_groq', 'main', "Show the installed Groq SDK"),
+}
+
+PROG = 'cli.py'
+
+
+def usage() -> str:
+    lines = [f"usage: {PROG} <command> [args...]", "", "Digital Twin command line", "", "commands:"]
+    lines += [f"  {name:<14} {summary}" for name, (_, _, summary) in COMMANDS.items()]
+    lines += ["", f"Run '{PROG} <command> --help' for a command's options."]
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    """Dispatch to a command, importing its module only now"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        import difflib
+        close = difflib.get_close_matches(command, COMMANDS, n=1)
+        hint = f" (did you mean '{close[0]}'?)" if close else ''
+        print(f"❌ Unknown command '{command}'{hint}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module_name, func_name, _ = COMMANDS[command]
+    sys.argv = [f"{PROG} {command}", *rest]
+
+    import importlib
+    from config import load_config
+    from profiling import run
+    load_config()
+    entry = getattr(importlib.import_module(module_name), func_name)
+    return run(entry, script=module_name) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
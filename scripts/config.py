@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Shared Configuration
+Loads environment files once and reads credentials the same way for every script
+- .env.local is read before .env, so local overrides win; variables already set
+  in the real environment beat both
+- test_-prefixed Upstash credentials take precedence, as before
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+ENV_FILES = ('.env.local', '.env')
+
+_loaded = False
+
+
+def load_config() -> None:
+    """Load .env.local and .env into os.environ (idempotent)"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return  # plain environment variables still work
+    for path in ENV_FILES:
+        if os.path.exists(path):
+            load_dotenv(dotenv_path=path)
+
+
+def upstash_credentials() -> Tuple[Optional[str], Optional[str]]:
+    """(url, token) for Upstash Vector"""
+    load_config()
+    url = os.getenv('test_UPSTASH_VECTOR_REST_URL') or os.getenv('UPSTASH_VECTOR_REST_URL')
+    token = os.getenv('test_UPSTASH_VECTOR_REST_TOKEN') or os.getenv('UPSTASH_VECTOR_REST_TOKEN')
+    return url, token
+
+
+def upstash_shard_credentials(shards: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(url, token) per shard: shard 0 uses the usual credentials, shard n the _n-suffixed ones"""
+    credentials = [upstash_credentials()]
+    for n in range(1, shards):
+        credentials.append((os.getenv(f'UPSTASH_VECTOR_REST_URL_{n}'), os.getenv(f'UPSTASH_VECTOR_REST_TOKEN_{n}')))
+    return credentials
+
+
+def groq_api_key() -> Optional[str]:
+    load_config()
+    return os.getenv('GROQ_API_KEY')
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Posting Content Store
+Append-only file of job posting bodies, read lazily through mmap
+- Bodies are appended to one data file; a small index file maps each posting
+  id to (offset, length), so only ids and offsets stay in memory
+- Readers map the data file read-only and decode a body only when it is put
+  into a prompt; every process reading the store shares the same page cache
+- Re-adding a changed posting appends the new body; save() compacts the file
+  once superseded bytes outnumber live ones
+- One writer at a time (ingest or watch mode); any number of readers
+
+Usage:
+    python scripts/content_store.py stats
+    python scripts/content_store.py show job_data-analyst
+    python scripts/content_store.py compact
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from profiling import run
+
+DATA_MAGIC = b'DTPOSTS1'
+INDEX_MAGIC = b'DTPOSIX1'
+TOKEN_SIZE = 16
+DATA_HEADER_SIZE = len(DATA_MAGIC) + TOKEN_SIZE
+CONTENT_STORE_FILE = 'postings.dat'
+COMPACT_MIN_BYTES = 1 << 20  # never compact a file with less garbage than this
+
+
+class ContentStoreError(Exception):
+    """Raised for malformed or mismatched content store files"""
+
+
+def content_store_path() -> str:
+    """Data file of the posting content store (its index sits next to it as .idx)"""
+    from vector_store import local_index_dir
+    return os.getenv('CONTENT_STORE_FILE') or os.path.join(local_index_dir(), CONTENT_STORE_FILE)
+
+
+class ContentStore:
+    """Posting id -> body, with bodies kept on disk and read through a shared mapping"""
+
+    def __init__(self, path: Optional[str] = None, writable: bool = False):
+        """Open (or, when writable, create) the store at path"""
+        self.path = path or content_store_path()
+        self.index_path = os.path.splitext(self.path)[0] + '.idx'
+        self.writable = writable
+        self._slots: Dict[str, int] = {}
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.crcs = array('I')
+        self.token = b''
+        self.data_bytes = DATA_HEADER_SIZE
+        self._index_stamp: Optional[Tuple[int, int]] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._appender = None
+        self._dirty = False
+        if writable:
+            self._open_writer()
+        else:
+            self._load_index()
+
+    @classmethod
+    def open(cls, path: Optional[str] = None, writable: bool = False) -> 'ContentStore':
+        """Open a store; a reader on a missing store is simply empty"""
+        return cls(path, writable=writable)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, posting_id: str) -> bool:
+        return posting_id in self._slots
+
+    def ids(self) -> Iterator[str]:
+        """Stored posting ids"""
+        return iter(self._slots)
+
+    # Index file: magic, header length, JSON header, then the raw columns
+
+    def _load_index(self) -> None:
+        """(Re)read the index file; a missing index means an empty store"""
+        self._slots = {}
+        self.offsets, self.lengths, self.crcs = array('Q'), array('I'), array('I')
+        self.token, self.data_bytes = b'', DATA_HEADER_SIZE
+        try:
+            stat = os.stat(self.index_path)
+            f = open(self.index_path, 'rb')
+        except OSError:
+            self._index_stamp = None
+            return
+        with f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ContentStoreError(f"{self.index_path} is not a posting content index")
+            (header_len,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len))
+            count = header['count']
+            id_offsets = array('Q')
+            id_offsets.fromfile(f, count + 1)
+            id_data = f.read(id_offsets[-1])
+            self.offsets.fromfile(f, count)
+            self.lengths.fromfile(f, count)
+            self.crcs.fromfile(f, count)
+        self.token = bytes.fromhex(header['token'])
+        self.data_bytes = header['data_bytes']
+        self._slots = {id_data[id_offsets[slot]:id_offsets[slot + 1]].decode('utf-8'): slot
+                       for slot in range(count)}
+        self._index_stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def _write_index(self) -> None:
+        """Atomically replace the index with the live entries"""
+        live = sorted(self._slots.items(), key=lambda item: item[1])
+        id_offsets = array('Q', [0])
+        id_data = bytearray()
+        offsets, lengths, crcs = array('Q'), array('I'), array('I')
+        for posting_id, slot in live:
+            id_data += posting_id.encode('utf-8')
+            id_offsets.append(len(id_data))
+            offsets.append(self.offsets[slot])
+            lengths.append(self.lengths[slot])
+            crcs.append(self.crcs[slot])
+        header = json.dumps({'token': self.token.hex(), 'data_bytes': self.data_bytes,
+                             'count': len(live)}).encode('utf-8')
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in (id_offsets, id_data, offsets, lengths, crcs):
+                f.write(column if isinstance(column, bytearray) else column.tobytes())
+        os.replace(tmp_path, self.index_path)
+        # Slots now match the file, so superseded entries no longer take index memory
+        self._slots = {posting_id: slot for slot, (posting_id, _) in enumerate(live)}
+        self.offsets, self.lengths, self.crcs = offsets, lengths, crcs
+
+    # Writing
+
+    def _open_writer(self) -> None:
+        """Load the index and drop bytes appended by a run that never saved it"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._load_index()
+        token = self._data_token()
+        if token is None or token != self.token:
+            if self._slots:
+                print(f"⚠️  {self.path} does not match its index; starting an empty content store")
+            self._create_data_file()
+            return
+        self._appender = open(self.path, 'r+b')
+        self._appender.truncate(self.data_bytes)
+        self._appender.seek(self.data_bytes)
+
+    def _data_token(self) -> Optional[bytes]:
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(DATA_HEADER_SIZE)
+        except OSError:
+            return None
+        if len(header) < DATA_HEADER_SIZE or not header.startswith(DATA_MAGIC):
+            return None
+        return header[len(DATA_MAGIC):]
+
+    def _create_data_file(self, bodies: Iterable[Tuple[str, bytes]] = ()) -> None:
+        """Write a data file with a new token holding bodies, then swap it in"""
+        self._close_mapping()
+        if self._appender:
+            self._appender.close()
+        self._slots = {}
+        self.offsets, self.lengths, self.crcs = array('Q'), array('I'), array('I')
+        self.token = os.urandom(TOKEN_SIZE)
+        self.data_bytes = DATA_HEADER_SIZE
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            self._appender = f
+            f.write(DATA_MAGIC + self.token)
+            for posting_id, data in bodies:
+                self._append(posting_id, data, zlib.crc32(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._appender = open(self.path, 'r+b')
+        self._appender.seek(self.data_bytes)
+        self._dirty = True
+
+    def _append(self, posting_id: str, data: bytes, crc: int) -> None:
+        self._appender.write(data)
+        self._slots[posting_id] = len(self.offsets)
+        self.offsets.append(self.data_bytes)
+        self.lengths.append(len(data))
+        self.crcs.append(crc)
+        self.data_bytes += len(data)
+
+    def put(self, posting_id: str, content: str) -> bool:
+        """Store a posting body; returns False if it was already stored unchanged"""
+        self._check_writable()
+        data = content.encode('utf-8')
+        crc = zlib.crc32(data)
+        slot = self._slots.get(posting_id)
+        if slot is not None and self.lengths[slot] == len(data) and self.crcs[slot] == crc:
+            return False
+        self._append(posting_id, data, crc)
+        self._dirty = True
+        return True
+
+    def remove(self, posting_id: str) -> bool:
+        """Forget a posting; its bytes are reclaimed by the next compaction"""
+        self._check_writable()
+        if self._slots.pop(posting_id, None) is None:
+            return False
+        self._dirty = True
+        return True
+
+    def garbage_bytes(self) -> int:
+        """Bytes in the data file that no live posting points at"""
+        return self.data_bytes - DATA_HEADER_SIZE - sum(self.lengths[slot] for slot in self._slots.values())
+
+    def save(self, compact: Optional[bool] = None) -> bool:
+        """Flush appended bodies and publish the index
+
+        compact=None compacts when superseded bytes exceed both the live bytes
+        and COMPACT_MIN_BYTES.
+        """
+        self._check_writable()
+        try:
+            if compact is None:
+                garbage = self.garbage_bytes()
+                compact = garbage > COMPACT_MIN_BYTES and garbage > self.data_bytes - DATA_HEADER_SIZE - garbage
+            if compact:
+                self._compact()
+            elif not self._dirty:
+                return True
+            self._appender.flush()
+            os.fsync(self._appender.fileno())
+            self._write_index()
+            self._dirty = False
+            return True
+        except OSError as e:
+            print(f"⚠️  Could not save posting content store: {e}")
+            return False
+
+    def _compact(self) -> None:
+        """Rewrite live bodies into a fresh data file with a new token"""
+        live = [(posting_id, self.offsets[slot], self.lengths[slot])
+                for posting_id, slot in sorted(self._slots.items(), key=lambda item: item[1])]
+        self._appender.flush()
+        with open(self.path, 'rb') as old:
+            def bodies() -> Iterator[Tuple[str, bytes]]:
+                for posting_id, offset, length in live:
+                    old.seek(offset)
+                    yield posting_id, old.read(length)
+            self._create_data_file(bodies())
+
+    def _check_writable(self) -> None:
+        if not self.writable:
+            raise ContentStoreError("content store was opened read-only")
+
+    # Reading
+
+    def _map(self) -> None:
+        """(Re)map the data file, checking it belongs to the loaded index"""
+        self._close_mapping()
+        if self._appender:
+            self._appender.flush()
+        try:
+            self._file = open(self.path, 'rb')
+        except OSError as e:
+            raise ContentStoreError(f"{self.path} is missing: {e}")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[len(DATA_MAGIC):DATA_HEADER_SIZE] != self.token:
+            raise ContentStoreError(f"{self.path} was replaced after its index was read")
+
+    def _view(self, slot: int) -> memoryview:
+        start = self.offsets[slot]
+        end = start + self.lengths[slot]
+        if self._mmap is None or end > len(self._mmap):
+            self._map()  # first read, or bodies appended since the file was mapped
+        return memoryview(self._mmap)[start:end]
+
+    def view(self, posting_id: str) -> Optional[memoryview]:
+        """Zero-copy view of a body's UTF-8 bytes; release it before close()"""
+        slot = self._slots.get(posting_id)
+        if slot is None:
+            return None
+        try:
+            return self._view(slot)
+        except ContentStoreError:
+            if self.writable:
+                raise
+            # The writer compacted the file after our index was read: reload both once
+            self._load_index()
+            slot = self._slots.get(posting_id)
+            return None if slot is None else self._view(slot)
+
+    def get(self, posting_id: str) -> Optional[str]:
+        """Decoded body of a posting, or None if it is not stored"""
+        view = self.view(posting_id)
+        if view is None:
+            return None
+        with view:
+            return str(view, 'utf-8')
+
+    def refresh(self) -> bool:
+        """Reload the index if a writer has published a new one"""
+        if self.writable:
+            return False
+        try:
+            stat = os.stat(self.index_path)
+            stamp: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._index_stamp:
+            return False
+        token = self.token
+        self._load_index()
+        if self.token != token:
+            self._close_mapping()
+        return True
+
+    def nbytes(self) -> int:
+        """Approximate resident bytes of the in-memory index (the mapping is page cache)"""
+        columns = self.offsets.itemsize * len(self.offsets) + 4 * (len(self.lengths) + len(self.crcs))
+        return sys.getsizeof(self._slots) + sum(sys.getsizeof(p) for p in self._slots) + columns
+
+    def stats(self) -> Dict[str, int]:
+        live = self.data_bytes - DATA_HEADER_SIZE - self.garbage_bytes()
+        return {'postings': len(self), 'data_bytes': self.data_bytes, 'live_bytes': live,
+                'garbage_bytes': self.garbage_bytes(), 'index_bytes': self.nbytes()}
+
+    def _close_mapping(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # a caller still holds a view; the mapping goes when it is dropped
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Release the mapping and, for a writer, the append handle (unsaved bodies are dropped)"""
+        self._close_mapping()
+        if self._appender:
+            self._appender.close()
+            self._appender = None
+
+
+def main(argv: List[str] = None) -> int:
+    """Inspect or compact the posting content store"""
+    parser = argparse.ArgumentParser(description="Inspect the posting content store")
+    parser.add_argument('--path', help=f"Data file (default: CONTENT_STORE_FILE or <LOCAL_INDEX_DIR>/{CONTENT_STORE_FILE})")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help="Posting count, file and index sizes")
+    show = sub.add_parser('show', help="Print one stored posting")
+    show.add_argument('posting_id')
+    sub.add_parser('compact', help="Rewrite the data file without superseded bodies")
+    args = parser.parse_args(argv)
+
+    path = args.path or content_store_path()
+    if not os.path.exists(path):
+        print(f"❌ No content store at {path}; ingest job postings first")
+        return 1
+    store = ContentStore.open(path, writable=args.command == 'compact')
+    try:
+        if args.command == 'show':
+            content = store.get(args.posting_id)
+            if content is None:
+                print(f"❌ {args.posting_id} is not stored")
+                return 1
+            print(content)
+        elif args.command == 'compact':
+            before = store.data_bytes
+            if not store.save(compact=True):
+                return 1
+            print(f"✅ Compacted {path}: {before:,} → {store.data_bytes:,} bytes")
+        else:
+            stats = store.stats()
+            print(f"📦 {path}")
+            print(f"  postings:      {stats['postings']:,}")
+            print(f"  data file:     {stats['data_bytes']:,} bytes ({stats['garbage_bytes']:,} superseded)")
+            print(f"  index memory:  {stats['index_bytes']:,} bytes")
+    except ContentStoreError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
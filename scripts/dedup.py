@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection
+MinHash signatures and LSH banding to find near-duplicate chunks and postings
+before they are embedded
+- Each text becomes a set of word 3-shingles; its MinHash signature estimates
+  the Jaccard similarity between two such sets. Signatures use one-permutation
+  hashing: every shingle is hashed once into one of NUM_PERM bins, instead of
+  NUM_PERM times, so signing is linear in the text, not in text × NUM_PERM
+- Signatures are cut into bands; texts that share any band land in the same
+  bucket, so each new text is compared only with its few candidates instead
+  of with everything seen so far (linear time over a corpus)
+- Candidates are confirmed against the threshold on their estimated similarity
+- The first text of a group is canonical; later ones are reported as its
+  duplicates, skipped at embedding time and listed in its metadata
+
+DEDUP=0 turns it off; DEDUP_THRESHOLD sets the Jaccard similarity (0.8).
+"""
+
+import os
+import re
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scheduler import shared_scheduler
+from sharded_store import is_local_store
+
+DEDUP_ENABLED = os.getenv('DEDUP', '1') != '0'
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.8'))
+NUM_PERM = 128     # signature length; estimate error is about 1/sqrt(NUM_PERM)
+SHINGLE_WORDS = 3
+REPORT_LINES = 10  # duplicate groups listed by report()
+
+# Fixed hash constants, so every process (parse workers too) signs texts alike
+_PRIME = (1 << 61) - 1  # Mersenne prime
+_MIX_A, _MIX_B = 0x1F3D5B79A2C4E687 % _PRIME, 0x6A09E667F3BCC909 % _PRIME
+_EMPTY = 1 << 62
+_BORROW = 1 << 55  # above any bin value (< 2^61 / NUM_PERM), per bin of distance
+WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> List[int]:
+    """CRC32 of every run of `size` consecutive words (case-folded)"""
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < size:
+        return [zlib.crc32(' '.join(words).encode('utf-8'))] if words else []
+    return list({zlib.crc32(' '.join(words[pos:pos + size]).encode('utf-8'))
+                 for pos in range(len(words) - size + 1)})
+
+
+def signature(text: str, num_perm: int = NUM_PERM) -> Optional[array]:
+    """One-permutation MinHash signature of a text, or None when it has no words
+
+    Each shingle's hash picks a bin and competes for that bin's minimum. A
+    bin no shingle fell into (common for short texts) borrows the nearest
+    filled bin to its right, offset by the distance, so that two texts agree
+    on it about as often as on a filled one.
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    bins = [_EMPTY] * num_perm
+    for h in hashes:
+        pos, value = divmod((_MIX_A * h + _MIX_B) % _PRIME, num_perm)[::-1]
+        if value < bins[pos]:
+            bins[pos] = value
+    sig = array('Q', bins)
+    if len(hashes) < num_perm * 8:  # otherwise every bin is all but certainly filled
+        nearest = None
+        for pos in range(2 * num_perm - 1, -1, -1):
+            slot = pos % num_perm
+            if bins[slot] != _EMPTY:
+                nearest = (bins[slot], pos)
+            elif nearest is not None and pos < num_perm:
+                sig[slot] = nearest[0] + (nearest[1] - pos) * _BORROW
+    return sig
+
+
+def estimate(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM, miss_weight: float = 10.0) -> Tuple[int, int]:
+    """(bands, rows per band) whose S-curve best separates pairs around threshold
+
+    A pair with similarity s shares a band with probability 1 - (1 - s^r)^b;
+    this picks the b and r that minimise the missed pairs above threshold plus
+    the candidates below it. Every candidate is checked against the threshold
+    afterwards, so a spurious one costs a comparison while a miss costs a
+    duplicate vector: misses weigh miss_weight times more.
+    """
+    steps = 100
+
+    def area(bands: int, rows: int, low: float, high: float, above: bool) -> float:
+        total = 0.0
+        for i in range(steps):
+            s = low + (high - low) * (i + 0.5) / steps
+            p = 1 - (1 - s ** rows) ** bands
+            total += (1 - p if above else p) * (high - low) / steps
+        return total
+
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        error = area(bands, rows, 0.0, threshold, False) + miss_weight * area(bands, rows, threshold, 1.0, True)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class DuplicateIndex:
+    """Streaming near-duplicate detector: add() each text once, in order"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, array] = {}  # canonical texts only
+        self.groups: Dict[str, List[Tuple[str, float]]] = {}  # canonical -> [(duplicate, similarity)]
+        self.duplicate_of: Dict[str, str] = {}
+        self.stats = {'checked': 0, 'candidates': 0, 'duplicates': 0}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, sig: array) -> List[bytes]:
+        return [sig[pos * self.rows:(pos + 1) * self.rows].tobytes() for pos in range(self.bands)]
+
+    def add(self, key: str, text: Optional[str] = None,
+            sig: Optional[array] = None) -> Optional[Tuple[str, float]]:
+        """Check a text against everything added so far
+
+        Returns (canonical key, estimated similarity) when it is a near
+        duplicate, which is then recorded but not indexed; otherwise None and
+        the text becomes a canonical. Pass sig when it was computed elsewhere
+        (e.g. in a worker process).
+        """
+        if sig is None:
+            sig = signature(text or '', self.num_perm)
+        self.stats['checked'] += 1
+        if sig is None or key in self._signatures:
+            return None
+        bands = self._bands(sig)
+        candidates = {other for band, bucket in zip(bands, self._buckets) for other in bucket.get(band, ())}
+        self.stats['candidates'] += len(candidates)
+        best, best_score = None, 0.0
+        for other in candidates:
+            score = estimate(sig, self._signatures[other])
+            if score > best_score:
+                best, best_score = other, score
+        if best is not None and best_score >= self.threshold:
+            self.groups.setdefault(best, []).append((key, best_score))
+            self.duplicate_of[key] = best
+            self.stats['duplicates'] += 1
+            return best, best_score
+        self._signatures[key] = sig
+        for band, bucket in zip(bands, self._buckets):
+            bucket.setdefault(band, []).append(key)
+        return None
+
+    def duplicates(self, key: str) -> List[str]:
+        """Keys collapsed into a canonical"""
+        return [other for other, _ in self.groups.get(key, ())]
+
+    def report(self, limit: int = REPORT_LINES) -> str:
+        """What was merged: one line per canonical with its duplicates"""
+        stats = self.stats
+        if not stats['duplicates']:
+            return (f"🔁 Near-duplicates: none among {stats['checked']} item(s) "
+                    f"(threshold {self.threshold:.2f})")
+        lines = [f"🔁 Near-duplicates: {stats['duplicates']} of {stats['checked']} item(s) collapsed into "
+                 f"{len(self.groups)} canonical(s) (threshold {self.threshold:.2f}, "
+                 f"{self.bands}x{self.rows} bands, {stats['candidates']} candidate pairs)"]
+        for canonical, merged in list(self.groups.items())[:limit]:
+            names = ', '.join(f"{other} ({score:.2f})" for other, score in merged)
+            lines.append(f"   {canonical} ← {names}")
+        if len(self.groups) > limit:
+            lines.append(f"   … and {len(self.groups) - limit} more group(s)")
+        return '\n'.join(lines)
+
+
+def duplicate_index(threshold: Optional[float] = None) -> Optional[DuplicateIndex]:
+    """A DuplicateIndex at threshold (default DEDUP_THRESHOLD), or None when DEDUP=0"""
+    if not DEDUP_ENABLED:
+        return None
+    return DuplicateIndex(DEDUP_THRESHOLD if threshold is None else threshold)
+
+
+def link_duplicates(batch: List[Tuple[str, Any, Dict[str, Any]]], dedup: DuplicateIndex) -> None:
+    """List the ids collapsed into each canonical in its upsert metadata"""
+    for vector_id, _, metadata in batch:
+        duplicates = dedup.duplicates(vector_id)
+        if duplicates:
+            metadata['duplicates'] = duplicates
+
+
+def drop_duplicates(index: Any, ids: Iterable[str], job: str = 'embed', **kwargs: Any) -> None:
+    """Delete vectors a run without deduplication stored for what are now duplicates"""
+    ids = list(ids)
+    if not ids:
+        return
+    try:
+        if not is_local_store(index):
+            shared_scheduler().acquire('upstash', job=job)
+        result = index.delete(ids=ids, **kwargs)
+        deleted = result if isinstance(result, int) else getattr(result, 'deleted', 0)
+        if deleted:
+            print(f"🧹 Removed {deleted} previously stored duplicate vector(s)")
+    except Exception as e:
+        print(f"⚠️  Could not remove stored duplicates: {e}")
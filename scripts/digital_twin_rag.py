@@ -8,43 +8,156 @@ Retrieval-Augmented Generation system for interview preparation
 
 import os
 import json
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-from upstash_vector import Index
-from groq import Groq
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Union
+from config import groq_api_key, load_config, upstash_credentials
+from vector_store import (LocalVectorStore, is_local_backend, local_index_dir, query_cache_path, read_generation,
+                          text_query)
+from embeddings import shared_query_cache
+from profiling import phase, run
+from snapshot import SnapshotIndex
+from sharded_store import ShardedIndex, is_local_store, open_local_index, open_upstash_index
+from resilience import CallError, CallResult, Deadline, ResilientCall
+from scheduler import current_job, estimate_tokens
+from skill_index import SkillIndex, profile_skills
+from content_store import ContentStore, ContentStoreError
+from chunk_text import chunk_text_path, hydrate, is_slim
+from json_stream import load_file
+from intent_router import IntentRouter
+from prefetch import PREFETCH_ENABLED, FollowUpPrefetcher
+from tenants import SharedClients, TenantConfig, approx_nbytes
+
+if TYPE_CHECKING:  # the SDKs are imported when a client is first created
+    from groq import Groq
+    from upstash_vector import Index
 
 # Load environment variables
-load_dotenv(dotenv_path='.env.local')
+load_config()
 
 # Configuration
-UPSTASH_VECTOR_REST_URL = os.getenv('test_UPSTASH_VECTOR_REST_URL') or os.getenv('UPSTASH_VECTOR_REST_URL')
-UPSTASH_VECTOR_REST_TOKEN = os.getenv('test_UPSTASH_VECTOR_REST_TOKEN') or os.getenv('UPSTASH_VECTOR_REST_TOKEN')
-GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+UPSTASH_VECTOR_REST_URL, UPSTASH_VECTOR_REST_TOKEN = upstash_credentials()
+GROQ_API_KEY = groq_api_key()
 DEFAULT_MODEL = "llama-3.1-8b-instant"
 JSON_FILE = "data/digitaltwin_clean.json"
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH')  # read-only mmap snapshot; takes precedence over other backends
+QUERY_DEADLINE_SECONDS = float(os.getenv('QUERY_DEADLINE_SECONDS', '15'))  # end-to-end budget per question
+RETRIEVAL_BUDGET_SHARE = 0.3  # share of the budget retrieval may use; generation gets the rest
+MAX_RESPONSE_TOKENS = 500
+RATE_LIMIT_BACKOFF = 5.0  # seconds to hold a provider back after a 429 that names no wait
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '3'))  # chunks of context per question
+FAST_PATH_ENABLED = os.getenv('FAST_PATH', '1') != '0'  # answer factual lookups from the profile directly
+QUERY_CACHE_ENABLED = os.getenv('QUERY_CACHE', '1') != '0'  # reuse query vectors when embedding in process
+# Questions about skill demand get the posting skill-gap summary added to their context
+SKILL_GAP_RE = re.compile(
+    r"\b(skill gaps?|gaps?|lack|missing|in demand|most (asked|requested|wanted)|"
+    r"(jobs?|postings?|roles?|employers?) (ask|want|require|need|look)\w*)\b",
+    re.IGNORECASE,
+)
+SYSTEM_PROMPT = "You are an AI digital twin representing a professional. Answer questions as if you are the person, speaking in first person about your background, skills, and experiences. Be specific, use examples, and demonstrate your expertise with quantifiable achievements."
 
 
 class DigitalTwinRAG:
     """RAG system for digital twin interview preparation"""
     
-    def __init__(self):
-        """Initialize RAG system with vector database and LLM"""
-        self.vector_index: Optional[Index] = None
-        self.groq_client: Optional[Groq] = None
+    def __init__(self, tenant: Optional[TenantConfig] = None, shared: Optional[SharedClients] = None):
+        """Initialize RAG system with vector database and LLM
+
+        tenant selects whose profile, namespace and prompt to use (default: the
+        single-profile setup from the module constants); shared lets many
+        tenants reuse one set of clients.
+        """
+        self.tenant = tenant
+        self.shared = shared or SharedClients()
+        self.profile_path = tenant.profile_path if tenant else JSON_FILE
+        self.namespace = tenant.namespace if tenant else ''
+        self.system_prompt = (tenant.system_prompt if tenant else None) or SYSTEM_PROMPT
+        self.local_index_path = os.path.join(local_index_dir(), self.namespace) if self.namespace else local_index_dir()
+        self.vector_index: Optional[Union['Index', LocalVectorStore, ShardedIndex, SnapshotIndex]] = None
+        self.groq_client: Optional['Groq'] = None
         self.profile_data: Dict[str, Any] = {}
+        self.router = IntentRouter({})
         self.setup_failed = False
+        self.index_generation = read_generation(self.local_index_path)
+        self.retrieval = self.shared.retrieval
+        self.generation = self.shared.generation
+        self.scheduler = self.shared.scheduler
+        self.query_cache = shared_query_cache(query_cache_path()) if QUERY_CACHE_ENABLED else None
+        self._skill_index: Optional[SkillIndex] = None
+        self._contents: Optional[ContentStore] = None
+        self._chunk_text: Optional[ContentStore] = None
+        # Retrievals run on several threads; lazy opening, refreshing and reading the stores is serialised
+        self._stores_lock = threading.Lock()
+    
+    @classmethod
+    def for_tenant(cls, tenant: TenantConfig, shared: SharedClients) -> 'DigitalTwinRAG':
+        """Ready-to-query twin for one tenant, reusing the shared clients"""
+        twin = cls(tenant, shared)
+        if not twin.setup_vector_database():
+            raise RuntimeError(f"Vector database unavailable for tenant {tenant.tenant_id}")
+        twin.setup_groq_client()
+        twin.load_profile_data()
+        return twin
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by this twin's own state (shared clients excluded)"""
+        size = approx_nbytes(self.profile_data) + approx_nbytes(self.router.answers())
+        if is_local_store(self.vector_index):
+            size += self.vector_index.nbytes()
+        return size
+    
+    def print_cache_summary(self) -> None:
+        """Fast-path and query-embedding hit rates for the session"""
+        print(f"\n⚡ {self.router.summary()}")
+        if self.query_cache is not None and self.query_cache.stats['hits'] + self.query_cache.stats['misses']:
+            print(f"⚡ {self.query_cache.summary()}")
+        if isinstance(self.vector_index, ShardedIndex):
+            print(f"⚡ {self.vector_index.shard_summary()}")
+        if any(self.scheduler.counts[priority]['granted'] for priority in self.scheduler.counts):
+            print(f"⚡ {self.scheduler.summary()}")
     
     def setup_vector_database(self) -> bool:
-        """Setup Upstash Vector database connection"""
+        """Setup Upstash Vector database connection (or the local index)"""
+        try:
+            if SNAPSHOT_PATH and not self.tenant:
+                self.vector_index = SnapshotIndex.open(SNAPSHOT_PATH, text_queries=True)
+                self.retrieval.hedge = False  # in-process search; a duplicate only competes for the GIL
+                print(f"✅ Snapshot mapped read-only from {SNAPSHOT_PATH}")
+                print(f"📊 Vectors in database: {self.vector_index.info().vector_count}")
+                return True
+
+            if is_local_backend():
+                self.vector_index = open_local_index(self.local_index_path)
+                self.retrieval.hedge = False
+                vector_count = self.vector_index.info().vector_count
+                print(f"✅ Local vector index loaded from {self.local_index_path}")
+                print(f"📊 Vectors in database: {vector_count}")
+                if vector_count == 0:
+                    print("⚠️  No vectors found in local index. Run embed_digitaltwin.py with VECTOR_BACKEND=local first.")
+                    return False
+                return True
+
+            with self.shared.lock:
+                if self.shared.vector_index is not None:
+                    # Another tenant already connected; namespaces share its connection pool
+                    self.vector_index = self.shared.vector_index
+                    return True
+                return self._connect_upstash()
+        
+        except Exception as e:
+            print(f"❌ Error setting up vector database: {str(e)}")
+            return False
+    
+    def _connect_upstash(self) -> bool:
+        """Create the Upstash client and publish it to the shared clients"""
         try:
             if not UPSTASH_VECTOR_REST_URL or not UPSTASH_VECTOR_REST_TOKEN:
                 print("❌ Upstash Vector credentials not found in environment")
                 return False
             
-            self.vector_index = Index(
-                url=UPSTASH_VECTOR_REST_URL,
-                token=UPSTASH_VECTOR_REST_TOKEN,
-            )
+            self.vector_index = open_upstash_index()
+            self.shared.vector_index = self.vector_index
             print("✅ Upstash Vector connected successfully")
             
             # Check database status
@@ -66,11 +179,20 @@ class DigitalTwinRAG:
             return False
     
     def setup_groq_client(self) -> bool:
-        """Setup Groq LLM client"""
+        """Setup Groq LLM client, reusing the shared one when another tenant created it"""
+        with self.shared.lock:
+            if self.shared.groq_client is None and self._connect_groq():
+                self.shared.groq_client = self.groq_client
+            self.groq_client = self.shared.groq_client
+            return self.groq_client is not None
+    
+    def _connect_groq(self) -> bool:
+        """Create the Groq client"""
         try:
             if not GROQ_API_KEY:
                 print("❌ GROQ_API_KEY not found in environment")
                 return False
+            from groq import Groq
             # Prefer explicit keyword-style initialization. Some environments
             # inject proxy settings which can cause underlying HTTP client
             # constructors to fail (e.g. unexpected 'proxies' kwarg). To avoid
@@ -97,16 +219,37 @@ class DigitalTwinRAG:
             print(f"❌ Error initializing Groq client: {str(e)}")
             return False
     
+    def close_clients(self) -> None:
+        """Close the Groq and Upstash connections (before forking workers)
+
+        A forked worker would otherwise inherit the parent's pooled
+        keep-alive sockets and share them with its siblings. In-process
+        indexes and snapshots stay open: they are read-only and shared.
+        """
+        self.shared.close()
+        self.groq_client = None
+        if not (is_local_store(self.vector_index) or isinstance(self.vector_index, SnapshotIndex)):
+            self.vector_index = None
+
+    def open_clients(self) -> bool:
+        """Connect again after close_clients(), in each forked worker; False without a vector database"""
+        if self.vector_index is None and not self.setup_vector_database():
+            return False
+        if not self.setup_groq_client():
+            print("⚠️  Groq setup had issues — continuing without LLM (degraded mode)")
+        return True
+
     def load_profile_data(self) -> bool:
         """Load digital twin profile for context"""
         try:
-            if not os.path.exists(JSON_FILE):
-                print(f"⚠️  {JSON_FILE} not found")
+            if not os.path.exists(self.profile_path):
+                print(f"⚠️  {self.profile_path} not found")
                 return False
             
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                self.profile_data = json.load(f)
-            
+            with phase('load'):
+                self.profile_data = load_file(self.profile_path)
+                
+                self.router = IntentRouter(self.profile_data, stats=self.router.stats)
             print("✅ Profile data loaded")
             return True
         
@@ -114,52 +257,174 @@ class DigitalTwinRAG:
             print(f"⚠️  Error loading profile: {e}")
             return False
     
-    def query_vectors(self, query_text: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Query vector database for relevant content"""
+    def refresh_if_stale(self) -> bool:
+        """Reload profile and local index when watch mode has pushed a change"""
+        generation = read_generation(self.local_index_path)
+        if generation == self.index_generation:
+            return False
+        self.index_generation = generation
+        if is_local_store(self.vector_index):
+            # Swapped in whole: a query still running on another thread (the
+            # prefetcher, other server requests) finishes on the old index
+            self.vector_index = open_local_index(self.local_index_path)
+        with self._stores_lock:
+            self._skill_index = None  # watch mode may have re-indexed postings too
+            for store in (self._contents, self._chunk_text):
+                if store is not None:
+                    store.close()
+            self._contents = self._chunk_text = None
+        self.load_profile_data()
+        print("🔄 Index updated since last question; reloaded")
+        return True
+    
+    def skill_context(self) -> Optional[str]:
+        """Skill-gap summary of the indexed postings against this profile, if any are indexed"""
+        with self._stores_lock:
+            if self._skill_index is None:
+                self._skill_index = SkillIndex.load()
+            skill_index = self._skill_index
+        if not len(skill_index):
+            return None
+        return skill_index.summary(profile_skills(self.profile_data))
+    
+    def posting_body(self, metadata: Optional[Dict[str, Any]]) -> str:
+        """Full body of a job posting hit stored without content, read from the content store"""
+        job_id = metadata.get('jobId') if metadata else None
+        if not job_id:
+            return ''
         try:
-            if not self.vector_index:
-                print("❌ Vector database not initialized")
-                return []
-            
-            results = self.vector_index.query(
-                data=query_text,
+            with self._stores_lock:
+                if self._contents is None:
+                    self._contents = ContentStore.open()
+                else:
+                    self._contents.refresh()
+                return self._contents.get(job_id) or ''
+        except (ContentStoreError, OSError) as e:
+            print(f"⚠️  Could not read posting {job_id}: {e}")
+            return ''
+    
+    def hit_metadata(self, vector_id: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Metadata of a hit; a slim vector's text fields are read from the chunk text store"""
+        if not is_slim(metadata):
+            return metadata or {}
+        with self._stores_lock:
+            if self._chunk_text is None:
+                self._chunk_text = ContentStore.open(chunk_text_path(self.namespace))
+            else:
+                self._chunk_text.refresh()
+            return hydrate(vector_id, metadata, self._chunk_text)
+    
+    def _admit(self, provider: str, stage: str, tokens: int,
+               deadline: Optional[Deadline], budget: float) -> Union[Deadline, CallResult]:
+        """Wait for the scheduler to let one request through to a provider
+
+        Interactive calls wait at most until their deadline. Batch calls (inside
+        scheduler.batch_job) wait for spare capacity as long as it takes; their
+        budget starts once they are admitted. Returns the deadline to call
+        under, or a timeout CallResult.
+        """
+        if current_job() is not None:
+            self.scheduler.acquire(provider, tokens)
+            return Deadline(deadline.budget if deadline else budget)
+        deadline = deadline or Deadline(budget)
+        if not self.scheduler.acquire(provider, tokens, timeout=deadline.remaining()):
+            return CallResult(error=CallError(stage, 'timeout', f"{provider} rate limit left no time for {stage}"))
+        return deadline
+
+    def _guarded(self, provider: str, call: ResilientCall, fn: Callable[[Deadline], Any],
+                 deadline: Deadline, tokens: int) -> CallResult:
+        """Run an admitted call; hedges and retries are admitted too, and a 429 pauses the provider"""
+        result = call(fn, deadline, admit=lambda timeout: self.scheduler.acquire(provider, tokens, timeout=timeout))
+        if not result.ok and result.error.kind == 'rate_limited':
+            self.scheduler.pause(provider, result.error.retry_after or RATE_LIMIT_BACKOFF)
+        return result
+    
+    def retrieve(self, query_text: str, top_k: int = RETRIEVAL_TOP_K, ef: Optional[int] = None,
+                 deadline: Optional[Deadline] = None) -> CallResult[List[Dict[str, Any]]]:
+        """Query vector database for relevant content within a deadline
+
+        ef widens the HNSW search for this query (local backend only);
+        None uses the ef calibrated against ANN_RECALL_TARGET at index time.
+        Upstash requests go through the request scheduler.
+        """
+        index = self.vector_index  # one index for the whole search, even if a reload swaps it
+        if not index:
+            return CallResult(error=CallError('retrieval', 'unavailable', "Vector database not initialized"))
+
+        query_kwargs: Dict[str, Any] = {}
+        in_process = is_local_store(index) or isinstance(index, SnapshotIndex)
+        if ef is not None and in_process:
+            query_kwargs['ef'] = ef
+        if self.namespace and not in_process:
+            query_kwargs['namespace'] = self.namespace
+
+        def search(budget: Deadline) -> List[Dict[str, Any]]:
+            kwargs = dict(query_kwargs)
+            sharded = isinstance(index, ShardedIndex)
+            if sharded:
+                # Shards that cannot answer within the retrieval budget are left out
+                kwargs['timeout'] = min(index.timeout, budget.remaining())
+            results = index.query(
+                **text_query(index, query_text, self.query_cache),
                 top_k=top_k,
-                include_metadata=True
+                include_metadata=True,
+                **kwargs
             )
+            if sharded and index.last_missing:
+                missing = ', '.join(map(str, index.last_missing))
+                print(f"⚠️  Partial results: shard(s) {missing} did not answer in time")
             
             formatted_results = []
             for result in results:
-                metadata = getattr(result, 'metadata', {})
+                vector_id = getattr(result, 'id', 'unknown')
+                # Slim vectors carry no text; it is read only for the hits returned
+                metadata = self.hit_metadata(vector_id, getattr(result, 'metadata', None))
                 score = getattr(result, 'score', 0)
                 
                 formatted_results.append({
-                    'id': getattr(result, 'id', 'unknown'),
-                    'content': metadata.get('content', '') if metadata else '',
-                    'title': metadata.get('title', '') if metadata else '',
-                    'type': metadata.get('type', '') if metadata else '',
+                    'id': vector_id,
+                    # Whole-posting vectors carry no body; it is read only for hits that are shown
+                    'content': metadata.get('content', '') or self.posting_body(metadata),
+                    'title': metadata.get('title', ''),
+                    'type': metadata.get('type', ''),
                     'score': score,
                     'metadata': metadata
                 })
             
             return formatted_results
-        
-        except Exception as e:
-            print(f"❌ Error querying vectors: {str(e)}")
+
+        budget = QUERY_DEADLINE_SECONDS * RETRIEVAL_BUDGET_SHARE
+        if in_process:
+            return self.retrieval(search, deadline or Deadline(budget))
+        admitted = self._admit('upstash', 'retrieval', 1, deadline, budget)
+        if isinstance(admitted, CallResult):
+            return admitted
+        return self._guarded('upstash', self.retrieval, search, admitted, 1)
+    
+    def query_vectors(self, query_text: str, top_k: int = RETRIEVAL_TOP_K, ef: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Query vector database for relevant content; empty list on failure"""
+        result = self.retrieve(query_text, top_k=top_k, ef=ef)
+        if not result.ok:
+            print(f"❌ Error querying vectors: {result.error.message}")
             return []
+        return result.value
     
-    def generate_response(self, prompt: str, model: str = DEFAULT_MODEL) -> str:
-        """Generate response using Groq LLM"""
-        try:
-            if not self.groq_client:
-                print("❌ Groq client not initialized")
-                return "Unable to generate response"
-            
+    def generate_response(self, prompt: str, model: str = DEFAULT_MODEL,
+                          deadline: Optional[Deadline] = None) -> CallResult[str]:
+        """Generate response using Groq LLM within a deadline
+
+        The request waits its turn for the Groq rate limit in the scheduler.
+        """
+        if not self.groq_client:
+            return CallResult(error=CallError('generation', 'unavailable', "LLM not available"))
+
+        def complete(stage_deadline: Deadline) -> str:
             completion = self.groq_client.chat.completions.create(
                 model=model,
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are an AI digital twin representing a professional. Answer questions as if you are the person, speaking in first person about your background, skills, and experiences. Be specific, use examples, and demonstrate your expertise with quantifiable achievements."
+                        "content": self.system_prompt
                     },
                     {
                         "role": "user",
@@ -167,23 +432,65 @@ class DigitalTwinRAG:
                     }
                 ],
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=MAX_RESPONSE_TOKENS,
+                timeout=max(0.1, stage_deadline.remaining())
             )
             
             return completion.choices[0].message.content.strip()
-        
-        except Exception as e:
-            return f"❌ Error generating response: {str(e)}"
+
+        tokens = estimate_tokens(self.system_prompt) + estimate_tokens(prompt) + MAX_RESPONSE_TOKENS
+        admitted = self._admit('groq', 'generation', tokens, deadline, QUERY_DEADLINE_SECONDS)
+        if isinstance(admitted, CallResult):
+            return admitted
+        return self._guarded('groq', self.generation, complete, admitted, tokens)
     
-    def rag_query(self, question: str, use_llm_formatting: bool = True) -> Dict[str, Any]:
+    def rag_query(self, question: str, use_llm_formatting: bool = True, background: bool = False,
+                  retrieval: Optional[CallResult] = None) -> Dict[str, Any]:
         """
         Perform RAG query: semantic search + LLM response generation
+
+        background runs silently and leaves index reloads to the foreground
+        (used by the follow-up prefetcher); retrieval reuses a search already made.
         """
+        say = (lambda *args, **kwargs: None) if background else print
         try:
+            if not background:
+                self.refresh_if_stale()
+            
+            # Step 0: Factual lookups are answered straight from the profile
+            if FAST_PATH_ENABLED:
+                started = time.perf_counter()
+                with phase('route'):
+                    routed = self.router.route(question, count=not background)
+                if routed:
+                    return {
+                        'success': True,
+                        'response': routed.answer,
+                        'results_found': 0,
+                        'model_used': None,
+                        'route': 'fast_path',
+                        'intent': routed.intent,
+                        'timings': {'route_s': time.perf_counter() - started}
+                    }
+            
+            deadline = Deadline(QUERY_DEADLINE_SECONDS)
+            
             # Step 1: Search vector database
-            print(f"\n🔍 Searching your professional profile...")
-            vector_results = self.query_vectors(question, top_k=3)
+            if retrieval is None:
+                say(f"\n🔍 Searching your professional profile...")
+                with phase('query'):
+                    retrieval = self.retrieve(question, deadline=deadline.child(RETRIEVAL_BUDGET_SHARE))
+            
+            if not retrieval.ok:
+                say(f"❌ Error querying vectors: {retrieval.error.message}")
+                return {
+                    'success': False,
+                    'response': "I couldn't search my professional background just now. Please try again shortly.",
+                    'results_found': 0,
+                    'error': retrieval.error.to_dict()
+                }
             
+            vector_results = retrieval.value
             if not vector_results:
                 return {
                     'success': False,
@@ -192,7 +499,7 @@ class DigitalTwinRAG:
                 }
             
             # Step 2: Extract and display context
-            print(f"✅ Found {len(vector_results)} relevant items:")
+            say(f"✅ Found {len(vector_results)} relevant items:")
             context_pieces = []
             
             for idx, result in enumerate(vector_results, 1):
@@ -200,13 +507,18 @@ class DigitalTwinRAG:
                 score = result.get('score', 0)
                 content = result.get('content', '')
                 
-                print(f"  {idx}. {title} (Relevance: {score:.0%})")
+                say(f"  {idx}. {title} (Relevance: {score:.0%})")
                 
                 if content:
                     context_pieces.append(f"{title}: {content}")
             
+            if SKILL_GAP_RE.search(question):
+                skills = self.skill_context()
+                if skills:
+                    context_pieces.insert(0, skills)
+            
             # Step 3: Generate response with LLM
-            print(f"\n⚡ Generating personalized response...")
+            say(f"\n⚡ Generating personalized response...")
             
             context = "\n".join(context_pieces)
             
@@ -236,27 +548,33 @@ Question: {question}
 
 Answer in first person based on this context:"""
             
-            response = self.generate_response(prompt)
+            with phase('generate'):
+                generation = self.generate_response(prompt, deadline=deadline)
+            timings = {'retrieval_s': retrieval.elapsed, 'generation_s': generation.elapsed}
 
-            # If LLM is not available, return the raw context as a fallback
-            if not self.groq_client:
+            # If the LLM is unavailable, slow or failing, return the raw context as a fallback
+            if not generation.ok:
                 fallback_response = (
-                    "⚠️ LLM not available. Returning supporting context instead:\n\n" + context
+                    f"⚠️ {generation.error.message}. Returning supporting context instead:\n\n" + context
                 )
                 return {
                     'success': True,
                     'response': fallback_response,
                     'results_found': len(vector_results),
                     'context_items': vector_results,
-                    'model_used': None
+                    'model_used': None,
+                    'degraded': True,
+                    'error': generation.error.to_dict(),
+                    'timings': timings
                 }
 
             return {
                 'success': True,
-                'response': response,
+                'response': generation.value,
                 'results_found': len(vector_results),
                 'context_items': vector_results,
-                'model_used': DEFAULT_MODEL
+                'model_used': DEFAULT_MODEL,
+                'timings': timings
             }
         
         except Exception as e:
@@ -273,7 +591,8 @@ Answer in first person based on this context:"""
         
         # Setup vector database
         print("\n📍 Setting up Vector Database...")
-        vector_ok = self.setup_vector_database()
+        with phase('open_index'):
+            vector_ok = self.setup_vector_database()
         if not vector_ok:
             print("⚠️  Vector database setup had issues")
             self.setup_failed = True
@@ -307,6 +626,8 @@ def main():
     if not rag_system.initialize():
         print("\n❌ Failed to initialize. Please check your setup.")
         return
+    # Prepares likely follow-ups while the user reads each answer
+    prefetcher = FollowUpPrefetcher(rag_system) if PREFETCH_ENABLED else None
     
     print("\n🤖 Chat with your Digital Twin")
     print("=" * 60)
@@ -326,6 +647,9 @@ def main():
             question = input("You: ").strip()
             
             if question.lower() in ["exit", "quit", "bye"]:
+                rag_system.print_cache_summary()
+                if prefetcher:
+                    print(f"⚡ {prefetcher.summary()}")
                 print("\n👋 Thank you for using Digital Twin RAG!")
                 break
             
@@ -333,21 +657,52 @@ def main():
                 print("Please ask a question.\n")
                 continue
             
-            # Run RAG query
-            result = rag_system.rag_query(question)
+            # Run RAG query, unless the question was predicted and prepared already
+            result = prefetcher.take(question) if prefetcher else None
+            if result is not None:
+                print(f"⚡ Follow-up predicted while you were reading (as \"{result['prefetched_as']}\")")
+            else:
+                result = rag_system.rag_query(question)
             
             if result['success']:
                 print(f"\n🤖 Digital Twin: {result['response']}\n")
                 print("-" * 60)
             else:
                 print(f"\n🤖 Digital Twin: {result['response']}\n")
+            if prefetcher:
+                prefetcher.start(question, result)
         
         except KeyboardInterrupt:
-            print("\n\n👋 Goodbye!")
+            print()
+            rag_system.print_cache_summary()
+            if prefetcher:
+                print(f"⚡ {prefetcher.summary()}")
+            print("\n👋 Goodbye!")
             break
         except Exception as e:
             print(f"❌ Error: {e}\n")
 
 
+
+def ask(argv: Optional[List[str]] = None) -> int:
+    """Answer one question and exit (non-interactive)"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Ask the digital twin one question")
+    parser.add_argument('question', nargs='+')
+    parser.add_argument('--json', action='store_true', help="Print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    rag_system = DigitalTwinRAG()
+    if not rag_system.initialize():
+        print("\n❌ Failed to initialize. Please check your setup.")
+        return 1
+    result = rag_system.rag_query(' '.join(args.question))
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+    else:
+        print(f"\n🤖 Digital Twin: {result['response']}")
+    return 0 if result['success'] else 1
+
+
 if __name__ == "__main__":
-    main()
+    run(main)
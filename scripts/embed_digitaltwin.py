@@ -4,47 +4,95 @@ Digital Twin Vector Database Setup and Data Loading
 Embeds professional profile data into Upstash Vector Database for semantic search
 """
 
+import argparse
 import os
-import json
 import sys
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-from dotenv import load_dotenv
-from upstash_vector import Index
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Union
+from config import load_config, upstash_credentials
+from sharded_store import ShardedIndex, is_local_store, open_local_index, open_upstash_index
+from vector_store import (UPSERT_BATCH_SIZE, LocalVectorStore, embed_upserts, index_embedder, is_local_backend,
+                          local_index_dir, text_query)
+from chunk_store import ChunkStore
+from json_stream import JsonStreamError, iter_values
+from chunk_text import hydrate, open_chunk_text, save_chunk_text, slim_upserts
+from dedup import DuplicateIndex, drop_duplicates, duplicate_index, link_duplicates
+from tenants import TenantRegistry, UnknownTenantError, tenants_dir
+from profiling import phase, run
+from scheduler import shared_scheduler
+
+if TYPE_CHECKING:  # imported in setup_connection, only for the Upstash backend
+    from upstash_vector import Index
 
 # Load environment variables
-load_dotenv()
+load_config()
 
 # Configuration
-UPSTASH_VECTOR_REST_URL = os.getenv('test_UPSTASH_VECTOR_REST_URL') or os.getenv('UPSTASH_VECTOR_REST_URL')
-UPSTASH_VECTOR_REST_TOKEN = os.getenv('test_UPSTASH_VECTOR_REST_TOKEN') or os.getenv('UPSTASH_VECTOR_REST_TOKEN')
+UPSTASH_VECTOR_REST_URL, UPSTASH_VECTOR_REST_TOKEN = upstash_credentials()
 JSON_FILE = 'data/digitaltwin_clean.json'
-BATCH_SIZE = 10  # Process vectors in batches
-CHUNK_SIZE = 500  # Characters per chunk for better embedding
+BATCH_SIZE = UPSERT_BATCH_SIZE  # Process vectors in batches
+# Chunks longer than CHUNK_SIZE characters are split into pieces that repeat
+# CHUNK_OVERLAP characters of the piece before (0: never split); tune_chunks.py measures both
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '0'))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '0'))
+PART_SEP = '_part'  # piece n > 0 of chunk "x" gets the id "x_part<n>"
+
+
+def split_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Pieces of at most size characters, each starting overlap characters before the last one ended
+
+    Pieces end at a space when one falls in the second half of the piece.
+    """
+    if size <= 0 or len(text) <= size:
+        return [text]
+    pieces, start = [], 0
+    while len(text) - start > size:
+        end = start + size
+        space = text.rfind(' ', start + size // 2, end)
+        if space != -1:
+            end = space
+        pieces.append(text[start:end].strip())
+        start = max(end - overlap, start + 1)
+        space = text.find(' ', start, end) if overlap else -1
+        if space != -1:
+            start = space + 1  # start the overlap on a whole word
+    pieces.append(text[start:].strip())
+    return pieces
 
 
-@dataclass
-class ContentChunk:
-    """Represents a chunk of embeddable content"""
-    id: str
-    title: str
-    content: str
-    type: str
-    category: str
-    tags: List[str]
+def chunk_parent(chunk_id: str) -> str:
+    """Id of the chunk a piece was split from (chunk_id itself for a whole chunk)"""
+    base, sep, part = chunk_id.rpartition(PART_SEP)
+    return base if sep and part.isdigit() else chunk_id
 
 
 class VectorDatabaseSetup:
     """Manages vector database setup and data loading"""
 
-    def __init__(self):
-        """Initialize vector database connection"""
-        self.index: Optional[Index] = None
-        self.chunks: List[ContentChunk] = []
+    def __init__(self, profile_path: str = JSON_FILE, namespace: str = '',
+                 dedup: Optional[DuplicateIndex] = None, chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP):
+        """Initialize vector database connection
+
+        namespace keeps one tenant's vectors apart from others in a shared
+        index (an Upstash namespace, or a subdirectory of the local index).
+        dedup collapses chunks that repeat another chunk almost word for word.
+        chunk_size and chunk_overlap control how long chunks are split.
+        """
+        self.profile_path = profile_path
+        self.namespace = namespace
+        self.dedup = dedup
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunk_text = None  # chunk text store writer, with VECTOR_METADATA=slim
+        self.index: Optional[Union['Index', LocalVectorStore, ShardedIndex]] = None
+        self.chunks = ChunkStore()
         self.validate_environment()
 
     def validate_environment(self) -> None:
         """Validate environment variables are properly set"""
+        if is_local_backend():
+            print(f"✅ Using local vector index at {local_index_dir()}")
+            return
         if not UPSTASH_VECTOR_REST_URL:
             raise ValueError("❌ UPSTASH_VECTOR_REST_URL not found in environment variables")
         if not UPSTASH_VECTOR_REST_TOKEN:
@@ -54,10 +102,13 @@ class VectorDatabaseSetup:
     def setup_connection(self) -> bool:
         """Establish connection to Upstash Vector Database"""
         try:
-            self.index = Index(
-                url=UPSTASH_VECTOR_REST_URL,
-                token=UPSTASH_VECTOR_REST_TOKEN,
-            )
+            if is_local_backend():
+                path = os.path.join(local_index_dir(), self.namespace) if self.namespace else None
+                self.index = open_local_index(path)
+                print(f"✅ Opened local vector index ({self.index.info().vector_count} vectors)")
+                return True
+
+            self.index = open_upstash_index()
             print("✅ Connected to Upstash Vector successfully!")
             
             # Check database info
@@ -76,201 +127,213 @@ class VectorDatabaseSetup:
     def load_profile_data(self) -> bool:
         """Load digital twin profile from JSON file"""
         try:
-            if not os.path.exists(JSON_FILE):
-                print(f"❌ {JSON_FILE} not found")
+            if not os.path.exists(self.profile_path):
+                print(f"❌ {self.profile_path} not found")
                 return False
             
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                profile_data = json.load(f)
-            
-            print(f"✅ Loaded profile data from {JSON_FILE}")
-            self._extract_chunks(profile_data)
+            # Chunk each section (or list item) as soon as it is decoded,
+            # instead of decoding the whole file first
+            self.chunks = ChunkStore()
+            with phase('load'), open(self.profile_path, 'rb') as f:
+                for path, value in iter_values(f, PROFILE_STREAM_PATHS):
+                    with phase('chunk'):
+                        self._add_chunks(path, value)
             
+            print(f"✅ Loaded profile data from {self.profile_path}")
             if not self.chunks:
                 print("❌ No content chunks extracted from profile")
                 return False
             
             print(f"✅ Extracted {len(self.chunks)} content chunks")
             return True
-        except json.JSONDecodeError as e:
+        except JsonStreamError as e:
             print(f"❌ Invalid JSON format: {str(e)}")
             return False
         except Exception as e:
             print(f"❌ Error loading profile data: {str(e)}")
             return False
 
+    def extract_chunks(self, profile_data: Dict[str, Any]) -> ChunkStore:
+        """Replace the current chunks with those extracted from profile_data"""
+        self.chunks = ChunkStore()
+        self._extract_chunks(profile_data)
+        return self.chunks
+
     def _extract_chunks(self, profile_data: Dict[str, Any]) -> None:
         """Extract embeddable chunks from profile data"""
-        chunk_id = 0
-        
-        # Personal Profile
-        if 'personal_profile' in profile_data:
-            personal = profile_data['personal_profile']
-            self.chunks.append(ContentChunk(
-                id=f"personal_{chunk_id}",
-                title="Professional Summary",
-                content=f"{personal.get('name', '')} - {personal.get('career_summary', '')}",
-                type="profile",
-                category="personal",
-                tags=personal.get('primary_roles', [])
-            ))
-            chunk_id += 1
-
-        # Education
-        if 'education' in profile_data:
-            for idx, edu in enumerate(profile_data['education']):
-                self.chunks.append(ContentChunk(
-                    id=f"education_{idx}",
-                    title=f"{edu.get('degree', 'Education')}",
-                    content=f"Degree: {edu.get('degree', '')}, Institution: {edu.get('institution', '')}, Year: {edu.get('year', '')}",
-                    type="education",
-                    category="education",
-                    tags=["education", "degree"]
-                ))
-
-        # Certifications
-        if 'certifications' in profile_data:
-            for idx, cert in enumerate(profile_data['certifications']):
-                self.chunks.append(ContentChunk(
-                    id=f"cert_{idx}",
-                    title=f"{cert.get('name', 'Certification')}",
-                    content=f"Certification: {cert.get('name', '')}, Year: {cert.get('year', '')}",
-                    type="certification",
-                    category="certifications",
-                    tags=["certification", "credential"]
-                ))
-
-        # Professional Experience
-        if 'professional_experience' in profile_data:
-            for idx, exp in enumerate(profile_data['professional_experience']):
-                # Company and role
-                company = exp.get('company', '')
-                role = exp.get('role', '')
-                self.chunks.append(ContentChunk(
-                    id=f"experience_header_{idx}",
-                    title=f"{role} at {company}",
-                    content=f"Position: {role}, Company: {company}",
-                    type="experience",
-                    category="experience",
-                    tags=["experience", "work", company.lower()]
-                ))
-                
-                # Quantified impacts
-                if 'quantified_impact' in exp:
-                    impacts = exp['quantified_impact']
-                    impact_text = " ".join(impacts)
-                    self.chunks.append(ContentChunk(
-                        id=f"experience_impact_{idx}",
-                        title=f"{role} - Achievements at {company}",
-                        content=impact_text,
-                        type="experience",
-                        category="achievements",
-                        tags=["achievement", "impact", "metric"]
-                    ))
-                
-                # Metrics examples
-                if 'metrics_examples' in exp:
-                    metrics = exp['metrics_examples']
-                    metrics_text = " ".join([f"{k}: {v}" for k, v in metrics.items()])
-                    self.chunks.append(ContentChunk(
-                        id=f"experience_metrics_{idx}",
-                        title=f"{role} - Key Metrics",
-                        content=metrics_text,
-                        type="experience",
-                        category="metrics",
-                        tags=["metrics", "performance", "results"]
-                    ))
-
-        # Skills
-        if 'skills' in profile_data:
-            skills = profile_data['skills']
-            skill_text = ""
-            
-            if 'cloud' in skills:
-                skill_text += f"Cloud Skills: {', '.join(skills['cloud'])}. "
-            if 'data_analytics' in skills:
-                skill_text += f"Data Analytics: {', '.join(skills['data_analytics'])}. "
-            if 'databases' in skills:
-                skill_text += f"Databases: {', '.join(skills['databases'])}. "
-            if 'soft_skills' in skills:
-                skill_text += f"Soft Skills: {', '.join(skills['soft_skills'])}. "
-            
-            if skill_text:
-                self.chunks.append(ContentChunk(
-                    id="skills_comprehensive",
-                    title="Professional Skills",
-                    content=skill_text,
-                    type="skills",
-                    category="skills",
-                    tags=["skills", "competencies", "expertise"]
-                ))
-
-        # Interview Prep - Behavioral
-        if 'interview_prep' in profile_data:
-            interview_prep = profile_data['interview_prep']
-            
-            if 'behavioral' in interview_prep:
-                for idx, item in enumerate(interview_prep['behavioral']):
-                    question = item.get('question', '')
-                    star = item.get('answer_star', {})
-                    
-                    star_text = f"Question: {question}. "
-                    star_text += f"Situation: {star.get('situation', '')}. "
-                    star_text += f"Task: {star.get('task', '')}. "
-                    if 'action' in star:
-                        actions = star['action']
-                        if isinstance(actions, list):
-                            star_text += f"Actions: {' '.join(actions)}. "
-                        else:
-                            star_text += f"Actions: {actions}. "
-                    star_text += f"Result: {star.get('result', '')}"
-                    
-                    self.chunks.append(ContentChunk(
-                        id=f"behavioral_qa_{idx}",
-                        title=f"Behavioral Interview - {question[:50]}...",
-                        content=star_text,
-                        type="interview",
-                        category="behavioral",
-                        tags=["interview", "behavioral", "STAR"]
-                    ))
-
-        # Interview Prep - Technical
-        if 'interview_prep' in profile_data:
-            interview_prep = profile_data['interview_prep']
-            
-            if 'technical' in interview_prep:
-                for idx, item in enumerate(interview_prep['technical']):
-                    question = item.get('question', '')
-                    answer = item.get('answer', {})
-                    
-                    answer_text = f"Question: {question}. "
-                    if 'points' in answer:
-                        answer_text += " ".join(answer['points'])
-                    
-                    self.chunks.append(ContentChunk(
-                        id=f"technical_qa_{idx}",
-                        title=f"Technical Interview - {question[:50]}...",
-                        content=answer_text,
-                        type="interview",
-                        category="technical",
-                        tags=["interview", "technical", "skills"]
-                    ))
-
-        # Career Transition
-        if 'career_transition' in profile_data:
-            transition = profile_data['career_transition']
-            transition_text = f"Career Transition: From {transition.get('from', '')} to {transition.get('to', '')}. "
-            if 'evidence' in transition:
-                transition_text += f"Evidence: {' '.join(transition['evidence'])}"
-            
-            self.chunks.append(ContentChunk(
-                id="career_transition",
-                title="Career Transition Story",
-                content=transition_text,
-                type="career",
-                category="transition",
-                tags=["career", "transition", "growth"]
-            ))
+        for section in CHUNKED_SECTIONS:
+            if section in profile_data:
+                self._add_chunks((section,), profile_data[section])
+
+    def _add_chunks(self, path: Tuple[Any, ...], value: Any) -> None:
+        """Chunk one piece of the profile: a whole section, or one item of a list section
+
+        path is where value sits in the profile, as iter_values yields it.
+        """
+        if isinstance(path[-1], int):
+            item_chunks = ITEM_CHUNKERS.get(path[:-1])
+            if item_chunks:
+                item_chunks(self, path[-1], value)
+        elif path in ITEM_CHUNKERS:
+            for idx, item in enumerate(value):
+                ITEM_CHUNKERS[path](self, idx, item)
+        elif path == ('interview_prep',):
+            for part in ('behavioral', 'technical'):
+                if part in value:
+                    self._add_chunks(('interview_prep', part), value[part])
+        elif len(path) == 1 and path[0] in SECTION_CHUNKERS:
+            SECTION_CHUNKERS[path[0]](self, value)
+
+    def _append(self, id: str, content: str, **fields: Any) -> None:
+        """Add a chunk, split into pieces of up to chunk_size characters"""
+        for part, piece in enumerate(split_text(content, self.chunk_size, self.chunk_overlap)):
+            self.chunks.append(id=f"{id}{PART_SEP}{part}" if part else id, content=piece, **fields)
+
+    def _personal_chunks(self, personal: Dict[str, Any]) -> None:
+        self._append(
+            id="personal_0",
+            title="Professional Summary",
+            content=f"{personal.get('name', '')} - {personal.get('career_summary', '')}",
+            type="profile",
+            category="personal",
+            tags=personal.get('primary_roles', [])
+        )
+
+    def _education_chunks(self, idx: int, edu: Dict[str, Any]) -> None:
+        self._append(
+            id=f"education_{idx}",
+            title=f"{edu.get('degree', 'Education')}",
+            content=f"Degree: {edu.get('degree', '')}, Institution: {edu.get('institution', '')}, Year: {edu.get('year', '')}",
+            type="education",
+            category="education",
+            tags=["education", "degree"]
+        )
+
+    def _certification_chunks(self, idx: int, cert: Dict[str, Any]) -> None:
+        self._append(
+            id=f"cert_{idx}",
+            title=f"{cert.get('name', 'Certification')}",
+            content=f"Certification: {cert.get('name', '')}, Year: {cert.get('year', '')}",
+            type="certification",
+            category="certifications",
+            tags=["certification", "credential"]
+        )
+
+    def _experience_chunks(self, idx: int, exp: Dict[str, Any]) -> None:
+        # Company and role
+        company = exp.get('company', '')
+        role = exp.get('role', '')
+        self._append(
+            id=f"experience_header_{idx}",
+            title=f"{role} at {company}",
+            content=f"Position: {role}, Company: {company}",
+            type="experience",
+            category="experience",
+            tags=["experience", "work", company.lower()]
+        )
+
+        # Quantified impacts
+        if 'quantified_impact' in exp:
+            impacts = exp['quantified_impact']
+            impact_text = " ".join(impacts)
+            self._append(
+                id=f"experience_impact_{idx}",
+                title=f"{role} - Achievements at {company}",
+                content=impact_text,
+                type="experience",
+                category="achievements",
+                tags=["achievement", "impact", "metric"]
+            )
+
+        # Metrics examples
+        if 'metrics_examples' in exp:
+            metrics = exp['metrics_examples']
+            metrics_text = " ".join([f"{k}: {v}" for k, v in metrics.items()])
+            self._append(
+                id=f"experience_metrics_{idx}",
+                title=f"{role} - Key Metrics",
+                content=metrics_text,
+                type="experience",
+                category="metrics",
+                tags=["metrics", "performance", "results"]
+            )
+
+    def _skills_chunks(self, skills: Dict[str, Any]) -> None:
+        skill_text = ""
+
+        if 'cloud' in skills:
+            skill_text += f"Cloud Skills: {', '.join(skills['cloud'])}. "
+        if 'data_analytics' in skills:
+            skill_text += f"Data Analytics: {', '.join(skills['data_analytics'])}. "
+        if 'databases' in skills:
+            skill_text += f"Databases: {', '.join(skills['databases'])}. "
+        if 'soft_skills' in skills:
+            skill_text += f"Soft Skills: {', '.join(skills['soft_skills'])}. "
+
+        if skill_text:
+            self._append(
+                id="skills_comprehensive",
+                title="Professional Skills",
+                content=skill_text,
+                type="skills",
+                category="skills",
+                tags=["skills", "competencies", "expertise"]
+            )
+
+    def _behavioral_chunks(self, idx: int, item: Dict[str, Any]) -> None:
+        question = item.get('question', '')
+        star = item.get('answer_star', {})
+
+        star_text = f"Question: {question}. "
+        star_text += f"Situation: {star.get('situation', '')}. "
+        star_text += f"Task: {star.get('task', '')}. "
+        if 'action' in star:
+            actions = star['action']
+            if isinstance(actions, list):
+                star_text += f"Actions: {' '.join(actions)}. "
+            else:
+                star_text += f"Actions: {actions}. "
+        star_text += f"Result: {star.get('result', '')}"
+
+        self._append(
+            id=f"behavioral_qa_{idx}",
+            title=f"Behavioral Interview - {question[:50]}...",
+            content=star_text,
+            type="interview",
+            category="behavioral",
+            tags=["interview", "behavioral", "STAR"]
+        )
+
+    def _technical_chunks(self, idx: int, item: Dict[str, Any]) -> None:
+        question = item.get('question', '')
+        answer = item.get('answer', {})
+
+        answer_text = f"Question: {question}. "
+        if 'points' in answer:
+            answer_text += " ".join(answer['points'])
+
+        self._append(
+            id=f"technical_qa_{idx}",
+            title=f"Technical Interview - {question[:50]}...",
+            content=answer_text,
+            type="interview",
+            category="technical",
+            tags=["interview", "technical", "skills"]
+        )
+
+    def _transition_chunks(self, transition: Dict[str, Any]) -> None:
+        transition_text = f"Career Transition: From {transition.get('from', '')} to {transition.get('to', '')}. "
+        if 'evidence' in transition:
+            transition_text += f"Evidence: {' '.join(transition['evidence'])}"
+
+        self._append(
+            id="career_transition",
+            title="Career Transition Story",
+            content=transition_text,
+            type="career",
+            category="transition",
+            tags=["career", "transition", "growth"]
+        )
 
     def embed_and_store(self) -> bool:
         """Embed chunks and store in vector database"""
@@ -283,46 +346,60 @@ class VectorDatabaseSetup:
             return False
         
         try:
-            print(f"\n🔄 Embedding {len(self.chunks)} chunks into vector database...")
-            
-            # Prepare vectors for upsert
-            vectors = []
-            for chunk in self.chunks:
-                enriched_text = f"{chunk.title}: {chunk.content}"
-                
-                vector_metadata = {
-                    "title": chunk.title,
-                    "type": chunk.type,
-                    "category": chunk.category,
-                    "content": chunk.content,
-                    "tags": chunk.tags
-                }
-                
-                vectors.append((
-                    chunk.id,
-                    enriched_text,
-                    vector_metadata
-                ))
+            rows = None
+            if self.dedup is not None:
+                with phase('dedup'):
+                    rows = [row for row, chunk in enumerate(self.chunks)
+                            if not self.dedup.add(chunk.id, f"{chunk.title}: {chunk.content}")]
+            count = len(self.chunks) if rows is None else len(rows)
+            self.chunk_text = open_chunk_text(self.namespace)
+            print(f"\n🔄 Embedding {count} chunks into vector database...")
             
-            # Upload vectors in batches
+            # Upload vectors in batches; each batch's tuples are built from the
+            # columnar store on demand instead of copying every chunk up front
             total_uploaded = 0
-            for i in range(0, len(vectors), BATCH_SIZE):
-                batch = vectors[i:i + BATCH_SIZE]
+            total_batches = (count + BATCH_SIZE - 1) // BATCH_SIZE
+            for batch_num, batch in enumerate(self.chunks.iter_upsert(BATCH_SIZE, rows=rows), 1):
                 try:
-                    self.index.upsert(vectors=batch)
+                    if self.dedup is not None:
+                        link_duplicates(batch, self.dedup)
+                    with phase('embed'):
+                        batch = slim_upserts(embed_upserts(self.index, batch), self.chunk_text)
+                    with phase('upsert'):
+                        if not is_local_store(self.index):
+                            shared_scheduler().acquire('upstash', job='embed')
+                        self.index.upsert(vectors=batch, **self._namespace_kwargs())
                     total_uploaded += len(batch)
-                    print(f"  ✓ Uploaded batch {i // BATCH_SIZE + 1}/{(len(vectors) + BATCH_SIZE - 1) // BATCH_SIZE} ({len(batch)} vectors)")
+                    print(f"  ✓ Uploaded batch {batch_num}/{total_batches} ({len(batch)} vectors)")
                 except Exception as e:
                     print(f"  ⚠️  Error uploading batch: {e}")
                     continue
             
             print(f"\n✅ Successfully uploaded {total_uploaded} vectors to database")
+            save_chunk_text(self.chunk_text)
+            if self.dedup is not None:
+                print(self.dedup.report())
+                drop_duplicates(self.index, self.dedup.duplicate_of, **self._namespace_kwargs())
+            embedder = index_embedder(self.index)
+            if embedder:
+                print(embedder.report())
+            
+            # The local index lives in memory until it is written out
+            if is_local_store(self.index):
+                with phase('save'):
+                    return self.index.save()
             return True
         
         except Exception as e:
             print(f"❌ Error embedding data: {str(e)}")
             return False
 
+    def _namespace_kwargs(self) -> Dict[str, Any]:
+        """Upstash namespace argument; the local store is already scoped by directory"""
+        if self.namespace and not is_local_store(self.index):
+            return {'namespace': self.namespace}
+        return {}
+
     def verify_database(self) -> bool:
         """Verify data was stored correctly"""
         if not self.index:
@@ -340,18 +417,20 @@ class VectorDatabaseSetup:
             ]
             
             for test_query in test_queries:
-                results = self.index.query(
-                    data=test_query,
-                    top_k=2,
-                    include_metadata=True
-                )
+                with phase('query'):
+                    results = self.index.query(
+                        **text_query(self.index, test_query),
+                        top_k=2,
+                        include_metadata=True,
+                        **self._namespace_kwargs()
+                    )
                 
                 if results and len(results) > 0:
                     print(f"\n  Query: '{test_query}'")
                     for result in results:
                         score = getattr(result, 'score', 'N/A')
-                        metadata = getattr(result, 'metadata', {})
-                        title = metadata.get('title', 'Unknown') if metadata else 'Unknown'
+                        metadata = hydrate(result.id, getattr(result, 'metadata', None), self.chunk_text)
+                        title = metadata.get('title', 'Unknown')
                         print(f"    ✓ Found: {title} (relevance: {score})")
                 else:
                     print(f"  ⚠️  No results for query: '{test_query}'")
@@ -364,13 +443,51 @@ class VectorDatabaseSetup:
             return False
 
 
+# Chunkers by profile section: one per whole section, one per item of a list section
+SECTION_CHUNKERS = {
+    'personal_profile': VectorDatabaseSetup._personal_chunks,
+    'skills': VectorDatabaseSetup._skills_chunks,
+    'career_transition': VectorDatabaseSetup._transition_chunks,
+}
+ITEM_CHUNKERS = {
+    ('education',): VectorDatabaseSetup._education_chunks,
+    ('certifications',): VectorDatabaseSetup._certification_chunks,
+    ('professional_experience',): VectorDatabaseSetup._experience_chunks,
+    ('interview_prep', 'behavioral'): VectorDatabaseSetup._behavioral_chunks,
+    ('interview_prep', 'technical'): VectorDatabaseSetup._technical_chunks,
+}
+CHUNKED_SECTIONS = ('personal_profile', 'education', 'certifications', 'professional_experience',
+                    'skills', 'interview_prep', 'career_transition')
+# What load_profile_data decodes one item at a time; other sections are decoded whole
+PROFILE_STREAM_PATHS = tuple('.'.join(path) + '.item' for path in ITEM_CHUNKERS)
+
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Embed a digital twin profile")
+    parser.add_argument('--tenant', help="Tenant id from TENANTS_DIR (sets profile and namespace)")
+    parser.add_argument('--profile', default=JSON_FILE, help=f"Profile JSON (default: {JSON_FILE})")
+    parser.add_argument('--namespace', default='', help="Vector namespace to write into")
+    parser.add_argument('--dedup-threshold', type=float, default=None, metavar='J',
+                        help="Similarity at which chunks count as duplicates (default: DEDUP_THRESHOLD or 0.8)")
+    parser.add_argument('--no-dedup', action='store_true', help="Embed near-duplicate chunks too")
+    args = parser.parse_args()
+    
     print("🤖 Digital Twin Vector Database Setup\n")
     print("=" * 60)
     
     # Initialize setup
-    setup = VectorDatabaseSetup()
+    profile_path, namespace = args.profile, args.namespace
+    if args.tenant:
+        try:
+            tenant = TenantRegistry().get(args.tenant)
+        except UnknownTenantError:
+            print(f"❌ No profile found for tenant '{args.tenant}' in {tenants_dir()}")
+            sys.exit(1)
+        profile_path, namespace = tenant.profile_path, tenant.namespace
+        print(f"👤 Tenant {tenant.tenant_id} (namespace '{namespace}')")
+    setup = VectorDatabaseSetup(profile_path, namespace,
+                                dedup=None if args.no_dedup else duplicate_index(args.dedup_threshold))
     
     # Step 1: Connect to database
     print("\n📍 Step 1: Connecting to Upstash Vector Database...")
@@ -402,4 +519,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run(main)
@@ -4,22 +4,34 @@ Job Posting Vector Database Embedding
 Embeds job posting markdown files into Upstash Vector Database for semantic search
 """
 
+import argparse
 import os
 import sys
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Any, List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
-from dotenv import load_dotenv
-from upstash_vector import Index
+from config import load_config, upstash_credentials
+from sharded_store import ShardedIndex, is_local_store, open_local_index, open_upstash_index
+from vector_store import (UPSERT_BATCH_SIZE, LocalVectorStore, embed_upserts, index_embedder, is_local_backend,
+                          local_index_dir, text_query)
+from chunk_store import ChunkRow, ChunkStore
+from chunk_text import hydrate, open_chunk_text, save_chunk_text, slim_upserts
+from content_store import ContentStore, content_store_path
+from dedup import DuplicateIndex, drop_duplicates, duplicate_index, link_duplicates
+from profiling import phase, run
+from scheduler import shared_scheduler
+from skill_index import SkillIndex, skill_index_path
 import re
 
+if TYPE_CHECKING:  # imported in setup_connection, only for the Upstash backend
+    from upstash_vector import Index
+
 # Load environment variables
-load_dotenv()
+load_config()
 
 # Configuration
-UPSTASH_VECTOR_REST_URL = os.getenv('test_UPSTASH_VECTOR_REST_URL') or os.getenv('UPSTASH_VECTOR_REST_URL')
-UPSTASH_VECTOR_REST_TOKEN = os.getenv('test_UPSTASH_VECTOR_REST_TOKEN') or os.getenv('UPSTASH_VECTOR_REST_TOKEN')
+UPSTASH_VECTOR_REST_URL, UPSTASH_VECTOR_REST_TOKEN = upstash_credentials()
 JOB_POSTINGS_DIR = 'job-postings'
-BATCH_SIZE = 5
+BATCH_SIZE = UPSERT_BATCH_SIZE  # same batches as the profile embedder
 
 
 @dataclass
@@ -34,17 +46,102 @@ class JobPosting:
     content: str
 
 
+# Compiled once; parse_job_posting also runs inside ingest worker processes
+TITLE_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+COMPANY_RE = re.compile(r'\*\*Company:\*\*\s*(.+?)(?:\n|$)')
+LOCATION_RE = re.compile(r'\*\*Location:\*\*\s*(.+?)(?:\n|$)')
+SALARY_RE = re.compile(r'\*\*Salary:\*\*\s*(.+?)(?:\n|$)')
+
+
+def parse_job_posting(filename: str, content: str) -> JobPosting:
+    """Extract title, company, location and salary from posting markdown"""
+    # Extract title from first heading
+    title_match = TITLE_RE.search(content)
+    title = title_match.group(1).strip() if title_match else "Unknown Position"
+    
+    # Extract company
+    company_match = COMPANY_RE.search(content)
+    company = company_match.group(1).strip() if company_match else "Unknown Company"
+    
+    # Extract location
+    location_match = LOCATION_RE.search(content)
+    location = location_match.group(1).strip() if location_match else "Unknown Location"
+    
+    # Extract salary
+    salary_match = SALARY_RE.search(content)
+    salary = salary_match.group(1).strip() if salary_match else "Not specified"
+    
+    # Generate ID from filename
+    job_id = f"job_{os.path.splitext(filename)[0]}"
+    
+    return JobPosting(
+        id=job_id,
+        filename=filename,
+        title=title,
+        company=company,
+        location=location,
+        salary=salary,
+        content=content
+    )
+
+
+def posting_text(job: ChunkRow, content: Optional[str] = None) -> str:
+    """Text embedded for a whole posting stored in a ChunkStore
+
+    content overrides the row's own content (empty when the body lives in a
+    ContentStore).
+    """
+    return (
+        f"Title: {job.title}\n"
+        f"Company: {job.field('company')}\n"
+        f"Location: {job.field('location')}\n"
+        f"Salary: {job.field('salary')}\n"
+        f"Content: {job.content if content is None else content}"
+    )
+
+
+def append_posting(store: ChunkStore, job: JobPosting) -> int:
+    """Add a posting's row, without its body (that lives in the ContentStore)"""
+    return store.append(
+        id=job.id,
+        title=job.title,
+        content='',
+        type="job_posting",
+        category=None,
+        jobId=job.id,
+        company=job.company,
+        location=job.location,
+        salary=job.salary,
+        filename=job.filename
+    )
+
+
+def posting_upserts(job: JobPosting) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """The one whole-posting upsert this embedder stores for a posting (id job_<stem>)"""
+    store = ChunkStore()
+    append_posting(store, job)
+    return [item for batch in store.iter_upsert(1, text=lambda row: posting_text(row, job.content),
+                                                include_content=False) for item in batch]
+
+
 class JobPostingEmbedder:
     """Manages job posting embedding into vector database"""
 
-    def __init__(self):
-        """Initialize job posting embedder"""
-        self.index: Optional[Index] = None
-        self.job_postings: List[JobPosting] = []
+    def __init__(self, dedup: Optional[DuplicateIndex] = None):
+        """Initialize job posting embedder; dedup collapses reposted postings"""
+        self.index: Optional[Union['Index', LocalVectorStore, ShardedIndex]] = None
+        self.job_postings = ChunkStore()
+        self.contents = ContentStore.open(writable=True)
+        self.skill_index = SkillIndex.load()
+        self.dedup = dedup
+        self.chunk_text = open_chunk_text()  # None unless VECTOR_METADATA=slim
         self.validate_environment()
 
     def validate_environment(self) -> None:
         """Validate environment variables"""
+        if is_local_backend():
+            print(f"✅ Using local vector index at {local_index_dir()}")
+            return
         if not UPSTASH_VECTOR_REST_URL:
             raise ValueError("❌ UPSTASH_VECTOR_REST_URL not found")
         if not UPSTASH_VECTOR_REST_TOKEN:
@@ -54,10 +151,12 @@ class JobPostingEmbedder:
     def setup_connection(self) -> bool:
         """Establish connection to Upstash"""
         try:
-            self.index = Index(
-                url=UPSTASH_VECTOR_REST_URL,
-                token=UPSTASH_VECTOR_REST_TOKEN,
-            )
+            if is_local_backend():
+                self.index = open_local_index()
+                print(f"✅ Opened local vector index ({self.index.info().vector_count} vectors)")
+                return True
+
+            self.index = open_upstash_index()
             print("✅ Connected to Upstash Vector Database")
             
             # Check current vector count
@@ -80,7 +179,8 @@ class JobPostingEmbedder:
                 print(f"❌ Directory not found: {JOB_POSTINGS_DIR}")
                 return False
             
-            md_files = [f for f in os.listdir(JOB_POSTINGS_DIR) if f.endswith('.md')]
+            # Sorted, so the earliest-named copy of a reposted posting is the one kept
+            md_files = sorted(f for f in os.listdir(JOB_POSTINGS_DIR) if f.endswith('.md'))
             
             if not md_files:
                 print(f"❌ No markdown files found in {JOB_POSTINGS_DIR}")
@@ -109,40 +209,30 @@ class JobPostingEmbedder:
 
     def _parse_job_posting(self, filename: str, filepath: str) -> None:
         """Parse a single job posting markdown file"""
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with phase('load'), open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Extract title from first heading
-        title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-        title = title_match.group(1).strip() if title_match else "Unknown Position"
-        
-        # Extract company
-        company_match = re.search(r'\*\*Company:\*\*\s*(.+?)(?:\n|$)', content)
-        company = company_match.group(1).strip() if company_match else "Unknown Company"
-        
-        # Extract location
-        location_match = re.search(r'\*\*Location:\*\*\s*(.+?)(?:\n|$)', content)
-        location = location_match.group(1).strip() if location_match else "Unknown Location"
-        
-        # Extract salary
-        salary_match = re.search(r'\*\*Salary:\*\*\s*(.+?)(?:\n|$)', content)
-        salary = salary_match.group(1).strip() if salary_match else "Not specified"
-        
-        # Generate ID from filename
-        job_id = f"job_{os.path.splitext(filename)[0]}"
+        with phase('chunk'):
+            job_posting = parse_job_posting(filename, content)
         
-        job_posting = JobPosting(
-            id=job_id,
-            filename=filename,
-            title=title,
-            company=company,
-            location=location,
-            salary=salary,
-            content=content
-        )
+        # A repost is folded into the first copy, so it neither adds a vector
+        # nor counts twice in skill demand
+        if self.dedup is not None:
+            with phase('dedup'):
+                match = self.dedup.add(job_posting.id, content)
+            if match:
+                # Forget what a run without deduplication stored for it
+                self.skill_index.remove(job_posting.id)
+                self.contents.remove(job_posting.id)
+                print(f"  ↪ Skipped: {job_posting.title} ({filename}), "
+                      f"near-duplicate of {match[0]} ({match[1]:.2f})")
+                return
+        self.skill_index.add(job_posting.id, job_posting.title, job_posting.company, content)
         
-        self.job_postings.append(job_posting)
-        print(f"  ✓ Parsed: {title} ({company}, {location})")
+        # The body goes to the content file; only the columnar row stays in memory
+        self.contents.put(job_posting.id, content)
+        append_posting(self.job_postings, job_posting)
+        print(f"  ✓ Parsed: {job_posting.title} ({job_posting.company}, {job_posting.location})")
 
     def embed_and_store(self) -> bool:
         """Embed job postings and store in vector database"""
@@ -157,48 +247,45 @@ class JobPostingEmbedder:
         try:
             print(f"\n🔄 Embedding {len(self.job_postings)} job posting(s)...")
             
-            # Prepare vectors
-            vectors = []
-            for job in self.job_postings:
-                enriched_text = (
-                    f"Title: {job.title}\n"
-                    f"Company: {job.company}\n"
-                    f"Location: {job.location}\n"
-                    f"Salary: {job.salary}\n"
-                    f"Content: {job.content}"
-                )
-                
-                metadata = {
-                    "jobId": job.id,
-                    "type": "job_posting",
-                    "title": job.title,
-                    "company": job.company,
-                    "location": job.location,
-                    "salary": job.salary,
-                    "filename": job.filename
-                }
-                
-                vectors.append((
-                    job.id,
-                    enriched_text,
-                    metadata
-                ))
-            
-            # Upload in batches
+            # Upload in batches; posting bodies are read back from the content
+            # store only while their batch is being sent, and are not put in metadata
             total_uploaded = 0
-            for i in range(0, len(vectors), BATCH_SIZE):
-                batch = vectors[i:i + BATCH_SIZE]
+            total_batches = (len(self.job_postings) + BATCH_SIZE - 1) // BATCH_SIZE
+            batches = self.job_postings.iter_upsert(
+                BATCH_SIZE, text=lambda job: posting_text(job, self.contents.get(job.id)), include_content=False)
+            for batch_num, batch in enumerate(batches, 1):
                 try:
-                    self.index.upsert(vectors=batch)
+                    if self.dedup is not None:
+                        link_duplicates(batch, self.dedup)
+                    with phase('embed'):
+                        batch = slim_upserts(embed_upserts(self.index, batch), self.chunk_text)
+                    with phase('upsert'):
+                        if not is_local_store(self.index):
+                            shared_scheduler().acquire('upstash', job='embed')
+                        self.index.upsert(vectors=batch)
                     total_uploaded += len(batch)
-                    batch_num = i // BATCH_SIZE + 1
-                    total_batches = (len(vectors) + BATCH_SIZE - 1) // BATCH_SIZE
                     print(f"  ✓ Uploaded batch {batch_num}/{total_batches} ({len(batch)} job posting(s))")
                 except Exception as e:
                     print(f"  ⚠️  Error uploading batch: {e}")
                     continue
             
             print(f"\n✅ Successfully embedded {total_uploaded} job posting(s)")
+            if self.dedup is not None:
+                print(self.dedup.report())
+                drop_duplicates(self.index, self.dedup.duplicate_of)
+            embedder = index_embedder(self.index)
+            if embedder:
+                print(embedder.report())
+            if self.skill_index.save():
+                print(f"🧩 Skill index: {len(self.skill_index)} posting(s) → {skill_index_path()}")
+            if self.contents.save():
+                print(f"📦 Posting bodies: {len(self.contents)} → {content_store_path()}")
+            save_chunk_text(self.chunk_text)
+            
+            # The local index lives in memory until it is written out
+            if is_local_store(self.index):
+                with phase('save'):
+                    return self.index.save()
             return True
         
         except Exception as e:
@@ -222,19 +309,20 @@ class JobPostingEmbedder:
             ]
             
             for test_query in test_queries:
-                results = self.index.query(
-                    data=test_query,
-                    top_k=2,
-                    include_metadata=True
-                )
+                with phase('query'):
+                    results = self.index.query(
+                        **text_query(self.index, test_query),
+                        top_k=2,
+                        include_metadata=True
+                    )
                 
                 if results and len(results) > 0:
                     print(f"\n  Query: '{test_query}'")
                     for result in results:
                         score = getattr(result, 'score', 'N/A')
-                        metadata = getattr(result, 'metadata', {})
-                        title = metadata.get('title', 'Unknown') if metadata else 'Unknown'
-                        job_type = metadata.get('type', '') if metadata else ''
+                        metadata = hydrate(result.id, getattr(result, 'metadata', None), self.chunk_text)
+                        title = metadata.get('title', 'Unknown')
+                        job_type = metadata.get('type', '')
                         
                         if job_type == 'job_posting':
                             print(f"    ✓ {title} (relevance: {score:.4f})")
@@ -251,11 +339,23 @@ class JobPostingEmbedder:
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Embed job postings into the vector database")
+    parser.add_argument('--stream', action='store_true',
+                        help="Use the streaming pipeline (section chunks, parallel parsing, bounded memory)")
+    parser.add_argument('--feed', metavar='PATH',
+                        help="Stream postings from a feed, JSONL or a JSON array ('-' for stdin), "
+                             "instead of the directory")
+    parser.add_argument('--workers', type=int, default=None, help="Parse processes (default: all cores)")
+    parser.add_argument('--dedup-threshold', type=float, default=None, metavar='J',
+                        help="Similarity at which postings count as reposts (default: DEDUP_THRESHOLD or 0.8)")
+    parser.add_argument('--no-dedup', action='store_true', help="Embed near-duplicate postings too")
+    args = parser.parse_args()
+    
     print("🤖 Job Posting Vector Database Embedding\n")
     print("=" * 60)
     
     # Initialize embedder
-    embedder = JobPostingEmbedder()
+    embedder = JobPostingEmbedder(dedup=None if args.no_dedup else duplicate_index(args.dedup_threshold))
     
     # Step 1: Connect
     print("\n📍 Step 1: Connecting to Upstash Vector Database...")
@@ -263,6 +363,25 @@ def main():
         print("❌ Failed to connect. Exiting.")
         sys.exit(1)
     
+    if args.stream or args.feed:
+        from ingest_pipeline import stream_job_postings
+        
+        print("\n📍 Step 2: Streaming, chunking and storing job postings...")
+        stores = {'contents': embedder.contents, 'dedup': embedder.dedup, 'chunk_text': embedder.chunk_text}
+        if args.feed == '-':
+            ok = stream_job_postings(embedder.index, feed=sys.stdin.buffer, workers=args.workers, **stores)
+        elif args.feed:
+            with open(args.feed, 'rb') as feed:
+                ok = stream_job_postings(embedder.index, feed=feed, workers=args.workers, **stores)
+        else:
+            ok = stream_job_postings(embedder.index, directory=JOB_POSTINGS_DIR, workers=args.workers, **stores)
+        if not ok:
+            print("❌ Failed to ingest job postings. Exiting.")
+            sys.exit(1)
+        print("\n" + "=" * 60)
+        print("✅ Job posting embedding complete!")
+        return
+    
     # Step 2: Load job postings
     print("\n📍 Step 2: Loading job posting files...")
     if not embedder.load_job_postings():
@@ -286,4 +405,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run(main)
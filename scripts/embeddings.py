@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+In-Process Embedding Providers
+Turns text into vectors on the local CPU so ingest and queries skip the
+remote embedding hop
+- hash: signed feature hashing of words and character trigrams (no dependencies)
+- onnx: a sentence-embedding model exported to ONNX, loaded from a local directory
+- Texts are embedded in batches spread over a worker pool, with texts/sec tracked
+- Query vectors are memoised in an LRU that persists across sessions
+"""
+
+import abc
+import atexit
+import base64
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+EMBEDDING_DIM = int(os.getenv('LOCAL_EMBEDDING_DIM', '256'))
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '64'))
+HASH_PARALLEL_MIN_TEXTS = 512  # below this, starting worker processes costs more than it saves
+ONNX_MAX_TOKENS = 256
+QUERY_CACHE_ENTRIES = int(os.getenv('QUERY_CACHE_ENTRIES', '4096'))
+QUERY_CACHE_MB = float(os.getenv('QUERY_CACHE_MB', '16'))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def hash_embed(text: str, dim: int = EMBEDDING_DIM) -> array:
+    """Embed text as a signed feature-hashed bag of words and character trigrams"""
+    vector = array('f', bytes(4 * dim))
+    for token in _TOKEN_RE.findall(text.lower()):
+        features = [token]
+        padded = f" {token} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm:
+        for i in range(dim):
+            vector[i] /= norm
+    return vector
+
+
+def _hash_batch(texts: List[str], dim: int) -> List[array]:
+    """hash_embed over a batch; module-level so worker processes can run it"""
+    return [hash_embed(text, dim) for text in texts]
+
+
+class EmbeddingProvider(abc.ABC):
+    """Batched text -> vector encoder shared by the stores, ingest and queries
+
+    Subclasses set name and implement _encode.
+    """
+
+    name = 'base'
+
+    def __init__(self, dim: int, workers: Optional[int] = None, batch_size: int = EMBED_BATCH_SIZE):
+        self.dim = dim
+        self.workers = workers or int(os.getenv('EMBED_WORKERS', '0')) or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.stats = {'texts': 0, 'batches': 0, 'seconds': 0.0}
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _encode(self, texts: List[str]) -> List[array]:
+        """Embed one batch on the calling thread"""
+
+    def _executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='embed')
+
+    def _parallel(self, texts: Sequence[str]) -> bool:
+        return self.workers > 1 and len(texts) > self.batch_size
+
+    def _map(self, pool: Executor, batches: List[List[str]]) -> Iterable[List[array]]:
+        return pool.map(self._encode, batches)
+
+    def embed(self, text: str) -> array:
+        """Embed a single text (queries)"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: Sequence[str]) -> List[array]:
+        """Embed many texts, splitting them into batches across the worker pool"""
+        texts = list(texts)
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self._parallel(texts):
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._executor()
+            vectors = [vector for batch in self._map(self._pool, batches) for vector in batch]
+        else:
+            vectors = [vector for batch in batches for vector in self._encode(batch)]
+        with self._lock:
+            self.stats['texts'] += len(texts)
+            self.stats['batches'] += len(batches)
+            self.stats['seconds'] += time.perf_counter() - start
+        return vectors
+
+    @property
+    def texts_per_sec(self) -> float:
+        return self.stats['texts'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    def report(self) -> str:
+        """One-line throughput summary"""
+        return (f"🧮 Embedded {self.stats['texts']} texts in {self.stats['seconds']:.2f}s "
+                f"({self.texts_per_sec:,.0f} texts/sec, {self.name}, {self.workers} workers)")
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class HashEmbedder(EmbeddingProvider):
+    """Feature-hashing embedder; large batches go to worker processes
+
+    Hashing is pure Python and holds the GIL, so threads would not add
+    throughput; processes do once a batch is big enough to pay for them.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, **kwargs):
+        super().__init__(dim, **kwargs)
+        self.name = f'hash-ngram-{dim}'
+
+    def _encode(self, texts: List[str]) -> List[array]:
+        return _hash_batch(texts, self.dim)
+
+    def _executor(self) -> Executor:
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def _parallel(self, texts: Sequence[str]) -> bool:
+        return self.workers > 1 and len(texts) >= HASH_PARALLEL_MIN_TEXTS
+
+    def _map(self, pool: Executor, batches: List[List[str]]) -> Iterable[List[array]]:
+        # A bound method would pickle the whole embedder, pool included
+        return pool.map(_hash_batch, batches, itertools.repeat(self.dim))
+
+
+class OnnxEmbedder(EmbeddingProvider):
+    """Sentence-embedding model in ONNX format, mean-pooled and L2-normalised
+
+    model_dir holds model.onnx and the matching tokenizer.json (for example an
+    all-MiniLM-L6-v2 export). onnxruntime releases the GIL while it runs, so
+    batches are spread over a thread pool with one intra-op thread each.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None, **kwargs):
+        model_dir = model_dir or os.getenv('ONNX_MODEL_DIR', 'models/embedding')
+        try:
+            import numpy as np
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                f"EMBEDDING_PROVIDER=onnx needs numpy, onnxruntime and tokenizers ({e.name} is missing)"
+            ) from e
+        model_path = os.path.join(model_dir, 'model.onnx')
+        tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"ONNX embedding model file not found: {path}")
+
+        self._np = np
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        self._session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS)
+        self._tokenizer.enable_padding()
+
+        hidden = self._session.get_outputs()[0].shape[-1]
+        super().__init__(hidden if isinstance(hidden, int) else 0, **kwargs)
+        if not self.dim:
+            self.dim = len(self._encode(['dimension probe'])[0])
+        self.name = f"onnx:{os.path.basename(os.path.normpath(model_dir))}:{self.dim}"
+
+    def _encode(self, texts: List[str]) -> List[array]:
+        np = self._np
+        encodings = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask, 'token_type_ids': np.zeros_like(ids)}
+        hidden = self._session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return [array('f', row.astype(np.float32).tobytes()) for row in pooled]
+
+
+_PROVIDERS = {'hash': HashEmbedder, 'onnx': OnnxEmbedder}
+_shared: Dict[Tuple[str, int], EmbeddingProvider] = {}
+_shared_lock = threading.Lock()
+
+
+def get_embedder(provider: str = 'hash', dim: int = EMBEDDING_DIM) -> EmbeddingProvider:
+    """Process-wide embedder for a provider name, created on first use
+
+    dim applies to the hash provider; an ONNX model has its own dimension.
+    """
+    provider = provider.lower()
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}' (expected one of: {', '.join(_PROVIDERS)}, upstash)")
+    key = (provider, dim if provider == 'hash' else 0)
+    with _shared_lock:
+        embedder = _shared.get(key)
+        if embedder is None:
+            embedder = _shared[key] = HashEmbedder(dim) if provider == 'hash' else OnnxEmbedder()
+        return embedder
+
+
+class QueryEmbeddingCache:
+    """LRU of query text -> vector, bounded by entries and bytes, persisted to disk
+
+    Keys are the embedder name plus the query with case and whitespace
+    normalised, so vectors from different models never mix. The file holds
+    the most recently used queries and is loaded at startup, so common
+    interview questions skip embedding from the first search.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = QUERY_CACHE_ENTRIES,
+                 max_bytes: int = int(QUERY_CACHE_MB * 1024 * 1024)):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries: 'OrderedDict[str, array]' = OrderedDict()
+        self._bytes = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return f"{model}\x00{' '.join(text.split()).casefold()}"
+
+    @staticmethod
+    def _entry_bytes(key: str, vector: array) -> int:
+        return len(key) + vector.itemsize * len(vector)
+
+    def get(self, model: str, text: str, embed: Callable[[str], array]) -> array:
+        """Cached vector for text, embedding and storing it on a miss"""
+        key = self._key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return vector
+            self.stats['misses'] += 1
+        vector = embed(text)
+        self.put(key, array('f', vector))
+        return vector
+
+    def put(self, key: str, vector: array) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._entry_bytes(key, old)
+            self._entries[key] = vector
+            self._bytes += self._entry_bytes(key, vector)
+            self._dirty = True
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                evicted, evicted_vector = self._entries.popitem(last=False)
+                self._bytes -= self._entry_bytes(evicted, evicted_vector)
+                self.stats['evictions'] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        """One-line hit-rate report"""
+        return (f"Query embedding cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({self.hit_rate:.0%}), {len(self._entries)} entries, {self._bytes / 1024:.0f} KB")
+
+    def load(self) -> int:
+        """Preload entries saved by an earlier session; returns how many were loaded"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring query embedding cache {self.path}: {e}")
+            return 0
+        for key, encoded in saved.get('entries', []):
+            self.put(key, array('f', base64.b64decode(encoded)))
+        self._dirty = False
+        return len(self._entries)
+
+    def save(self) -> bool:
+        """Write entries, least recently used first, if anything changed"""
+        if not self.path or not self._dirty:
+            return False
+        with self._lock:
+            entries = [[key, base64.b64encode(vector.tobytes()).decode('ascii')]
+                       for key, vector in self._entries.items()]
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': entries}, f)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            print(f"⚠️  Could not save query embedding cache: {e}")
+            return False
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+
+
+def shared_query_cache(path: Optional[str] = None) -> QueryEmbeddingCache:
+    """Process-wide query cache, loaded from path on first use and saved at exit"""
+    global _query_cache
+    with _shared_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache(path)
+            _query_cache.load()
+            atexit.register(_query_cache.save)
+        return _query_cache
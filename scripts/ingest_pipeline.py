@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Streaming Job Posting Ingestion Pipeline
+scan → parse → chunk → embed → upsert, one thread per stage
+- Stages are generators linked by bounded queues, so a slow stage applies
+  backpressure upstream and memory stays flat regardless of corpus size
+- Parsing runs in a process pool sized to the machine's cores
+- Per-stage counters and throughput are printed while the pipeline runs
+- The chunk stage also feeds each posting's skills into the skill-gap index
+  and appends its full body to the posting content store
+- With a DuplicateIndex, parse workers also compute each posting's MinHash
+  signature and the chunk stage drops reposts of a posting already seen
+- Feeds are JSONL or one JSON array of postings (a dump); both are decoded
+  one posting at a time
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from chunk_text import save_chunk_text, slim_upserts
+from content_store import ContentStore
+from dedup import DuplicateIndex, drop_duplicates, signature
+from embed_job_postings import JobPosting, parse_job_posting, BATCH_SIZE
+from json_stream import READ_BYTES, JsonStreamError, iter_values, loads
+from profiling import phase
+from scheduler import shared_scheduler
+from sharded_store import ShardedIndex, is_local_store
+from skill_index import SkillIndex, skill_index_path
+from vector_store import embed_upserts, index_embedder
+
+QUEUE_SIZE = 64  # items buffered between consecutive stages
+SECTION_CHARS = 1200  # soft upper bound for a posting section chunk
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Counters for one pipeline stage"""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the stage started (or total run time once finished)"""
+        if not self.started:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        """Items emitted per second"""
+        elapsed = self.elapsed
+        return self.items_out / elapsed if elapsed > 0 else 0.0
+
+
+def scan_directory(directory: str) -> Iterator[Dict[str, str]]:
+    """Yield posting file references without reading or listing everything up front"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.md') and entry.is_file():
+                yield {'filename': entry.name, 'path': entry.path}
+
+
+def _feed_record(record: Any, number: int, where: str) -> Optional[Dict[str, str]]:
+    if not isinstance(record, dict):
+        print(f"⚠️  Skipping feed {where}: not a JSON object")
+        return None
+    filename = record.get('filename') or f"{record.get('id', number)}.md"
+    return {'filename': filename, 'content': record.get('content', '')}
+
+
+def scan_jsonl(stream: BinaryIO) -> Iterator[Dict[str, str]]:
+    """Yield postings from a JSONL feed: {"filename" or "id", "content"} per line"""
+    offset = 0
+    for line_no, line in enumerate(stream, 1):
+        start, offset = offset, offset + len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            print(f"⚠️  Skipping feed line {line_no} (byte {start}): {e}")
+            continue
+        posting = _feed_record(record, line_no, f"line {line_no} (byte {start})")
+        if posting:
+            yield posting
+
+
+def scan_json_array(stream: BinaryIO) -> Iterator[Dict[str, str]]:
+    """Yield postings from a dump holding one JSON array of posting objects, decoding one at a time
+
+    Stops at the first malformed byte; the postings before it still go through.
+    """
+    try:
+        for (pos,), record in iter_values(stream, ('item',)):
+            posting = _feed_record(record, pos + 1, f"item {pos}")
+            if posting:
+                yield posting
+    except JsonStreamError as e:
+        print(f"⚠️  Feed is not valid JSON past this point, stopping the scan: {e}")
+
+
+def scan_feed(stream: BinaryIO) -> Iterator[Dict[str, str]]:
+    """Yield postings from a binary feed: a JSON array of postings, or JSONL"""
+    head = stream.peek(READ_BYTES) if hasattr(stream, 'peek') else b''
+    if head.lstrip()[:1] == b'[':
+        return scan_json_array(stream)
+    return scan_jsonl(stream)
+
+
+def parse_record(record: Dict[str, str]) -> Optional[JobPosting]:
+    """Read (if needed) and parse one posting; runs in a worker process"""
+    try:
+        content = record.get('content')
+        if content is None:
+            with open(record['path'], 'r', encoding='utf-8') as f:
+                content = f.read()
+        return parse_job_posting(record['filename'], content)
+    except Exception as e:
+        print(f"⚠️  Error parsing {record.get('filename')}: {e}")
+        return None
+
+
+def parse_signed(record: Dict[str, str], sign: bool = False) -> Optional[Tuple[JobPosting, Any]]:
+    """parse_record plus the posting's MinHash signature, both computed in the worker"""
+    job = parse_record(record)
+    if job is None:
+        return None
+    return job, signature(job.content) if sign else None
+
+
+def chunk_posting(job: JobPosting, max_chars: int = SECTION_CHARS) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Split a posting into paragraph-aligned sections of at most ~max_chars"""
+    header = (
+        f"Title: {job.title}\n"
+        f"Company: {job.company}\n"
+        f"Location: {job.location}\n"
+        f"Salary: {job.salary}\n"
+    )
+    sections: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in job.content.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and size + len(paragraph) > max_chars:
+            sections.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+    if current:
+        sections.append('\n\n'.join(current))
+
+    chunks = []
+    for idx, section in enumerate(sections):
+        metadata = {
+            "jobId": job.id,
+            "type": "job_posting",
+            "title": job.title,
+            "company": job.company,
+            "location": job.location,
+            "salary": job.salary,
+            "filename": job.filename,
+            "section": idx,
+            "content": section,
+        }
+        chunks.append((f"{job.id}_s{idx}", f"{header}Content: {section}", metadata))
+    return chunks
+
+
+class IngestPipeline:
+    """Runs postings through scan/parse/chunk/embed/upsert with bounded queues"""
+
+    def __init__(self, index: Any, workers: Optional[int] = None, queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, section_chars: int = SECTION_CHARS,
+                 progress_interval: float = PROGRESS_INTERVAL, skill_index: Optional[SkillIndex] = None,
+                 contents: Optional[ContentStore] = None, dedup: Optional[DuplicateIndex] = None,
+                 chunk_text: Optional[ContentStore] = None):
+        """Configure the pipeline; index is an Upstash Index or LocalVectorStore
+
+        chunk_text, when given, takes each chunk's text fields (slim metadata).
+        """
+        self.index = index
+        self.skill_index = skill_index
+        self.contents = contents
+        self.chunk_text = chunk_text
+        self.dedup = dedup
+        self.duplicate_ids: List[str] = []  # chunk ids of dropped reposts
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        # Each shard of a sharded index should still get about batch_size per request
+        self.batch_size = batch_size * len(index.shards) if isinstance(index, ShardedIndex) else batch_size
+        self.section_chars = section_chars
+        self.progress_interval = progress_interval
+        self.stats: Dict[str, StageStats] = {}
+        self._queues: List[queue.Queue] = []
+        self._abort = threading.Event()
+
+    def run(self, source: Iterable[Dict[str, str]]) -> Dict[str, StageStats]:
+        """Drain source through every stage and return the per-stage counters"""
+        stages: List[Tuple[str, Callable[[Iterable], Iterable]]] = [
+            ('scan', lambda _: source),
+            ('parse', self._parse_stage),
+            ('chunk', self._chunk_stage),
+            ('embed', self._embed_stage),
+            ('upsert', self._upsert_stage),
+        ]
+        self.stats = {name: StageStats(name) for name, _ in stages}
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(stages) - 1)]
+        self._abort.clear()
+
+        threads = []
+        for pos, (name, fn) in enumerate(stages):
+            inbox = self._queues[pos - 1] if pos > 0 else None
+            outbox = self._queues[pos] if pos < len(self._queues) else None
+            thread = threading.Thread(
+                target=self._run_stage, args=(name, fn, inbox, outbox),
+                name=f"ingest-{name}", daemon=True,
+            )
+            threads.append(thread)
+
+        done = threading.Event()
+        reporter = threading.Thread(target=self._report_progress, args=(done,), daemon=True)
+        for thread in threads:
+            thread.start()
+        reporter.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        reporter.join()
+
+        self.print_summary()
+        return self.stats
+
+    def _run_stage(self, name: str, fn: Callable[[Iterable], Iterable],
+                   inbox: Optional[queue.Queue], outbox: Optional[queue.Queue]) -> None:
+        """Drive one stage generator between its input and output queues"""
+        stats = self.stats[name]
+        stats.started = time.perf_counter()
+        try:
+            # Each stage thread is its own profiling phase, so samples split by stage
+            with phase(name):
+                for item in fn(self._drain(inbox, stats) if inbox else None):
+                    stats.items_out += 1
+                    if outbox is not None and not self._put(outbox, item):
+                        break
+        except Exception as e:
+            stats.errors += 1
+            print(f"❌ Ingest stage '{name}' failed: {e}")
+            self._abort.set()
+        finally:
+            stats.finished = time.perf_counter()
+            if outbox is not None:
+                self._put(outbox, _DONE, force=True)
+
+    def _drain(self, inbox: queue.Queue, stats: StageStats) -> Iterator[Any]:
+        """Yield items from a queue until the upstream stage signals completion"""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            stats.items_in += 1
+            yield item
+
+    def _put(self, outbox: queue.Queue, item: Any, force: bool = False) -> bool:
+        """Blocking put that gives up if another stage aborted the run"""
+        while True:
+            if self._abort.is_set() and not force:
+                return False
+            try:
+                outbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if force and self._abort.is_set():
+                    # Downstream is gone; make room so the sentinel lands
+                    try:
+                        outbox.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _parse_stage(self, records: Iterable[Dict[str, str]]) -> Iterator[Tuple[JobPosting, Any]]:
+        """Parse (and sign) in a process pool with a bounded number of postings in flight"""
+        max_pending = self.workers * 2
+        parse = partial(parse_signed, sign=self.dedup is not None)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending: deque = deque()
+            for record in records:
+                pending.append(pool.submit(parse, record))
+                if len(pending) >= max_pending:
+                    job = pending.popleft().result()
+                    if job is not None:
+                        yield job
+                    else:
+                        self.stats['parse'].errors += 1
+            while pending:
+                job = pending.popleft().result()
+                if job is not None:
+                    yield job
+                else:
+                    self.stats['parse'].errors += 1
+
+    def _chunk_stage(self, postings: Iterable[Tuple[JobPosting, Any]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Split each posting into section chunks, dropping the full body afterwards"""
+        for job, sig in postings:
+            if self.dedup is not None and self.dedup.add(job.id, sig=sig):
+                # Forget what a run without deduplication stored for the repost
+                self.duplicate_ids.extend(chunk[0] for chunk in chunk_posting(job, self.section_chars))
+                if self.skill_index is not None:
+                    self.skill_index.remove(job.id)
+                if self.contents is not None:
+                    self.contents.remove(job.id)
+                continue
+            if self.skill_index is not None:
+                self.skill_index.add(job.id, job.title, job.company, job.content)
+            if self.contents is not None:
+                self.contents.put(job.id, job.content)
+            yield from chunk_posting(job, self.section_chars)
+
+    def _embed_stage(self, chunks: Iterable[Tuple[str, Any, Dict[str, Any]]]) -> Iterator[Tuple]:
+        """Vectorise in process, a worker pool's worth of chunks at a time
+
+        With EMBEDDING_PROVIDER=upstash against Upstash, text passes through
+        and is embedded server-side.
+        """
+        embedder = index_embedder(self.index)
+        if embedder is None:
+            yield from chunks
+            return
+        group_size = embedder.batch_size * embedder.workers
+        group: List[Tuple[str, Any, Dict[str, Any]]] = []
+        for chunk in chunks:
+            group.append(chunk)
+            if len(group) >= group_size:
+                yield from embed_upserts(self.index, group)
+                group = []
+        if group:
+            yield from embed_upserts(self.index, group)
+
+    def _upsert_stage(self, vectors: Iterable[Tuple]) -> Iterator[str]:
+        """Upsert in batches of batch_size, yielding the ids that were stored"""
+        batch: List[Tuple] = []
+        for vector in vectors:
+            batch.append(vector)
+            if len(batch) >= self.batch_size:
+                yield from self._flush(batch)
+                batch = []
+        if batch:
+            yield from self._flush(batch)
+
+    def _flush(self, batch: List[Tuple]) -> List[str]:
+        """Upsert one batch, counting a failure instead of stopping the run"""
+        try:
+            batch = slim_upserts(batch, self.chunk_text)
+            if not is_local_store(self.index):
+                shared_scheduler().acquire('upstash', job='ingest')
+            self.index.upsert(vectors=batch)
+            return [vector[0] for vector in batch]
+        except Exception as e:
+            self.stats['upsert'].errors += 1
+            print(f"  ⚠️  Error uploading batch: {e}")
+            return []
+
+    def _report_progress(self, done: threading.Event) -> None:
+        """Print a one-line status for every stage until the run finishes"""
+        while not done.wait(self.progress_interval):
+            parts = []
+            for pos, stats in enumerate(self.stats.values()):
+                depth = f" q={self._queues[pos].qsize()}" if pos < len(self._queues) else ""
+                parts.append(f"{stats.name} {stats.items_out} ({stats.rate:.0f}/s{depth})")
+            print("  ⏱  " + " | ".join(parts))
+
+    def print_summary(self) -> None:
+        """Print final per-stage counts, errors and throughput"""
+        print("\n📊 Ingest pipeline summary")
+        print(f"  {'stage':<8} {'in':>8} {'out':>8} {'errors':>7} {'seconds':>8} {'items/s':>9}")
+        for stats in self.stats.values():
+            print(f"  {stats.name:<8} {stats.items_in:>8} {stats.items_out:>8} {stats.errors:>7} "
+                  f"{stats.elapsed:>8.2f} {stats.rate:>9.1f}")
+
+
+def stream_job_postings(index: Any, directory: Optional[str] = None, feed: Optional[BinaryIO] = None,
+                        workers: Optional[int] = None, contents: Optional[ContentStore] = None,
+                        dedup: Optional[DuplicateIndex] = None, chunk_text: Optional[ContentStore] = None) -> bool:
+    """Ingest postings from a directory or a feed (JSONL or a JSON array, binary stream) into index
+
+    contents is the open content store writer, if the caller already holds one;
+    dedup drops postings that are near-duplicates of one ingested earlier in the run;
+    chunk_text is the chunk text store writer when vectors get slim metadata.
+    """
+    if feed is not None:
+        source = scan_feed(feed)
+        print(f"🔄 Streaming postings from feed ({workers or os.cpu_count()} parse workers)")
+    else:
+        if not directory or not os.path.isdir(directory):
+            print(f"❌ Directory not found: {directory}")
+            return False
+        source = scan_directory(directory)
+        print(f"🔄 Streaming postings from {directory}/ ({workers or os.cpu_count()} parse workers)")
+
+    skills = SkillIndex.load()
+    contents = contents or ContentStore.open(writable=True)
+    pipeline = IngestPipeline(index, workers=workers, skill_index=skills, contents=contents, dedup=dedup,
+                              chunk_text=chunk_text)
+    stats = pipeline.run(source)
+    embedder = index_embedder(index)
+    if embedder:
+        print(embedder.report())
+    if dedup is not None:
+        print(dedup.report())
+        drop_duplicates(index, pipeline.duplicate_ids, job='ingest')
+    if stats['upsert'].items_out == 0:
+        print("❌ No job postings were ingested")
+        return False
+    if skills.save():
+        print(f"🧩 Skill index: {len(skills)} posting(s) → {skill_index_path()}")
+    if contents.save():
+        print(f"📦 Posting bodies: {len(contents)} → {contents.path}")
+    save_chunk_text(chunk_text)
+
+    save = getattr(index, 'save', None)
+    if save is not None:
+        return save()
+    return True
+
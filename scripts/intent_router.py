@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Intent Router
+Answers factual lookup questions straight from the loaded profile
+- Field indexes over personal_profile, education, certifications, skills and
+  professional_experience are built once when the profile loads
+- Answers are pre-rendered templates, so a hit costs a few regex matches
+- Open-ended questions (describe, why, how would you...) always go to full RAG
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Questions that want a narrative, not a fact; these never take the fast path
+NARRATIVE_RE = re.compile(
+    r"\b(why|describe|explain|tell me about|walk me through|how (would|do|did|can|have) you|"
+    r"example|challeng|approach|compare|difference|improve|handle|strength|weakness|story)\b"
+)
+MAX_FAST_PATH_WORDS = 16
+
+# Sub-fields of a skills entry that describe it rather than name a skill
+GENERIC_SKILL_FIELDS = {'proficiency', 'note', 'key_skills', 'key_capabilities',
+                        'experience_areas', 'projects', 'dashboards_built'}
+
+# Extra names people use for a skills category, beyond the words in its key
+SKILL_SYNONYMS = {
+    'aws': 'cloud',
+    'bi': 'power_bi',
+    'dashboards': 'power_bi',
+    'office': 'office_tools',
+    'shell': 'shell_scripting',
+    'sql': 'databases',
+    'database': 'databases',
+    'oracle': 'erp_and_business_systems',
+    'erp': 'erp_and_business_systems',
+    'ai': 'ai_ml_and_modern_tools',
+    'ml': 'ai_ml_and_modern_tools',
+    'machine learning': 'ai_ml_and_modern_tools',
+    'llm': 'ai_ml_and_modern_tools',
+    'rag': 'ai_ml_and_modern_tools',
+    'git': 'development_tools',
+    'dev tools': 'development_tools',
+    'programming': 'programming_and_scripting',
+    'scripting': 'programming_and_scripting',
+    'soft': 'soft_skills',
+    'soft skills': 'soft_skills',
+    'people': 'soft_skills',
+    'communication': 'soft_skills',
+    'quality': 'data_quality',
+}
+
+# Rules match whole question phrasings about one profile field, never a bare
+# keyword ("start", "remote", "know"): anything else goes to full RAG
+ABOUT_YOU_RE = re.compile(r"\b(you|your|yours)\b")
+SKILL_QUESTION_RE = re.compile(
+    r"\b((what|which) (\w+ )?(skills?|tools?|technolog\w*)|your (\w+ )?(skills?|skill level|proficiency)|"
+    r"how (good|proficient|familiar|experienced|strong) are you|"
+    r"are you (familiar|proficient|experienced|skilled) (with|in)|"
+    r"do you (know|use|have (any )?experience (with|in))|"
+    r"(what is|what's) your (\w+ )?(experience|level) (with|in)|rate your)\b")
+CERT_RE = re.compile(
+    r"\b((what|which|any) (\w+ )?(certifications?|certs)( do| have| did)? you|"
+    r"(what are|list|name) your (\w+ )?(certifications|certs)|"
+    r"do you (have|hold) (any )?(\w+ )?(certifications?|certs)|are you certified)\b")
+EDUCATION_RE = re.compile(
+    r"\b(what did you study|what (degree|degrees|qualifications?) do you (have|hold)|"
+    r"(your|highest) (education|educational background|degrees?|qualifications?)|"
+    r"where did you (study|graduate|go to (university|college|school))|which (university|college))\b")
+EMPLOYERS_RE = re.compile(r"\b(where (have|did) you work(ed)?|companies|employers|work history|previous (roles|jobs)|"
+                          r"roles have you|jobs have you|career history)\b")
+COMPANY_ROLE_RE = re.compile(
+    r"\b((what|which) (was|is|were) your (role|position|job title|title)s? (at|with)|"
+    r"what (role|position|title) did you (have|hold) (at|with)|what did you do (at|for)|"
+    r"(when|how long|how many years) (did you work|were you|have you been) (at|for|with))\b")
+TOTAL_YEARS_RE = re.compile(r"\bhow (many|much) (years|experience)\b")
+SALARY_RE = re.compile(
+    r"\b((what is|what's|what are) your (salary|pay|compensation|remuneration)|"
+    r"(salary|pay|compensation|remuneration) (expectations?|range|requirements?)|expected (salary|pay)|"
+    r"how much do you (expect|want) to (earn|be paid))\b")
+NOTICE_RE = re.compile(
+    r"\b((what is|what's) your notice period|how long is your notice( period)?|"
+    r"when (can|could|would) you (start|join)|how soon (can|could) you (start|join)|"
+    r"when are you available to (start|join)|(your )?(earliest )?start date)\b")
+VISA_RE = re.compile(
+    r"\b((what is|what's) your visa( status)?|your visa status|do you (have|hold|need) a visa|"
+    r"(your )?work rights|right to work|(need|require) (visa )?sponsorship|"
+    r"are you an? (\w+ )?(citizen|permanent resident|resident)|(your )?(citizenship|residency) status)\b")
+LOCATION_RE = re.compile(
+    r"\b(where are you (currently )?(based|located|living)|where do you (currently )?live|"
+    r"(what is|what's) your (current |preferred )?location|your preferred (work )?location|"
+    r"which city (are you|do you live) in)\b")
+TARGET_RE = re.compile(
+    r"\b(what (kind of |type of )?(roles?|positions?|jobs?) are you (looking for|targeting|seeking|interested in)|"
+    r"(what is|what's) your (job|role|career) target|your target role)\b")
+NAME_RE = re.compile(r"\b(what is your name|who are you)\b")
+
+
+@dataclass
+class RouteResult:
+    """A fast-path answer"""
+    intent: str
+    answer: str
+
+
+def _flatten(value: Any) -> List[str]:
+    """All leaf strings of a nested profile value, in document order"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (int, float)):
+        return [str(value)]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in _flatten(item)]
+    if isinstance(value, dict):
+        return [leaf for item in value.values() for leaf in _flatten(item)]
+    return []
+
+
+def _join(items: Iterable[str]) -> str:
+    """Human list: 'a, b and c'"""
+    items = list(items)
+    if len(items) <= 1:
+        return ''.join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _words(key: str) -> str:
+    return key.replace('_', ' ')
+
+
+class IntentRouter:
+    """Rule-based router from question text to a pre-rendered profile answer"""
+
+    def __init__(self, profile_data: Dict[str, Any], stats: Optional[Dict[str, int]] = None):
+        """Build field indexes and answer templates for one profile
+
+        stats carries hit counters over from a previous router when the profile reloads.
+        """
+        self.stats: Dict[str, int] = stats if stats is not None else {'questions': 0, 'hits': 0}
+        self._answers: Dict[str, str] = {}
+        self._skill_answers: Dict[str, str] = {}
+        self._company_answers: List[Tuple[re.Pattern, str]] = []
+        self._build(profile_data or {})
+        self._rules: List[Tuple[str, Callable[[str], Optional[str]]]] = [
+            ('salary', self._fixed('salary', SALARY_RE)),
+            ('notice_period', self._fixed('notice_period', NOTICE_RE)),
+            ('visa', self._fixed('visa', VISA_RE)),
+            ('location', self._fixed('location', LOCATION_RE)),
+            ('job_target', self._fixed('job_target', TARGET_RE)),
+            ('name', self._fixed('name', NAME_RE)),
+            ('certifications', self._fixed('certifications', CERT_RE)),
+            ('education', self._fixed('education', EDUCATION_RE)),
+            ('company', self._company),
+            ('skills', self._skill),
+            ('employers', self._fixed('employers', EMPLOYERS_RE)),
+            ('total_experience', self._fixed('total_experience', TOTAL_YEARS_RE)),
+        ]
+
+    def _build(self, profile: Dict[str, Any]) -> None:
+        """Precompute every answer the router can give"""
+        personal = profile.get('personal_profile', {})
+        fit = personal.get('job_fit', {})
+        if personal.get('name'):
+            self._answers['name'] = f"I'm {personal['name']}."
+        if fit.get('salary_expectation'):
+            self._answers['salary'] = f"My salary expectation is {fit['salary_expectation']}."
+        if fit.get('notice_period'):
+            self._answers['notice_period'] = f"Notice period: {fit['notice_period']}."
+        if fit.get('visa_status'):
+            self._answers['visa'] = f"Work rights: {fit['visa_status']}."
+        if fit.get('location') or personal.get('location_preference'):
+            preferred = _join(personal.get('location_preference', []))
+            self._answers['location'] = ' '.join(filter(None, [
+                f"{fit['location']}." if fit.get('location') else '',
+                f"Preferred location: {preferred}." if preferred else '',
+            ]))
+        if personal.get('job_target'):
+            self._answers['job_target'] = f"I'm targeting {personal['job_target']} roles."
+        if personal.get('total_it_experience'):
+            roles = _join(personal.get('primary_roles', []))
+            self._answers['total_experience'] = (
+                f"I have {personal['total_it_experience']} of IT experience"
+                + (f", mainly as {roles}." if roles else "."))
+
+        certifications = profile.get('certifications', [])
+        if certifications:
+            names = [f"{c['name']} ({c['year']})" if c.get('year') else c['name']
+                     for c in certifications if c.get('name')]
+            noun = 'certification' if len(names) == 1 else 'certifications'
+            self._answers['certifications'] = f"I hold {len(names)} {noun}: {_join(names)}."
+
+        education = profile.get('education', [])
+        if education:
+            entries = [f"{e.get('degree')} from {e.get('institution')}"
+                       + (f", {e['location']}" if e.get('location') else '')
+                       + (f" ({e['year']})" if e.get('year') else '')
+                       for e in education]
+            self._answers['education'] = f"My education: {'; '.join(entries)}."
+
+        experience = profile.get('professional_experience', [])
+        if experience:
+            entries = [f"{e.get('role')} at {e.get('company')} ({e.get('duration')})" for e in experience]
+            self._answers['employers'] = f"My work history, most recent first: {'; '.join(entries)}."
+        for entry in experience:
+            company = entry.get('company', '')
+            # "Amazon Web Services (AWS)" is found by its full name or the acronym
+            names = [re.sub(r'\s*\(.*?\)', '', company).strip(),
+                     *re.findall(r'\((.*?)\)', company)]
+            names += [names[0].split()[0]] if names[0] and len(names[0].split()[0]) >= 3 else []
+            pattern = re.compile(r'\b(' + '|'.join(re.escape(n.lower()) for n in names if n) + r')\b')
+            answer = (f"At {company} I was {entry.get('role')} ({entry.get('duration')}"
+                      + (f", {entry['location']}" if entry.get('location') else '') + ").")
+            impact = entry.get('quantified_impact', [])
+            if impact:
+                answer += f" Highlight: {impact[0]}."
+            self._company_answers.append((pattern, answer))
+
+        aliases: Dict[str, str] = {}
+        for key, value in profile.get('skills', {}).items():
+            leaves = _flatten(value)
+            if not leaves:
+                continue
+            self._skill_answers[key] = f"Under {_words(key)} I list: {'; '.join(leaves)}."
+            aliases[_words(key)] = key
+            if not isinstance(value, dict):
+                continue
+            # Named sub-skills (python, power_query, llm_integration) get their own answers
+            for sub, sub_value in value.items():
+                if sub in GENERIC_SKILL_FIELDS:
+                    continue
+                if isinstance(sub_value, (dict, list)):
+                    self._skill_answers[sub] = f"My {_words(sub)} experience: {'; '.join(_flatten(sub_value))}."
+                else:
+                    self._skill_answers[sub] = f"{_words(sub).title()}: {sub_value}."
+                aliases.setdefault(_words(sub), sub)
+        for alias, key in SKILL_SYNONYMS.items():
+            if key in self._skill_answers:
+                aliases.setdefault(alias, key)
+        self._skill_aliases = aliases
+        ordered = sorted(aliases, key=len, reverse=True)
+        self._skill_re = re.compile(r'\b(' + '|'.join(re.escape(a) for a in ordered) + r')\b') if ordered else None
+
+    def answers(self) -> List[str]:
+        """Every pre-rendered answer (for memory accounting)"""
+        return [*self._answers.values(), *self._skill_answers.values(),
+                *(answer for _, answer in self._company_answers)]
+
+    def _fixed(self, intent: str, pattern: re.Pattern) -> Callable[[str], Optional[str]]:
+        """Rule returning a precomputed answer when pattern matches"""
+        answer = self._answers.get(intent)
+        return lambda text: answer if answer and pattern.search(text) and ABOUT_YOU_RE.search(text) else None
+
+    def _skill(self, text: str) -> Optional[str]:
+        if not self._skill_re or not SKILL_QUESTION_RE.search(text):
+            return None
+        match = self._skill_re.search(text)
+        return self._skill_answers[self._skill_aliases[match.group(1)]] if match else None
+
+    def _company(self, text: str) -> Optional[str]:
+        if not COMPANY_ROLE_RE.search(text):
+            return None
+        for pattern, answer in self._company_answers:
+            if pattern.search(text):
+                return answer
+        return None
+
+    def route(self, question: str, count: bool = True) -> Optional[RouteResult]:
+        """Fast-path answer for question, or None to fall back to full RAG
+
+        count=False leaves the hit counters alone (speculative lookups).
+        """
+        if count:
+            self.stats['questions'] += 1
+        text = question.lower().strip()
+        if len(text.split()) > MAX_FAST_PATH_WORDS or NARRATIVE_RE.search(text):
+            return None
+        for intent, rule in self._rules:
+            answer = rule(text)
+            if answer:
+                if count:
+                    self.stats['hits'] += 1
+                    self.stats[intent] = self.stats.get(intent, 0) + 1
+                return RouteResult(intent, answer)
+        return None
+
+    @property
+    def hit_rate(self) -> float:
+        return self.stats['hits'] / self.stats['questions'] if self.stats['questions'] else 0.0
+
+    def summary(self) -> str:
+        """One-line hit-rate report"""
+        intents = {k: v for k, v in self.stats.items() if k not in ('questions', 'hits')}
+        detail = f" ({', '.join(f'{k}: {v}' for k, v in sorted(intents.items()))})" if intents else ''
+        return (f"Fast-path answers: {self.stats['hits']}/{self.stats['questions']} "
+                f"({self.hit_rate:.0%}){detail}")
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON
+Decodes large JSON files piece by piece instead of json.load on the whole text
+- A byte-level scanner walks the document and hands out one section or array
+  item at a time, decoded with orjson when it is installed (the standard json
+  module otherwise)
+- Only the piece being decoded is held in memory, so peak memory follows the
+  largest section or item, not the file size
+- Errors carry the byte offset (and line) where the document went wrong
+- validate() checks a whole file the same way, for check_json.py
+
+Paths name the pieces to hand out, ijson-style: 'education.item' is every
+item of the top-level education array, '*' every top-level member and 'item'
+every item of a top-level array. Members passed on the way that lead to none
+of the paths come out whole, so a profile streams as its sections plus the
+items of its big arrays.
+"""
+
+import json
+import re
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pip install orjson for faster decoding
+    orjson = None
+
+READ_BYTES = 1 << 16
+VALIDATE_SPAN_BYTES = 1 << 20  # validate() decodes values up to this size whole, and walks into larger ones
+
+_WS_RE = re.compile(rb'[ \t\n\r]*')
+_STRING_END_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)  # from just after the opening quote
+# Everything up to the next bracket outside a string, whole strings included
+_CONTENT_RE = re.compile(rb'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+_SCALAR_END_RE = re.compile(rb'[ \t\n\r,:\]}]')
+_DIGITS = bytes(48 if b in b'0123456789' else 32 for b in range(256))  # translate() table: digits to 0, the rest blanked
+_LONG_DIGITS = b'0' * 19
+_QUOTE, _COMMA, _COLON = ord('"'), ord(','), ord(':')
+_OPEN_OBJECT, _CLOSE_OBJECT, _OPEN_ARRAY, _CLOSE_ARRAY = ord('{'), ord('}'), ord('['), ord(']')
+
+Path = Tuple[Any, ...]  # keys and array indexes from the document root
+
+
+class JsonStreamError(ValueError):
+    """Malformed JSON, with the byte offset (and line) where it was found"""
+
+    def __init__(self, message: str, offset: int, line: int):
+        super().__init__(f"{message} at byte {offset} (line {line})")
+        self.message = message
+        self.offset = offset
+        self.line = line
+
+
+def loads(raw: bytes) -> Any:
+    """Decode one JSON text, with orjson when available
+
+    The standard decoder handles what orjson rejects (NaN, Infinity) and
+    text with long digit runs: some orjson versions turn integers beyond 64
+    bits into floats instead of failing.
+    """
+    if orjson is not None and _LONG_DIGITS not in raw.translate(_DIGITS):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+class _Scanner:
+    """Buffered input with a read position and the file offset of the buffer"""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.buf = bytearray()
+        self.pos = 0    # next byte to look at, in buf
+        self.base = 0   # file offset of buf[0]
+        self.lines = 1  # line number of buf[0]
+        self.eof = False
+        while len(self.buf) < 3 and self.more():
+            pass
+        if self.buf.startswith(b'\xef\xbb\xbf'):
+            self.pos = 3
+
+    def more(self) -> bool:
+        """Read more input; False at end of file
+
+        Reads grow with the bytes held since pos, so a long value is scanned
+        in a few reads rather than one per READ_BYTES.
+        """
+        if self.eof:
+            return False
+        data = self.stream.read(max(READ_BYTES, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def release(self) -> None:
+        """Drop input before pos once enough of it has piled up"""
+        if self.pos >= READ_BYTES:
+            self.lines += self.buf.count(b'\n', 0, self.pos)
+            del self.buf[:self.pos]
+            self.base += self.pos
+            self.pos = 0
+
+    @property
+    def offset(self) -> int:
+        return self.base + self.pos
+
+    def error(self, message: str, at: Optional[int] = None) -> JsonStreamError:
+        at = self.pos if at is None else at
+        return JsonStreamError(message, self.base + at, self.lines + self.buf.count(b'\n', 0, at))
+
+    def peek(self) -> Optional[int]:
+        """Next byte after whitespace, not consumed; None at end of input"""
+        while True:
+            self.pos = _WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.release()
+            if not self.more():
+                return None
+
+    def expect(self, char: int, message: str) -> None:
+        if self.peek() != char:
+            raise self.error(message)
+        self.pos += 1
+
+    def span(self, limit: Optional[int] = None) -> Optional[int]:
+        """End (index in buf) of the value starting at pos, reading as far as needed
+
+        Only finds where the value ends; decode() checks what is inside.
+        None when the value is an object or array longer than limit bytes.
+        """
+        start = self.pos
+        first = self.buf[start]
+        if first == _QUOTE:
+            return self._string_end(start + 1, start)
+        if first not in (_OPEN_OBJECT, _OPEN_ARRAY):
+            while True:  # number, true, false or null (or garbage decode() reports)
+                match = _SCALAR_END_RE.search(self.buf, start)
+                if match:
+                    return match.start()
+                if not self.more():
+                    return len(self.buf)
+        depth, i = 0, start
+        while True:
+            i = _CONTENT_RE.match(self.buf, i).end()
+            if i < len(self.buf) and self.buf[i] != _QUOTE:
+                depth += 1 if self.buf[i] in (_OPEN_OBJECT, _OPEN_ARRAY) else -1
+                i += 1
+                if depth == 0:
+                    return i
+                if limit and i - start > limit:
+                    return None
+                continue
+            # End of input so far, or a string running past it
+            if limit and len(self.buf) - start > limit:
+                return None
+            if not self.more():
+                raise self._unterminated(start, 'object' if first == _OPEN_OBJECT else 'array')
+
+    def _string_end(self, i: int, start: int) -> int:
+        while True:
+            match = _STRING_END_RE.match(self.buf, i)
+            if match:
+                return match.end()
+            if not self.more():
+                raise self._unterminated(start, 'string')
+
+    def _unterminated(self, start: int, what: str) -> JsonStreamError:
+        """Error for a value that runs to the end of input
+
+        The cause is usually further in (a missing comma or quote), so the
+        decoder, which points at the first thing wrong, reports it.
+        """
+        pos, self.pos = self.pos, start
+        try:
+            self.decode(len(self.buf))
+        except JsonStreamError as e:
+            return e
+        finally:
+            self.pos = pos
+        return self.error(f"Unterminated {what}", start)
+
+    def decode(self, end: int) -> Any:
+        """Decode buf[pos:end] and move past it"""
+        raw = self.buf[self.pos:end]
+        try:
+            value = loads(raw)
+        except UnicodeDecodeError as e:
+            raise self.error("Invalid UTF-8", self.pos + e.start) from None
+        except json.JSONDecodeError as e:
+            message = e.msg[:-3] if e.msg.endswith(' at') else e.msg  # 'Invalid control character at'
+            raise self.error(message, self.pos + len(e.doc[:e.pos].encode('utf-8'))) from None
+        self.pos = end
+        return value
+
+
+def _step(part: str, key: Any) -> bool:
+    if part == 'item':
+        return isinstance(key, int)
+    return isinstance(key, str) and part in ('*', key)
+
+
+def _descend(path: Path, patterns: List[Tuple[str, ...]], first: int) -> bool:
+    """True when a pattern goes deeper than path into a container of this kind"""
+    for pattern in patterns:
+        if len(pattern) > len(path) and all(_step(part, key) for part, key in zip(pattern, path)):
+            if (pattern[len(path)] == 'item') == (first == _OPEN_ARRAY) and first in (_OPEN_OBJECT, _OPEN_ARRAY):
+                return True
+    return False
+
+
+def _walk(scanner: _Scanner, path: Path, patterns: List[Tuple[str, ...]]) -> Iterator[Tuple[Path, Any]]:
+    first = scanner.peek()
+    if first is None:
+        raise scanner.error("Expecting value")
+    if not _descend(path, patterns, first):
+        value = scanner.decode(scanner.span())
+        scanner.release()
+        yield path, value
+        return
+    for key in _members(scanner):
+        yield from _walk(scanner, path + (key,), patterns)
+
+
+def _members(scanner: _Scanner) -> Iterator[Any]:
+    """Keys (objects) or indexes (arrays) of the container at pos, each left at its value"""
+    is_object = scanner.buf[scanner.pos] == _OPEN_OBJECT
+    close = _CLOSE_OBJECT if is_object else _CLOSE_ARRAY
+    scanner.pos += 1
+    if scanner.peek() == close:
+        scanner.pos += 1
+        return
+    index = 0
+    while True:
+        if is_object:
+            if scanner.peek() != _QUOTE:
+                raise scanner.error("Expecting property name enclosed in double quotes")
+            key = scanner.decode(scanner.span())
+            scanner.expect(_COLON, "Expecting ':' delimiter")
+            yield key
+        else:
+            yield index
+            index += 1
+        char = scanner.peek()
+        if char == _COMMA:
+            scanner.pos += 1
+        elif char == close:
+            scanner.pos += 1
+            return
+        elif char is None:
+            raise scanner.error(f"Unterminated {'object' if is_object else 'array'}")
+        else:
+            raise scanner.error("Expecting ',' delimiter")
+
+
+def iter_values(stream: BinaryIO, paths: Iterable[str] = ('item',)) -> Iterator[Tuple[Path, Any]]:
+    """(path, value) for each piece of the document named by paths, in document order
+
+    stream is a binary file. Raises JsonStreamError on malformed input,
+    after yielding every piece before the error.
+    """
+    patterns = [tuple(path.split('.')) for path in paths]
+    scanner = _Scanner(stream)
+    yield from _walk(scanner, (), patterns)
+    if scanner.peek() is not None:
+        raise scanner.error("Extra data")
+
+
+def load(stream: BinaryIO) -> Any:
+    """The whole document, decoded one top-level member at a time
+
+    Same result as json.load, without holding the file's text and its
+    decoded objects at the same time.
+    """
+    document: Any = {}
+    for path, value in iter_values(stream, ('*',)):
+        if path:
+            document[path[0]] = value
+        else:
+            document = value  # not an object
+    return document
+
+
+def load_file(path: str) -> Any:
+    """load() a file by name"""
+    with open(path, 'rb') as f:
+        return load(f)
+
+
+def _check(scanner: _Scanner) -> None:
+    first = scanner.peek()
+    if first is None:
+        raise scanner.error("Expecting value")
+    end = scanner.span(VALIDATE_SPAN_BYTES)
+    if end is not None:
+        scanner.decode(end)
+        scanner.release()
+        return
+    for _ in _members(scanner):
+        _check(scanner)
+
+
+def validate(stream: BinaryIO) -> int:
+    """Check that a binary stream holds one well-formed JSON document; returns its size in bytes
+
+    Decodes values of up to VALIDATE_SPAN_BYTES at a time and walks into
+    larger ones, so memory stays bounded whatever the file size.
+    """
+    scanner = _Scanner(stream)
+    _check(scanner)
+    if scanner.peek() is not None:
+        raise scanner.error("Extra data")
+    return scanner.offset
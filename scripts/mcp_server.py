@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Digital Twin MCP Server (Python)
+Serves DigitalTwinRAG over the same JSON-RPC contract as the Next.js /api/mcp route
+- asyncio HTTP/1.1 with keep-alive; rag_query runs on a bounded worker pool
+- Identical questions already in flight share one retrieval + generation
+- Backpressure: beyond --max-pending distinct questions in flight, requests get 503 + Retry-After
+- SIGINT/SIGTERM stop accepting, drain in-flight questions, then exit
+- analyze_skill_gaps answers from the saved skill-gap index without touching the LLM
+- /health includes the request scheduler's queue depth and wait times
+- --processes N pre-forks N workers sharing the loaded index (worker_pool.py)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from profiling import run
+from scheduler import shared_scheduler
+
+PROTOCOL_VERSION = '2024-11-05'
+SERVER_INFO = {'name': 'digital-twin-mcp', 'version': '1.0.0'}
+MCP_PATHS = ('/api/mcp', '/mcp', '/')
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+SHUTDOWN_GRACE = 30.0
+
+TOOL = {
+    'name': 'query_digital_twin',
+    'description': 'Ask questions about your professional background, experience, skills, and career using RAG-powered search',
+    'inputSchema': {
+        'type': 'object',
+        'properties': {
+            'question': {
+                'type': 'string',
+                'description': 'Question about your professional background, skills, experience, projects, or education'
+            },
+            'tenant': {
+                'type': 'string',
+                'description': 'Tenant id (only when the server runs with --tenants)'
+            }
+        },
+        'required': ['question']
+    }
+}
+
+SKILL_TOOL = {
+    'name': 'analyze_skill_gaps',
+    'description': 'Compare the skills job postings ask for with the skills in your profile: gaps, overlap and per-posting coverage',
+    'inputSchema': {
+        'type': 'object',
+        'properties': {
+            'filter': {
+                'type': 'string',
+                'description': 'Only postings whose title or company contains this text'
+            },
+            'top': {
+                'type': 'integer',
+                'description': 'How many gap and overlap skills to list (default 10)'
+            },
+            'tenant': {
+                'type': 'string',
+                'description': 'Tenant id (only when the server runs with --tenants)'
+            }
+        }
+    }
+}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class ServerBusy(Exception):
+    """Too many questions queued; the client should retry later"""
+
+
+def _rpc_result(request_id: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+def _rpc_error(request_id: Any, code: int, message: str, data: Any = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {'code': code, 'message': message}
+    if data is not None:
+        error['data'] = data
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+
+class DigitalTwinServer:
+    """JSON-RPC front end over one twin or a TenantPool"""
+
+    def __init__(self, answer, concurrency: int = 8, max_pending: int = 64, skill_report=None):
+        """answer(tenant, question) -> rag_query result dict; runs on worker threads
+
+        skill_report(tenant, filter, top) -> text serves analyze_skill_gaps.
+        """
+        self.answer = answer
+        self.skill_report = skill_report
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='rag')
+        self.inflight: Dict[Tuple[Optional[str], str], asyncio.Future] = {}
+        self.pending = 0
+        self.active = 0  # requests between parsed and fully written
+        self.draining = False
+        self.connections: set = set()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.worker: Optional[Dict[str, Any]] = None  # slot, pid and memory when run as a pool worker
+        self.stats = {'requests': 0, 'questions': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+
+    async def ask(self, tenant: Optional[str], question: str) -> Dict[str, Any]:
+        """Answer a question, joining an identical one already in flight"""
+        key = (tenant, ' '.join(question.split()).casefold())
+        shared = self.inflight.get(key)
+        if shared is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(shared)
+        if self.pending >= self.max_pending:
+            self.stats['rejected'] += 1
+            raise ServerBusy()
+
+        self.stats['questions'] += 1
+        self.pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.answer, tenant, question)
+        self.inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            # Later identical questions start a fresh query rather than reuse a stale answer
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+                self.pending -= 1
+
+    async def dispatch(self, body: Any) -> Tuple[int, Dict[str, Any]]:
+        """Handle one JSON-RPC message; returns (http_status, response)"""
+        if not isinstance(body, dict) or body.get('jsonrpc') != '2.0':
+            return 400, _rpc_error(None, -32600, 'Invalid Request')
+        request_id, method = body.get('id'), body.get('method')
+
+        if method == 'initialize':
+            return 200, _rpc_result(request_id, {'protocolVersion': PROTOCOL_VERSION,
+                                                 'capabilities': {'tools': {}}, 'serverInfo': SERVER_INFO})
+        if method == 'tools/list':
+            tools = [TOOL, SKILL_TOOL] if self.skill_report else [TOOL]
+            return 200, _rpc_result(request_id, {'tools': tools})
+        if method != 'tools/call':
+            return 200, _rpc_error(request_id, -32601, f"Method not implemented: {method}")
+
+        params = body.get('params') or {}
+        name, args = params.get('name'), params.get('arguments') or {}
+        if name == SKILL_TOOL['name'] and self.skill_report:
+            return await self._skill_gaps(request_id, args)
+        if name != TOOL['name']:
+            return 200, _rpc_error(request_id, -32601, f"Tool not found: {name}")
+        # Support both 'question' and 'query' parameter names, like the Next.js route
+        question = args.get('question') or args.get('query')
+        if not isinstance(question, str) or not question.strip():
+            return 200, _rpc_error(request_id, -32602, 'Missing required parameter: question')
+
+        try:
+            result = await self.ask(args.get('tenant'), question)
+        except ServerBusy:
+            return 503, _rpc_error(request_id, -32000, 'Server busy, retry shortly')
+        except Exception as e:
+            self.stats['errors'] += 1
+            return 200, _rpc_error(request_id, -32000, str(e) or 'Tool execution failed')
+
+        if not result.get('success'):
+            return 200, _rpc_error(request_id, -32000, result.get('response') or 'Query failed', result.get('error'))
+        return 200, _rpc_result(request_id, {'content': [{'type': 'text', 'text': result['response']}]})
+
+    async def _skill_gaps(self, request_id: Any, args: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        top = args.get('top', 10)
+        if not isinstance(top, int) or top < 1:
+            return 200, _rpc_error(request_id, -32602, 'top must be a positive integer')
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.skill_report, args.get('tenant'), args.get('filter'), top)
+        except Exception as e:
+            self.stats['errors'] += 1
+            return 200, _rpc_error(request_id, -32000, str(e) or 'Skill analysis failed')
+        return 200, _rpc_result(request_id, {'content': [{'type': 'text', 'text': text}]})
+
+    def health(self) -> Dict[str, Any]:
+        health = {**self.stats, 'pending': self.pending, 'active': self.active,
+                  'connections': len(self.connections), 'draining': self.draining,
+                  'scheduler': shared_scheduler().stats()}
+        if self.worker is not None:
+            health['worker'] = self.worker
+        return health
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection until close, idle timeout or shutdown"""
+        self.connections.add(writer)
+        try:
+            while not self.draining:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, {'error': 'headers too large'}, keep_alive=False)
+                    return
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'bad content-length'}, keep_alive=False)
+                    return
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, _rpc_error(None, -32600, 'Request too large'), keep_alive=False)
+                    return
+                try:
+                    raw = await asyncio.wait_for(reader.readexactly(length), KEEPALIVE_TIMEOUT) if length else b''
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                self.stats['requests'] += 1
+                self.active += 1
+                try:
+                    status, payload = await self._route(method, path.split('?', 1)[0], raw)
+                    await self._respond(writer, status, payload, keep_alive and not self.draining)
+                finally:
+                    self.active -= 1
+                if not keep_alive:
+                    return
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method: str, path: str, raw: bytes) -> Tuple[int, Any]:
+        if path == '/health' and method == 'GET':
+            return 200, self.health()
+        if path not in MCP_PATHS:
+            return 404, {'error': f"no route for {path}"}
+        if method == 'GET':
+            return 200, {'status': 'ok', **SERVER_INFO}
+        if method != 'POST':
+            return 405, {'error': f"{method} not allowed"}
+        try:
+            body = json.loads(raw or b'null')
+        except ValueError:
+            return 400, _rpc_error(None, -32700, 'Parse error')
+        return await self.dispatch(body)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if keep_alive:
+            headers.append(f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}")
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host: str, port: int, sock: Optional[socket.socket] = None) -> None:
+        """Run until SIGINT/SIGTERM, then drain; sock is an already listening socket to use"""
+        if sock is not None:
+            self.server = await asyncio.start_server(self.handle_connection, sock=sock, limit=MAX_HEADER_BYTES)
+            host, port = sock.getsockname()[:2]
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C surfaces as KeyboardInterrupt instead
+        print(f"🚀 Digital Twin MCP server on http://{host}:{port}/api/mcp "
+              f"(workers={self.concurrency}, max pending={self.max_pending})")
+        await stop.wait()
+        await self.shutdown()
+
+    async def shutdown(self, quiet: bool = False) -> None:
+        """Stop accepting, let in-flight questions finish, then close idle connections"""
+        if not quiet:
+            print("\n🛑 Shutting down: draining in-flight questions...")
+        self.draining = True
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        while self.active and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self.connections):
+            writer.close()
+        self.executor.shutdown(wait=False)
+        if not quiet:
+            print(f"✅ Stopped ({self.stats}); {shared_scheduler().summary()}")
+
+
+def build_answer(tenants: bool):
+    """Blocking answer(tenant, question) over one initialised twin or a TenantPool, and that owner
+
+    The owner's close_clients() / open_clients() move its network
+    connections into each pre-forked worker.
+    """
+    if tenants:
+        from tenants import TenantPool
+        pool = TenantPool()
+
+        def answer(tenant: Optional[str], question: str) -> Dict[str, Any]:
+            if not tenant:
+                return {'success': False, 'response': 'Missing required parameter: tenant'}
+            return pool.rag_query(tenant, question)
+        return answer, pool
+
+    from digital_twin_rag import DigitalTwinRAG
+    twin = DigitalTwinRAG()
+    if not twin.initialize():
+        return None, twin
+    return (lambda tenant, question: twin.rag_query(question)), twin
+
+
+def build_skill_report(tenants: bool):
+    """Blocking skill_report(tenant, filter, top) over the saved skill index"""
+    from skill_index import SkillIndex, load_profile_skills, skill_index_path
+    from embed_digitaltwin import JSON_FILE
+    registry = None
+    if tenants:
+        from tenants import TenantRegistry
+        registry = TenantRegistry()
+    cached: Dict[str, Any] = {}
+
+    def skill_report(tenant: Optional[str], text: Optional[str], top: int) -> str:
+        # Reload when ingest or watch mode has rewritten the index
+        path = skill_index_path()
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if cached.get('mtime') != mtime or 'index' not in cached:
+            cached['index'], cached['mtime'] = SkillIndex.load(path), mtime
+        index = cached['index']
+        if not len(index):
+            return "No job postings are indexed for skill analysis yet. Ingest job postings first."
+        if registry is not None and not tenant:
+            raise ValueError('Missing required parameter: tenant')
+        profile_path = registry.get(tenant).profile_path if registry is not None else JSON_FILE
+        return index.summary(load_profile_skills(profile_path), index.select(text), top)
+    return skill_report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Digital Twin JSON-RPC/MCP server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=8, help="Questions answered at once")
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help="Distinct questions in flight before new ones get 503")
+    parser.add_argument('--tenants', action='store_true', help="Serve every tenant in TENANTS_DIR")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="Pre-fork this many worker processes sharing the loaded index "
+                             "(0: serve from this process)")
+    args = parser.parse_args(argv)
+    if args.processes < 0:
+        parser.error('--processes must be 0 or more')
+
+    answer, owner = build_answer(args.tenants)
+    if answer is None:
+        print("\n❌ Failed to initialize. Please check your setup.")
+        return 1
+    skill_report = build_skill_report(args.tenants)
+    if args.processes:
+        from worker_pool import PreforkServer, prefork_supported
+        if not prefork_supported():
+            print("❌ --processes needs fork and socket passing (Unix only)")
+            return 1
+        PreforkServer(lambda: DigitalTwinServer(answer, args.concurrency, args.max_pending, skill_report),
+                      args.processes, before_fork=owner.close_clients,
+                      init_worker=owner.open_clients).serve(args.host, args.port)
+        return 0
+    server = DigitalTwinServer(answer, args.concurrency, args.max_pending, skill_report)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
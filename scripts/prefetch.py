@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Follow-Up Prefetch
+Uses the chat's idle time (the user reading an answer) to prepare the next one
+- Predicts likely follow-ups from the answer's top chunks ("What was the
+  result of ...", "What tools did you use ...", with the role the profile
+  is moving into for a career chunk) and from the interview question bank
+  entries closest to the answer
+- A follow-up about a chunk is answered from that chunk, with no new search;
+  a worker thread retrieves the others and pre-generates the most likely ones,
+  as a 'prefetch' batch job of the request scheduler, so it only uses spare
+  provider capacity and never delays a live question
+- The twin swaps in a reloaded index rather than changing it in place, so a
+  background call never sees a half-reloaded one while the chat goes on
+- Results live in a short-TTL cache; a follow-up that matches a prediction
+  (including a short form like "what tools did you use?") is answered from it
+- Per-turn and per-session budgets cap what speculation may spend; hit rate
+  and wasted calls are reported at the end of the chat
+
+PREFETCH=0 turns it off.
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from resilience import CallResult
+from scheduler import batch_job, estimate_tokens
+
+PREFETCH_ENABLED = os.getenv('PREFETCH', '1') != '0'
+PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '180'))
+PREFETCH_RETRIEVALS = int(os.getenv('PREFETCH_RETRIEVALS', '4'))     # per answer
+PREFETCH_GENERATIONS = int(os.getenv('PREFETCH_GENERATIONS', '1'))   # per answer; 0 = retrieve only
+PREFETCH_TOKEN_BUDGET = int(os.getenv('PREFETCH_TOKEN_BUDGET', '20000'))  # per session
+SHORT_FORM_KEYWORDS = 4  # a question this short, all of it in a prediction, is taken as a short form of it
+MATCH_THRESHOLD = 0.75   # keyword Jaccard needed otherwise
+RESPONSE_TOKENS = 500    # DigitalTwinRAG.generate_response's max_tokens
+BATCH_JOB = 'prefetch'
+
+# Follow-ups asked after an answer built on a chunk of this type; {topic} is the chunk,
+# {target} the role the profile is moving into (left out when the profile names none)
+FOLLOW_UPS = {
+    'interview': ("What was the result of that?",
+                  "What tools did you use for that?",
+                  "What would you do differently next time?"),
+    'experience': ("What was the result of your work as {topic}?",
+                   "What tools did you use as {topic}?",
+                   "What was the biggest challenge you faced as {topic}?"),
+    'certification': ("What did you learn from {topic}?",),
+    'education': ("What did you learn from {topic}?",),
+    'career': ("Why do you want to move into {target} roles?",),
+}
+
+WORD_RE = re.compile(r"[a-z0-9+#]+")
+TITLE_NOISE_RE = re.compile(r"\s+-\s+(Achievements at|Key Metrics)\b", re.IGNORECASE)
+STOPWORDS = frozenset(
+    "a an and any are as at be can could did do does for from have how i in is it me my of on or "
+    "tell that the this to was were what when where which who why with would you your about".split())
+
+
+def keywords(text: str) -> FrozenSet[str]:
+    """Content words of a question, lightly stemmed, for matching follow-ups"""
+    words = set()
+    for word in WORD_RE.findall(text.casefold()):
+        if word in STOPWORDS:
+            continue
+        words.add(word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word)
+    return frozenset(words)
+
+
+def similarity(asked: FrozenSet[str], predicted: FrozenSet[str]) -> float:
+    """1.0 when a short question is covered by the prediction, else keyword Jaccard"""
+    if not asked or not predicted:
+        return 0.0
+    if asked <= predicted and len(asked) <= SHORT_FORM_KEYWORDS:
+        return 1.0
+    return len(asked & predicted) / len(asked | predicted)
+
+
+def career_target(profile: Dict[str, Any]) -> Optional[str]:
+    """First role the profile is moving into: career_transition.to, else personal_profile.job_target"""
+    transition = profile.get('career_transition')
+    personal = profile.get('personal_profile')
+    target = ((transition.get('to') if isinstance(transition, dict) else None)
+              or (personal.get('job_target') if isinstance(personal, dict) else None))
+    if not isinstance(target, str) or not target.strip():
+        return None
+    return re.split(r'\s*[/,]\s*|\s+or\s+', target.strip())[0]
+
+
+def topic_of(title: str) -> str:
+    """'Data Analyst - Achievements at Acme' -> 'Data Analyst at Acme'"""
+    return TITLE_NOISE_RE.sub(lambda m: ' at' if m.group(1).lower().startswith('achievements') else '',
+                              title).strip()
+
+
+@dataclass(eq=False)
+class Prediction:
+    """One predicted follow-up and what has been prepared for it"""
+    question: str
+    keys: FrozenSet[str]
+    context: Optional[List[Dict[str, Any]]] = None  # the chunk a follow-up is about
+    created: float = field(default_factory=time.monotonic)
+    retrieval: Optional[CallResult] = None
+    result: Optional[Dict[str, Any]] = None
+    ready: threading.Event = field(default_factory=threading.Event)
+
+
+class FollowUpPrefetcher:
+    """Speculative retrieval and generation for the chat's next question"""
+
+    def __init__(self, twin, retrievals: int = PREFETCH_RETRIEVALS, generations: int = PREFETCH_GENERATIONS,
+                 token_budget: int = PREFETCH_TOKEN_BUDGET, ttl: float = PREFETCH_TTL_SECONDS):
+        self.twin = twin
+        self.retrievals = retrievals
+        self.generations = generations
+        self.tokens_left = token_budget
+        self.ttl = ttl
+        self.predictions: List[Prediction] = []
+        self.asked: set = set()
+        self._bank: Optional[List[str]] = None
+        self._generation = twin.index_generation
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.stats = {'predicted': 0, 'asked': 0, 'hits': 0, 'answer_hits': 0,
+                      'retrievals': 0, 'generations': 0, 'used': 0}
+
+    def _question_bank(self) -> List[str]:
+        if self._bank is None:
+            from tailored_answers import question_bank
+            self._bank = [question.text for question in question_bank(self.twin.profile_data)]
+        return self._bank
+
+    def predict(self, question: str, result: Dict[str, Any]) -> List[Prediction]:
+        """Likely next questions after this answer, most likely first"""
+        candidates: List[Prediction] = []
+        target = career_target(self.twin.profile_data)
+        for item in result.get('context_items') or []:
+            topic = topic_of(item.get('title', ''))
+            for template in FOLLOW_UPS.get(item.get('type', ''), ()):
+                if '{target}' in template and not target:
+                    continue
+                text = template.format(topic=topic, target=target)
+                candidates.append(Prediction(text, keywords(text), context=[item]))
+        # Bank questions sharing the most words with the question and answer
+        context = keywords(question + ' ' + result.get('response', ''))
+        asked = keywords(question)
+        ranked = sorted(((len(keywords(text) & context), text) for text in self._question_bank()
+                         if keywords(text) != asked), reverse=True)
+        bank = [Prediction(text, keywords(text)) for overlap, text in ranked if overlap >= 2]
+        # Alternate chunk follow-ups and bank questions, best of each first
+        merged: List[Prediction] = []
+        for pos in range(max(len(candidates), len(bank))):
+            merged += [group[pos] for group in (candidates, bank) if pos < len(group)]
+        seen = set(self.asked)
+        unique = []
+        for prediction in merged:
+            if prediction.keys and prediction.keys not in seen:
+                seen.add(prediction.keys)
+                unique.append(prediction)
+        return unique[:self.retrievals]
+
+    def start(self, question: str, result: Dict[str, Any]) -> None:
+        """Predict follow-ups to an answer and prepare them in the background"""
+        self.cancel()
+        self._expire(drop_all=True)
+        self.asked.add(keywords(question))
+        if not result.get('success'):
+            return
+        self._generation = self.twin.index_generation
+        self.predictions = self.predict(question, result)
+        self.stats['predicted'] += len(self.predictions)
+        if not self.predictions:
+            return
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(list(self.predictions), self._stop),
+                                        daemon=True, name='prefetch')
+        self._worker.start()
+
+    def _run(self, predictions: List[Prediction], stop: threading.Event) -> None:
+        with batch_job(BATCH_JOB):
+            for rank, prediction in enumerate(predictions):
+                try:
+                    if stop.is_set():
+                        continue
+                    if self.twin.router.route(prediction.question, count=False):
+                        continue  # the fast path answers it instantly anyway
+                    if prediction.context is not None:
+                        prediction.retrieval = CallResult(value=prediction.context)
+                    else:
+                        prediction.retrieval = self.twin.retrieve(prediction.question)
+                        self.stats['retrievals'] += 1
+                    if (stop.is_set() or rank >= self.generations or not prediction.retrieval.ok
+                            or not self.twin.groq_client):
+                        continue
+                    context = ' '.join(hit.get('content', '') for hit in prediction.retrieval.value)
+                    cost = estimate_tokens(prediction.question + context) + RESPONSE_TOKENS
+                    if cost > self.tokens_left:
+                        continue
+                    self.tokens_left -= cost
+                    result = self.twin.rag_query(prediction.question, background=True,
+                                                 retrieval=prediction.retrieval)
+                    self.stats['generations'] += 1
+                    if result.get('success') and not result.get('degraded'):
+                        prediction.result = result
+                finally:
+                    prediction.ready.set()
+
+    def cancel(self) -> None:
+        """Stop speculating; a call already under way still finishes in the background"""
+        self._stop.set()
+
+    def _expire(self, drop_all: bool = False) -> None:
+        now = time.monotonic()
+        self.predictions = [prediction for prediction in self.predictions
+                            if not drop_all and now - prediction.created <= self.ttl]
+
+    def take(self, question: str) -> Optional[Dict[str, Any]]:
+        """rag_query result for a question that was predicted, or None
+
+        Speculation still under way is abandoned rather than waited for: a
+        batch call may sit behind the scheduler's pacing, while the live
+        question goes first.
+        """
+        self.stats['asked'] += 1
+        self.cancel()
+        if self.twin.refresh_if_stale() or self._generation != self.twin.index_generation:
+            self._expire(drop_all=True)
+        self._expire()
+        asked = keywords(question)
+        best, best_score = None, 0.0
+        for prediction in self.predictions:
+            score = similarity(asked, prediction.keys)
+            if score > best_score:
+                best, best_score = prediction, score
+        if best is None or best_score < MATCH_THRESHOLD:
+            return None
+
+        self.predictions.remove(best)
+        ready = best.ready.is_set()
+        searched = best.context is None  # chunk follow-ups needed no search
+        if ready and best.result is not None:
+            self.stats['hits'] += 1
+            self.stats['answer_hits'] += 1
+            self.stats['used'] += searched + 1
+            return {**best.result, 'route': 'prefetch', 'prefetched_as': best.question}
+        retrieval = best.retrieval if ready else None
+        if retrieval is None and best.context is not None:
+            retrieval = CallResult(value=best.context)
+        if retrieval is None or not retrieval.ok:
+            return None
+        self.stats['hits'] += 1
+        self.stats['used'] += ready and searched
+        result = self.twin.rag_query(question, retrieval=retrieval)
+        return {**result, 'route': 'prefetch', 'prefetched_as': best.question}
+
+    def summary(self) -> str:
+        """Hit rate and wasted calls for the session"""
+        stats = self.stats
+        calls = stats['retrievals'] + stats['generations']
+        rate = stats['hits'] / stats['asked'] if stats['asked'] else 0.0
+        return (f"Prefetch: {stats['hits']}/{stats['asked']} follow-ups predicted ({rate:.0%}, "
+                f"{stats['answer_hits']} answered instantly), "
+                f"{calls - stats['used']} of {calls} prefetch calls wasted")
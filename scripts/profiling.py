@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Profiling Hooks
+One switch to profile any script's entry point: --profiler MODE or PROFILER=MODE
+(not --profile, which scripts use for the profile JSON path)
+- cprofile: deterministic profile, dumped as .pstats with a top-N summary
+- tracemalloc: allocations attributed to named phases (load, chunk, embed, upsert, query...)
+- sample: wall-clock stack sampler writing collapsed stacks for flame graphs
+  (flamegraph.pl profile.collapsed > flame.svg, or load it in speedscope)
+
+Code marks phases with `with phase('embed'):`. With profiling off, phase()
+returns a shared no-op context manager, so the hooks cost one global lookup,
+and cProfile/pstats/tracemalloc are not imported at all.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '15'))
+SAMPLE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))  # seconds between stack samples
+TRACEMALLOC_FRAMES = 1
+
+
+class _NoPhase:
+    """Context manager that does nothing (profiling disabled)"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NO_PHASE = _NoPhase()
+_active: Optional['Profiler'] = None
+
+
+def phase(name: str):
+    """Mark a named phase of work; a no-op unless a profiler is running"""
+    if _active is None:
+        return _NO_PHASE
+    return _Phase(_active, name)
+
+
+class _Phase:
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.token = self.profiler.phase_start(self.name)
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.profiler.phase_end(self.name, self.token, time.perf_counter() - self.started)
+        return False
+
+
+class Profiler:
+    """Base profiler: tracks wall time per phase"""
+
+    extension = ''
+
+    def __init__(self, script: str, out: Optional[str] = None):
+        self.script = script
+        self.out = out or os.getenv('PROFILE_OUT') or f"profile_{script}{self.extension}"
+        self.phases: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def current_phase(self) -> Optional[str]:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def phase_start(self, name: str) -> Any:
+        self._local.stack = getattr(self._local, 'stack', []) + [name]
+        return None
+
+    def phase_end(self, name: str, token: Any, elapsed: float) -> None:
+        self._local.stack = self._local.stack[:-1]
+        with self._lock:
+            entry = self.phases[name]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def report(self) -> None:
+        if not self.phases:
+            return
+        print(f"\n⏱  Phases ({self.script})")
+        for name, (count, seconds) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            print(f"  {name:<16} {count:>6}x {seconds:>9.3f}s")
+
+
+class CProfileProfiler(Profiler):
+    """cProfile over the whole run"""
+
+    extension = '.pstats'
+
+    def start(self) -> None:
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def report(self) -> None:
+        import pstats
+        super().report()
+        self.profile.dump_stats(self.out)
+        print(f"\n🔬 cProfile: top {PROFILE_TOP} by cumulative time (full dump: {self.out})")
+        pstats.Stats(self.profile, stream=sys.stdout).sort_stats('cumulative').print_stats(PROFILE_TOP)
+
+
+class TracemallocProfiler(Profiler):
+    """Allocation diffs per phase, aggregated over every time the phase ran"""
+
+    extension = '.tracemalloc.txt'
+
+    def start(self) -> None:
+        global tracemalloc  # bound at module level for the methods below
+        import tracemalloc
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.diffs: Dict[str, Counter] = defaultdict(Counter)
+        self.peaks: Dict[str, int] = {}
+
+    def _snapshot(self) -> 'tracemalloc.Snapshot':
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def phase_start(self, name: str) -> Any:
+        super().phase_start(name)
+        tracemalloc.reset_peak()
+        return self._snapshot()
+
+    def phase_end(self, name: str, token: Any, elapsed: float) -> None:
+        _, peak = tracemalloc.get_traced_memory()
+        after = self._snapshot()
+        with self._lock:
+            for stat in after.compare_to(token, 'lineno'):
+                if stat.size_diff:
+                    frame = stat.traceback[0]
+                    self.diffs[name][(frame.filename, frame.lineno)] += stat.size_diff
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+        super().phase_end(name, token, elapsed)
+
+    def stop(self) -> None:
+        self.current, self.peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    def report(self) -> None:
+        super().report()
+        lines = [f"tracemalloc: {self.current / 1024:.0f} KB still allocated at exit"]
+        for name, diff in self.diffs.items():
+            grown = sum(diff.values())
+            lines.append(f"\nphase '{name}': net {grown / 1024:+.1f} KB, peak {self.peaks[name] / 1024:.0f} KB")
+            for (filename, lineno), size in diff.most_common(PROFILE_TOP):
+                if size <= 0:
+                    break
+                lines.append(f"  {size / 1024:>+10.1f} KB  {_short_path(filename)}:{lineno}")
+        print("\n📦 " + "\n".join(lines))
+        with open(self.out, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"\n   (saved to {self.out})")
+
+
+class SamplingProfiler(Profiler):
+    """Wall-clock sampler over every thread, in collapsed-stack format
+
+    Each sample walks sys._current_frames(); the current phase (if any) becomes
+    the root frame, so a flame graph splits by phase.
+    """
+
+    extension = '.collapsed'
+
+    def start(self) -> None:
+        self.samples: Counter = Counter()
+        self.thread_phases: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def phase_start(self, name: str) -> Any:
+        super().phase_start(name)
+        self.thread_phases[threading.get_ident()] = name
+
+    def phase_end(self, name: str, token: Any, elapsed: float) -> None:
+        super().phase_end(name, token, elapsed)
+        outer = self.current_phase()
+        if outer:
+            self.thread_phases[threading.get_ident()] = outer
+        else:
+            self.thread_phases.pop(threading.get_ident(), None)
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                root = self.thread_phases.get(ident)
+                if root:
+                    stack.append(f"phase:{root}")
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def report(self) -> None:
+        super().report()
+        with open(self.out, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.items():
+                f.write(f"{stack} {count}\n")
+        total = sum(self.samples.values())
+        own: Counter = Counter()
+        for stack, count in self.samples.items():
+            own[stack.rsplit(';', 1)[-1]] += count
+        print(f"\n🔥 {total} samples every {SAMPLE_INTERVAL * 1000:.0f} ms → {self.out}")
+        print(f"   Top {PROFILE_TOP} frames by own samples (idle waits included):")
+        for frame, count in own.most_common(PROFILE_TOP):
+            print(f"  {count / total:>6.1%}  {frame}")
+
+
+PROFILERS = {'cprofile': CProfileProfiler, 'tracemalloc': TracemallocProfiler, 'sample': SamplingProfiler}
+
+
+def _short_path(filename: str) -> str:
+    cwd = os.getcwd() + os.sep
+    return filename[len(cwd):] if filename.startswith(cwd) else filename
+
+
+def _pop_profiler_flag(argv: List[str]) -> Optional[str]:
+    """Remove --profiler MODE / --profiler=MODE from argv and return MODE"""
+    for i, arg in enumerate(argv):
+        if arg == '--profiler' and i + 1 < len(argv):
+            mode = argv[i + 1]
+            del argv[i:i + 2]
+            return mode
+        if arg.startswith('--profiler='):
+            del argv[i]
+            return arg.split('=', 1)[1]
+    return None
+
+
+def run(main: Callable[[], Any], script: Optional[str] = None) -> Any:
+    """Call an entry point, profiled when --profiler MODE or PROFILER=MODE asks for it
+
+    script names the output files (default: the running script's file name).
+    """
+    global _active
+    mode = (_pop_profiler_flag(sys.argv) or os.getenv('PROFILER', '')).lower()
+    if not mode:
+        return main()
+    if mode not in PROFILERS:
+        raise SystemExit(f"❌ Unknown profile mode '{mode}' (expected one of: {', '.join(PROFILERS)})")
+
+    script = script or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+    profiler = PROFILERS[mode](script)
+    print(f"🔬 Profiling {script} ({mode})")
+    _active = profiler
+    profiler.start()
+    try:
+        return main()
+    finally:
+        profiler.stop()
+        _active = None
+        profiler.report()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Resilience Layer
+Bounds the tail latency of the remote calls behind each answer
+- Deadline: one budget per question, split across retrieval and generation
+- Hedging: a duplicate request once a call outlives its observed p95
+- CircuitBreaker: fail fast to the degraded path while a provider is failing
+- CallResult / CallError: structured outcomes instead of error strings
+- Rate limits: a 429 is reported as such, with the wait the provider asked
+  for, and never retried on the spot
+"""
+
+import queue
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+HEDGE_MIN_SAMPLES = 20      # latencies observed before p95 replaces the default hedge delay
+HEDGE_MIN_DELAY = 0.05      # never hedge sooner than this, however fast the provider is
+LATENCY_WINDOW = 200
+RETRY_AFTER_RE = re.compile(r'try again in\s+([\d.]+)\s*(ms|s)', re.IGNORECASE)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider refused a call for exceeding its rate limit (HTTP 429)"""
+    if getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError':
+        return True
+    text = str(error).lower()
+    return bool(re.search(r'\b429\b', text)) or 'rate limit' in text
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds a rate-limited provider asked to wait, if it said (header or message)"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        pass
+    hint = RETRY_AFTER_RE.search(str(error))
+    if hint:
+        return float(hint.group(1)) / (1000 if hint.group(2).lower() == 'ms' else 1)
+    return None
+
+
+class Deadline:
+    """Absolute point in time by which an answer must be ready"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def child(self, share: float) -> 'Deadline':
+        """Deadline for one stage: a share of the time left, so later stages keep the rest"""
+        return Deadline(self.remaining() * share)
+
+
+@dataclass
+class CallError:
+    """Why a remote call produced no value"""
+    stage: str
+    kind: str           # timeout | circuit_open | unavailable | rate_limited | error
+    message: str
+    elapsed: float = 0.0
+    retry_after: Optional[float] = None  # rate_limited: seconds the provider asked to wait
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class CallResult(Generic[T]):
+    """Value or error of one guarded call"""
+    value: Optional[T] = None
+    error: Optional[CallError] = None
+    elapsed: float = 0.0
+    hedged: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window: int = LATENCY_WINDOW, default_delay: float = 1.0):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.default_delay = default_delay
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None when empty"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def hedge_delay(self) -> float:
+        """p95 once enough samples exist, the configured default before that"""
+        with self._lock:
+            enough = len(self._samples) >= HEDGE_MIN_SAMPLES
+        if not enough:
+            return self.default_delay
+        return max(HEDGE_MIN_DELAY, self.percentile(95))
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures → half-open single probe after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open only one probe is let through"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class ResilientCall:
+    """Deadline, hedging and circuit breaking for one kind of remote call
+
+    fn receives the stage Deadline so it can hand the remaining time to its
+    client as a socket timeout. Attempts run on daemon threads: an attempt
+    that outlives the deadline is abandoned rather than waited on, so a
+    stalled provider can never hold up the caller or interpreter exit.
+
+    admit, when given, is asked (with a timeout in seconds) before every
+    attempt after the first, so hedges and retries count against the
+    provider's rate limit like the original request: a hedge goes out only
+    if admitted at once, a retry may wait for the time left. A rate-limited
+    attempt is not retried; the caller backs off instead.
+    """
+
+    def __init__(self, stage: str, hedge: bool = True, default_hedge_delay: float = 1.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.stage = stage
+        self.hedge = hedge
+        self.latency = LatencyTracker(default_delay=default_hedge_delay)
+        self.breaker = CircuitBreaker(stage, failure_threshold, reset_timeout)
+        self.stats = {'calls': 0, 'hedges': 0, 'hedge_wins': 0, 'timeouts': 0,
+                      'errors': 0, 'rate_limited': 0, 'hedges_skipped': 0, 'short_circuits': 0}
+
+    def __call__(self, fn: Callable[[Deadline], T], deadline: Deadline,
+                 admit: Optional[Callable[[float], bool]] = None) -> CallResult[T]:
+        start = time.monotonic()
+        self.stats['calls'] += 1
+
+        if not self.breaker.allow():
+            self.stats['short_circuits'] += 1
+            return CallResult(error=CallError(
+                self.stage, 'circuit_open',
+                f"{self.stage} disabled for up to {self.breaker.reset_timeout:.0f}s after repeated failures"))
+        if deadline.expired:
+            self.stats['timeouts'] += 1
+            return CallResult(error=CallError(self.stage, 'timeout', f"no time left for {self.stage}"))
+
+        outcomes: 'queue.Queue' = queue.Queue()
+
+        def attempt(number: int) -> None:
+            began = time.monotonic()
+            try:
+                outcomes.put((number, True, fn(deadline), time.monotonic() - began))
+            except Exception as e:
+                outcomes.put((number, False, e, time.monotonic() - began))
+
+        def launch(number: int) -> None:
+            threading.Thread(target=attempt, args=(number,), daemon=True,
+                             name=f"{self.stage}-attempt-{number}").start()
+
+        launch(0)
+        attempts, pending = 1, 1
+        # Hedge no later than halfway through the budget so the duplicate has time to finish
+        hedge_delay = min(self.latency.hedge_delay(), deadline.remaining() / 2)
+        hedge_at = start + hedge_delay if self.hedge else float('inf')
+        last_error: Optional[Exception] = None
+
+        while True:
+            wake_at = min(deadline.expires_at, hedge_at if attempts == 1 else float('inf'))
+            try:
+                number, ok, value, took = outcomes.get(timeout=max(0.0, wake_at - time.monotonic()))
+            except queue.Empty:
+                if not deadline.expired:
+                    if attempts == 1 and time.monotonic() >= hedge_at:
+                        if admit is None or admit(0):
+                            self.stats['hedges'] += 1
+                            launch(1)
+                            attempts, pending = 2, pending + 1
+                        else:
+                            # No spare capacity under the rate limit; the hedge would only queue
+                            self.stats['hedges_skipped'] += 1
+                            hedge_at = float('inf')
+                    continue
+                self.stats['timeouts'] += 1
+                self.breaker.record_failure()
+                return CallResult(
+                    error=CallError(self.stage, 'timeout',
+                                    f"{self.stage} exceeded its {deadline.budget:.1f}s budget",
+                                    time.monotonic() - start),
+                    elapsed=time.monotonic() - start, hedged=attempts > 1)
+
+            pending -= 1
+            if ok:
+                self.latency.record(took)
+                self.breaker.record_success()
+                if number == 1:
+                    self.stats['hedge_wins'] += 1
+                return CallResult(value=value, elapsed=time.monotonic() - start, hedged=attempts > 1)
+
+            last_error = value
+            if (attempts == 1 and self.hedge and not deadline.expired and not is_rate_limited(value)
+                    and (admit is None or admit(deadline.remaining()))):
+                # A fast failure is retried once right away instead of waiting for the hedge delay
+                self.stats['hedges'] += 1
+                launch(1)
+                attempts, pending = 2, pending + 1
+            elif pending == 0:
+                self.breaker.record_failure()
+                elapsed = time.monotonic() - start
+                if is_rate_limited(last_error):
+                    self.stats['rate_limited'] += 1
+                    return CallResult(
+                        error=CallError(self.stage, 'rate_limited', str(last_error), elapsed,
+                                        retry_after(last_error)),
+                        elapsed=elapsed, hedged=attempts > 1)
+                self.stats['errors'] += 1
+                return CallResult(error=CallError(self.stage, 'error', str(last_error), elapsed),
+                                  elapsed=elapsed, hedged=attempts > 1)
+
+    def status(self) -> Dict[str, Any]:
+        """Counters, breaker state and observed latency for diagnostics"""
+        return {
+            **self.stats,
+            'breaker': self.breaker.state,
+            'p50_s': self.latency.percentile(50),
+            'p95_s': self.latency.percentile(95),
+            'hedge_delay_s': self.latency.hedge_delay(),
+        }
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Request Scheduler
+Shares each provider's rate limits between live questions and batch jobs
+- Interactive requests (chat, query, the MCP server) always go first: while
+  one is waiting, no batch request is admitted to that provider
+- Batch requests (tailored answers, re-embedding) use only spare capacity, at
+  most SCHEDULER_BATCH_SHARE of each limit, so a live question never queues
+  behind a full minute of batch traffic
+- Batch requests are paced evenly and batch jobs take turns round-robin,
+  so a job with many workers cannot starve one with few
+- Queue depth and wait-time percentiles per class, requests per batch job
+
+Limits count the trailing minute, the window providers enforce: GROQ_RPM /
+GROQ_TPM and UPSTASH_RPM (0 = unlimited). Scheduling is per process; a batch
+run in its own process still stops at the batch share, leaving the rest of
+each limit to a server answering questions next to it.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from resilience import LatencyTracker
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+RATE_WINDOW = 60.0   # seconds; providers count RPM/TPM over a trailing minute
+BATCH_SHARE = float(os.getenv('SCHEDULER_BATCH_SHARE', '0.8'))
+WAIT_WINDOW = 512    # recent waits kept per class for percentiles
+
+# Name of the batch job the current thread (or task) is working for; None = interactive
+_batch_job: ContextVar[Optional[str]] = ContextVar('batch_job', default=None)
+
+
+@contextmanager
+def batch_job(name: str) -> Iterator[None]:
+    """Schedule every provider call made inside the block as batch work for job `name`
+
+    Context variables do not follow work handed to a thread pool, so enter
+    this in the worker function itself.
+    """
+    token = _batch_job.set(name)
+    try:
+        yield
+    finally:
+        _batch_job.reset(token)
+
+
+def current_job() -> Optional[str]:
+    """Batch job the caller is working for, or None for interactive work"""
+    return _batch_job.get()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate budgeting (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class RateBucket:
+    """Requests and tokens sent to one provider in the trailing window"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, window: float = RATE_WINDOW):
+        self.rpm, self.tpm = rpm, tpm
+        self.window = window
+        self._paced_at = 0.0  # earliest time the next paced request may go
+        self._sent: Deque[Tuple[float, int]] = deque()
+        self._tokens = 0
+        self.paused_until = 0.0
+
+    def _expire(self, now: float) -> None:
+        while self._sent and self._sent[0][0] <= now - self.window:
+            self._tokens -= self._sent.popleft()[1]
+
+    def delay(self, tokens: int, share: float, now: float, paced: bool = False) -> float:
+        """Seconds until a request of `tokens` fits in `share` of the limits (0 = now)
+
+        Paced requests are also spread evenly over the window instead of
+        going out in bursts whenever a burst of older ones ages out.
+        """
+        self._expire(now)
+        if self.paused_until > now:
+            return self.paused_until - now
+        if paced and self._paced_at > now:
+            return self._paced_at - now
+        rpm, tpm = self.rpm * share, self.tpm * share
+        tokens = min(tokens, tpm) if tpm else tokens  # an oversized request must still go out alone
+
+        def fits(count: int, used: int) -> bool:
+            return (not rpm or count < rpm) and (not tpm or used + tokens <= tpm)
+
+        if fits(len(self._sent), self._tokens):
+            return 0.0
+        # Sleep until enough of the window has aged out
+        freed = 0
+        for idx, (sent_at, sent_tokens) in enumerate(self._sent):
+            freed += sent_tokens
+            if fits(len(self._sent) - idx - 1, self._tokens - freed):
+                return sent_at + self.window - now
+        return self.window
+
+    def take(self, tokens: int, now: float, share: float = 1.0, paced: bool = False) -> None:
+        self._sent.append((now, tokens))
+        self._tokens += tokens
+        if paced:
+            interval = max(self.window / (self.rpm * share) if self.rpm else 0.0,
+                           self.window * tokens / (self.tpm * share) if self.tpm else 0.0)
+            self._paced_at = max(self._paced_at, now) + interval
+
+    def usage(self, now: float) -> Tuple[int, int]:
+        """(requests, tokens) sent in the trailing window"""
+        self._expire(now)
+        return len(self._sent), self._tokens
+
+
+@dataclass(eq=False)
+class _Ticket:
+    tokens: int
+    job: Optional[str]
+    enqueued: float
+
+
+@dataclass
+class _Queues:
+    """Waiting requests for one provider: interactive FIFO, then one FIFO per batch job"""
+    interactive: Deque[_Ticket] = field(default_factory=deque)
+    # Insertion order is the round-robin turn; a job moves to the back once served
+    batch: 'OrderedDict[str, Deque[_Ticket]]' = field(default_factory=OrderedDict)
+
+    def head(self) -> Optional[_Ticket]:
+        if self.interactive:
+            return self.interactive[0]
+        for waiting in self.batch.values():
+            return waiting[0]
+        return None
+
+    def add(self, ticket: _Ticket) -> None:
+        if ticket.job is None:
+            self.interactive.append(ticket)
+        else:
+            self.batch.setdefault(ticket.job, deque()).append(ticket)
+
+    def remove(self, ticket: _Ticket, served: bool) -> None:
+        if ticket.job is None:
+            self.interactive.remove(ticket)
+            return
+        waiting = self.batch[ticket.job]
+        waiting.remove(ticket)
+        if not waiting:
+            del self.batch[ticket.job]
+        elif served:
+            self.batch.move_to_end(ticket.job)
+
+    def depth(self) -> Tuple[int, int]:
+        return len(self.interactive), sum(len(waiting) for waiting in self.batch.values())
+
+
+class RequestScheduler:
+    """Priority admission to rate-limited providers, shared by every thread"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 batch_share: float = BATCH_SHARE, window: float = RATE_WINDOW):
+        """limits maps provider -> (requests, tokens) per window; 0 means unlimited"""
+        self.batch_share = min(max(batch_share, 0.05), 1.0)
+        self.window = window
+        self.buckets: Dict[str, RateBucket] = {}
+        self._queues: Dict[str, _Queues] = {}
+        self._cond = threading.Condition()
+        self.waits = {INTERACTIVE: LatencyTracker(WAIT_WINDOW), BATCH: LatencyTracker(WAIT_WINDOW)}
+        self.counts = {priority: {'granted': 0, 'timeouts': 0, 'max_queued': 0}
+                       for priority in (INTERACTIVE, BATCH)}
+        self.jobs: Dict[str, Dict[str, float]] = {}
+        for provider, (rpm, tpm) in (limits or {}).items():
+            self.limit(provider, rpm, tpm)
+
+    def limit(self, provider: str, rpm: float, tpm: float = 0) -> None:
+        """Set a provider's requests and tokens per window (a minute by default)"""
+        with self._cond:
+            bucket = self.buckets.setdefault(provider, RateBucket(window=self.window))
+            bucket.rpm, bucket.tpm = rpm, tpm
+            self._queues.setdefault(provider, _Queues())
+            self._cond.notify_all()
+
+    def pause(self, provider: str, seconds: float) -> None:
+        """Hold every request to a provider back for a while (it answered 429)"""
+        with self._cond:
+            bucket = self.buckets.get(provider)
+            if bucket is not None:
+                bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+                self._cond.notify_all()
+
+    def acquire(self, provider: str, tokens: int = 1, job: Optional[str] = None,
+                timeout: Optional[float] = None) -> bool:
+        """Block until one request may be sent; False if timeout passes first
+
+        job (or an enclosing batch_job()) makes it batch work; without one it
+        is interactive and goes ahead of every waiting batch request.
+        """
+        job = job or _batch_job.get()
+        priority = BATCH if job else INTERACTIVE
+        bucket = self.buckets.get(provider)
+        if bucket is None:  # provider without limits
+            self._record(priority, job, 0.0)
+            return True
+
+        ticket = _Ticket(tokens, job, time.monotonic())
+        give_up = ticket.enqueued + timeout if timeout is not None else float('inf')
+        share = self.batch_share if job else 1.0
+        queues = self._queues[provider]
+        with self._cond:
+            queues.add(ticket)
+            counts = self.counts[priority]
+            counts['max_queued'] = max(counts['max_queued'], queues.depth()[0 if job is None else 1])
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if queues.head() is ticket:
+                        wait = bucket.delay(tokens, share, now, paced=job is not None)
+                        if wait <= 0:
+                            bucket.take(tokens, now, share, paced=job is not None)
+                            queues.remove(ticket, served=True)
+                            self._cond.notify_all()
+                            self._record(priority, job, now - ticket.enqueued)
+                            return True
+                    if now >= give_up:
+                        queues.remove(ticket, served=False)
+                        self._cond.notify_all()
+                        counts['timeouts'] += 1
+                        return False
+                    # Woken early when anything ahead is served, leaves, or limits change
+                    limit = min(float('inf') if wait is None else wait, give_up - now)
+                    self._cond.wait(None if limit == float('inf') else limit)
+            except BaseException:
+                if ticket in queues.interactive or ticket in queues.batch.get(job or '', ()):
+                    queues.remove(ticket, served=False)
+                    self._cond.notify_all()
+                raise
+
+    def _record(self, priority: str, job: Optional[str], waited: float) -> None:
+        self.waits[priority].record(waited)
+        with self._cond:
+            self.counts[priority]['granted'] += 1
+            if job:
+                stats = self.jobs.setdefault(job, {'granted': 0, 'waited_s': 0.0})
+                stats['granted'] += 1
+                stats['waited_s'] += waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, waits and counts per class; requests per batch job; provider usage"""
+        now = time.monotonic()
+        with self._cond:
+            depths = [queues.depth() for queues in self._queues.values()]
+            result: Dict[str, Any] = {}
+            for pos, priority in enumerate((INTERACTIVE, BATCH)):
+                tracker = self.waits[priority]
+                result[priority] = {
+                    **self.counts[priority],
+                    'queued': sum(depth[pos] for depth in depths),
+                    'wait_p50_s': tracker.percentile(50) or 0.0,
+                    'wait_p95_s': tracker.percentile(95) or 0.0,
+                }
+            result['jobs'] = {job: dict(stats) for job, stats in self.jobs.items()}
+            result['providers'] = {}
+            for provider, bucket in self.buckets.items():
+                requests, tokens = bucket.usage(now)
+                result['providers'][provider] = {'rpm': bucket.rpm, 'tpm': bucket.tpm,
+                                                 'requests_in_window': requests, 'tokens_in_window': tokens}
+        return result
+
+    def summary(self) -> str:
+        stats = self.stats()
+        live, batch = stats[INTERACTIVE], stats[BATCH]
+        text = (f"Scheduler: {live['granted']} interactive (p95 wait {live['wait_p95_s'] * 1000:.0f} ms), "
+                f"{batch['granted']} batch")
+        if stats['jobs']:
+            text += f" from {len(stats['jobs'])} job(s) (p95 wait {batch['wait_p95_s']:.1f}s)"
+        if live['queued'] or batch['queued']:
+            text += f", queued {live['queued']} interactive / {batch['queued']} batch"
+        return text
+
+
+def default_limits() -> Dict[str, Tuple[float, float]]:
+    """Provider limits from the environment"""
+    return {
+        'groq': (float(os.getenv('GROQ_RPM', '30')), float(os.getenv('GROQ_TPM', '0'))),
+        'upstash': (float(os.getenv('UPSTASH_RPM', '0')), 0),
+    }
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def shared_scheduler() -> RequestScheduler:
+    """Process-wide scheduler with the limits from the environment"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(default_limits())
+        return _scheduler
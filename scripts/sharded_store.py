@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Sharded Vector Index
+Spreads one logical index over N shards behind the usual Index surface
+- Chunks are routed by a stable hash of their id (CRC32, the same in every
+  process), so upserts, deletes and fetches touch only the owning shard
+- Upserts, deletes and fetches run on all affected shards in parallel
+- Queries scatter to every shard at once and gather with a heap top-k merge;
+  a shard that misses its timeout is left out and the result is marked partial
+- Shards are LocalVectorStore directories (shard-00, shard-01, ...) or
+  separate Upstash indexes (UPSTASH_VECTOR_REST_URL_1, _TOKEN_1, ...)
+
+VECTOR_SHARDS=1 (the default) keeps the plain single index.
+"""
+
+import heapq
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from vector_store import LocalVectorStore, StoreInfo, bump_generation, local_index_dir
+
+SHARD_TIMEOUT_SECONDS = float(os.getenv('SHARD_TIMEOUT_SECONDS', '2.0'))
+SHARDS_FILE = 'shards'  # shard count of a sharded local index; routing depends on it
+
+# Attributes served by the first shard when the shards embed locally; Upstash
+# shards lack them, so hasattr() keeps telling the two backends apart
+_LOCAL_ATTRIBUTES = ('embed', 'embed_batch', 'embedder', 'embedding_name')
+
+
+def shard_count() -> int:
+    """VECTOR_SHARDS, at least 1"""
+    return max(1, int(os.getenv('VECTOR_SHARDS', '1')))
+
+
+def shard_of(vector_id: str, shards: int) -> int:
+    """Shard that owns a chunk id"""
+    return zlib.crc32(vector_id.encode('utf-8')) % shards
+
+
+class ShardedIndex:
+    """One logical vector index over several shards"""
+
+    def __init__(self, shards: Sequence[Any], timeout: float = SHARD_TIMEOUT_SECONDS,
+                 path: Optional[str] = None):
+        """Wrap shard clients; path is the root directory of local shards"""
+        if not shards:
+            raise ValueError("ShardedIndex needs at least one shard")
+        self.shards = list(shards)
+        self.timeout = timeout
+        self.path = path
+        # Timed-out shard calls keep their thread, so leave room for the next query
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards) * 4, thread_name_prefix='shard')
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'partial': 0, 'timeouts': [0] * len(self.shards),
+                      'errors': [0] * len(self.shards)}
+        self.last_missing: List[int] = []
+
+    def __getattr__(self, name: str) -> Any:
+        if name in _LOCAL_ATTRIBUTES:
+            return getattr(self.shards[0], name)
+        raise AttributeError(name)
+
+    @property
+    def local(self) -> bool:
+        """True when the shards are in-process stores"""
+        return isinstance(self.shards[0], LocalVectorStore)
+
+    def shard_of(self, vector_id: str) -> int:
+        return shard_of(vector_id, len(self.shards))
+
+    def _route(self, items: Iterable[Any], key: Callable[[Any], str]) -> Dict[int, List[Any]]:
+        groups: Dict[int, List[Any]] = {}
+        for item in items:
+            groups.setdefault(self.shard_of(key(item)), []).append(item)
+        return groups
+
+    def _each(self, calls: Dict[int, Callable[[], Any]]) -> Dict[int, Any]:
+        """Run one call per shard in parallel and wait for all; the first failure is raised"""
+        futures = {shard: self._pool.submit(call) for shard, call in calls.items()}
+        wait(futures.values())
+        results = {}
+        for shard, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                raise RuntimeError(f"shard {shard}: {error}") from error
+            results[shard] = future.result()
+        return results
+
+    # Writes
+
+    def upsert(self, vectors: Iterable[Tuple], **kwargs) -> str:
+        """Insert or replace (id, vector_or_text, metadata) tuples on their owning shards"""
+        groups = self._route(vectors, lambda item: item[0])
+        self._each({shard: (lambda s=shard, batch=batch: self.shards[s].upsert(vectors=batch, **kwargs))
+                    for shard, batch in groups.items()})
+        return 'Success'
+
+    def delete(self, ids: Sequence[str], **kwargs) -> int:
+        """Delete by id; returns how many existed"""
+        groups = self._route(ids, lambda vector_id: vector_id)
+        results = self._each({shard: (lambda s=shard, batch=batch: self.shards[s].delete(ids=batch, **kwargs))
+                              for shard, batch in groups.items()})
+        # LocalVectorStore returns a count, Upstash a DeleteResult
+        return sum(r if isinstance(r, int) else getattr(r, 'deleted', 0) for r in results.values())
+
+    def fetch(self, ids: Sequence[str], **kwargs) -> List[Any]:
+        """Look up vectors by id, in the order asked"""
+        positions = self._route(range(len(ids)), lambda pos: ids[pos])
+        results = self._each({
+            shard: (lambda s=shard, pos=pos: self.shards[s].fetch([ids[p] for p in pos], **kwargs))
+            for shard, pos in positions.items()
+        })
+        ordered: List[Any] = [None] * len(ids)
+        for shard, pos in positions.items():
+            for p, result in zip(pos, results[shard]):
+                ordered[p] = result
+        return ordered
+
+    # Reads
+
+    def query(self, vector: Optional[Sequence[float]] = None, data: Optional[str] = None,
+              top_k: int = 10, timeout: Optional[float] = None, **kwargs) -> List[Any]:
+        """Scatter a query to every shard and merge the best top_k hits
+
+        Shards that fail or miss the timeout are skipped and listed in
+        last_missing; only when no shard answers is the error raised.
+        """
+        if vector is None and data is None:
+            raise ValueError("query() needs either vector or data")
+        if vector is None and self.local:
+            vector = self.embed(data)  # embed once, not once per shard
+            data = None
+        args = {'vector': vector} if vector is not None else {'data': data}
+        futures: Dict[Future, int] = {
+            self._pool.submit(shard.query, top_k=top_k, **args, **kwargs): pos
+            for pos, shard in enumerate(self.shards)
+        }
+        done, pending = wait(futures, timeout=self.timeout if timeout is None else timeout)
+
+        hits: List[Any] = []
+        missing: List[int] = []
+        first_error: Optional[BaseException] = None
+        with self._lock:
+            self.stats['queries'] += 1
+            for future in pending:
+                missing.append(futures[future])
+                self.stats['timeouts'][futures[future]] += 1
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    missing.append(futures[future])
+                    self.stats['errors'][futures[future]] += 1
+                    first_error = first_error or error
+                else:
+                    hits.extend(future.result())
+            if missing:
+                self.stats['partial'] += 1
+        self.last_missing = sorted(missing)
+        if len(missing) == len(self.shards):
+            if first_error is not None:
+                raise first_error
+            raise TimeoutError(f"no shard answered within {self.timeout if timeout is None else timeout:.2f}s")
+        return heapq.nlargest(top_k, hits, key=lambda hit: hit.score)
+
+    def info(self) -> StoreInfo:
+        """Summed vector count across shards"""
+        infos = self._each({pos: shard.info for pos, shard in enumerate(self.shards)})
+        counts = [getattr(infos[pos], 'vector_count', 0) for pos in range(len(self.shards))]
+        first = infos[0]
+        return StoreInfo(
+            vector_count=sum(counts),
+            dimension=getattr(first, 'dimension', 0),
+            similarity_function=getattr(first, 'similarity_function', 'COSINE'),
+            ef_search=getattr(first, 'ef_search', 0),
+            extra={'shards': len(self.shards), 'per_shard': counts, 'path': self.path},
+        )
+
+    def shard_summary(self) -> str:
+        """Query count, partial results and per-shard timeouts so far"""
+        timeouts = ', '.join(f"{pos}:{n}" for pos, n in enumerate(self.stats['timeouts']) if n)
+        return (f"Shards: {len(self.shards)}, {self.stats['queries']} queries, "
+                f"{self.stats['partial']} partial" + (f" (timeouts {timeouts})" if timeouts else ""))
+
+    # Local shards
+
+    def nbytes(self) -> int:
+        return sum(shard.nbytes() for shard in self.shards if hasattr(shard, 'nbytes'))
+
+    def calibrate(self, k: int = 10) -> List[Tuple[int, float]]:
+        return [shard.calibrate(k) for shard in self.shards]
+
+    def refresh(self) -> bool:
+        """Reload any shard another process has saved since"""
+        return any([shard.refresh() for shard in self.shards if hasattr(shard, 'refresh')])
+
+    def save(self, calibrate: bool = True, quiet: bool = False) -> bool:
+        """Save every local shard in parallel, then bump the root generation"""
+        if not self.local:
+            return True
+        start = time.perf_counter()
+        saved = self._each({pos: (lambda s=shard: s.save(calibrate=calibrate, quiet=True))
+                            for pos, shard in enumerate(self.shards)})
+        if not all(saved.values()):
+            return False
+        try:
+            with open(os.path.join(self.path, SHARDS_FILE), 'w', encoding='utf-8') as f:
+                f.write(str(len(self.shards)))
+            bump_generation(self.path)
+        except OSError as e:
+            print(f"❌ Error saving local index: {e}")
+            return False
+        if not quiet:
+            print(f"💾 Local index saved to {self.path} ({len(self.shards)} shards, "
+                  f"{time.perf_counter() - start:.2f}s)")
+        return True
+
+    def close(self) -> None:
+        """Stop the query threads and close each shard's connections"""
+        self._pool.shutdown(wait=False)
+        for shard in self.shards:
+            close = getattr(shard, 'close', None)
+            if callable(close):
+                close()
+
+
+def saved_shard_count(path: str) -> int:
+    """Shard count a local index was saved with (1 for a plain index)"""
+    try:
+        with open(os.path.join(path, SHARDS_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 1)
+    except (OSError, ValueError):
+        return 1
+
+
+def _check_layout(path: str, shards: int) -> None:
+    saved = saved_shard_count(path)
+    has_plain = os.path.exists(os.path.join(path, 'hnsw.bin'))
+    if (shards > 1 and (saved not in (1, shards) or has_plain)) or (shards == 1 and saved > 1):
+        found = saved if saved > 1 else 1
+        raise ValueError(f"Index at {path} was built with {found} shard(s) but VECTOR_SHARDS={shards}; "
+                         f"re-embed into an empty LOCAL_INDEX_DIR or change VECTOR_SHARDS")
+
+
+def open_local_index(path: Optional[str] = None, **kwargs) -> Any:
+    """LocalVectorStore, or a ShardedIndex of them when VECTOR_SHARDS > 1"""
+    path = path or local_index_dir()
+    shards = shard_count()
+    _check_layout(path, shards)
+    if shards == 1:
+        return LocalVectorStore.open(path, **kwargs)
+    return ShardedIndex(
+        [LocalVectorStore.open(os.path.join(path, f"shard-{pos:02d}"), **kwargs) for pos in range(shards)],
+        path=path,
+    )
+
+
+def open_upstash_index() -> Any:
+    """Upstash Index, or a ShardedIndex over one index per shard when VECTOR_SHARDS > 1"""
+    from upstash_vector import Index
+    from config import upstash_shard_credentials
+
+    credentials = upstash_shard_credentials(shard_count())
+    missing = [pos for pos, (url, token) in enumerate(credentials) if not url or not token]
+    if missing:
+        raise ValueError(f"Upstash credentials missing for shard(s) {', '.join(map(str, missing))}")
+    indexes = [Index(url=url, token=token) for url, token in credentials]
+    return indexes[0] if len(indexes) == 1 else ShardedIndex(indexes)
+
+
+def is_local_store(index: Any) -> bool:
+    """True for an in-process index that has to be saved to disk"""
+    return isinstance(index, LocalVectorStore) or (isinstance(index, ShardedIndex) and index.local)
+
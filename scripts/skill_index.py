@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Skill-Gap Index
+Which skills do postings ask for, and which of them does the profile lack?
+- Skill terms are normalised through one vocabulary (aliases → canonical name),
+  for posting text and the profile alike, so both sides compare exactly
+- Every posting gets a bitset over skills (forward index); every skill gets a
+  bitset over postings (inverted index), so document frequency is a popcount
+- Gap, overlap and coverage over any subset of postings are AND/NOT/popcount
+  on Python ints, with no per-posting loops over text
+- Built at ingest time (embed_job_postings.py, watch mode) and saved next to
+  the local index; the RAG prompt and the MCP server read it
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from json_stream import load_file
+
+SKILL_INDEX_VERSION = 1
+SKILL_INDEX_FILE = 'skill_index.json'
+DEFAULT_TOP = 10
+
+# Canonical skill -> aliases (regex fragments, matched case-insensitively on
+# word boundaries). Order matters where aliases overlap: more specific terms
+# come first, so "SQL Server" is not read as "SQL" followed by "Server".
+SKILL_TERMS: Dict[str, Tuple[str, ...]] = {
+    'PL/SQL': (r'pl/?sql',),
+    'SQL Server': (r'(?:ms |microsoft )?sql server', r'mssql', r't-sql'),
+    'PostgreSQL': (r'postgre(?:s|sql)',),
+    'MySQL': (r'mysql',),
+    'SQL': (r'sql',),
+    'Oracle Applications': (r'oracle (?:applications|e-?business suite|ebs|hrms)', r'oracle apps'),
+    'Oracle': (r'oracle',),
+    'Snowflake': (r'snowflake',),
+    'Databricks': (r'databricks',),
+    'BigQuery': (r'bigquery',),
+    'Redshift': (r'redshift',),
+    'Power BI': (r'power ?bi',),
+    'Power Query': (r'power ?query',),
+    'DAX': (r'dax',),
+    'Tableau': (r'tableau',),
+    'Looker': (r'looker',),
+    'Excel': (r'excel', r'pivot ?tables?', r'spreadsheets?'),
+    'VBA': (r'vba',),
+    'Python': (r'python', r'pandas'),
+    'Bash': (r'bash', r'shell scripting', r'shell scripts?'),
+    'PowerShell': (r'powershell',),
+    'C#': (r'c#', r'c sharp'),
+    '.NET': (r'\.net', r'dotnet'),
+    'Java': (r'java',),
+    'TypeScript': (r'typescript',),
+    'JavaScript': (r'javascript', r'js', r'node\.?js'),
+    'HTML/CSS': (r'html5?', r'css3?'),
+    'Next.js': (r'next\.?js',),
+    'XML/JSON': (r'xml', r'json'),
+    'REST APIs': (r'rest(?:ful)? (?:apis?|services|web services)', r'apis?'),
+    'AWS': (r'aws', r'amazon web services', r'cloudwatch', r'aws rds'),
+    'Azure': (r'(?:microsoft )?azure(?: ad)?', r'entra id'),
+    'GCP': (r'gcp', r'google cloud'),
+    'Microsoft 365': (r'microsoft 365', r'office 365', r'm365'),
+    'SharePoint': (r'sharepoint',),
+    'Windows Server': (r'windows server',),
+    'IIS': (r'iis',),
+    'Linux': (r'linux', r'unix'),
+    'Docker': (r'docker', r'containeri[sz]ation'),
+    'Kubernetes': (r'kubernetes', r'k8s'),
+    'Git': (r'git', r'github', r'gitlab', r'version control'),
+    'CI/CD': (r'ci/cd', r'continuous (?:integration|delivery|deployment)'),
+    'Datadog': (r'datadog',),
+    'Log Analysis': (r'log analysis', r'application logs', r'logs'),
+    'Xero': (r'xero',),
+    'SAP': (r'sap',),
+    'ERP': (r'erp',),
+    'Jira': (r'jira',),
+    'Zendesk': (r'zendesk',),
+    'ITIL': (r'itil',),
+    'Service Desk': (r'service desk', r'help ?desk', r'support tickets?', r'ticketing'),
+    'ETL': (r'etl', r'elt', r'data pipelines?', r'data transformation', r'data acquisition'),
+    'Data Warehousing': (r'data warehous\w*', r'warehousing'),
+    'Data Modelling': (r'data model(?:l)?ing', r'dimensional model(?:l)?ing', r'data models?'),
+    'Data Quality': (r'data quality', r'data validation', r'data cleaning', r'data accuracy',
+                     r'reconciliation'),
+    'Data Governance': (r'data governance',),
+    'Data Profiling': (r'data profiling', r'profiling sources'),
+    'Data Lineage': (r'lineage', r'source-to-target', r'source to target'),
+    'Data Visualisation': (r'data visuali[sz]ation', r'visuali[sz]ations?', r'dashboards?'),
+    'Reporting': (r'reporting', r'reports?'),
+    'Statistics': (r'statistic(?:s|al)',),
+    'Machine Learning': (r'machine learning', r'ml'),
+    'LLMs': (r'llms?', r'large language models?', r'generative ai', r'genai', r'prompt engineering'),
+    'RAG': (r'rag', r'retrieval[- ]augmented generation'),
+    'Vector Databases': (r'vector (?:databases?|search|embeddings?)', r'semantic search'),
+    'Stored Procedures': (r'stored procedures?',),
+    'Performance Tuning': (r'performance (?:bottlenecks?|tuning)',),
+    'Software Testing': (r'software testing', r'test (?:cases|strategies|strategy|plans?)', r'uat'),
+    'Troubleshooting': (r'troubleshoot\w*', r'diagnos\w+'),
+    'Root Cause Analysis': (r'root causes? analysis', r'root causes?', r'rca'),
+    'Incident Management': (r'incident (?:management|escalation|response)', r'incidents?', r'escalat\w+'),
+    'Requirements Analysis': (r'(?:business |data )?requirements', r'user stories', r'acceptance criteria',
+                              r'specifications?'),
+    'Documentation': (r'documentation', r'documenting', r'document (?:work|analysis)', r'knowledge base',
+                      r'runbooks?', r'troubleshooting guides?'),
+    'Stakeholder Communication': (r'stakeholders?', r'communicat\w+'),
+    'Workshop Facilitation': (r'workshops?', r'facilitat\w+'),
+    'Agile': (r'agile', r'scrum', r'kanban'),
+    'Problem Solving': (r'problem[- ]solving', r'analytical (?:thinking|skills)'),
+    'Customer Support': (r'customer (?:support|service|success|education)', r'application support',
+                         r'technical support'),
+}
+
+# A skill that names a more specific one (SQL Server) also implies the general skill (SQL)
+IMPLIES: Dict[str, Tuple[str, ...]] = {
+    'PL/SQL': ('SQL', 'Oracle'),
+    'SQL Server': ('SQL',),
+    'PostgreSQL': ('SQL',),
+    'MySQL': ('SQL',),
+    'Oracle Applications': ('Oracle', 'ERP'),
+    'Snowflake': ('Data Warehousing',),
+    'BigQuery': ('Data Warehousing',),
+    'Redshift': ('Data Warehousing',),
+    'Power BI': ('Data Visualisation',),
+    'Tableau': ('Data Visualisation',),
+    'Looker': ('Data Visualisation',),
+    'Next.js': ('JavaScript',),
+    'TypeScript': ('JavaScript',),
+    'SAP': ('ERP',),
+    'Stored Procedures': ('SQL',),
+}
+
+# Profile sections read for the skills the profile already has
+PROFILE_SKILL_SECTIONS = ('skills', 'certifications', 'professional_experience', 'recent_learning_projects')
+
+SKILLS: List[str] = list(SKILL_TERMS)
+SKILL_BITS: Dict[str, int] = {skill: 1 << i for i, skill in enumerate(SKILLS)}
+ALL_SKILLS = (1 << len(SKILLS)) - 1
+
+# One alternation with a named group per skill; the group that matched names the skill
+SKILL_RE = re.compile(
+    r'(?<![\w/#+.])(?:'
+    + '|'.join(f"(?P<s{i}>{'|'.join(aliases)})" for i, aliases in enumerate(SKILL_TERMS.values()))
+    + r')(?![\w#+]|/\w)',
+    re.IGNORECASE,
+)
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+def extract_skills(text: str) -> int:
+    """Skill bitset of every vocabulary term mentioned in text (implications included)"""
+    bits = 0
+    for match in SKILL_RE.finditer(text):
+        bits |= 1 << int(match.lastgroup[1:])
+    for skill, implied in IMPLIES.items():
+        if bits & SKILL_BITS[skill]:
+            for other in implied:
+                bits |= SKILL_BITS[other]
+    return bits
+
+
+def skill_names(bits: int) -> List[str]:
+    """Canonical names of the skills set in a bitset, in vocabulary order"""
+    bits &= ALL_SKILLS
+    names = []
+    while bits:
+        lowest = bits & -bits
+        names.append(SKILLS[lowest.bit_length() - 1])
+        bits ^= lowest
+    return names
+
+
+def skill_mask(names: Iterable[str]) -> int:
+    """Bitset of canonical skill names or aliases (unknown names are ignored)"""
+    bits = 0
+    for name in names:
+        bits |= SKILL_BITS.get(name) or extract_skills(name)
+    return bits
+
+
+def _profile_text(value: Any, key: str = '') -> Iterable[str]:
+    """Every key and leaf string in a profile section (keys like power_bi name skills)"""
+    if key:
+        yield key.replace('_', ' ')
+    if isinstance(value, dict):
+        for sub_key, sub_value in value.items():
+            yield from _profile_text(sub_value, sub_key)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _profile_text(item)
+    elif isinstance(value, str):
+        yield value
+
+
+def profile_skills(profile: Dict[str, Any]) -> int:
+    """Skill bitset of what the profile's skills, certifications and experience mention"""
+    text = '\n'.join(line for section in PROFILE_SKILL_SECTIONS
+                     for line in _profile_text(profile.get(section, {})))
+    return extract_skills(text)
+
+
+class SkillIndex:
+    """Posting ↔ skill index over integer bitsets
+
+    Posting n is bit n of every skill's posting list; a posting's own skill
+    set is a bitset over SKILLS. Titles and companies map to posting bitsets
+    too, so a text filter scans distinct names rather than postings. Removed
+    postings leave a free slot that the next added posting reuses, so bit
+    positions stay stable.
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.titles: List[str] = []
+        self.companies: List[str] = []
+        self.forward: List[int] = []  # slot -> skill bitset
+        self.inverted: Dict[str, int] = {skill: 0 for skill in SKILLS}  # skill -> posting bitset
+        self.live = 0  # bitset of occupied slots
+        self._slots: Dict[str, int] = {}
+        self._labels: Dict[str, int] = {}  # casefolded title or company -> posting bitset
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, posting_id: str, title: str, company: str, text: str) -> int:
+        """Index (or re-index) one posting; returns its skill bitset"""
+        bits = extract_skills(text)
+        self._place(posting_id, title, company, bits)
+        return bits
+
+    def _place(self, posting_id: str, title: str, company: str, bits: int) -> None:
+        self.remove(posting_id)
+        free = ~self.live & ((1 << len(self.ids)) - 1)
+        if free:
+            slot = (free & -free).bit_length() - 1
+        else:
+            slot = len(self.ids)
+            self.ids.append(None)
+            self.titles.append('')
+            self.companies.append('')
+            self.forward.append(0)
+        self.ids[slot], self.titles[slot], self.companies[slot], self.forward[slot] = (
+            posting_id, title, company, bits)
+        self._slots[posting_id] = slot
+        bit = 1 << slot
+        self.live |= bit
+        for skill in skill_names(bits):
+            self.inverted[skill] |= bit
+        for label in (title.casefold(), company.casefold()):
+            self._labels[label] = self._labels.get(label, 0) | bit
+
+    def remove(self, posting_id: str) -> bool:
+        slot = self._slots.pop(posting_id, None)
+        if slot is None:
+            return False
+        clear = ~(1 << slot)
+        for skill in skill_names(self.forward[slot]):
+            self.inverted[skill] &= clear
+        for label in (self.titles[slot].casefold(), self.companies[slot].casefold()):
+            if label in self._labels:
+                self._labels[label] &= clear
+                if not self._labels[label]:
+                    del self._labels[label]
+        self.live &= clear
+        self.ids[slot], self.forward[slot] = None, 0
+        return True
+
+    def select(self, text: Optional[str] = None, ids: Optional[Iterable[str]] = None) -> int:
+        """Posting bitset: all postings, those whose title/company contains text, or given ids"""
+        if ids is not None:
+            mask = 0
+            for posting_id in ids:
+                if posting_id in self._slots:
+                    mask |= 1 << self._slots[posting_id]
+            return mask
+        if not text:
+            return self.live
+        needle = text.casefold()
+        mask = 0
+        for label, postings in self._labels.items():
+            if needle in label:
+                mask |= postings
+        return mask
+
+    def demand(self, within: Optional[int] = None, skills: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(skill, postings asking for it) over within, most asked first; skills limits which"""
+        within = self.live if within is None else within
+        counts = []
+        for skill in SKILLS:
+            if skills is not None and not skills & SKILL_BITS[skill]:
+                continue
+            df = _popcount(self.inverted[skill] & within)
+            if df:
+                counts.append((skill, df))
+        counts.sort(key=lambda item: -item[1])
+        return counts
+
+    def gaps(self, have: int, within: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Skills the postings ask for that are not in have, most asked first"""
+        return self.demand(within, skills=~have)
+
+    def overlap(self, have: int, within: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Skills the postings ask for that are in have, most asked first"""
+        return self.demand(within, skills=have)
+
+    def coverage(self, have: int, within: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per posting: how many of its skills have covers, best match first"""
+        within = self.live if within is None else within
+        rows = []
+        for posting_id, slot in self._slots.items():
+            if not within >> slot & 1:
+                continue
+            wanted = self.forward[slot]
+            required = _popcount(wanted)
+            covered = _popcount(wanted & have)
+            rows.append({
+                'id': posting_id, 'title': self.titles[slot], 'company': self.companies[slot],
+                'required': required, 'covered': covered,
+                'coverage': covered / required if required else 1.0,
+                'missing': skill_names(wanted & ~have),
+            })
+        rows.sort(key=lambda row: (-row['coverage'], row['id']))
+        return rows
+
+    def report(self, have: int, within: Optional[int] = None, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Gap, overlap and coverage in one JSON-ready dict"""
+        within = self.live if within is None else within
+        return {
+            'postings': _popcount(within),
+            'gaps': self.gaps(have, within)[:top],
+            'overlap': self.overlap(have, within)[:top],
+            'coverage': self.coverage(have, within),
+        }
+
+    def summary(self, have: int, within: Optional[int] = None, top: int = DEFAULT_TOP) -> str:
+        """Plain-text report for prompts and tool results"""
+        report = self.report(have, within, top)
+        total = report['postings']
+        if not total:
+            return "No job postings are indexed for skill analysis."
+        lines = [f"Skill demand across {total} job posting(s):"]
+        lines.append("Most requested skills I lack: " + (
+            ', '.join(f"{skill} ({df}/{total})" for skill, df in report['gaps']) or "none"))
+        lines.append("Most requested skills I have: " + (
+            ', '.join(f"{skill} ({df}/{total})" for skill, df in report['overlap']) or "none"))
+        lines.append("Coverage per posting:")
+        for row in report['coverage']:
+            missing = f"; missing {', '.join(row['missing'])}" if row['missing'] else ''
+            lines.append(f"- {row['title']} at {row['company']}: {row['covered']}/{row['required']} "
+                         f"({row['coverage']:.0%}){missing}")
+        return '\n'.join(lines)
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """Write the forward index (the inverted one is rebuilt on load)"""
+        path = path or skill_index_path()
+        postings = [{'id': self.ids[slot], 'title': self.titles[slot], 'company': self.companies[slot],
+                     'skills': skill_names(self.forward[slot])}
+                    for slot in sorted(self._slots.values())]
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SKILL_INDEX_VERSION, 'postings': postings}, f, indent=1)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            print(f"⚠️  Could not save skill index: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'SkillIndex':
+        """Load a saved index, or return an empty one if there is none (or it is unreadable)"""
+        path = path or skill_index_path()
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring skill index {path}: {e}")
+            return index
+        if saved.get('version') != SKILL_INDEX_VERSION:
+            return index
+        for posting in saved.get('postings', []):
+            # Names are re-resolved, so a vocabulary change drops unknown skills instead of shifting bits
+            bits = skill_mask(name for name in posting['skills'] if name in SKILL_BITS)
+            index._place(posting['id'], posting.get('title', ''), posting.get('company', ''), bits)
+        return index
+
+
+def skill_index_path() -> str:
+    """File holding the saved skill index"""
+    from vector_store import local_index_dir
+    return os.getenv('SKILL_INDEX_FILE') or os.path.join(local_index_dir(), SKILL_INDEX_FILE)
+
+
+def build_from_directory(directory: str, index: Optional[SkillIndex] = None) -> SkillIndex:
+    """Index every posting markdown file in directory"""
+    from embed_job_postings import parse_job_posting
+    index = index or SkillIndex()
+    with os.scandir(directory) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.name.endswith('.md') and entry.is_file():
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    job = parse_job_posting(entry.name, f.read())
+                index.add(job.id, job.title, job.company, job.content)
+    return index
+
+
+def load_profile_skills(profile_path: str) -> int:
+    return profile_skills(load_file(profile_path))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Build the skill index or query it"""
+    from embed_job_postings import JOB_POSTINGS_DIR
+    from embed_digitaltwin import JSON_FILE
+
+    parser = argparse.ArgumentParser(description="Skill-gap analytics over job postings")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Rebuild the index from the postings directory")
+    build.add_argument('--dir', default=JOB_POSTINGS_DIR)
+    for name, help_text in (('gaps', "Most requested skills the profile lacks"),
+                            ('overlap', "Most requested skills the profile has"),
+                            ('coverage', "How much of each posting the profile covers"),
+                            ('report', "Gaps, overlap and coverage as text (what the RAG prompt sees)")):
+        query = sub.add_parser(name, help=help_text)
+        query.add_argument('--filter', help="Only postings whose title or company contains this")
+        query.add_argument('--profile', default=JSON_FILE, help=f"Profile JSON (default: {JSON_FILE})")
+        query.add_argument('--top', type=int, default=DEFAULT_TOP)
+        query.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        index = build_from_directory(args.dir)
+        if not index.save():
+            return 1
+        print(f"✅ Indexed {len(index)} posting(s), {len(index.demand())} distinct skill(s) "
+              f"→ {skill_index_path()}")
+        return 0
+
+    index = SkillIndex.load()
+    if not len(index):
+        print("❌ Skill index is empty. Run: python scripts/cli.py skills build")
+        return 1
+    have = load_profile_skills(args.profile)
+    within = index.select(args.filter)
+    if args.command == 'report':
+        result: Any = index.summary(have, within, args.top)
+    elif args.command == 'coverage':
+        result = index.coverage(have, within)
+    else:
+        result = getattr(index, args.command)(have, within)[:args.top]
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif args.command == 'report':
+        print(result)
+    elif args.command == 'coverage':
+        for row in result:
+            print(f"{row['coverage']:>5.0%}  {row['covered']:>2}/{row['required']:<2} {row['title']} "
+                  f"({row['company']})  missing: {', '.join(row['missing']) or '-'}")
+    else:
+        total = _popcount(within)
+        for skill, df in result:
+            print(f"{df:>4}/{total:<4} {skill}")
+    return 0
+
+
+if __name__ == '__main__':
+    from profiling import run
+    sys.exit(run(main))
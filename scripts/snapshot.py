@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Versioned Vector Index Snapshots
+Single-file, memory-mapped snapshot of vectors, ids, metadata and HNSW graph
+- Fixed header with format version, then a section table with CRC32 checksums
+- Sections are 64-byte aligned raw arrays, so opening is a handful of
+  memoryview casts: no JSON parsing and no network calls
+- Files are mapped read-only, so every process that opens the same snapshot
+  shares the same page-cache pages
+
+Usage:
+    python scripts/snapshot.py export index.dtsnap [--source local|upstash]
+    python scripts/snapshot.py import index.dtsnap [--target local|upstash]
+    python scripts/snapshot.py verify index.dtsnap
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ann_index import HNSWIndex
+from profiling import run
+from vector_store import ANN_THRESHOLD, EMBEDDING_DIM, QueryResult, StoreInfo, hash_embed, local_embedder
+
+SNAPSHOT_MAGIC = b'DTSNAP\x00\x00'
+SNAPSHOT_VERSION = 1
+LOCAL_EMBEDDING = f'hash-ngram-{EMBEDDING_DIM}'  # vectors produced by vector_store.hash_embed
+ALIGNMENT = 64
+BATCH_SIZE = 100
+
+# magic, version, dim, node count, m, ef_search, entry point, max level, section count
+HEADER_FORMAT = '<8sIIIIIiiI'
+# name, offset, length, crc32
+SECTION_FORMAT = '<8sQQI4x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SECTION_SIZE = struct.calcsize(SECTION_FORMAT)
+
+SECTION_NAMES = ('vectors', 'idoffs', 'ids', 'metaoffs', 'meta', 'levels', 'linkoffs', 'links',
+                 'deleted', 'manifest')
+
+
+class SnapshotError(Exception):
+    """Raised for malformed, unsupported or corrupted snapshot files"""
+
+
+def _string_arena(values: Sequence[Optional[bytes]]) -> Tuple[array, bytes]:
+    """Pack byte strings into (offsets, arena); offsets has len(values) + 1 entries"""
+    offsets = array('Q', [0])
+    parts = []
+    total = 0
+    for value in values:
+        value = value or b''
+        parts.append(value)
+        total += len(value)
+        offsets.append(total)
+    return offsets, b''.join(parts)
+
+
+def write_snapshot(path: str, index: HNSWIndex, ids: Sequence[Optional[str]],
+                   metadata: Sequence[Optional[Dict[str, Any]]], manifest: Dict[str, Any]) -> int:
+    """Write a snapshot atomically; returns the file size in bytes
+
+    ids and metadata are aligned with the index's node numbers; None marks a
+    tombstoned node.
+    """
+    vectors = array('f')
+    for node in range(index.node_count):
+        vectors.extend(index.vector(node))
+    idoffs, id_arena = _string_arena([i.encode('utf-8') if i is not None else None for i in ids])
+    metaoffs, meta_arena = _string_arena([
+        json.dumps(m, separators=(',', ':')).encode('utf-8') if m is not None else None
+        for m in metadata
+    ])
+    levels, linkoffs, links = index.export_graph()
+    deleted = array('i', sorted(index.deleted))
+
+    manifest = dict(manifest)
+    manifest.setdefault('created_at', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+    manifest['vector_count'] = sum(1 for i in ids if i is not None)
+
+    payloads = {
+        'vectors': vectors.tobytes(),
+        'idoffs': idoffs.tobytes(),
+        'ids': id_arena,
+        'metaoffs': metaoffs.tobytes(),
+        'meta': meta_arena,
+        'levels': levels.tobytes(),
+        'linkoffs': linkoffs.tobytes(),
+        'links': links.tobytes(),
+        'deleted': deleted.tobytes(),
+        'manifest': json.dumps(manifest, indent=2).encode('utf-8'),
+    }
+
+    table = []
+    offset = _align(HEADER_SIZE + SECTION_SIZE * len(SECTION_NAMES))
+    for name in SECTION_NAMES:
+        data = payloads[name]
+        table.append((name, offset, len(data), zlib.crc32(data)))
+        offset = _align(offset + len(data))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack(
+            HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, index.dim, index.node_count,
+            index.m, index.ef_search, index.entry_point, index.max_level, len(table),
+        ))
+        for name, section_offset, length, crc in table:
+            f.write(struct.pack(SECTION_FORMAT, name.encode('ascii'), section_offset, length, crc))
+        for name, section_offset, length, _ in table:
+            f.write(b'\x00' * (section_offset - f.tell()))
+            f.write(payloads[name])
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def _align(offset: int) -> int:
+    """Round offset up to the section alignment"""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class _MappedVectors:
+    """Sequence of per-node float views over the mapped vector section"""
+
+    def __init__(self, view: memoryview, dim: int, count: int):
+        self._view = view
+        self._dim = dim
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, node: int) -> memoryview:
+        start = node * self._dim
+        return self._view[start:start + self._dim]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for node in range(self._count):
+            yield self[node]
+
+
+class _MappedLinks:
+    """Sequence of per-node link lists decoded on demand from the mapped graph"""
+
+    def __init__(self, levels: memoryview, offsets: memoryview, links: memoryview):
+        self._levels = levels
+        self._offsets = offsets
+        self._links = links
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def __getitem__(self, node: int) -> List[memoryview]:
+        pos = self._offsets[node]
+        layers = []
+        for _ in range(self._levels[node] + 1):
+            n = self._links[pos]
+            layers.append(self._links[pos + 1:pos + 1 + n])
+            pos += n + 1
+        return layers
+
+
+class SnapshotIndex:
+    """Read-only vector index served straight from a memory-mapped snapshot"""
+
+    def __init__(self, path: str, verify: bool = False):
+        """Map a snapshot; verify=True also checks every section checksum"""
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"{path} is empty")
+        self._view = memoryview(self._mmap)
+        self._views: List[memoryview] = []
+        self._sections = self._read_header()
+        if verify:
+            self.verify()
+
+        self._ids = self._cast('ids', 'B')
+        self._idoffs = self._cast('idoffs', 'Q')
+        self._meta = self._cast('meta', 'B')
+        self._metaoffs = self._cast('metaoffs', 'Q')
+        self.index = HNSWIndex.from_graph(
+            self.dim,
+            _MappedVectors(self._cast('vectors', 'f'), self.dim, self.node_count),
+            _MappedLinks(self._cast('levels', 'i'), self._cast('linkoffs', 'Q'), self._cast('links', 'i')),
+            self._cast('deleted', 'i'),
+            self._entry, self._max_level, m=self._m, ef_search=self._ef_search,
+        )
+        self._nodes: Optional[Dict[str, int]] = None
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def open(cls, path: str, verify: bool = False, text_queries: bool = False) -> 'SnapshotIndex':
+        """Open a snapshot for querying
+
+        text_queries refuses, with SnapshotError, a snapshot whose vectors no
+        in-process embedder can match (e.g. one exported from Upstash).
+        """
+        snapshot = cls(path, verify=verify)
+        if text_queries:
+            try:
+                snapshot.check_text_queries()
+            except SnapshotError:
+                snapshot.close()
+                raise
+        return snapshot
+
+    def _read_header(self) -> Dict[str, Tuple[int, int, int]]:
+        """Validate the header and return {section: (offset, length, crc)}"""
+        if len(self._view) < HEADER_SIZE:
+            raise SnapshotError(f"{self.path} is too small to be a snapshot")
+        (magic, version, self.dim, self.node_count, self._m, self._ef_search,
+         self._entry, self._max_level, section_count) = struct.unpack_from(HEADER_FORMAT, self._view, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{self.path} is not a digital twin snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{self.path} is snapshot version {version}; this build reads {SNAPSHOT_VERSION}")
+
+        sections = {}
+        for i in range(section_count):
+            name, offset, length, crc = struct.unpack_from(SECTION_FORMAT, self._view, HEADER_SIZE + i * SECTION_SIZE)
+            if offset + length > len(self._view):
+                raise SnapshotError(f"{self.path} is truncated (section {name!r})")
+            sections[name.rstrip(b'\x00').decode('ascii')] = (offset, length, crc)
+        missing = set(SECTION_NAMES) - set(sections)
+        if missing:
+            raise SnapshotError(f"{self.path} is missing sections: {', '.join(sorted(missing))}")
+        return sections
+
+    def _section(self, name: str) -> memoryview:
+        """Zero-copy view of one section"""
+        offset, length, _ = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def _cast(self, name: str, fmt: str) -> memoryview:
+        """Typed zero-copy view of one section (tracked so close() can release it)"""
+        section = self._section(name)
+        typed = section.cast(fmt)
+        self._views.extend((section, typed))
+        return typed
+
+    def verify(self) -> None:
+        """Check every section checksum; raises SnapshotError on mismatch"""
+        for name, (offset, length, crc) in self._sections.items():
+            if zlib.crc32(self._view[offset:offset + length]) != crc:
+                raise SnapshotError(f"{self.path}: checksum mismatch in section '{name}'")
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        """Snapshot manifest (decoded on first access)"""
+        if self._manifest is None:
+            self._manifest = json.loads(bytes(self._section('manifest')))
+        return self._manifest
+
+    def id_at(self, node: int) -> Optional[str]:
+        """Vector id of a node, or None for a tombstone"""
+        start, end = self._idoffs[node], self._idoffs[node + 1]
+        if start == end:
+            return None
+        return bytes(self._ids[start:end]).decode('utf-8')
+
+    def metadata_at(self, node: int) -> Optional[Dict[str, Any]]:
+        """Metadata of a node, decoded only when asked for"""
+        start, end = self._metaoffs[node], self._metaoffs[node + 1]
+        if start == end:
+            return None
+        return json.loads(bytes(self._meta[start:end]))
+
+    def node_of(self, vector_id: str) -> Optional[int]:
+        """Node number for an id (builds the id map lazily on first lookup)"""
+        if self._nodes is None:
+            self._nodes = {}
+            for node in range(self.node_count):
+                node_id = self.id_at(node)
+                if node_id is not None:
+                    self._nodes[node_id] = node
+        return self._nodes.get(vector_id)
+
+    @property
+    def embedding_name(self) -> str:
+        return self.manifest.get('embedding', LOCAL_EMBEDDING)
+
+    def embed(self, text: str) -> array:
+        """Embed query text with the model the snapshot was built from"""
+        return self._text_embedder()(text)
+
+    def check_text_queries(self) -> None:
+        """Raise SnapshotError unless questions can be embedded like the snapshot's vectors"""
+        self._text_embedder()
+
+    def _text_embedder(self) -> Callable[[str], array]:
+        embedding = self.embedding_name
+        if embedding == f'hash-ngram-{self.dim}':
+            return lambda text: hash_embed(text, self.dim)
+        if embedding.startswith('upstash:'):
+            raise SnapshotError(
+                f"{self.path} was exported from Upstash: its vectors come from Upstash's hosted model, "
+                f"which cannot embed questions in process. Import it with 'snapshot.py import --target "
+                f"upstash', or export the snapshot from a local index"
+            )
+        embedder = local_embedder(self.dim) if embedding.startswith('onnx:') else None
+        if embedder is None or embedder.name != embedding:
+            raise SnapshotError(
+                f"Snapshot vectors come from '{embedding}'; query with a raw vector instead of text"
+            )
+        return embedder.embed
+
+    def query(self, vector: Optional[Sequence[float]] = None, data: Optional[str] = None,
+              top_k: int = 10, include_metadata: bool = False, include_vectors: bool = False,
+              ef: Optional[int] = None, exact: Optional[bool] = None) -> List[QueryResult]:
+        """Nearest-neighbour search, same signature as LocalVectorStore.query"""
+        if vector is None:
+            if data is None:
+                raise ValueError("query() needs either vector or data")
+            vector = self.embed(data)
+        if exact is None:
+            exact = ef is None and len(self.index) <= ANN_THRESHOLD
+        hits = self.index.brute_force(vector, top_k) if exact else self.index.search(vector, top_k, ef)
+        return [
+            QueryResult(
+                id=self.id_at(node),
+                score=(1 + sim) / 2,
+                metadata=self.metadata_at(node) if include_metadata else None,
+                vector=self.index.vector(node).tolist() if include_vectors else None,
+            )
+            for node, sim in hits
+        ]
+
+    def fetch(self, ids: Sequence[str], include_metadata: bool = False,
+              include_vectors: bool = False) -> List[Optional[QueryResult]]:
+        """Look up vectors by id"""
+        results: List[Optional[QueryResult]] = []
+        for vector_id in ids:
+            node = self.node_of(vector_id)
+            if node is None:
+                results.append(None)
+                continue
+            results.append(QueryResult(
+                id=vector_id,
+                score=1.0,
+                metadata=self.metadata_at(node) if include_metadata else None,
+                vector=self.index.vector(node).tolist() if include_vectors else None,
+            ))
+        return results
+
+    def info(self) -> StoreInfo:
+        """Vector count and dimension"""
+        return StoreInfo(
+            vector_count=len(self.index),
+            dimension=self.dim,
+            ef_search=self.index.ef_search,
+            extra={'nodes': self.node_count, 'path': self.path, 'read_only': True},
+        )
+
+    def iter_records(self) -> Iterator[Tuple[str, memoryview, Optional[Dict[str, Any]]]]:
+        """Yield (id, vector, metadata) for every live node"""
+        for node in range(self.node_count):
+            vector_id = self.id_at(node)
+            if vector_id is not None:
+                yield vector_id, self.index.vector(node), self.metadata_at(node)
+
+    def close(self) -> None:
+        """Release the mapping (views still held by callers keep it alive until dropped)"""
+        self.index = None
+        try:
+            for view in reversed(self._views):
+                view.release()
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def _require_unsharded() -> None:
+    from sharded_store import shard_count
+    if shard_count() > 1:
+        raise SnapshotError("Snapshots hold a single unsharded index; run with VECTOR_SHARDS=1")
+
+
+def export_local(path: str) -> int:
+    """Snapshot the on-disk local vector store"""
+    from vector_store import LocalVectorStore
+    _require_unsharded()
+
+    store = LocalVectorStore.open()
+    if store.info().vector_count == 0:
+        raise SnapshotError(f"Local index at {store.path} is empty")
+    nodes = range(store.index.node_count)
+    return write_snapshot(path, store.index, [store.id_at(n) for n in nodes], [store.metadata_at(n) for n in nodes], {
+        'source': 'local',
+        'embedding': store.embedder.name,
+    })
+
+
+def export_upstash(path: str) -> int:
+    """Snapshot an Upstash index by paging through range() with vectors and metadata"""
+    from upstash_vector import Index
+    from config import upstash_credentials
+    _require_unsharded()
+
+    url, token = upstash_credentials()
+    if not url or not token:
+        raise SnapshotError("Upstash Vector credentials not found in environment")
+
+    remote = Index(url=url, token=token)
+    info = remote.info()
+    index = HNSWIndex(info.dimension)
+    ids: List[str] = []
+    metadata: List[Optional[Dict[str, Any]]] = []
+    cursor = ''
+    while True:
+        page = remote.range(cursor=cursor, limit=BATCH_SIZE, include_vectors=True, include_metadata=True)
+        for item in page.vectors:
+            index.add(item.vector)
+            ids.append(item.id)
+            metadata.append(item.metadata)
+        print(f"  ✓ Exported {len(ids)} vectors")
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    index.tune_ef(0.95)
+    print("⚠️  Upstash embeds text with its hosted model: this snapshot can be imported back, "
+          "but not served with SNAPSHOT_PATH")
+    return write_snapshot(path, index, ids, metadata, {
+        'source': 'upstash',
+        'embedding': f"upstash:{getattr(info, 'similarity_function', 'COSINE')}:{info.dimension}",
+    })
+
+
+def import_local(snapshot: SnapshotIndex) -> bool:
+    """Restore a snapshot into the writable local vector store"""
+    from vector_store import LocalVectorStore
+    _require_unsharded()
+
+    index = HNSWIndex.from_graph(
+        snapshot.dim,
+        [array('f', snapshot.index.vector(node)) for node in range(snapshot.node_count)],
+        [[list(layer) for layer in snapshot.index.links(node)] for node in range(snapshot.node_count)],
+        snapshot.index.deleted, snapshot.index.entry_point, snapshot.index.max_level,
+        m=snapshot._m, ef_search=snapshot._ef_search,
+    )
+    nodes = range(snapshot.node_count)
+    store = LocalVectorStore.from_records(
+        index, [snapshot.id_at(n) for n in nodes], [snapshot.metadata_at(n) for n in nodes]
+    )
+    return store.save()
+
+
+def import_upstash(snapshot: SnapshotIndex) -> bool:
+    """Upsert a snapshot's raw vectors into Upstash"""
+    from upstash_vector import Index
+    from config import upstash_credentials
+    _require_unsharded()
+
+    url, token = upstash_credentials()
+    if not url or not token:
+        raise SnapshotError("Upstash Vector credentials not found in environment")
+
+    remote = Index(url=url, token=token)
+    batch = []
+    total = 0
+    for vector_id, vector, metadata in snapshot.iter_records():
+        batch.append((vector_id, vector.tolist(), metadata))
+        if len(batch) >= BATCH_SIZE:
+            remote.upsert(vectors=batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        remote.upsert(vectors=batch)
+        total += len(batch)
+    print(f"  ✓ Imported {total} vectors into Upstash")
+    return True
+
+
+def main(argv: List[str] = None) -> int:
+    """Snapshot command line"""
+    parser = argparse.ArgumentParser(description="Export, import and verify vector index snapshots")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_cmd = sub.add_parser('export', help="Write a snapshot from the local index or Upstash")
+    export_cmd.add_argument('path')
+    export_cmd.add_argument('--source', choices=['local', 'upstash'], default='local')
+    import_cmd = sub.add_parser('import', help="Load a snapshot into the local index or Upstash")
+    import_cmd.add_argument('path')
+    import_cmd.add_argument('--target', choices=['local', 'upstash'], default='local')
+    verify_cmd = sub.add_parser('verify', help="Check header and section checksums")
+    verify_cmd.add_argument('path')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'export':
+            start = time.perf_counter()
+            size = export_local(args.path) if args.source == 'local' else export_upstash(args.path)
+            print(f"✅ Wrote {args.path} ({size / 1024:.1f} KB, {time.perf_counter() - start:.2f}s)")
+            return 0
+
+        start = time.perf_counter()
+        snapshot = SnapshotIndex.open(args.path, verify=True)
+        print(f"✅ {args.path}: v{SNAPSHOT_VERSION}, {snapshot.info().vector_count} vectors, "
+              f"dim {snapshot.dim}, checksums OK ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        print(f"📋 Manifest: {json.dumps(snapshot.manifest)}")
+        if args.command == 'import':
+            ok = import_local(snapshot) if args.target == 'local' else import_upstash(snapshot)
+            snapshot.close()
+            return 0 if ok else 1
+        snapshot.close()
+        return 0
+    except (SnapshotError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Tailored Answer Generator
+Interview question bank x job postings -> one tailored answer per pair, as JSONL
+- Bounded worker pool running as a batch job of the request scheduler: it uses
+  only spare Groq/Upstash capacity and yields to live questions in the same process
+- Retrieval runs once per question and is shared by every posting
+- Identical prompts are generated once; the answer is reused for each pair
+- The output file is the checkpoint: finished pairs are skipped on restart
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from embed_job_postings import JOB_POSTINGS_DIR, JobPosting, parse_job_posting
+from profiling import run
+from resilience import Deadline, ResilientCall
+from scheduler import batch_job
+
+OUTPUT_FILE = 'tailored_answers.jsonl'
+REQUIREMENTS_CHARS = 1200
+GENERATION_DEADLINE = 60.0
+MAX_ATTEMPTS = 5
+PROGRESS_EVERY = 10
+BATCH_JOB = 'tailor'
+
+REQUIREMENT_LINE_RE = re.compile(
+    r'\b(experience|skills?|knowledge|understanding|proficien\w*|qualifications?|familiar\w*|'
+    r'ability|able to|degree|certifi\w*|strong|solid)\b', re.IGNORECASE)
+
+
+@dataclass
+class Question:
+    """One entry of the profile's interview question bank"""
+    id: str
+    text: str
+
+
+def question_bank(profile: Dict[str, Any]) -> List[Question]:
+    """Behavioral, technical and screening questions from the profile, deduplicated by text"""
+    prep = profile.get('interview_prep', {})
+    screening = profile.get('interview_screening', {}).get('screening_questions', {})
+    found: List[Question] = []
+    for kind in ('behavioral', 'technical'):
+        for idx, item in enumerate(prep.get(kind, [])):
+            if item.get('question'):
+                found.append(Question(f"{kind}_{idx}", item['question']))
+    for key, item in screening.items():
+        if isinstance(item, dict) and item.get('question'):
+            found.append(Question(f"screening_{key}", item['question']))
+
+    seen: Set[str] = set()
+    unique = []
+    for question in found:
+        normalized = ' '.join(question.text.split()).casefold()
+        if normalized not in seen:
+            seen.add(normalized)
+            unique.append(question)
+    return unique
+
+
+def load_postings(directory: str) -> List[JobPosting]:
+    """Parse every markdown posting in a directory"""
+    postings = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.md'):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                postings.append(parse_job_posting(name, f.read()))
+    return postings
+
+
+def requirements_of(job: JobPosting, max_chars: int = REQUIREMENTS_CHARS) -> str:
+    """Requirement-like lines of a posting (skills, experience, qualifications)"""
+    lines = [line.strip() for line in job.content.splitlines()]
+    picked = [line for line in lines if len(line) > 30 and REQUIREMENT_LINE_RE.search(line)]
+    text = '\n'.join(f"- {line}" for line in picked) or job.content.strip()
+    return text[:max_chars]
+
+
+def build_prompt(question: str, context: str, job: JobPosting, requirements: str) -> str:
+    """Interview prompt tailored to one posting; same shape as rag_query's prompt"""
+    return f"""Based on the following professional information, provide a compelling interview response for this specific role:
+
+Professional Context:
+{context}
+
+Target Role: {job.title} at {job.company}
+Role Requirements:
+{requirements}
+
+Interview Question: {question}
+
+Guidelines:
+- Speak in first person as the professional
+- Connect your examples to the role requirements above
+- Include specific examples and metrics
+- Use STAR format (Situation-Task-Action-Result) when telling stories
+- Sound confident and natural
+- Directly address the question
+
+Response:"""
+
+
+class SingleFlight:
+    """Compute each key once; concurrent callers for the same key share the result"""
+
+    def __init__(self, preset: Optional[Dict[str, Any]] = None):
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+        for key, value in (preset or {}).items():
+            future: Future = Future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def get(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(value, reused) for key; failed computations are retried by the next caller"""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.computed += 1
+            else:
+                self.reused += 1
+        if owner:
+            try:
+                future.set_result(compute())
+            except Exception as e:
+                with self._lock:
+                    del self._futures[key]
+                future.set_exception(e)
+        return future.result(), not owner
+
+
+class CheckpointWriter:
+    """Append-only JSONL output that doubles as the resume checkpoint"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[Tuple[str, str]] = set()
+        self.answers: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._recover()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self) -> None:
+        """Load finished pairs and drop a line torn by a crash mid-write"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') == 'ok':
+                self.done.add((record['posting_id'], record['question_id']))
+                self.answers[record['prompt_hash']] = record['answer']
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class TailoredAnswerBatch:
+    """Generates an answer for every (posting, question) pair not yet in the output"""
+
+    def __init__(self, twin, writer: CheckpointWriter, workers: int = 8,
+                 model: Optional[str] = None, dry_run: bool = False, job: str = BATCH_JOB):
+        self.twin = twin
+        self.writer = writer
+        self.scheduler = twin.scheduler
+        self.job = job
+        self.workers = workers
+        self.model = model
+        self.dry_run = dry_run
+        self.retrievals = SingleFlight()
+        self.generations = SingleFlight(writer.answers)
+        self.stats = {'pairs': 0, 'skipped': 0, 'ok': 0, 'errors': 0, 'retries': 0}
+        self._stats_lock = threading.Lock()
+        # Batch traffic is paced by the scheduler; hedged duplicates would only burn quota
+        twin.generation = ResilientCall('generation', hedge=False, failure_threshold=MAX_ATTEMPTS * workers)
+
+    def _context(self, question: Question) -> Tuple[str, List[str]]:
+        result = self.twin.retrieve(question.text)
+        if not result.ok:
+            raise RuntimeError(result.error.message)
+        context = '\n'.join(f"{r['title']}: {r['content']}" for r in result.value if r.get('content'))
+        return context, [r['id'] for r in result.value]
+
+    def _generate(self, prompt: str) -> str:
+        """One provider call, paced by the scheduler and retried on rate limits and errors"""
+        if self.dry_run:
+            return ''
+        kwargs = {'model': self.model} if self.model else {}
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            result = self.twin.generate_response(prompt, deadline=Deadline(GENERATION_DEADLINE), **kwargs)
+            if result.ok:
+                return result.value
+            if result.error.kind == 'unavailable' or attempt == MAX_ATTEMPTS:
+                raise RuntimeError(result.error.message)
+            with self._stats_lock:
+                self.stats['retries'] += 1
+            if result.error.kind == 'rate_limited':
+                # The twin has paused Groq for the wait asked for; back off further when none was given
+                if result.error.retry_after is None:
+                    self.scheduler.pause('groq', 2 ** attempt)
+            else:
+                time.sleep(min(2 ** attempt, 30))
+        raise RuntimeError("unreachable")
+
+    def _run_pair(self, job: JobPosting, requirements: str, question: Question) -> None:
+        with batch_job(self.job):
+            self._answer_pair(job, requirements, question)
+
+    def _answer_pair(self, job: JobPosting, requirements: str, question: Question) -> None:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {
+            'posting_id': job.id, 'posting_title': job.title, 'company': job.company,
+            'question_id': question.id, 'question': question.text,
+        }
+        try:
+            (context, context_ids), _ = self.retrievals.get(question.text, lambda: self._context(question))
+            prompt = build_prompt(question.text, context, job, requirements)
+            prompt_hash = hashlib.sha1(
+                f"{self.model}\n{self.twin.system_prompt}\n{prompt}".encode('utf-8')).hexdigest()
+            answer, reused = self.generations.get(prompt_hash, lambda: self._generate(prompt))
+            record.update(answer=answer, prompt_hash=prompt_hash, context_ids=context_ids, reused=reused,
+                          status='dry_run' if self.dry_run else 'ok')
+            if self.dry_run:
+                record['prompt'] = prompt
+            outcome = 'ok'
+        except Exception as e:
+            record.update(status='error', error=str(e))
+            outcome = 'errors'
+        record['elapsed_s'] = round(time.perf_counter() - started, 3)
+        self.writer.write(record)
+
+        with self._stats_lock:
+            self.stats[outcome] += 1
+            finished = self.stats['ok'] + self.stats['errors']
+            if finished % PROGRESS_EVERY == 0:
+                print(f"  ✓ {finished}/{self.stats['pairs'] - self.stats['skipped']} pairs "
+                      f"({self.generations.computed} prompts, {self.generations.reused} reused)")
+
+    def run(self, postings: List[JobPosting], questions: List[Question]) -> Dict[str, Any]:
+        """Process every unfinished pair; returns run statistics"""
+        started = time.perf_counter()
+        requirements = {job.id: requirements_of(job) for job in postings}
+        pending = []
+        # Question-major order keeps each question's shared retrieval hot
+        for question in questions:
+            for job in postings:
+                self.stats['pairs'] += 1
+                if (job.id, question.id) in self.writer.done:
+                    self.stats['skipped'] += 1
+                else:
+                    pending.append((job, requirements[job.id], question))
+
+        print(f"🔄 {len(pending)} pairs to generate ({self.stats['skipped']} already done, "
+              f"{len(postings)} postings x {len(questions)} questions, {self.workers} workers)")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tailor') as pool:
+            for future in [pool.submit(self._run_pair, *args) for args in pending]:
+                future.result()
+
+        elapsed = time.perf_counter() - started
+        return {**self.stats, 'generated': self.generations.computed, 'prompt_reuse': self.generations.reused,
+                'retrievals': self.retrievals.computed, 'retrieval_reuse': self.retrievals.reused,
+                'elapsed_s': elapsed, 'rate_wait_s': self.scheduler.jobs.get(self.job, {}).get('waited_s', 0.0),
+                'requests_per_min': self.generations.computed / elapsed * 60 if elapsed else 0.0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate interview answers tailored to each job posting")
+    parser.add_argument('--postings', default=JOB_POSTINGS_DIR, help="Directory of posting markdown files")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="JSONL output (also the resume checkpoint)")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rpm', type=float, default=float(os.getenv('GROQ_RPM', '30')),
+                        help="Groq requests per minute (batch work uses SCHEDULER_BATCH_SHARE of it)")
+    parser.add_argument('--tpm', type=float, default=float(os.getenv('GROQ_TPM', '0')),
+                        help="Groq tokens per minute")
+    parser.add_argument('--model', help="Groq model (default: DigitalTwinRAG's)")
+    parser.add_argument('--questions', type=int, help="Only the first N questions of the bank")
+    parser.add_argument('--dry-run', action='store_true', help="Retrieve and write prompts without calling the LLM")
+    args = parser.parse_args(argv)
+
+    from digital_twin_rag import DigitalTwinRAG
+    print("🤖 Tailored Answer Generator\n")
+    print("=" * 60)
+    twin = DigitalTwinRAG()
+    if not twin.setup_vector_database():
+        print("❌ Vector database unavailable")
+        return 1
+    if not twin.load_profile_data():
+        return 1
+    if not args.dry_run and not twin.setup_groq_client():
+        print("❌ An LLM is required (or pass --dry-run)")
+        return 1
+
+    postings = load_postings(args.postings)
+    questions = question_bank(twin.profile_data)[:args.questions]
+    if not postings or not questions:
+        print("❌ Need at least one posting and one interview question")
+        return 1
+
+    twin.scheduler.limit('groq', args.rpm, args.tpm)
+    writer = CheckpointWriter(args.output)
+    batch = TailoredAnswerBatch(twin, writer, workers=args.workers, model=args.model, dry_run=args.dry_run)
+    try:
+        stats = batch.run(postings, questions)
+    finally:
+        writer.close()
+
+    print("\n" + "=" * 60)
+    print(f"✅ {stats['ok']} answers written to {args.output} ({stats['skipped']} resumed, {stats['errors']} failed)")
+    print(f"📊 {stats['generated']} unique prompts, {stats['prompt_reuse']} answered by reuse, "
+          f"{stats['retrievals']} retrievals shared by {stats['retrieval_reuse']} other pairs")
+    print(f"⏱️  {stats['elapsed_s']:.1f}s, {stats['requests_per_min']:.1f} requests/min, "
+          f"{stats['rate_wait_s']:.1f} worker-seconds waiting on rate limits, {stats['retries']} retries")
+    return 0 if stats['errors'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
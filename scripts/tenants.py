@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Multi-Tenant Digital Twins
+Serves many candidate twins from one process
+- TenantRegistry: resolves a tenant id to its profile, namespace and prompt on demand
+- SharedClients: one Upstash and one Groq client (their breakers and rate limits) for every tenant
+- TenantPool: LRU of loaded tenants bounded by approximate memory, with idle
+  eviction and a per-tenant concurrency limit so one busy tenant cannot starve the rest
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from profiling import run
+from resilience import CallError, ResilientCall
+from scheduler import RequestScheduler, shared_scheduler
+
+TENANT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+TENANTS_MANIFEST = 'tenants.json'
+TENANT_MAX_CONCURRENCY = 4
+TENANT_ADMISSION_TIMEOUT = 1.0   # seconds a request waits for a slot before being rejected
+TENANT_CACHE_MB = 256
+TENANT_IDLE_SECONDS = 600
+# A hedged completion is billed twice against the Groq limits; opt in only with quota to spare
+GENERATION_HEDGE = os.getenv('GENERATION_HEDGE', '0') == '1'
+
+
+def tenants_dir() -> str:
+    """Directory holding tenant profiles (<tenant_id>.json) and an optional tenants.json"""
+    return os.getenv('TENANTS_DIR', 'data/tenants')
+
+
+class UnknownTenantError(KeyError):
+    """No profile or manifest entry exists for a tenant id"""
+
+
+@dataclass
+class TenantConfig:
+    """Where one tenant's data lives and how its twin speaks"""
+    tenant_id: str
+    profile_path: str
+    namespace: str = ''
+    system_prompt: Optional[str] = None
+    max_concurrency: int = TENANT_MAX_CONCURRENCY
+
+
+@dataclass
+class SharedClients:
+    """Connections reused by every tenant; created by whichever tenant loads first"""
+    vector_index: Any = None
+    groq_client: Any = None
+    retrieval: ResilientCall = field(default_factory=lambda: ResilientCall('retrieval', default_hedge_delay=0.5))
+    generation: ResilientCall = field(default_factory=lambda: ResilientCall(
+        'generation', hedge=GENERATION_HEDGE, default_hedge_delay=3.0))
+    scheduler: RequestScheduler = field(default_factory=shared_scheduler)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def close(self) -> None:
+        """Close the pooled Groq and Upstash connections; the next twin to set up connects again"""
+        with self.lock:
+            for client in (self.groq_client, self.vector_index):
+                close = getattr(client, 'close', None)
+                if callable(close):
+                    close()
+            self.groq_client = self.vector_index = None
+
+
+def approx_nbytes(value: Any, _seen: Optional[set] = None) -> int:
+    """Rough deep size of JSON-like data (dicts, lists, strings, numbers)"""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_nbytes(k, seen) + approx_nbytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approx_nbytes(v, seen) for v in value)
+    return size
+
+
+class TenantRegistry:
+    """Tenant configs resolved lazily, so unloaded tenants cost nothing"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or tenants_dir()
+        self._manifest: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _overrides(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tenant settings from tenants.json (profile, namespace, system_prompt, max_concurrency)"""
+        if self._manifest is None:
+            path = os.path.join(self.root, TENANTS_MANIFEST)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except (FileNotFoundError, NotADirectoryError):  # no tenants set up yet
+                self._manifest = {}
+        return self._manifest
+
+    def get(self, tenant_id: str) -> TenantConfig:
+        """Config for a tenant; raises UnknownTenantError if it has no profile"""
+        if not TENANT_ID_RE.match(tenant_id or ''):
+            raise UnknownTenantError(tenant_id)
+        settings = self._overrides().get(tenant_id, {})
+        profile = settings.get('profile') or os.path.join(self.root, f"{tenant_id}.json")
+        if not os.path.isabs(profile) and settings.get('profile'):
+            profile = os.path.join(self.root, profile)
+        if not os.path.exists(profile):
+            raise UnknownTenantError(tenant_id)
+        return TenantConfig(
+            tenant_id=tenant_id,
+            profile_path=profile,
+            namespace=settings.get('namespace', tenant_id),
+            system_prompt=settings.get('system_prompt'),
+            max_concurrency=int(settings.get('max_concurrency', TENANT_MAX_CONCURRENCY)),
+        )
+
+    def ids(self) -> List[str]:
+        """All tenant ids: profiles in the directory plus manifest entries"""
+        found = set(self._overrides())
+        if os.path.isdir(self.root):
+            for entry in os.scandir(self.root):
+                name, ext = os.path.splitext(entry.name)
+                if ext == '.json' and entry.name != TENANTS_MANIFEST and TENANT_ID_RE.match(name):
+                    found.add(name)
+        return sorted(found)
+
+
+class TenantPool:
+    """Loaded tenant twins, least recently used evicted first"""
+
+    def __init__(self, registry: Optional[TenantRegistry] = None, clients: Optional[SharedClients] = None,
+                 max_bytes: Optional[int] = None, idle_seconds: Optional[float] = None,
+                 factory: Optional[Callable[[TenantConfig, SharedClients], Any]] = None):
+        """factory builds a ready twin for a tenant (default: DigitalTwinRAG.for_tenant)"""
+        if factory is None:
+            from digital_twin_rag import DigitalTwinRAG
+            factory = DigitalTwinRAG.for_tenant
+        self.registry = registry or TenantRegistry()
+        self.clients = clients or SharedClients()
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv('TENANT_CACHE_MB', TENANT_CACHE_MB)) * 1024 * 1024)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(
+            os.getenv('TENANT_IDLE_SECONDS', TENANT_IDLE_SECONDS))
+        self.factory = factory
+        self._loaded: 'OrderedDict[str, Tuple[Any, int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0}
+
+    def get(self, tenant_id: str) -> Any:
+        """Loaded twin for a tenant, loading it on first use"""
+        with self._lock:
+            entry = self._loaded.get(tenant_id)
+            if entry:
+                self._loaded[tenant_id] = (entry[0], entry[1], time.monotonic())
+                self._loaded.move_to_end(tenant_id)
+                self.stats['hits'] += 1
+                self._evict_locked(keep=tenant_id)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        # One load per tenant at a time; concurrent requests for it wait here
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(tenant_id)
+                if entry:
+                    self.stats['hits'] += 1
+                    return entry[0]
+            twin = self.factory(self.registry.get(tenant_id), self.clients)
+            size = twin.nbytes()
+            with self._lock:
+                self._loaded[tenant_id] = (twin, size, time.monotonic())
+                self._bytes += size
+                self.stats['misses'] += 1
+                self._evict_locked(keep=tenant_id)
+            return twin
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        """Drop idle tenants, then least recently used ones until under the memory budget"""
+        now = time.monotonic()
+        for tenant_id in list(self._loaded):
+            if tenant_id == keep:
+                continue
+            _, size, last_used = self._loaded[tenant_id]
+            if self._bytes <= self.max_bytes and now - last_used < self.idle_seconds:
+                break  # oldest-first order: everything after this is newer
+            del self._loaded[tenant_id]
+            self._bytes -= size
+            self.stats['evictions'] += 1
+
+    def evict_idle(self) -> None:
+        """Sweep tenants idle longer than idle_seconds (for callers with a timer)"""
+        with self._lock:
+            self._evict_locked()
+
+    def _slot(self, tenant_id: str, limit: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(tenant_id)
+            if slot is None:
+                slot = self._slots[tenant_id] = threading.BoundedSemaphore(limit)
+            return slot
+
+    def rag_query(self, tenant_id: str, question: str, **kwargs) -> Dict[str, Any]:
+        """Answer a question as one tenant's twin, within that tenant's concurrency limit"""
+        try:
+            config = self.registry.get(tenant_id)
+        except UnknownTenantError:
+            return {'success': False, 'response': f"Unknown tenant: {tenant_id}", 'results_found': 0,
+                    'error': CallError('admission', 'unknown_tenant', f"no profile for {tenant_id}").to_dict()}
+
+        slot = self._slot(tenant_id, config.max_concurrency)
+        if not slot.acquire(timeout=TENANT_ADMISSION_TIMEOUT):
+            self.stats['rejected'] += 1
+            return {'success': False, 'response': "Too many requests for this twin right now. Please retry shortly.",
+                    'results_found': 0,
+                    'error': CallError('admission', 'overloaded',
+                                       f"{tenant_id} already has {config.max_concurrency} requests in flight",
+                                       TENANT_ADMISSION_TIMEOUT).to_dict()}
+        try:
+            return self.get(tenant_id).rag_query(question, **kwargs)
+        finally:
+            slot.release()
+
+    def close_clients(self) -> None:
+        """Unload every tenant and close the shared connections (before forking workers)"""
+        with self._lock:
+            self._loaded.clear()
+            self._bytes = 0
+        self.clients.close()
+
+    def open_clients(self) -> bool:
+        """Nothing to open up front: each tenant connects when it is first loaded"""
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Cache occupancy and counters"""
+        with self._lock:
+            return {**self.stats, 'loaded': len(self._loaded), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes, 'tenants': list(self._loaded)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """List tenants or ask one tenant's twin a question"""
+    import argparse
+    from config import load_config
+    load_config()
+
+    parser = argparse.ArgumentParser(description="Multi-tenant digital twins")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="List tenant ids")
+    ask = sub.add_parser('ask', help="Ask a tenant's twin a question")
+    ask.add_argument('tenant')
+    ask.add_argument('question')
+    args = parser.parse_args(argv)
+
+    registry = TenantRegistry()
+    if args.command == 'list':
+        tenant_ids = registry.ids()
+        print(f"📋 {len(tenant_ids)} tenant(s) in {registry.root}")
+        for tenant_id in tenant_ids:
+            try:
+                config = registry.get(tenant_id)
+            except UnknownTenantError:
+                print(f"{tenant_id:24} ⚠️  listed in {TENANTS_MANIFEST} but its profile is missing")
+                continue
+            print(f"{tenant_id:24} namespace={config.namespace or '-':16} {config.profile_path}")
+        return 0
+
+    pool = TenantPool(registry)
+    result = pool.rag_query(args.tenant, args.question)
+    print(f"\n🤖 {args.tenant}: {result['response']}\n")
+    print(f"📊 {pool.status()}")
+    return 0 if result['success'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
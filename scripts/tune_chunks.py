@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Chunking Parameter Sweep
+Picks chunking and retrieval defaults from measurements instead of guesses
+- Sweeps chunk size, overlap, top_k and upsert batch size against a labeled
+  question set (data/retrieval_questions.json)
+- Each chunk size/overlap pair is ingested into its own local index, in
+  parallel worker processes
+- Measures recall@k, prompt tokens per question, query latency and ingest
+  throughput, then prints the Pareto front: the configurations that no other
+  one matches or beats on all four
+- Suggests the front configuration with the fewest prompt tokens among those
+  within --recall-slack of the best recall (under --max-tokens, if given)
+
+Timings from parallel workers share the CPU; use --workers 1 when comparing
+latency and throughput closely.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from embed_digitaltwin import JSON_FILE, VectorDatabaseSetup, chunk_parent
+from json_stream import load_file
+from profiling import run
+from scheduler import estimate_tokens
+from vector_store import LocalVectorStore, embed_upserts, local_embedder, text_query
+
+QUESTIONS_FILE = 'data/retrieval_questions.json'
+# (measure, +1 higher is better / -1 lower is better, compared with the timing tolerance)
+OBJECTIVES = (('recall', 1, False), ('tokens', -1, False), ('latency_ms', -1, True), ('ingest_kbps', 1, True))
+
+
+def load_questions(path: str) -> Dict[str, Any]:
+    """Labeled question set: {"profile": path, "questions": [{"question", "relevant": [chunk ids]}]}"""
+    data = load_file(path)
+    questions = [q for q in data.get('questions', []) if q.get('question') and q.get('relevant')]
+    if not questions:
+        raise ValueError(f"{path} has no labeled questions")
+    return {'profile': data.get('profile') or JSON_FILE, 'questions': questions}
+
+
+def measure_chunking(profile_path: str, questions: List[Dict[str, Any]], chunk_size: int, overlap: int,
+                     top_ks: Sequence[int], batch_sizes: Sequence[int], upsert_ms: float = 0.0,
+                     repeats: int = 3) -> List[Dict[str, Any]]:
+    """One row per (top_k, batch size) for a chunk size and overlap
+
+    Ingest throughput is profile KB per second through chunking, embedding
+    and upserts (plus upsert_ms per request); the other measures come from
+    the index built with the last batch size, which holds the same vectors.
+    """
+    profile = load_file(profile_path)
+    profile_kb = os.path.getsize(profile_path) / 1024
+    with contextlib.redirect_stdout(io.StringIO()):  # the setup announces the backend
+        setup = VectorDatabaseSetup(profile_path, chunk_size=chunk_size, chunk_overlap=overlap)
+    ingest: Dict[int, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in batch_sizes:
+            seconds = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                chunks = setup.extract_chunks(profile)
+                store = LocalVectorStore(tmp)
+                for batch in chunks.iter_upsert(batch_size):
+                    store.upsert(vectors=embed_upserts(store, batch))
+                    if upsert_ms:
+                        time.sleep(upsert_ms / 1000)
+                seconds.append(time.perf_counter() - started)
+            ingest[batch_size] = profile_kb / statistics.median(seconds)
+
+        rows = []
+        for top_k in top_ks:
+            found, tokens, latencies = 0, [], []
+            for item in questions:
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    hits = store.query(**text_query(store, item['question']), top_k=top_k, include_metadata=True)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                found += bool({chunk_parent(hit.id) for hit in hits} & set(item['relevant']))
+                # The context the chat would put in the prompt for these hits
+                context = "\n".join(f"{hit.metadata.get('title', '')}: {hit.metadata.get('content', '')}"
+                                    for hit in hits)
+                tokens.append(estimate_tokens(context))
+            for batch_size in batch_sizes:
+                rows.append({'chunk_size': chunk_size, 'overlap': overlap, 'top_k': top_k,
+                             'batch_size': batch_size, 'chunks': len(chunks),
+                             'recall': found / len(questions), 'tokens': statistics.mean(tokens),
+                             'latency_ms': statistics.median(latencies), 'ingest_kbps': ingest[batch_size]})
+    return rows
+
+
+def _compare(a: Dict[str, Any], b: Dict[str, Any], tolerance: float) -> Tuple[bool, bool]:
+    """(a is at least as good as b on every measure, a is better on at least one)"""
+    no_worse, better = True, False
+    for key, sign, timed in OBJECTIVES:
+        x, y = sign * a[key], sign * b[key]
+        margin = tolerance * max(abs(x), abs(y)) if timed else 1e-9
+        if x < y - margin:
+            no_worse = False
+        elif x > y + margin:
+            better = True
+    return no_worse, better
+
+
+def pareto_front(rows: List[Dict[str, Any]], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    """Rows no other row dominates; timings within tolerance (relative) count as equal"""
+    front = []
+    for row in rows:
+        if not any(other is not row and all(_compare(other, row, tolerance)) for other in rows):
+            front.append(row)
+    return front
+
+
+def suggest(front: List[Dict[str, Any]], recall_slack: float, max_tokens: float = 0) -> Optional[Dict[str, Any]]:
+    """Fewest prompt tokens within recall_slack of the best recall, then latency, then throughput
+
+    max_tokens leaves out configurations whose context is larger (0: no limit).
+    """
+    front = [row for row in front if not max_tokens or row['tokens'] <= max_tokens]
+    if not front:
+        return None
+    best = max(row['recall'] for row in front)
+    near = [row for row in front if row['recall'] >= best - recall_slack - 1e-9]
+    return min(near, key=lambda row: (row['tokens'], row['latency_ms'], -row['ingest_kbps']))
+
+
+def sweep(profile_path: str, questions: List[Dict[str, Any]], chunk_sizes: Sequence[int],
+          overlaps: Sequence[int], top_ks: Sequence[int], batch_sizes: Sequence[int],
+          workers: int, upsert_ms: float = 0.0, repeats: int = 3) -> List[Dict[str, Any]]:
+    """Measure every configuration, one chunk size/overlap pair per worker task"""
+    pairs = [(size, overlap) for size in chunk_sizes for overlap in overlaps
+             if (size == 0 and overlap == 0) or 0 <= overlap < size]
+    rows: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(measure_chunking, profile_path, questions, size, overlap, top_ks,
+                               batch_sizes, upsert_ms, repeats) for size, overlap in pairs]
+        for future in futures:
+            rows.extend(future.result())
+    return rows
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"  {'size':>5} {'overlap':>7} {'top_k':>5} {'batch':>5} {'chunks':>6} {'recall':>7} "
+          f"{'tokens':>7} {'query ms':>8} {'ingest KB/s':>11}")
+    for row in rows:
+        size = row['chunk_size'] or 'whole'
+        print(f"  {size:>5} {row['overlap']:>7} {row['top_k']:>5} {row['batch_size']:>5} {row['chunks']:>6} "
+              f"{row['recall']:>7.2f} {row['tokens']:>7.0f} {row['latency_ms']:>8.2f} {row['ingest_kbps']:>11.0f}")
+
+
+def _ints(value: str) -> List[int]:
+    return sorted({int(v) for v in value.split(',') if v})
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep chunking and retrieval settings against labeled questions")
+    parser.add_argument('--questions', default=QUESTIONS_FILE, help="Labeled question set (JSON)")
+    parser.add_argument('--profile', help="Profile to chunk (default: the question set's)")
+    parser.add_argument('--chunk-sizes', default="0,300,500,800,1200",
+                        help="Comma-separated CHUNK_SIZE values (0: chunks are never split)")
+    parser.add_argument('--overlaps', default="0,50,100", help="Comma-separated CHUNK_OVERLAP values")
+    parser.add_argument('--top-k', default="1,2,3,5,8", help="Comma-separated RETRIEVAL_TOP_K values")
+    parser.add_argument('--batch-sizes', default="5,10,25,50,100", help="Comma-separated UPSERT_BATCH_SIZE values")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Configurations measured at once")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per measurement (median kept)")
+    parser.add_argument('--upsert-ms', type=float, default=0.0,
+                        help="Simulated round trip per upsert request (e.g. 50 for a remote index)")
+    parser.add_argument('--recall-slack', type=float, default=0.05,
+                        help="Recall the suggestion may give up for fewer prompt tokens")
+    parser.add_argument('--max-tokens', type=float, default=0,
+                        help="Prompt tokens of context per question the suggestion may use (0: no limit)")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Relative difference below which timings count as equal")
+    parser.add_argument('--all', action='store_true', help="Print every configuration, not just the front")
+    parser.add_argument('--output', help="Write every row, with an on_front flag, to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Every configuration gets its own local index; nothing touches the real one
+    os.environ['VECTOR_BACKEND'] = 'local'
+    try:
+        labeled = load_questions(args.questions)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read the question set: {e}")
+        return 1
+    profile_path = args.profile or labeled['profile']
+    if not os.path.exists(profile_path):
+        print(f"❌ {profile_path} not found")
+        return 1
+
+    started = time.perf_counter()
+    print(f"🔧 Sweeping chunking against {len(labeled['questions'])} labeled questions "
+          f"({profile_path}, {local_embedder().name} embeddings, {args.workers} workers)")
+    rows = sweep(profile_path, labeled['questions'], _ints(args.chunk_sizes), _ints(args.overlaps),
+                 _ints(args.top_k), _ints(args.batch_sizes), args.workers, args.upsert_ms, args.repeats)
+    if not rows:
+        print("❌ No valid configuration (overlap must be below the chunk size)")
+        return 1
+    front = pareto_front(rows, args.tolerance)
+    order = lambda row: (-row['recall'], row['tokens'], row['latency_ms'])
+    print(f"\n📊 {len(rows)} configurations in {time.perf_counter() - started:.1f}s; "
+          f"{len(front)} on the Pareto front (recall@k, prompt tokens, query latency, ingest throughput)")
+    _print_rows(sorted(rows if args.all else front, key=order))
+
+    pick = suggest(front, args.recall_slack, args.max_tokens)
+    if pick is None:
+        print(f"\n⚠️  No configuration on the front fits in {args.max_tokens:.0f} prompt tokens")
+    else:
+        print(f"\n✅ Suggested: CHUNK_SIZE={pick['chunk_size']} CHUNK_OVERLAP={pick['overlap']} "
+              f"RETRIEVAL_TOP_K={pick['top_k']} UPSERT_BATCH_SIZE={pick['batch_size']}")
+        print(f"   recall@{pick['top_k']} {pick['recall']:.2f}, {pick['tokens']:.0f} prompt tokens, "
+              f"{pick['latency_ms']:.2f} ms per query, {pick['ingest_kbps']:.0f} KB/s ingest")
+
+    if args.output:
+        on_front = {id(row) for row in front}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([{**row, 'on_front': id(row) in on_front} for row in rows], f, indent=2)
+        print(f"💾 Wrote {len(rows)} rows to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Local Vector Store
+Drop-in stand-in for the Upstash Index used by the embedders and the RAG system
+- Same upsert/query/info/delete/fetch surface as upstash_vector.Index
+- Exact scan for small collections, HNSW graph search for large ones
+- Persisted to a directory so it loads at startup without re-embedding
+- Compacted on save once replaced and deleted vectors pile up as tombstones
+"""
+
+import os
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ann_index import HNSWIndex
+from chunk_store import ChunkStore
+from embeddings import (EMBEDDING_DIM, EmbeddingProvider, QueryEmbeddingCache,  # noqa: F401 (re-exported)
+                        get_embedder, hash_embed)
+
+# Configuration (VECTOR_BACKEND, LOCAL_INDEX_DIR and EMBEDDING_PROVIDER are read
+# at call time so scripts can import this module before calling load_dotenv)
+ANN_THRESHOLD = int(os.getenv('ANN_THRESHOLD', '2000'))  # below this, exact scan is faster
+ANN_RECALL_TARGET = float(os.getenv('ANN_RECALL_TARGET', '0.95'))
+ANN_M = int(os.getenv('ANN_M', '16'))
+ANN_EF_CONSTRUCTION = int(os.getenv('ANN_EF_CONSTRUCTION', '100'))
+# Rebuild the graph on save once tombstones exceed this share of the live vectors
+ANN_COMPACT_RATIO = float(os.getenv('ANN_COMPACT_RATIO', '0.2'))
+UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', '100'))  # vectors per upsert request when embedding
+
+INDEX_FILE = 'hnsw.bin'
+RECORDS_FILE = 'chunks.bin'
+GENERATION_FILE = 'generation'  # bumped after every write; readers reload when it changes
+OPEN_RETRIES = 50  # loads retried while a concurrent save is between its two file swaps
+OPEN_RETRY_DELAY = 0.02
+
+
+@dataclass
+class QueryResult:
+    """Single search hit, shaped like upstash_vector's QueryResult"""
+    id: str
+    score: float
+    metadata: Optional[Dict[str, Any]] = None
+    vector: Optional[List[float]] = None
+
+
+@dataclass
+class StoreInfo:
+    """Store statistics, shaped like upstash_vector's InfoResult"""
+    vector_count: int
+    dimension: int
+    similarity_function: str = 'COSINE'
+    ef_search: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class LocalVectorStore:
+    """Vector store kept in process memory and persisted to a directory"""
+
+    def __init__(self, path: Optional[str] = None, dim: Optional[int] = None,
+                 recall_target: float = ANN_RECALL_TARGET, embedder: Optional[EmbeddingProvider] = None):
+        """Create an empty store rooted at path (default: LOCAL_INDEX_DIR)
+
+        embedder vectorises text payloads and queries (default: the shared
+        EMBEDDING_PROVIDER embedder); dim defaults to the embedder's.
+        """
+        path = path or local_index_dir()
+        self.path = path
+        if dim is None:
+            embedder = embedder or local_embedder()
+            dim = embedder.dim
+        self._embedder = embedder
+        self.dim = dim
+        self.recall_target = recall_target
+        self.index = HNSWIndex(dim, m=ANN_M, ef_construction=ANN_EF_CONSTRUCTION)
+        self.records = ChunkStore()  # row n holds the id and metadata of graph node n
+        self._nodes: Dict[str, int] = {}
+        self._dirty = False
+        self._generation = read_generation(path)
+
+    @classmethod
+    def open(cls, path: Optional[str] = None, **kwargs) -> 'LocalVectorStore':
+        """Load a persisted store, or return an empty one if none exists yet
+
+        The graph and records carry the stamp of the save that wrote them; a
+        pair from two different saves (another process is swapping them in)
+        is read again until both come from the same one.
+        """
+        store = cls(path, **kwargs)
+        path = store.path
+        index_path = os.path.join(path, INDEX_FILE)
+        records_path = os.path.join(path, RECORDS_FILE)
+        if not (os.path.exists(index_path) and os.path.exists(records_path)):
+            return store
+        for _ in range(OPEN_RETRIES):
+            index = HNSWIndex.load(index_path)
+            records = ChunkStore.load(records_path)
+            if index.stamp == records.stamp:
+                break
+            time.sleep(OPEN_RETRY_DELAY)
+        else:
+            raise ValueError(f"{index_path} and {records_path} were written by different saves; "
+                             f"re-run the embedders to rebuild the index")
+        store.index = index
+        store.dim = index.dim
+        store._check_embedder()
+        store.records = records
+        store._reindex_nodes()
+        return store
+
+    def refresh(self) -> bool:
+        """Reload from disk if another process saved a newer generation"""
+        generation = read_generation(self.path)
+        if generation == self._generation or self._dirty:
+            return False
+        fresh = LocalVectorStore.open(self.path, dim=self.dim, recall_target=self.recall_target,
+                                      embedder=self._embedder)
+        self.index, self.records, self._nodes = fresh.index, fresh.records, fresh._nodes
+        self._generation = fresh._generation
+        return True
+
+    @classmethod
+    def from_records(cls, index: HNSWIndex, ids: Iterable[Optional[str]],
+                     metadata: Iterable[Optional[Dict[str, Any]]], path: Optional[str] = None,
+                     **kwargs) -> 'LocalVectorStore':
+        """Build a store around an existing graph and node-aligned ids/metadata"""
+        store = cls(path, dim=index.dim, **kwargs)
+        store.index = index
+        for vector_id, meta in zip(ids, metadata):
+            store.records.append_metadata(vector_id or '', meta)
+        store._reindex_nodes()
+        store._dirty = True
+        return store
+
+    def _reindex_nodes(self) -> None:
+        """Rebuild the id -> node map from the records, skipping tombstones"""
+        deleted = self.index.deleted
+        self._nodes = {
+            self.records.ids.get(node): node
+            for node in range(len(self.records)) if node not in deleted
+        }
+
+    def id_at(self, node: int) -> Optional[str]:
+        """Vector id of a graph node, or None for a tombstone"""
+        if node in self.index.deleted:
+            return None
+        return self.records.ids.get(node)
+
+    def metadata_at(self, node: int) -> Optional[Dict[str, Any]]:
+        """Metadata of a graph node, built from the columnar records"""
+        if node in self.index.deleted:
+            return None
+        return self.records.metadata(node)
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the graph, records and id map"""
+        return self.index.nbytes() + self.records.nbytes() + sys.getsizeof(self._nodes)
+
+    @property
+    def embedder(self) -> EmbeddingProvider:
+        """In-process embedder for this store's dimension"""
+        if self._embedder is None:
+            self._embedder = local_embedder(self.dim)
+            self._check_embedder()
+        return self._embedder
+
+    def _check_embedder(self) -> None:
+        if self._embedder and self._embedder.dim != self.dim:
+            raise ValueError(f"Index at {self.path} has {self.dim}-dim vectors but {self._embedder.name} "
+                             f"produces {self._embedder.dim}; re-embed or change EMBEDDING_PROVIDER")
+
+    @property
+    def embedding_name(self) -> str:
+        return self.embedder.name
+
+    def embed(self, text: str) -> array:
+        """Embed raw text for upsert or query"""
+        return self.embedder.embed(text)
+
+    def embed_batch(self, texts: Sequence[str]) -> List[array]:
+        """Embed many texts at once across the embedder's worker pool"""
+        return self.embedder.embed_batch(texts)
+
+    def upsert(self, vectors: Iterable[Tuple]) -> str:
+        """Insert or replace (id, vector_or_text, metadata) tuples"""
+        items = list(vectors)
+        # Text payloads are vectorised together so the embedder can batch them
+        texts = [item[1] for item in items if isinstance(item[1], str)]
+        embedded = iter(self.embed_batch(texts))
+        for item in items:
+            vector_id, payload = item[0], item[1]
+            metadata = item[2] if len(item) > 2 else None
+            vector = next(embedded) if isinstance(payload, str) else payload
+
+            old = self._nodes.get(vector_id)
+            if old is not None:
+                self.index.remove(old)
+
+            node = self.index.add(vector)
+            self.records.append_metadata(vector_id, metadata)
+            self._nodes[vector_id] = node
+        self._dirty = True
+        return 'Success'
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Delete vectors by id; returns how many existed"""
+        deleted = 0
+        for vector_id in ids:
+            node = self._nodes.pop(vector_id, None)
+            if node is None:
+                continue
+            self.index.remove(node)
+            deleted += 1
+        if deleted:
+            self._dirty = True
+        return deleted
+
+    def fetch(self, ids: Sequence[str], include_metadata: bool = False,
+              include_vectors: bool = False) -> List[Optional[QueryResult]]:
+        """Look up vectors by id"""
+        results: List[Optional[QueryResult]] = []
+        for vector_id in ids:
+            node = self._nodes.get(vector_id)
+            if node is None:
+                results.append(None)
+                continue
+            results.append(QueryResult(
+                id=vector_id,
+                score=1.0,
+                metadata=self.metadata_at(node) if include_metadata else None,
+                vector=self.index.vector(node).tolist() if include_vectors else None,
+            ))
+        return results
+
+    def query(self, vector: Optional[Sequence[float]] = None, data: Optional[str] = None,
+              top_k: int = 10, include_metadata: bool = False, include_vectors: bool = False,
+              ef: Optional[int] = None, exact: Optional[bool] = None) -> List[QueryResult]:
+        """Nearest-neighbour search by raw vector or by text"""
+        if vector is None:
+            if data is None:
+                raise ValueError("query() needs either vector or data")
+            vector = self.embed(data)
+
+        if exact is None:
+            exact = ef is None and len(self.index) <= ANN_THRESHOLD
+        if exact:
+            hits = self.index.brute_force(vector, top_k)
+        else:
+            hits = self.index.search(vector, top_k, ef)
+
+        return [
+            QueryResult(
+                id=self.records.ids.get(node),
+                # Upstash reports cosine scores normalised to [0, 1]
+                score=(1 + sim) / 2,
+                metadata=self.metadata_at(node) if include_metadata else None,
+                vector=self.index.vector(node).tolist() if include_vectors else None,
+            )
+            for node, sim in hits
+        ]
+
+    def info(self) -> StoreInfo:
+        """Vector count and dimension"""
+        return StoreInfo(
+            vector_count=len(self._nodes),
+            dimension=self.dim,
+            ef_search=self.index.ef_search,
+            extra={'nodes': self.index.node_count, 'path': self.path},
+        )
+
+    def compact(self) -> int:
+        """Rebuild the graph and records without tombstones; returns how many were dropped"""
+        dropped = len(self.index.deleted)
+        if not dropped:
+            return 0
+        index, live = self.index.compacted()
+        records = ChunkStore()
+        for node in live:
+            records.append_metadata(self.records.ids.get(node), self.records.metadata(node))
+        self.index, self.records = index, records
+        self._reindex_nodes()
+        self._dirty = True
+        return dropped
+
+    def calibrate(self, k: int = 10) -> Tuple[int, float]:
+        """Pick the smallest ef_search that meets the configured recall target"""
+        return self.index.tune_ef(self.recall_target, k=k)
+
+    def save(self, calibrate: bool = True, quiet: bool = False) -> bool:
+        """Persist the graph and records, calibrating ef_search for large stores
+
+        Tombstones are compacted away first once they exceed ANN_COMPACT_RATIO
+        of the live vectors, so searches stop over-fetching for them. Files
+        are written under temporary names, both stamped with the new
+        generation, and swapped in; open() only pairs files with the same
+        stamp. Then the generation marker is bumped so readers in other
+        processes reload.
+        """
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            start = time.perf_counter()
+            if len(self.index.deleted) > ANN_COMPACT_RATIO * max(len(self.index), 1):
+                dropped = self.compact()
+                if not quiet:
+                    print(f"🧹 Compacted {dropped} replaced or deleted vector(s)")
+            if calibrate and len(self.index) > ANN_THRESHOLD:
+                ef, recall = self.calibrate()
+                print(f"🎯 ANN calibrated: ef_search={ef}, recall@10={recall:.1%} "
+                      f"(target {self.recall_target:.0%})")
+
+            index_path = os.path.join(self.path, INDEX_FILE)
+            records_path = os.path.join(self.path, RECORDS_FILE)
+            generation = new_generation()
+            self.index.save(index_path + '.tmp', stamp=generation)
+            self.records.save(records_path + '.tmp', stamp=generation)
+            os.replace(index_path + '.tmp', index_path)
+            os.replace(records_path + '.tmp', records_path)
+            self._generation = bump_generation(self.path, generation)
+            self._dirty = False
+            if not quiet:
+                print(f"💾 Local index saved to {self.path} ({time.perf_counter() - start:.2f}s)")
+            return True
+        except Exception as e:
+            print(f"❌ Error saving local index: {e}")
+            return False
+
+
+def is_local_backend() -> bool:
+    """True when VECTOR_BACKEND selects the on-disk store instead of Upstash"""
+    return os.getenv('VECTOR_BACKEND', 'upstash').lower() == 'local'
+
+
+def embedding_provider() -> str:
+    """EMBEDDING_PROVIDER: 'hash' or 'onnx' embed in process, 'upstash' leaves it to the hosted model
+
+    Defaults to 'hash' for the local backend and 'upstash' otherwise.
+    """
+    return os.getenv('EMBEDDING_PROVIDER', 'hash' if is_local_backend() else 'upstash').lower()
+
+
+def local_embedder(dim: int = EMBEDDING_DIM) -> EmbeddingProvider:
+    """Shared embedder for local stores; hashing when the provider is Upstash's model"""
+    provider = embedding_provider()
+    return get_embedder('hash' if provider == 'upstash' else provider, dim)
+
+
+def client_embedder(index: Any) -> Optional[EmbeddingProvider]:
+    """Embedder to run before talking to index, or None if the store embeds text itself
+
+    Local stores and snapshots embed internally; an Upstash index only gets
+    raw vectors when EMBEDDING_PROVIDER selects an in-process model.
+    """
+    if hasattr(index, 'embed'):
+        return None
+    provider = embedding_provider()
+    return None if provider == 'upstash' else get_embedder(provider)
+
+
+def index_embedder(index: Any) -> Optional[EmbeddingProvider]:
+    """Embedder that vectorises text for index on this machine (None: Upstash's hosted model)"""
+    return getattr(index, 'embedder', None) or client_embedder(index)
+
+
+def text_query(index: Any, text: str, cache: Optional[QueryEmbeddingCache] = None) -> Dict[str, Any]:
+    """query() arguments for text: a raw vector when embedding in process, else data=
+
+    With a cache, a repeated query reuses its vector and skips embedding.
+    """
+    embedder = client_embedder(index)
+    if embedder is not None:
+        embed, model = embedder.embed, embedder.name
+    elif hasattr(index, 'embed'):
+        embed, model = index.embed, index.embedding_name
+    else:
+        return {'data': text}  # Upstash's hosted model embeds server-side
+    vector = cache.get(model, text, embed) if cache is not None else embed(text)
+    # Upstash takes plain lists; local stores and snapshots search the array directly
+    return {'vector': vector.tolist() if embedder is not None else vector}
+
+
+def embed_upserts(index: Any, batch: List[Tuple]) -> List[Tuple]:
+    """Replace text payloads with raw vectors whenever embedding happens in process
+
+    Keeps embedding a separate step from the upsert; Upstash's hosted model
+    gets the text unchanged.
+    """
+    embedder = index_embedder(index)
+    if embedder is None:
+        return batch
+    embedded = iter(embedder.embed_batch([item[1] for item in batch if isinstance(item[1], str)]))
+    # Upstash takes plain lists; the local store keeps the compact arrays
+    as_list = not hasattr(index, 'embed')
+    vectors = []
+    for item in batch:
+        payload = item[1]
+        if isinstance(payload, str):
+            payload = next(embedded).tolist() if as_list else next(embedded)
+        vectors.append((item[0], payload, *item[2:]))
+    return vectors
+
+
+def local_index_dir() -> str:
+    """Directory holding the persisted local index"""
+    return os.getenv('LOCAL_INDEX_DIR', '.vector_index')
+
+
+def query_cache_path() -> str:
+    """File holding the persisted query embedding cache"""
+    return os.getenv('QUERY_CACHE_FILE') or os.path.join(local_index_dir(), 'query_embeddings.json')
+
+
+def read_generation(path: Optional[str] = None) -> str:
+    """Current index generation marker ('' if nothing was ever written)"""
+    try:
+        with open(os.path.join(path or local_index_dir(), GENERATION_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def new_generation() -> str:
+    """A generation marker value newer than any written before"""
+    return f"{time.time_ns()}"
+
+
+def bump_generation(path: Optional[str] = None, generation: Optional[str] = None) -> str:
+    """Advance the generation marker so caches keyed on index contents are dropped
+
+    generation defaults to a fresh one. Also used by the watcher for the
+    Upstash backend, where the marker is the only local trace of a remote change.
+    """
+    path = path or local_index_dir()
+    os.makedirs(path, exist_ok=True)
+    generation = generation or new_generation()
+    tmp_path = os.path.join(path, GENERATION_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(generation)
+    os.replace(tmp_path, os.path.join(path, GENERATION_FILE))
+    return generation
@@ -2,12 +2,34 @@
 """
 Quick Setup Verification Script
 Checks all prerequisites and environment configuration before running RAG system
+- --diagnose also probes Upstash, Groq, the local index/snapshot and the query
+  cache concurrently, timing round trips and Groq time-to-first-token
+- --json writes the timings as a baseline; --compare flags regressions against one
 """
 
+import argparse
+import importlib.util
+import json
 import os
+import platform
+import statistics
 import sys
+import threading
+import time
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict, List, Optional
+from config import ENV_FILES, groq_api_key, load_config, upstash_credentials
+from profiling import run
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+PROFILE_FILE = 'data/digitaltwin_clean.json'  # what embed_digitaltwin.py and digital_twin_rag.py read
+DIAG_TIMEOUT = float(os.getenv('DIAG_TIMEOUT', '10'))  # seconds per probe, all samples included
+DIAG_SAMPLES = 3
+DIAG_QUERY = "What are your technical skills?"
+REGRESSION_FACTOR = 1.5  # p50 this many times the baseline's counts as a regression...
+REGRESSION_MIN_MS = 5.0  # ...if it is also this much slower (sub-millisecond local probes are noisy)
+BASELINE_VERSION = 1
 
 def check_python_version():
     """Verify Python version"""
@@ -26,11 +48,11 @@ def check_dependencies():
     required = ['upstash_vector', 'groq', 'dotenv', 'requests']
     missing = []
     
+    # find_spec locates a package without importing it (the SDKs take a while to import)
     for package in required:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(package) is not None:
             print(f"  ✅ {package}")
-        except ImportError:
+        else:
             print(f"  ❌ {package} (not installed)")
             missing.append(package)
     
@@ -42,7 +64,7 @@ def check_dependencies():
 def check_environment_variables():
     """Verify environment variables are configured"""
     print("\n🔐 Checking environment variables...")
-    load_dotenv()
+    load_config()
     
     checks = {
         'Upstash URL': ['test_UPSTASH_VECTOR_REST_URL', 'UPSTASH_VECTOR_REST_URL'],
@@ -63,7 +85,7 @@ def check_environment_variables():
             all_set = False
     
     if not all_set:
-        print("\n  Update your .env file with required credentials:")
+        print(f"\n  Update {' or '.join(ENV_FILES)} with required credentials:")
         print("  - test_UPSTASH_VECTOR_REST_URL or UPSTASH_VECTOR_REST_URL")
         print("  - test_UPSTASH_VECTOR_REST_TOKEN or UPSTASH_VECTOR_REST_TOKEN")
         print("  - GROQ_API_KEY")
@@ -71,38 +93,321 @@ def check_environment_variables():
     return all_set
 
 def check_profile_data():
-    """Verify profile data file exists"""
+    """Verify the profile data file the scripts read exists and parses"""
     print("\n📄 Checking profile data...")
-    profile_path = Path('data/digitaltwin.json')
+    profile_path = Path(PROFILE_FILE)
     
-    if profile_path.exists():
-        size = profile_path.stat().st_size
-        print(f"  ✅ data/digitaltwin.json ({size} bytes)")
-        return True
-    else:
-        print(f"  ❌ data/digitaltwin.json not found")
+    if not profile_path.exists():
+        print(f"  ❌ {PROFILE_FILE} not found")
+        if (REPO_ROOT / PROFILE_FILE).exists() and Path.cwd() != REPO_ROOT:
+            print(f"     Run the scripts from the repository root ({REPO_ROOT})")
+        return False
+    from json_stream import validate
+    try:
+        with open(profile_path, 'rb') as f:
+            validate(f)
+    except ValueError as e:
+        print(f"  ❌ {PROFILE_FILE} is not valid JSON: {e}")
         return False
+    print(f"  ✅ {PROFILE_FILE} ({profile_path.stat().st_size} bytes)")
+    return True
 
 def check_scripts():
-    """Verify script files exist"""
+    """Verify script files exist next to this one"""
     print("\n🐍 Checking script files...")
     scripts = [
         'embed_digitaltwin.py',
-        'digital_twin_rag.py'
+        'embed_job_postings.py',
+        'digital_twin_rag.py',
+        'cli.py'
     ]
     
     all_exist = True
     for script in scripts:
-        if Path(script).exists():
+        if (SCRIPTS_DIR / script).exists():
             print(f"  ✅ {script}")
         else:
-            print(f"  ❌ {script} not found")
+            print(f"  ❌ {script} not found in {SCRIPTS_DIR}")
             all_exist = False
     
     return all_exist
 
-def main():
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class Probe:
+    """One diagnostic: a setup step, then timed samples until done or out of time
+
+    setup() returns the state each sample() receives (e.g. a client) or
+    raises to fail the probe; sample(state) returns (details, ttft_seconds).
+    Setup time (connecting, opening a file) is reported apart from the
+    samples. A probe without a sample() is timed once, through setup.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Any],
+                 sample: Optional[Callable[[Any], Any]] = None, skip: Optional[str] = None):
+        self.name = name
+        self.setup = setup
+        self.sample = sample
+        self.result: Dict[str, Any] = ({'status': 'skipped', 'detail': skip} if skip else
+                                       {'status': 'timeout', 'detail': "no answer within the timeout"})
+        self.skipped = bool(skip)
+
+    def run(self, samples: int, deadline: float) -> None:
+        latencies: List[float] = []
+        ttfts: List[float] = []
+        detail: Any = None
+        try:
+            started = time.perf_counter()
+            state = self.setup()
+            setup_seconds = time.perf_counter() - started
+            if self.sample is None:
+                latencies.append(setup_seconds)
+                detail = state
+            else:
+                for _ in range(samples):
+                    if time.monotonic() >= deadline:
+                        break
+                    started = time.perf_counter()
+                    detail, ttft = self.sample(state)
+                    latencies.append(time.perf_counter() - started)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+        except Exception as e:
+            self.result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            return
+        if not latencies:
+            self.result = {'status': 'timeout', 'detail': "setup used the whole time budget"}
+            return
+        result: Dict[str, Any] = {
+            'status': 'ok',
+            'setup_ms': _ms(setup_seconds),
+            'samples': len(latencies),
+            'cold_ms': _ms(latencies[0]),
+            'p50_ms': _ms(statistics.median(latencies)),
+            'max_ms': _ms(max(latencies)),
+            'detail': detail,
+        }
+        if ttfts:
+            result['ttft_p50_ms'] = _ms(statistics.median(ttfts))
+        self.result = result
+
+
+def _upstash_probes() -> List[Probe]:
+    """info() and a sample query against Upstash, sharing one client"""
+    url, token = upstash_credentials()
+    if not url or not token:
+        return [Probe('upstash.info', None, skip="no credentials"),
+                Probe('upstash.query', None, skip="no credentials")]
+    client: Dict[str, Any] = {}
+    lock = threading.Lock()
+
+    def connect() -> Any:
+        with lock:
+            if 'index' not in client:
+                from upstash_vector import Index
+                client['index'] = Index(url=url, token=token)
+            return client['index']
+
+    def info(index: Any) -> Any:
+        result = index.info()
+        return {'vectors': getattr(result, 'vector_count', None), 'dimension': getattr(result, 'dimension', None)}, None
+
+    def query(index: Any) -> Any:
+        from vector_store import text_query
+        results = index.query(**text_query(index, DIAG_QUERY), top_k=1, include_metadata=False)
+        return {'top_score': round(results[0].score, 4) if results else None}, None
+
+    return [Probe('upstash.info', connect, info), Probe('upstash.query', connect, query)]
+
+
+def _groq_probe(model: str, timeout: float) -> Probe:
+    """A one-token streamed completion: round trip plus time to first token"""
+    api_key = groq_api_key()
+    if not api_key:
+        return Probe('groq.completion', None, skip="no GROQ_API_KEY")
+
+    def connect() -> Any:
+        from groq import Groq
+        return Groq(api_key=api_key, timeout=timeout, max_retries=0)
+
+    def complete(client: Any) -> Any:
+        started = time.perf_counter()
+        ttft = None
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{'role': 'user', 'content': "Reply with OK."}],
+            max_tokens=1,
+            stream=True,
+        )
+        for chunk in stream:
+            if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                ttft = time.perf_counter() - started
+        return {'model': model}, ttft
+
+    return Probe('groq.completion', connect, complete)
+
+
+def _local_probes() -> List[Probe]:
+    """Open and query the local index and snapshot; load the query cache"""
+    from sharded_store import SHARDS_FILE
+    from vector_store import INDEX_FILE, local_index_dir, query_cache_path
+    probes = []
+
+    index_dir = local_index_dir()
+    if not any(os.path.exists(os.path.join(index_dir, name)) for name in (INDEX_FILE, SHARDS_FILE)):
+        probes.append(Probe('local.index', None, skip=f"no index at {index_dir}"))
+    else:
+        def open_local() -> Any:
+            from sharded_store import open_local_index
+            from vector_store import read_generation
+            store = open_local_index(index_dir)
+            info = store.info()
+            return {'store': store, 'vectors': info.vector_count, 'dimension': info.dimension,
+                    'ef_search': info.ef_search, 'shards': info.extra.get('shards', 1),
+                    'generation': read_generation(index_dir)}
+
+        def query_local(state: Dict[str, Any]) -> Any:
+            from vector_store import text_query
+            store = state['store']
+            store.query(**text_query(store, DIAG_QUERY), top_k=3)
+            return {k: v for k, v in state.items() if k != 'store'}, None
+
+        probes.append(Probe('local.index', open_local, query_local))
+
+    snapshot_path = os.getenv('SNAPSHOT_PATH')
+    if not snapshot_path:
+        probes.append(Probe('snapshot', None, skip="SNAPSHOT_PATH not set"))
+    else:
+        def open_snapshot() -> Any:
+            from snapshot import SnapshotIndex
+            snapshot = SnapshotIndex.open(snapshot_path, verify=True, text_queries=True)  # checksums every section
+            return {'snapshot': snapshot, 'vectors': snapshot.info().vector_count,
+                    'embedding': snapshot.manifest.get('embedding')}
+
+        def query_snapshot(state: Dict[str, Any]) -> Any:
+            from vector_store import text_query
+            snapshot = state['snapshot']
+            snapshot.query(**text_query(snapshot, DIAG_QUERY), top_k=3)
+            return {k: v for k, v in state.items() if k != 'snapshot'}, None
+
+        probes.append(Probe('snapshot', open_snapshot, query_snapshot))
+
+    cache_path = query_cache_path()
+    if not os.path.exists(cache_path):
+        probes.append(Probe('query_cache', None, skip=f"no cache file at {cache_path}"))
+    else:
+        def load_cache() -> Any:
+            from embeddings import QueryEmbeddingCache
+            cache = QueryEmbeddingCache(cache_path)
+            entries = cache.load()
+            size = os.path.getsize(cache_path)
+            if not entries and size > 2:
+                raise ValueError(f"{cache_path} could not be loaded")
+            return {'entries': entries, 'file_kb': round(size / 1024, 1),
+                    'full': f"{len(cache) / cache.max_entries:.0%}"}
+
+        probes.append(Probe('query_cache', load_cache))
+    return probes
+
+
+def run_diagnostics(samples: int = DIAG_SAMPLES, timeout: float = DIAG_TIMEOUT,
+                    model: Optional[str] = None) -> Dict[str, Any]:
+    """Run every probe concurrently, each within timeout seconds; returns the baseline dict"""
+    if model is None:
+        from digital_twin_rag import DEFAULT_MODEL
+        model = DEFAULT_MODEL
+    load_config()
+    probes = _upstash_probes() + [_groq_probe(model, timeout)] + _local_probes()
+    print(f"\n🩺 Probing {sum(not p.skipped for p in probes)} endpoint(s) concurrently "
+          f"({samples} sample(s), {timeout:g}s timeout each)...")
+
+    deadline = time.monotonic() + timeout
+    # Daemon threads, so a hung connection cannot keep the process alive past the timeout
+    threads = [threading.Thread(target=probe.run, args=(samples, deadline), daemon=True)
+               for probe in probes if not probe.skipped]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    report = {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'backend': os.getenv('VECTOR_BACKEND', 'upstash'),
+        'samples': samples,
+        'wall_ms': _ms(time.perf_counter() - started),
+        'probes': {probe.name: probe.result for probe in probes},
+    }
+    print_diagnostics(report)
+    return report
+
+
+def print_diagnostics(report: Dict[str, Any]) -> None:
+    print(f"\n{'probe':<16} {'status':<8} {'cold ms':>8} {'p50 ms':>8} {'max ms':>8} {'ttft ms':>8}  detail")
+    for name, result in report['probes'].items():
+        if result['status'] != 'ok':
+            print(f"{name:<16} {result['status']:<8} {'':>8} {'':>8} {'':>8} {'':>8}  "
+                  f"{result.get('error') or result.get('detail') or ''}")
+            continue
+        detail = ', '.join(f"{k}={v}" for k, v in (result['detail'] or {}).items())
+        ttft = result.get('ttft_p50_ms')
+        print(f"{name:<16} {'ok':<8} {result['cold_ms']:>8.1f} {result['p50_ms']:>8.1f} {result['max_ms']:>8.1f} "
+              f"{f'{ttft:.1f}' if ttft is not None else '':>8}  {detail}")
+    print(f"\n  All probes finished in {report['wall_ms']:.0f} ms")
+
+
+def compare_baseline(report: Dict[str, Any], baseline_path: str) -> bool:
+    """Print p50/TTFT changes against a saved baseline; False on a regression or new failure"""
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read baseline {baseline_path}: {e}")
+        return False
+    if baseline.get('version') != BASELINE_VERSION:
+        print(f"⚠️  {baseline_path} is baseline version {baseline.get('version')}; expected {BASELINE_VERSION}")
+        return False
+
+    print(f"\n📈 Compared with {baseline_path} ({baseline.get('created', '?')})")
+    ok = True
+    for name, result in report['probes'].items():
+        before = baseline['probes'].get(name)
+        if not before or before['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            print(f"  ❌ {name}: {result['status']} (was ok)")
+            ok = False
+            continue
+        for key in ('p50_ms', 'ttft_p50_ms'):
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            regressed = ratio >= REGRESSION_FACTOR and new - old >= REGRESSION_MIN_MS
+            ok = ok and not regressed
+            print(f"  {'⚠️ ' if regressed else '✅'} {name} {key}: {old:.1f} → {new:.1f} ms ({ratio:.2f}x)")
+    return ok
+
+def main(argv: Optional[List[str]] = None):
     """Run all checks"""
+    parser = argparse.ArgumentParser(description="Check prerequisites, configuration and connectivity")
+    parser.add_argument('--diagnose', action='store_true',
+                        help="Also probe Upstash, Groq, the local index/snapshot and the query cache")
+    parser.add_argument('--samples', type=int, default=DIAG_SAMPLES, help="Timed requests per probe")
+    parser.add_argument('--timeout', type=float, default=DIAG_TIMEOUT, help="Seconds per probe")
+    parser.add_argument('--model', help="Groq model to probe (default: the RAG default)")
+    parser.add_argument('--json', metavar='PATH', help="Write the probe timings as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="Compare against a baseline written by --json")
+    args = parser.parse_args(argv)
+    if (args.json or args.compare) and not args.diagnose:
+        parser.error("--json and --compare need --diagnose")
+
     print("=" * 60)
     print("🤖 Digital Twin Setup Verification")
     print("=" * 60)
@@ -115,6 +420,16 @@ def main():
         'Script Files': check_scripts()
     }
     
+    if args.diagnose:
+        report = run_diagnostics(args.samples, args.timeout, args.model)
+        results['Connectivity'] = all(r['status'] in ('ok', 'skipped') for r in report['probes'].values())
+        if args.compare:
+            results['Latency vs Baseline'] = compare_baseline(report, args.compare)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Baseline written to {args.json}")
+    
     print("\n" + "=" * 60)
     print("📊 Summary")
     print("=" * 60)
@@ -128,12 +443,12 @@ def main():
     if all(results.values()):
         print("✅ All checks passed! Ready to proceed.\n")
         print("Next steps:")
-        print("1. Load vectors: python embed_digitaltwin.py")
-        print("2. Test RAG: python digital_twin_rag.py")
+        print("1. Load vectors: python scripts/cli.py ingest")
+        print("2. Test RAG: python scripts/cli.py chat")
         return 0
     else:
         print("❌ Some checks failed. Fix issues above before proceeding.\n")
         return 1
 
 if __name__ == '__main__':
-    sys.exit(main())
+    sys.exit(run(main))
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Watch Mode: Continuous Incremental Re-indexing
+Keeps the vector index in step with data/ and job-postings/ while you edit
+- inotify on Linux (via ctypes, no extra dependency), mtime polling elsewhere
+- Change bursts are debounced, then only the affected profile sections or
+  posting files are re-chunked; unchanged chunks are never re-upserted
+- Postings keep the layout the index was built with: one vector per posting
+  (embed_job_postings.py) or section chunks (--stream); the ids stored for a
+  posting are read from the index, so edits and deletes replace exactly those
+- Bumps the index generation so running RAG sessions drop stale state
+- Reports the delay from file save to searchable for every change
+
+Usage:
+    python scripts/watch_index.py [--sync] [--poll] [--debounce 0.3]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from embed_digitaltwin import VectorDatabaseSetup, JSON_FILE
+from embed_job_postings import JOB_POSTINGS_DIR, parse_job_posting, posting_upserts
+from chunk_text import open_chunk_text, slim_upserts
+from content_store import ContentStore
+from json_stream import load_file
+from ingest_pipeline import chunk_posting
+from profiling import run
+from sharded_store import is_local_store
+from skill_index import SkillIndex
+from vector_store import bump_generation, embed_upserts
+
+DEBOUNCE_SECONDS = 0.3  # quiet period that ends a burst of change events
+MAX_BATCH_DELAY = 2.0  # flush even if events keep arriving
+POLL_INTERVAL = 0.5
+SECTION_PROBE = 16  # section ids looked up per fetch when reading what a posting has stored
+
+# inotify event flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Directory watcher backed by Linux inotify"""
+
+    def __init__(self, directories: Iterable[str]):
+        """Start watching directories; raises OSError where inotify is unavailable"""
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        for directory in directories:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._dirs[wd] = directory
+
+    def poll(self, timeout: float) -> List[str]:
+        """Wait up to timeout seconds and return paths that changed"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(data):
+            wd, _, _, name_len = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = data[pos:pos + name_len].rstrip(b'\x00')
+            pos += name_len
+            if wd in self._dirs and name:
+                paths.append(os.path.join(self._dirs[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback: compares (mtime, size) of directory entries"""
+
+    def __init__(self, directories: Iterable[str], interval: float = POLL_INTERVAL):
+        self._dirs = list(directories)
+        self._interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for directory in self._dirs:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def poll(self, timeout: float) -> List[str]:
+        """Sleep for one interval (bounded by timeout) and return changed paths"""
+        time.sleep(min(timeout, self._interval))
+        state = self._scan()
+        changed = [p for p, sig in state.items() if self._state.get(p) != sig]
+        changed.extend(p for p in self._state if p not in state)
+        self._state = state
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(directories: List[str], force_polling: bool = False):
+    """inotify when possible, polling otherwise"""
+    if not force_polling:
+        try:
+            watcher = InotifyWatcher(directories)
+            print("👀 Watching with inotify")
+            return watcher
+        except OSError as e:
+            print(f"⚠️  inotify unavailable ({e}); falling back to polling")
+    print(f"👀 Watching by polling every {POLL_INTERVAL}s")
+    return PollingWatcher(directories)
+
+
+def stored_posting_ids(index: Any, job_id: str) -> Set[str]:
+    """Ids the index holds for a posting: its whole-posting vector (job_<stem>)
+    and its section chunks (job_<stem>_s<n>, numbered from 0 without gaps)"""
+    found: Set[str] = set()
+    start = 0
+    while True:
+        sections = [f"{job_id}_s{n}" for n in range(start, start + SECTION_PROBE)]
+        ids = ([job_id] if start == 0 else []) + sections
+        present = {vector_id for vector_id, hit in zip(ids, index.fetch(ids)) if hit is not None}
+        found |= present
+        if not present.issuperset(sections):
+            return found
+        start += SECTION_PROBE
+
+
+def _fingerprint(vector_id: str, text: str, metadata: Dict[str, Any]) -> int:
+    """Stable hash of everything that ends up in the index for one chunk"""
+    payload = json.dumps([vector_id, text, metadata], sort_keys=True)
+    return zlib.crc32(payload.encode('utf-8'))
+
+
+class IncrementalIndexer:
+    """Diffs profile sections and posting files against what was last pushed"""
+
+    def __init__(self, setup: VectorDatabaseSetup, profile_path: str = JSON_FILE,
+                 postings_dir: str = JOB_POSTINGS_DIR):
+        self.setup = setup
+        self.index = setup.index
+        self.profile_path = os.path.abspath(profile_path)
+        self.postings_dir = os.path.abspath(postings_dir)
+        self._section_hashes: Dict[str, int] = {}
+        self._section_ids: Dict[str, Set[str]] = {}
+        self._file_ids: Dict[str, Set[str]] = {}
+        self.posting_layout: Optional[str] = None  # 'whole' or 'sections', from the first posting found stored
+        self._chunk_hashes: Dict[str, int] = {}
+        self.skill_index = SkillIndex.load()
+        self.contents = ContentStore.open(writable=True)
+        self.chunk_text = open_chunk_text(setup.namespace)
+        self._skills_changed = False
+
+    def baseline(self, push: bool = False) -> None:
+        """Record the current files as the indexed state (or push them with push=True)"""
+        self.sync_profile(push=push)
+        with os.scandir(self.postings_dir) as entries:
+            paths = sorted(entry.path for entry in entries if entry.name.endswith('.md') and entry.is_file())
+        # Read what is stored first, so every posting is chunked in the layout the index uses
+        for path in paths:
+            self._file_ids[path] = self._stored_ids(path, f"job_{os.path.splitext(os.path.basename(path))[0]}")
+        for path in paths:
+            self.sync_posting(path, push=push)
+
+    def sync_profile(self, push: bool = True) -> Tuple[int, int]:
+        """Re-chunk only changed top-level profile sections; returns (upserted, deleted)"""
+        try:
+            profile = load_file(self.profile_path)
+        except (OSError, ValueError) as e:
+            # Half-saved or invalid JSON: keep serving the last good state
+            print(f"⚠️  Skipping profile update: {e}")
+            return 0, 0
+
+        upserts: List[Tuple[str, str, Dict[str, Any]]] = []
+        stale: Set[str] = set()
+        for section in set(profile) | set(self._section_hashes):
+            if section not in profile:
+                stale |= self._section_ids.pop(section, set())
+                self._section_hashes.pop(section, None)
+                continue
+            section_hash = zlib.crc32(json.dumps(profile[section], sort_keys=True).encode('utf-8'))
+            if self._section_hashes.get(section) == section_hash:
+                continue
+            self._section_hashes[section] = section_hash
+            chunks = self.setup.extract_chunks({section: profile[section]})
+            ids: Set[str] = set()
+            for batch in chunks.iter_upsert(len(chunks) or 1):
+                for vector_id, text, metadata in batch:
+                    ids.add(vector_id)
+                    if self._changed(vector_id, text, metadata):
+                        upserts.append((vector_id, text, metadata))
+            stale |= self._section_ids.get(section, set()) - ids
+            self._section_ids[section] = ids
+        return self._apply(upserts, stale, push)
+
+    def _stored_ids(self, path: str, job_id: str) -> Set[str]:
+        """Ids last pushed for a posting file, read from the index the first time it is seen"""
+        if path in self._file_ids:
+            return self._file_ids[path]
+        stored = stored_posting_ids(self.index, job_id)
+        if self.posting_layout is None and stored:
+            self.posting_layout = 'whole' if job_id in stored else 'sections'
+        return stored
+
+    def posting_chunks(self, job) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Upserts for a posting in the index's layout (whole postings unless sections are found)"""
+        if self.posting_layout == 'sections':
+            return chunk_posting(job)
+        return posting_upserts(job)
+
+    def sync_posting(self, path: str, push: bool = True) -> Tuple[int, int]:
+        """Re-chunk one posting file (or drop its chunks if it was deleted)"""
+        job_id = f"job_{os.path.splitext(os.path.basename(path))[0]}"
+        previous = self._stored_ids(path, job_id)
+        if not os.path.exists(path):
+            self._file_ids.pop(path, None)
+            self._skills_changed |= self.skill_index.remove(job_id)
+            self.contents.remove(job_id)
+            return self._apply([], previous, push)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                job = parse_job_posting(os.path.basename(path), f.read())
+        except OSError as e:
+            print(f"⚠️  Skipping {path}: {e}")
+            return 0, 0
+        self.skill_index.add(job.id, job.title, job.company, job.content)
+        self._skills_changed = True
+        self.contents.put(job.id, job.content)
+
+        upserts = []
+        ids = set()
+        for vector_id, text, metadata in self.posting_chunks(job):
+            ids.add(vector_id)
+            if self._changed(vector_id, text, metadata):
+                upserts.append((vector_id, text, metadata))
+        self._file_ids[path] = ids
+        return self._apply(upserts, previous - ids, push)
+
+    def _changed(self, vector_id: str, text: str, metadata: Dict[str, Any]) -> bool:
+        fingerprint = _fingerprint(vector_id, text, metadata)
+        if self._chunk_hashes.get(vector_id) == fingerprint:
+            return False
+        self._chunk_hashes[vector_id] = fingerprint
+        return True
+
+    def _apply(self, upserts: List[Tuple], stale: Set[str], push: bool) -> Tuple[int, int]:
+        for vector_id in stale:
+            self._chunk_hashes.pop(vector_id, None)
+        if not push:
+            return 0, 0
+        if upserts:
+            self.index.upsert(vectors=slim_upserts(embed_upserts(self.index, upserts), self.chunk_text))
+        if stale:
+            self.index.delete(ids=sorted(stale))
+            if self.chunk_text is not None:
+                for vector_id in stale:
+                    self.chunk_text.remove(vector_id)
+        return len(upserts), len(stale)
+
+    def save_postings(self) -> None:
+        """Write the skill index, posting bodies and chunk text if anything changed since the last save"""
+        if self._skills_changed and self.skill_index.save():
+            self._skills_changed = False
+        self.contents.save()
+        if self.chunk_text is not None:
+            self.chunk_text.save()
+
+    def apply(self, paths: Iterable[str]) -> Tuple[int, int]:
+        """Route changed paths to the profile or posting syncer"""
+        upserted = deleted = 0
+        for path in sorted(set(os.path.abspath(p) for p in paths)):
+            if path == self.profile_path:
+                u, d = self.sync_profile()
+            elif os.path.dirname(path) == self.postings_dir and path.endswith('.md'):
+                u, d = self.sync_posting(path)
+            else:
+                continue
+            upserted += u
+            deleted += d
+        return upserted, deleted
+
+
+def _save_time(path: str) -> Optional[float]:
+    """Wall-clock time a file was last written, if it still exists"""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def watch(indexer: IncrementalIndexer, watcher, debounce: float = DEBOUNCE_SECONDS) -> None:
+    """Main loop: collect a debounced burst of changes, push it, report freshness"""
+    pending: Set[str] = set()
+    first_event = last_event = 0.0
+    print("✅ Watching for changes (Ctrl+C to stop)\n")
+    while True:
+        timeout = debounce if pending else 1.0
+        changed = watcher.poll(timeout)
+        now = time.monotonic()
+        if changed:
+            if not pending:
+                first_event = now
+            pending.update(changed)
+            last_event = now
+            if now - first_event < MAX_BATCH_DELAY:
+                continue
+        if not pending or (now - last_event < debounce and now - first_event < MAX_BATCH_DELAY):
+            continue
+
+        paths, pending = pending, set()
+        saved_at = [t for t in (_save_time(p) for p in paths) if t is not None]
+        try:
+            upserted, deleted = indexer.apply(paths)
+        except Exception as e:
+            print(f"❌ Re-index failed: {e}")
+            continue
+        indexer.save_postings()
+        if not upserted and not deleted:
+            continue
+
+        if is_local_store(indexer.index):
+            # Skip recall calibration here; it runs on the next full embed
+            indexer.index.save(calibrate=False, quiet=True)
+        else:
+            bump_generation()
+        searchable = time.time()
+        lag = f"{searchable - min(saved_at):.2f}s after save" if saved_at else "after delete"
+        names = ', '.join(sorted(os.path.basename(p) for p in paths))
+        print(f"⚡ {names}: {upserted} chunk(s) upserted, {deleted} removed; searchable {lag}")
+
+
+def main(argv: List[str] = None) -> int:
+    """Watch data/ and job-postings/ until interrupted"""
+    parser = argparse.ArgumentParser(description="Incrementally re-index profile and postings on change")
+    parser.add_argument('--sync', action='store_true', help="Push all current content once before watching")
+    parser.add_argument('--poll', action='store_true', help="Force the polling watcher")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS)
+    args = parser.parse_args(argv)
+
+    print("🤖 Digital Twin Watch Mode\n")
+    print("=" * 60)
+    setup = VectorDatabaseSetup()
+    if not setup.setup_connection():
+        print("❌ Failed to connect to the vector database. Exiting.")
+        return 1
+
+    indexer = IncrementalIndexer(setup)
+    start = time.perf_counter()
+    indexer.baseline(push=args.sync)
+    indexer.save_postings()
+    if args.sync and is_local_store(setup.index):
+        setup.index.save()
+    print(f"📋 Baseline: {len(indexer._chunk_hashes)} chunks tracked ({time.perf_counter() - start:.2f}s)")
+
+    watcher = make_watcher([os.path.dirname(indexer.profile_path), indexer.postings_dir], args.poll)
+    try:
+        watch(indexer, watcher, args.debounce)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(main))
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Prefork Worker Pool
+Serves the MCP endpoint from N pre-forked worker processes, so CPU-bound local
+retrieval and prompt assembly use every core instead of one GIL
+- The parent loads the twin (index, profile) once, closes its network
+  clients, moves its heap out of the garbage collector's reach (gc.freeze)
+  and forks: workers share those pages copy-on-write, and map the same
+  snapshot and content store files, so the page cache holds one copy for all
+  of them. Each worker opens its own Groq and Upstash connections
+- The parent only accepts connections; each one is handed, socket and all, to
+  the worker with the fewest open connections, which serves it with the usual
+  DigitalTwinServer (keep-alive, coalescing, backpressure)
+- A worker that crashes is replaced by a fresh fork of the parent. One that
+  has served WORKER_MAX_REQUESTS requests, or whose private memory passed
+  WORKER_MAX_PRIVATE_MB, finishes its requests and exits once its replacement
+  is up
+- /health answers from the worker serving it, with its slot, pid and memory
+
+Unix only: needs fork and socket passing (SCM_RIGHTS).
+"""
+
+import asyncio
+import gc
+import json
+import os
+import random
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+WORKER_MAX_REQUESTS = int(os.getenv('WORKER_MAX_REQUESTS', '10000'))  # 0 = never recycle by count
+WORKER_MAX_PRIVATE_MB = float(os.getenv('WORKER_MAX_PRIVATE_MB', '512'))  # 0 = never recycle by memory
+MAX_REQUESTS_JITTER = 0.1  # spread recycling so workers started together do not all retire together
+CHECK_SECONDS = 2.0        # how often a worker checks its memory and that the parent is alive
+RESPAWN_BACKOFF_MAX = 30.0  # seconds between restarts of a worker that keeps dying on start
+STOP_GRACE = 35.0          # a worker drains for up to mcp_server.SHUTDOWN_GRACE; then it is killed
+
+
+def prefork_supported() -> bool:
+    """True when this platform can fork workers and pass them sockets"""
+    return hasattr(os, 'fork') and hasattr(socket, 'send_fds')
+
+
+def private_mb() -> Optional[float]:
+    """Memory this process does not share with the parent or the page cache, in MB
+
+    Resident size would count the shared index pages once per worker; a leak
+    shows up as private pages. None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            kb = sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+    except (OSError, ValueError, IndexError):
+        return None
+    return kb / 1024
+
+
+@dataclass(eq=False)
+class Worker:
+    """One worker process as the parent sees it"""
+    slot: int
+    pid: int
+    control: socket.socket
+    started: float = field(default_factory=time.monotonic)
+    connections: int = 0  # handed over and not yet reported closed
+    handed: int = 0
+    retiring: Optional[str] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+class PreforkServer:
+    """Parent of the worker processes: accept, dispatch, supervise"""
+
+    def __init__(self, make_server: Callable[[], Any], processes: int,
+                 max_requests: int = WORKER_MAX_REQUESTS, max_private_mb: float = WORKER_MAX_PRIVATE_MB,
+                 before_fork: Optional[Callable[[], None]] = None,
+                 init_worker: Optional[Callable[[], Any]] = None):
+        """make_server() -> DigitalTwinServer, called in each worker after fork
+
+        Whatever make_server closes over (the loaded twin, the tenant pool) is
+        built by the caller before serve() forks, so workers share it.
+        before_fork() runs once in the parent before the first fork, to close
+        network clients whose pooled connections must not be inherited;
+        init_worker() runs in each worker before make_server() to open its
+        own (a False result fails the worker's start).
+        """
+        if not prefork_supported():
+            raise RuntimeError("Pre-forked workers need fork and socket passing (Unix only)")
+        self.make_server = make_server
+        self.processes = processes
+        self.max_requests = max_requests
+        self.max_private_mb = max_private_mb
+        self.before_fork = before_fork
+        self.init_worker = init_worker
+        self.workers: Dict[int, Worker] = {}   # slot -> serving worker
+        self.retiring: Dict[int, Worker] = {}  # pid -> worker draining before exit
+        self.respawn_at: Dict[int, float] = {}  # slot -> when to start its next worker
+        self.backoff: Dict[int, float] = {}
+        self.selector = selectors.DefaultSelector()
+        self.listener: Optional[socket.socket] = None
+        self.stopping = False
+        self.totals = {'requests': 0, 'questions': 0, 'errors': 0}
+        self.stats = {'connections': 0, 'rejected': 0, 'spawned': 0, 'recycled': 0, 'crashed': 0}
+
+    # --- parent -------------------------------------------------------------
+
+    def serve(self, host: str = '127.0.0.1', port: int = 3000, sock: Optional[socket.socket] = None) -> None:
+        """Fork the workers and dispatch connections until SIGINT/SIGTERM"""
+        self.listener = sock or socket.create_server((host, port), backlog=1024)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._request_stop)
+
+        if self.before_fork:
+            self.before_fork()
+        # Everything loaded so far is shared with the workers; keep the collector
+        # from writing to (and so copying) those pages in every one of them
+        gc.collect()
+        gc.freeze()
+        for slot in range(self.processes):
+            self._spawn(slot)
+        host, port = self.listener.getsockname()[:2]
+        print(f"🚀 Digital Twin MCP server on http://{host}:{port}/api/mcp "
+              f"({self.processes} worker processes, parent pid {os.getpid()})")
+        try:
+            while not self.stopping:
+                for key, _ in self.selector.select(timeout=0.5):
+                    if key.fileobj is self.listener:
+                        self._accept()
+                    else:
+                        self._receive(key.data)
+                self._reap()
+                self._respawn_due()
+        finally:
+            self._stop_workers()
+
+    def _request_stop(self, signum: int, frame: Any) -> None:
+        self.stopping = True
+
+    def _spawn(self, slot: int) -> None:
+        parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sys.stdout.flush()  # or the child inherits, and prints again, whatever is buffered
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            parent_end.close()
+            status = 0
+            try:
+                self._worker_main(slot, child_end)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        child_end.close()
+        worker = Worker(slot, pid, parent_end)
+        self.workers[slot] = worker
+        self.selector.register(parent_end, selectors.EVENT_READ, worker)
+        self.stats['spawned'] += 1
+
+    def _accept(self) -> None:
+        """Hand every pending connection to the least busy worker"""
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:  # nothing pending (or a client gave up before we got to it)
+                return
+            self.stats['connections'] += 1
+            try:
+                self._dispatch(conn)
+            finally:
+                conn.close()  # the worker holds its own descriptor now
+
+    def _dispatch(self, conn: socket.socket) -> None:
+        # Fewest open connections; ties go round-robin
+        candidates = sorted(self.workers.values(), key=lambda w: (w.connections, w.handed))
+        for worker in candidates:
+            try:
+                socket.send_fds(worker.control, [b'c'], [conn.fileno()])
+            except OSError:
+                continue  # died since the last reap; it is replaced there
+            worker.connections += 1
+            worker.handed += 1
+            return
+        self.stats['rejected'] += 1
+        try:
+            conn.setblocking(True)
+            conn.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                         b"Retry-After: 1\r\nConnection: close\r\n\r\n")
+        except OSError:
+            pass
+
+    def _receive(self, worker: Worker) -> None:
+        """Messages from a worker: closed connections, stats, retirement"""
+        while True:
+            try:
+                data = worker.control.recv(65536, socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = b''
+            if not data:
+                self.selector.unregister(worker.control)
+                return
+            message = json.loads(data)
+            worker.connections = max(0, worker.connections - message.get('closed', 0))
+            worker.stats = message.get('stats', worker.stats)
+            reason = message.get('retire')
+            if reason and worker.retiring is None:
+                worker.retiring = reason
+                if self.workers.get(worker.slot) is worker:
+                    del self.workers[worker.slot]
+                    self.retiring[worker.pid] = worker
+                    if not self.stopping:
+                        self._spawn(worker.slot)
+                # Sent after every connection handed to it, so it stops only once it has them all
+                try:
+                    worker.control.send(b'r')
+                except OSError:
+                    pass
+
+    def _reap(self) -> None:
+        """Collect exited workers; restart the ones that were not asked to go"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.retiring.pop(pid, None)
+            if worker is None:
+                worker = next((w for w in self.workers.values() if w.pid == pid), None)
+                if worker is None:
+                    continue
+                del self.workers[worker.slot]
+            self._receive(worker)  # its last stats
+            self._close_control(worker)
+            self._add_totals(worker)
+            if worker.retiring:
+                self.stats['recycled'] += 1
+                print(f"♻️  Worker {worker.slot} (pid {pid}) recycled: {worker.retiring}")
+                continue
+            if self.stopping:
+                continue
+            self.stats['crashed'] += 1
+            cause = (f"signal {os.WTERMSIG(status)}" if os.WIFSIGNALED(status)
+                     else f"exit code {os.WEXITSTATUS(status)}")
+            # Back off a worker that dies as soon as it starts instead of fork-looping
+            startup = time.monotonic() - worker.started < 1.0 and not worker.stats.get('requests')
+            delay = min(RESPAWN_BACKOFF_MAX, self.backoff.get(worker.slot, 0.5) * 2) if startup else 0.0
+            self.backoff[worker.slot] = delay
+            self.respawn_at[worker.slot] = time.monotonic() + delay
+            print(f"💥 Worker {worker.slot} (pid {pid}) died ({cause}); "
+                  f"restarting{f' in {delay:.0f}s' if delay else ''}")
+
+    def _respawn_due(self) -> None:
+        now = time.monotonic()
+        for slot, when in list(self.respawn_at.items()):
+            if when <= now and not self.stopping:
+                del self.respawn_at[slot]
+                self._spawn(slot)
+
+    def _close_control(self, worker: Worker) -> None:
+        try:
+            self.selector.unregister(worker.control)
+        except (KeyError, ValueError):
+            pass
+        worker.control.close()
+
+    def _add_totals(self, worker: Worker) -> None:
+        for key in self.totals:
+            self.totals[key] += worker.stats.get(key, 0)
+
+    def _stop_workers(self) -> None:
+        """Stop accepting, let every worker drain, then collect them"""
+        print("\n🛑 Shutting down: draining worker processes...")
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        running = {**{w.pid: w for w in self.workers.values()}, **self.retiring}
+        for pid in running:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + STOP_GRACE
+        while running and time.monotonic() < deadline:
+            for key, _ in self.selector.select(timeout=0.1):
+                self._receive(key.data)
+            for pid in list(running):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    self._receive(running[pid])
+                    self._add_totals(running.pop(pid))
+        for pid, worker in running.items():
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self._add_totals(worker)
+        for worker in list(self.workers.values()) + list(self.retiring.values()):
+            self._close_control(worker)
+        self.workers.clear()
+        self.retiring.clear()
+        print(f"✅ Stopped ({self.totals['requests']} requests, {self.totals['questions']} questions; "
+              f"{self.stats['spawned']} workers started, {self.stats['recycled']} recycled, "
+              f"{self.stats['crashed']} crashed)")
+
+    # --- worker -------------------------------------------------------------
+
+    def _worker_main(self, slot: int, control: socket.socket) -> None:
+        """Runs in the forked child; returns when the worker should exit"""
+        # Only the parent's own descriptors: the listener and other workers' channels
+        self.selector.close()
+        self.listener.close()
+        for worker in list(self.workers.values()) + list(self.retiring.values()):
+            worker.control.close()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the parent, which stops us
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if self.init_worker and self.init_worker() is False:
+            raise RuntimeError(f"worker {slot} could not open its clients")
+        asyncio.run(WorkerProcess(self, slot, control).run())
+
+
+class WorkerProcess:
+    """A forked worker: serves handed-over connections with its own DigitalTwinServer"""
+
+    def __init__(self, pool: PreforkServer, slot: int, control: socket.socket):
+        self.slot = slot
+        self.control = control
+        self.parent = os.getppid()
+        self.server = pool.make_server()
+        limit = pool.max_requests
+        self.max_requests = int(limit * (1 + random.uniform(0, MAX_REQUESTS_JITTER))) if limit else 0
+        self.max_private_mb = pool.max_private_mb
+        self.server.worker = {'slot': slot, 'pid': os.getpid(), 'private_mb': private_mb()}
+        self.stop = asyncio.Event()
+        self.retired = False
+        self.tasks: set = set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, self.stop.set)
+        self.control.setblocking(False)
+        loop.add_reader(self.control.fileno(), self._receive)
+        checker = loop.create_task(self._check_loop())
+        await self.stop.wait()
+        loop.remove_reader(self.control.fileno())
+        checker.cancel()
+        await self.server.shutdown(quiet=True)
+        self._notify()
+        self.control.close()
+
+    def _receive(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(self.control, 16, 8)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self.stop.set()
+                return
+            if data == b'r':
+                self.stop.set()  # replacement is up and nothing more is coming our way
+            for fd in fds:
+                task = loop.create_task(self._serve(socket.socket(fileno=fd)))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def _serve(self, sock: socket.socket) -> None:
+        from mcp_server import MAX_HEADER_BYTES
+        try:
+            reader, writer = await asyncio.open_connection(sock=sock, limit=MAX_HEADER_BYTES)
+        except OSError:
+            sock.close()
+            self._notify(closed=1)
+            return
+        try:
+            await self.server.handle_connection(reader, writer)
+        finally:
+            self._notify(closed=1)
+            self._check()
+
+    def _notify(self, **message: Any) -> None:
+        stats = self.server.stats
+        message['stats'] = {key: stats.get(key, 0) for key in ('requests', 'questions', 'errors')}
+        try:
+            self.control.send(json.dumps(message).encode('utf-8'))
+        except OSError:
+            pass  # parent gone or its queue full; the next message carries the stats again
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(CHECK_SECONDS)
+            if os.getppid() != self.parent:
+                self.stop.set()  # orphaned: nobody dispatches to us any more
+                return
+            self.server.worker['private_mb'] = private_mb()
+            self._check()
+
+    def _check(self) -> None:
+        """Ask the parent for a replacement once this worker is due for recycling"""
+        if self.retired:
+            return
+        reason = None
+        if self.max_requests and self.server.stats['requests'] >= self.max_requests:
+            reason = f"served {self.server.stats['requests']} requests"
+        else:
+            memory = private_mb()
+            if self.max_private_mb and memory is not None and memory > self.max_private_mb:
+                reason = f"private memory {memory:.0f} MB > {self.max_private_mb:.0f} MB"
+        if reason:
+            self.retired = True
+            self._notify(retire=reason)
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from intent_router import IntentRouter
+
+PROFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'digitaltwin_clean.json')
+
+
+@pytest.fixture(scope='module')
+def router():
+    with open(PROFILE, encoding='utf-8') as f:
+        return IntentRouter(json.load(f))
+
+
+@pytest.mark.parametrize('question', [
+    "Where did you start your career?",
+    "Tell me your availability for a call tomorrow?",
+    "Are you looking for feedback on your code?",
+    "Are you open to remote work?",
+    "Do you know what time it is?",
+    "Is there experience you want to share?",
+    "How do you store credentials?",
+    "Did you start the meeting?",
+    "What are you looking for in a manager?",
+    "Are you available next week?",
+    "Is your certification relevant to this job posting?",
+    "Why does this job need a certification?",
+    "What tools did you use at Amazon?",
+    "Did you like the job at IBM?",
+    "What do you think of the team at Amazon?",
+])
+def test_unrelated_questions_go_to_rag(router, question):
+    assert router.route(question) is None
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("When can you start?", 'notice_period'),
+    ("What is your notice period?", 'notice_period'),
+    ("What are your salary expectations?", 'salary'),
+    ("What is your visa status?", 'visa'),
+    ("Where are you based?", 'location'),
+    ("What roles are you looking for?", 'job_target'),
+    ("What is your name?", 'name'),
+    ("Which certifications do you hold?", 'certifications'),
+    ("What did you study?", 'education'),
+    ("What certifications do you have?", 'certifications'),
+    ("Do you have any AWS certifications?", 'certifications'),
+    ("What was your role at IBM?", 'company'),
+    ("When did you work at Amazon?", 'company'),
+    ("How long did you work at IBM?", 'company'),
+    ("How many years were you at IBM?", 'company'),
+    ("Do you know SQL?", 'skills'),
+    ("What cloud skills do you have?", 'skills'),
+    ("How many years of experience do you have?", 'total_experience'),
+])
+def test_factual_lookups_take_the_fast_path(router, question, intent):
+    result = router.route(question)
+    assert result is not None and result.intent == intent
+
+
+def test_notice_answer_is_the_notice_field(router):
+    assert router.route("When can you start?").answer == "Notice period: Immediately available."
@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from prefetch import FollowUpPrefetcher
+
+CAREER_ITEM = {'id': 'career_transition', 'type': 'career', 'title': 'Career Transition', 'content': '...'}
+
+
+def _predictions(profile):
+    twin = SimpleNamespace(profile_data=profile, index_generation='0')
+    result = {'success': True, 'response': 'I am moving on.', 'context_items': [CAREER_ITEM]}
+    return [p.question for p in FollowUpPrefetcher(twin).predict("Why the change?", result)]
+
+
+def test_career_follow_up_names_the_profiles_target():
+    profile = {'career_transition': {'to': 'Product Manager / Product Owner'}}
+    assert _predictions(profile) == ["Why do you want to move into Product Manager roles?"]
+    assert _predictions({'personal_profile': {'job_target': 'Nurse'}}) == ["Why do you want to move into Nurse roles?"]
+
+
+def test_no_career_follow_up_without_a_target():
+    assert _predictions({}) == []
@@ -0,0 +1,41 @@
+import json
+import sys
+
+import profiling
+
+
+def test_profiler_switch_leaves_profile_path_alone(monkeypatch):
+    monkeypatch.delenv('PROFILER', raising=False)
+    monkeypatch.setattr(sys, 'argv', ['embed_digitaltwin.py', '--profile', 'me.json'])
+    assert profiling.run(lambda: list(sys.argv)) == ['embed_digitaltwin.py', '--profile', 'me.json']
+
+
+def test_profiler_switch_is_removed_from_argv(monkeypatch, tmp_path):
+    monkeypatch.delenv('PROFILER', raising=False)
+    monkeypatch.setenv('PROFILE_OUT', str(tmp_path / 'out'))
+    monkeypatch.setattr(sys, 'argv', ['embed_digitaltwin.py', '--profiler', 'tracemalloc', '--profile', 'me.json'])
+    assert profiling.run(lambda: list(sys.argv)) == ['embed_digitaltwin.py', '--profile', 'me.json']
+
+
+def test_skill_gaps_read_the_profile_option(monkeypatch, tmp_path, capsys):
+    import skill_index
+    monkeypatch.delenv('PROFILER', raising=False)
+    monkeypatch.setenv('SKILL_INDEX_FILE', str(tmp_path / 'skills.json'))
+    (tmp_path / 'job1.md').write_text("# Data Engineer\n\n**Company:** Acme\n\n- Python and SQL\n")
+    assert skill_index.main(['build', '--dir', str(tmp_path)]) == 0
+    profile = tmp_path / 'me.json'
+    profile.write_text('{"skills": {"languages": ["Python"]}}')
+    monkeypatch.setattr(sys, 'argv', ['skill_index.py', 'gaps', '--profile', str(profile), '--json'])
+    capsys.readouterr()
+    assert profiling.run(lambda: skill_index.main(sys.argv[1:])) == 0
+    assert [skill for skill, _ in json.loads(capsys.readouterr().out)] == ['SQL']
+
+
+def test_tune_chunks_reads_the_profile_option(monkeypatch, tmp_path, capsys):
+    import tune_chunks
+    monkeypatch.delenv('PROFILER', raising=False)
+    monkeypatch.setenv('VECTOR_BACKEND', 'local')  # main() sets it for the sweep
+    missing = str(tmp_path / 'other_profile.json')
+    monkeypatch.setattr(sys, 'argv', ['tune_chunks.py', '--profile', missing])
+    assert profiling.run(lambda: tune_chunks.main(sys.argv[1:])) == 1
+    assert f"{missing} not found" in capsys.readouterr().out
@@ -0,0 +1,64 @@
+import threading
+
+from resilience import Deadline, ResilientCall, is_rate_limited, retry_after
+from scheduler import RequestScheduler
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_rate_limit_detection():
+    assert is_rate_limited(RateLimitError("Too many requests"))
+    assert is_rate_limited(RuntimeError("Error code: 429 - rate limit reached"))
+    assert not is_rate_limited(RuntimeError("read 4290 bytes"))
+    assert retry_after(RuntimeError("Please try again in 750ms")) == 0.75
+    assert retry_after(RuntimeError("Please try again in 2.5s")) == 2.5
+    assert retry_after(RuntimeError("boom")) is None
+
+
+def test_rate_limited_call_is_not_retried():
+    calls = []
+
+    def fn(deadline):
+        calls.append(1)
+        raise RateLimitError("Rate limit reached. Please try again in 3s")
+
+    result = ResilientCall('generation')(fn, Deadline(2.0), admit=lambda timeout: True)
+    assert calls == [1]
+    assert result.error.kind == 'rate_limited'
+    assert result.error.retry_after == 3.0
+
+
+def test_fast_failure_retry_is_admitted():
+    calls, admitted = [], []
+
+    def fn(deadline):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return 'ok'
+
+    def admit(timeout):
+        admitted.append(timeout)
+        return True
+
+    result = ResilientCall('generation')(fn, Deadline(2.0), admit=admit)
+    assert result.value == 'ok' and len(calls) == 2 and len(admitted) == 1
+
+
+def test_hedge_waits_for_rate_limit_capacity():
+    scheduler = RequestScheduler({'groq': (1, 0)})
+    assert scheduler.acquire('groq')  # the original request uses the only slot
+    release = threading.Event()
+    calls = []
+
+    def fn(deadline):
+        calls.append(1)
+        release.wait(0.3)
+        return 'ok'
+
+    call = ResilientCall('generation', default_hedge_delay=0.05)
+    result = call(fn, Deadline(2.0), admit=lambda timeout: scheduler.acquire('groq', timeout=timeout))
+    assert result.ok and not result.hedged
+    assert len(calls) == 1 and call.stats['hedges_skipped'] == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from ann_index import HNSWIndex
+from snapshot import LOCAL_EMBEDDING, SnapshotError, SnapshotIndex, write_snapshot
+from vector_store import EMBEDDING_DIM, hash_embed
+
+
+def _write(path, embedding, dim=EMBEDDING_DIM):
+    index = HNSWIndex(dim)
+    for text in ("python and sql", "cloud support"):
+        index.add(hash_embed(text, dim) if dim == EMBEDDING_DIM else [1.0] * dim)
+    write_snapshot(str(path), index, ['a', 'b'], [{'title': 'a'}, {'title': 'b'}], {'embedding': embedding})
+    return str(path)
+
+
+def test_upstash_snapshot_refused_for_text_queries(tmp_path):
+    path = _write(tmp_path / 'upstash.dtsnap', 'upstash:COSINE:8', dim=8)
+    with pytest.raises(SnapshotError, match="exported from Upstash"):
+        SnapshotIndex.open(path, text_queries=True)
+    snapshot = SnapshotIndex.open(path)  # still readable for import and verify
+    assert snapshot.info().vector_count == 2
+    snapshot.close()
+
+
+def test_local_snapshot_answers_text_queries(tmp_path):
+    snapshot = SnapshotIndex.open(_write(tmp_path / 'local.dtsnap', LOCAL_EMBEDDING), text_queries=True)
+    assert snapshot.query(data="python and sql", top_k=1)[0].id == 'a'
+    snapshot.close()
@@ -0,0 +1,19 @@
+import json
+
+from tenants import TenantRegistry, main
+
+
+def test_list_without_a_tenants_dir(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('TENANTS_DIR', str(tmp_path / 'missing'))
+    assert TenantRegistry().ids() == []
+    assert main(['list']) == 0
+    assert "0 tenant(s)" in capsys.readouterr().out
+
+
+def test_list_reports_a_manifest_entry_without_profile(tmp_path, monkeypatch, capsys):
+    (tmp_path / 'tenants.json').write_text(json.dumps({'ghost': {'namespace': 'g'}}))
+    (tmp_path / 'alice.json').write_text('{}')
+    monkeypatch.setenv('TENANTS_DIR', str(tmp_path))
+    assert main(['list']) == 0
+    out = capsys.readouterr().out
+    assert "2 tenant(s)" in out and "profile is missing" in out and "alice.json" in out
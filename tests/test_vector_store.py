@@ -0,0 +1,49 @@
+import pytest
+
+from vector_store import ANN_COMPACT_RATIO, LocalVectorStore
+
+
+def test_repeated_upserts_keep_tombstones_bounded(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dim=8)
+    ids = [f"chunk_{n}" for n in range(20)]
+    for round_no in range(10):
+        store.upsert([(vector_id, [float(n + round_no + 1)] + [1.0] * 7, {'title': vector_id, 'round': round_no})
+                      for n, vector_id in enumerate(ids)])
+        assert store.save(calibrate=False, quiet=True)
+        assert len(store.index.deleted) <= ANN_COMPACT_RATIO * len(store.index)
+    assert len(store.index) == len(ids) and store.index.node_count == len(ids)
+    assert store.fetch(['chunk_3'], include_metadata=True)[0].metadata == {'title': 'chunk_3', 'content': '', 'round': 9}
+
+
+def test_compacted_store_reloads(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dim=4)
+    store.upsert([('a', [1.0, 0, 0, 0]), ('b', [0, 1.0, 0, 0]), ('c', [0, 0, 1.0, 0])])
+    store.delete(['b'])
+    assert store.save(calibrate=False, quiet=True)
+    loaded = LocalVectorStore.open(str(tmp_path), dim=4)
+    assert loaded.index.node_count == 2 and not loaded.index.deleted
+    assert [hit.id for hit in loaded.query([0, 0, 1.0, 0], top_k=1)] == ['c']
+
+
+def test_open_waits_for_both_files_of_a_save(tmp_path, monkeypatch):
+    import shutil
+    import threading
+    import vector_store
+    old, new = tmp_path / 'old', tmp_path / 'new'
+    for path, ids in ((old, ['a']), (new, ['a', 'b'])):
+        store = LocalVectorStore(str(path), dim=4)
+        store.upsert([(vector_id, [1.0, n, 0, 0]) for n, vector_id in enumerate(ids)])
+        assert store.save(calibrate=False, quiet=True)
+
+    # A save in another process has swapped in its graph but not yet its records
+    shutil.copy(new / vector_store.INDEX_FILE, old / vector_store.INDEX_FILE)
+    monkeypatch.setattr(vector_store, 'OPEN_RETRIES', 2)
+    with pytest.raises(ValueError):
+        LocalVectorStore.open(str(old), dim=4)
+
+    monkeypatch.setattr(vector_store, 'OPEN_RETRIES', 500)
+    swap = threading.Timer(0.05, shutil.copy, (new / vector_store.RECORDS_FILE, old / vector_store.RECORDS_FILE))
+    swap.start()
+    reopened = LocalVectorStore.open(str(old), dim=4)
+    swap.join()
+    assert [hit is not None for hit in reopened.fetch(['a', 'b'])] == [True, True]
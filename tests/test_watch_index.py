@@ -0,0 +1,52 @@
+import os
+from types import SimpleNamespace
+
+from embed_job_postings import JobPostingEmbedder
+from sharded_store import open_local_index
+from watch_index import IncrementalIndexer
+
+POSTING = """# {title}
+
+**Company:** Acme
+**Location:** Remote
+
+## Requirements
+- Python and SQL
+- {extra}
+"""
+
+
+def write_posting(directory, name, title, extra):
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+        f.write(POSTING.format(title=title, extra=extra))
+
+
+def test_edit_and_delete_replace_embedder_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('VECTOR_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_INDEX_DIR', str(tmp_path / 'index'))
+    monkeypatch.delenv('VECTOR_SHARDS', raising=False)
+    postings = tmp_path / 'job-postings'
+    postings.mkdir()
+    write_posting(postings, 'job1.md', 'Data Engineer', 'Airflow')
+    write_posting(postings, 'job2.md', 'Backend Developer', 'Django')
+    (tmp_path / 'profile.json').write_text('{}')
+
+    embedder = JobPostingEmbedder()
+    assert embedder.setup_connection() and embedder.load_job_postings() and embedder.embed_and_store()
+
+    index = open_local_index()
+    indexer = IncrementalIndexer(SimpleNamespace(index=index, namespace=''),
+                                 profile_path=str(tmp_path / 'profile.json'), postings_dir=str(postings))
+    indexer.baseline()
+    assert indexer.posting_layout == 'whole'
+
+    write_posting(postings, 'job1.md', 'Senior Data Engineer', 'Kafka')
+    assert indexer.sync_posting(str(postings / 'job1.md')) == (1, 0)
+    hit, stray = index.fetch(['job_job1', 'job_job1_s0'], include_metadata=True)
+    assert hit.metadata['title'] == 'Senior Data Engineer' and stray is None
+
+    os.remove(postings / 'job2.md')
+    assert indexer.sync_posting(str(postings / 'job2.md')) == (0, 1)
+    assert index.fetch(['job_job2']) == [None]
+    assert index.info().vector_count == 1